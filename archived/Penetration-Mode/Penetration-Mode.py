@@ -5,26 +5,51 @@ import logging
 import base64
 import json
 import shutil
-import yaml
+import signal
+import sqlite3
+from array import array
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QVBoxLayout, QWidget, QLabel,
-    QTextEdit, QMessageBox, QHBoxLayout, QTabWidget, QLineEdit, QScrollArea,
+    QTextEdit, QPlainTextEdit, QMessageBox, QHBoxLayout, QTabWidget, QLineEdit, QScrollArea,
     QMenu, QAction, QGridLayout, QToolBar, QComboBox, QProgressBar,
     QDialog, QInputDialog, QCheckBox, QStatusBar, QSizePolicy,
-    QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog, QSpinBox,
+    QTableWidget, QTableWidgetItem, QTableView, QHeaderView, QFileDialog, QSpinBox,
     QGroupBox, QFormLayout, QSplitter, QTreeWidget, QTreeWidgetItem, QDockWidget,
-    QToolButton, QProgressDialog, QDateEdit, QGraphicsView, QGraphicsScene
+    QToolButton, QProgressDialog, QDateEdit, QGraphicsView, QGraphicsScene, QGraphicsItem, QGraphicsRectItem,
+    QAbstractScrollArea
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QPoint, QSize, QSettings, QThreadPool, QDate, QPropertyAnimation, QRectF
-from PyQt5.QtGui import QFont, QIcon, QPixmap, QCursor, QColor, QBrush, QPainter, QPen, QLinearGradient
-import requests
+from PyQt5.QtCore import (
+    Qt, QObject, pyqtSignal, QTimer, QPoint, QSize, QSettings, QDate, QPropertyAnimation, QRectF,
+    QAbstractTableModel, QAbstractProxyModel, QModelIndex, QPointF
+)
+from PyQt5.QtGui import QFont, QIcon, QPixmap, QCursor, QColor, QBrush, QPainter, QPen, QLinearGradient, QPolygonF, QPalette
 from urllib.parse import urlparse
 from pathlib import Path
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from penmode.accounting import Usage
+from penmode.aggregate import ToolStats
+from penmode.blobs import BlobStore
+from penmode.cache import CACHED, DEFAULT_CACHE_SIZE, DEFAULT_TTLS, ResultCache, cache_key
+from penmode.config import CONFIG_PATH, history_path, journal_path, load_yaml_config, outputs_path
+from penmode.console import APP_SOURCE, CONSOLE_LINES, LineRing
+from penmode.history import FINDING_COLUMNS, HistoryStore, RetentionPolicy
+from penmode.inventory import ToolInventory
+from penmode.jobs import CANCELLED, Job, JobScheduler, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, RESOURCE_CLASSES
+from penmode.journal import JobJournal, JournalEntry
+from penmode.keys import KeyDeriver
+from penmode.logsink import LogSink, derive_log_key
+from penmode.netlink import Interface, NetlinkWatcher
+from penmode.parsers import OutputIngest, stdout_parser, structured_output
+from penmode.pipeline import DiscoveryPipeline, nmap_command, split_pipeline_params
+from penmode.privhelper import STAGED_RESOLV_CONF, PrivilegedHelper
+from penmode.results import COLUMNS, ResultsStore, date_key, format_date_key, preview
+from penmode.sampler import ResourceSampler, format_bytes
+from penmode.sharding import NmapCommand, ShardGroup, plan_shards, shard_count
+from penmode.streaming import BatchWindow
+from penmode.tasks import ScheduledTask, TaskScheduler
+from penmode.tools import find_tool, tool_categories, validate_input
+from penmode.updates import DEFAULT_UPDATE_URL, MIN_CHECK_INTERVAL, RELEASE_INFO_PATHS, UpdateChecker, release_label
 
 # Logging setup
 logging.basicConfig(
@@ -35,6 +60,9 @@ logging.basicConfig(
 
 # Encryption key generation
 def generate_key(password: str = "default_password") -> bytes:
+    # Runs on the KeyDeriver thread, so cryptography is loaded off the GUI thread too
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
     salt = b'hackeros_salt_2025'
     kdf = PBKDF2HMAC(
         algorithm=hashes.SHA256(),
@@ -44,21 +72,13 @@ def generate_key(password: str = "default_password") -> bytes:
     )
     return base64.urlsafe_b64encode(kdf.derive(password.encode()))
 
-# Load optional YAML config
-CONFIG_PATH = "/etc/xdg/Penetration-Mode/config.yaml"
-def load_yaml_config() -> Dict:
-    if os.path.exists(CONFIG_PATH):
-        try:
-            with open(CONFIG_PATH, "r") as f:
-                return yaml.safe_load(f) or {}
-        except (yaml.YAMLError, IOError) as e:
-            logging.error(f"Failed to load config from {CONFIG_PATH}: {str(e)}")
-    return {}
+# Privileged commands share one helper process, authorized once per session
+privileged_helper = PrivilegedHelper()
 
 # Funkcja do uruchamiania komend z uprawnieniami roota
 def run_with_privileges(command: List[str], timeout: int = None) -> subprocess.CompletedProcess:
     try:
-        result = subprocess.run(['pkexec'] + command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=timeout)
+        result = privileged_helper.run(command, timeout=timeout)
         if result.returncode == 126 or result.returncode == 127:
             raise subprocess.CalledProcessError(result.returncode, command, output="Authentication canceled by user")
         return result
@@ -67,32 +87,419 @@ def run_with_privileges(command: List[str], timeout: int = None) -> subprocess.C
     except subprocess.CalledProcessError as e:
         raise subprocess.CalledProcessError(e.returncode, command, output=e.output, stderr=e.stderr)
 
-class ProcessWorker(QThread):
-    output_signal = pyqtSignal(str)
-    error_signal = pyqtSignal(str)
-    finished_signal = pyqtSignal()
-    progress_signal = pyqtSignal(int)
-
-    def __init__(self, command: List[str], timeout: int = 60):
-        super().__init__()
-        self.command = command
-        self.timeout = timeout
-
-    def run(self):
+# Tools probed by the inventory besides the ones listed in tool_categories
+INVENTORY_EXTRA_TOOLS = ["openvpn", "tor", "macchanger", "lynis", "chkrootkit", "nslookup", "nmcli", "bluetoothctl"]
+# Stored outputs are decompressed only this far when opened from the Results tab
+MAX_OUTPUT_VIEW = 8 * 1024 * 1024
+# A cache hit puts at most this much of the stored output into the Output dock
+MAX_CACHED_REPLAY = 256 * 1024
+
+class BackgroundSignal(QObject):
+    # Lets plain threads hand results to the GUI thread
+    fired = pyqtSignal(object)
+
+class JobBridge(QObject):
+    # Scheduler callbacks arrive on worker threads; re-emit them as queued Qt signals
+    state_signal = pyqtSignal(object)
+    output_signal = pyqtSignal(object, str, str)
+    progress_signal = pyqtSignal(object, int)
+
+    def dispatch(self, event: str, job: Job, payload=None):
+        if event == "state":
+            self.state_signal.emit(job)
+        elif event == "output":
+            stream, lines = payload
+            self.output_signal.emit(job, stream, "\n".join(lines))
+        elif event == "progress":
+            self.progress_signal.emit(job, payload)
+
+class ResultsChart:
+    # Keeps one set of scene items per tool so a new result only moves its own bar
+    BAR_WIDTH = 50
+    SPACING = 20
+    MAX_HEIGHT = 250
+    X_START = 50
+    Y_BOTTOM = 280
+
+    def __init__(self, scene: QGraphicsScene):
+        self.scene = scene
+        self.bars = {}
+        self.scale = 0
+
+    def rebuild(self, stats: ToolStats):
+        self.scene.clear()
+        self.bars = {}
+        self.scale = 0
+        stats.take_dirty()
+        if not stats.tools:
+            self.scene.addText("No data available", QFont("Ubuntu Mono", 14)).setPos(200, 140)
+            return
+        self.scene.addText("Tool Usage", QFont("Ubuntu Mono", 14)).setPos(200, 10)
+        self.scene.addLine(50, self.Y_BOTTOM, 450, self.Y_BOTTOM, QPen(Qt.white))
+        self.scene.addLine(50, 30, 50, self.Y_BOTTOM, QPen(Qt.white))
+        self.apply(stats, set(stats.tools))
+
+    def update(self, stats: ToolStats):
+        dirty = stats.take_dirty()
+        if not self.bars:
+            self.rebuild(stats)
+        elif dirty:
+            self.apply(stats, dirty)
+
+    def apply(self, stats: ToolStats, dirty: set):
+        if stats.max_count != self.scale:
+            # Rescaling moves every bar; otherwise only the touched ones change
+            self.scale = stats.max_count
+            dirty = set(stats.tools)
+        for tool in dirty:
+            count = stats.tools[tool].count
+            x = self.X_START + self.bar_index(tool) * (self.BAR_WIDTH + self.SPACING)
+            height = (count / self.scale) * self.MAX_HEIGHT
+            bar, count_label = self.bars[tool]
+            bar.setRect(x, self.Y_BOTTOM - height, self.BAR_WIDTH, height)
+            count_label.setPlainText(str(count))
+            count_label.setPos(x + self.BAR_WIDTH // 2 - 10, self.Y_BOTTOM - height - 15)
+
+    def bar_index(self, tool: str) -> int:
+        if tool not in self.bars:
+            index = len(self.bars)
+            x = self.X_START + index * (self.BAR_WIDTH + self.SPACING)
+            bar = self.scene.addRect(x, self.Y_BOTTOM, self.BAR_WIDTH, 0, QPen(Qt.NoPen), QBrush(QColor("#4A5A66")))
+            bar.setData(1, tool)
+            bar.setData(2, index)
+            bar.setFlag(QGraphicsItem.ItemIsSelectable, True)
+            self.scene.addText(tool, QFont("Ubuntu Mono", 10)).setPos(x + self.BAR_WIDTH // 2 - 20, self.Y_BOTTOM + 5)
+            count_label = self.scene.addText("0", QFont("Ubuntu Mono", 10))
+            self.bars[tool] = (bar, count_label)
+        return self.bars[tool][0].data(2)
+
+class ResultsTableModel(QAbstractTableModel):
+    # Cells are formatted from the columnar store only when the view asks for them
+    def __init__(self, store: ResultsStore, parent=None):
+        super().__init__(parent)
+        self.store = store
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.store)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.store.cell(index.row(), index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        return COLUMNS[section] if orientation == Qt.Horizontal else section + 1
+
+    def append_row(self, date: int, tool: str, params: str, result: str, status: str, duration: float,
+                   blob: str = None, usage: Usage = None) -> int:
+        row = len(self.store)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.store.append(date, tool, params, result, status, duration, blob, usage)
+        self.endInsertRows()
+        return row
+
+    def reset_rows(self, rows: List[tuple]):
+        self.beginResetModel()
+        self.store.clear()
+        self.store.extend_rows(rows)
+        self.endResetModel()
+
+class FindingsTableModel(QAbstractTableModel):
+    # Parsed scan findings are paged in from the history database as the view scrolls
+    PAGE_SIZE = 500
+
+    def __init__(self, history: HistoryStore, parent=None):
+        super().__init__(parent)
+        self.history = history
+        self.scan = None
+        self.host = ""
+        self.rows: List[tuple] = []
+        self.exhausted = True
+
+    def set_query(self, scan: Optional[int], host: str = ""):
+        self.beginResetModel()
+        self.scan = scan
+        self.host = host
+        self.rows = []
+        self.exhausted = scan is None
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        # Keyset paging: continue after the last id loaded
+        after = self.rows[-1][0] if self.rows else 0
         try:
-            result = run_with_privileges(self.command, timeout=self.timeout)
-            self.progress_signal.emit(100)
-            if result.stdout:
-                self.output_signal.emit(result.stdout)
-            if result.stderr:
-                self.error_signal.emit(result.stderr)
-            self.finished_signal.emit()
-        except subprocess.TimeoutExpired:
-            self.error_signal.emit(f"Timeout ({self.timeout}s) for command: {' '.join(self.command)}")
-        except subprocess.CalledProcessError as e:
-            self.error_signal.emit(f"Execution error: {e.stderr or str(e)}")
-        except Exception as e:
-            self.error_signal.emit(f"Unexpected error: {str(e)}")
+            page = self.history.findings(self.scan, self.host, self.PAGE_SIZE, after)
+        except sqlite3.Error:
+            page = []
+        self.exhausted = len(page) < self.PAGE_SIZE
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+            self.rows.extend(page)
+            self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(FINDING_COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        value = self.rows[index.row()][index.column() + 1]
+        return "" if value is None else str(value)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        return FINDING_COLUMNS[section] if orientation == Qt.Horizontal else section + 1
+
+class ResultsProxyModel(QAbstractProxyModel):
+    # Sorting and the date filter work on the store's key arrays and keep a
+    # plain proxy->source row map; QSortFilterProxyModel would call back into
+    # Python for every comparison.
+    def __init__(self, source: ResultsTableModel, parent=None):
+        super().__init__(parent)
+        self.store = source.store
+        self.date_range = None
+        self.sort_column = 0
+        self.sort_order = Qt.AscendingOrder
+        self.rows = array("I")
+        self._inverse = None
+        self.setSourceModel(source)
+        source.rowsInserted.connect(self.on_rows_inserted)
+        source.modelReset.connect(self.refresh)
+        self.refresh()
+
+    def refresh(self):
+        self.beginResetModel()
+        self.rows = self.store.select(self.date_range, self.sort_column, self.sort_order == Qt.DescendingOrder)
+        self._inverse = None
+        self.endResetModel()
+
+    def set_date_range(self, date_range):
+        self.date_range = date_range
+        self.refresh()
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        self.sort_column = column
+        self.sort_order = order
+        self.refresh()
+
+    def on_rows_inserted(self, parent, first: int, last: int):
+        for row in range(first, last + 1):
+            if self.date_range is not None and not self.date_range[0] <= self.store.dates[row] <= self.date_range[1]:
+                continue
+            position = self.insert_position(row)
+            self.beginInsertRows(QModelIndex(), position, position)
+            self.rows.insert(position, row)
+            self._inverse = None
+            self.endInsertRows()
+
+    def insert_position(self, row: int) -> int:
+        # Ties go after existing rows, matching the stable sort in select()
+        key = self.store.sort_key(self.sort_column)
+        value = key(row)
+        descending = self.sort_order == Qt.DescendingOrder
+        lo, hi = 0, len(self.rows)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            other = key(self.rows[mid])
+            if (value > other) if descending else (value < other):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def index(self, row: int, column: int, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < len(self.rows) and 0 <= column < len(COLUMNS)):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def mapToSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(self.rows[index.row()], index.column())
+
+    def mapFromSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        if self._inverse is None:
+            self._inverse = {source: proxy for proxy, source in enumerate(self.rows)}
+        row = self._inverse.get(index.row())
+        return QModelIndex() if row is None else self.createIndex(row, index.column())
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole or not index.isValid():
+            return None
+        return self.store.cell(self.rows[index.row()], index.column())
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role != Qt.DisplayRole:
+            return None
+        return COLUMNS[section] if orientation == Qt.Horizontal else section + 1
+
+class Sparkline(QWidget):
+    # Live line for one sampler series; job runs are shaded behind it
+    def __init__(self, title: str, unit: str = "%", max_value: float = None, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.unit = unit
+        self.max_value = max_value
+        self.times = []
+        self.values = []
+        self.markers = []
+        self.setMinimumHeight(70)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+    def set_series(self, times: List[float], values: List[float], markers: List[tuple]):
+        self.times = times
+        self.values = values
+        self.markers = markers
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        text_color = self.palette().color(self.foregroundRole())
+        current = f"{self.values[-1]:.1f}{self.unit}" if self.values else "N/A"
+        painter.setPen(text_color)
+        painter.setFont(QFont("Ubuntu Mono", 10))
+        painter.drawText(4, 12, f"{self.title}: {current}")
+        area = QRectF(self.rect().adjusted(4, 18, -4, -4))
+        painter.setPen(QPen(text_color, 1, Qt.DotLine))
+        painter.drawRect(area)
+        if len(self.values) < 2:
+            return
+        start, end = self.times[0], self.times[-1]
+        span = max(end - start, 1e-6)
+        top = self.max_value or max(max(self.values), 1.0)
+        for marker_start, marker_end, name in self.markers:
+            left = area.left() + max(0.0, (marker_start - start) / span) * area.width()
+            right = area.left() + min(1.0, (marker_end - start) / span) * area.width()
+            if right <= area.left() or left >= area.right():
+                continue
+            painter.fillRect(QRectF(left, area.top(), max(right - left, 2.0), area.height()), QColor(255, 170, 0, 50))
+            painter.setPen(QColor(255, 170, 0))
+            painter.drawText(QPointF(left + 2, area.top() + 10), name)
+        line = QPolygonF([QPointF(area.left() + (t - start) / span * area.width(),
+                                  area.bottom() - min(value, top) / top * area.height())
+                          for t, value in zip(self.times, self.values)])
+        painter.setPen(QPen(QColor("#6A8299"), 2))
+        painter.drawPolyline(line)
+
+class OutputConsole(QAbstractScrollArea):
+    # Plain-text console over a bounded LineRing. append() only queues the
+    # text; a timer moves it into the ring at most REFRESH_MS apart and only
+    # the rows on screen are painted, so a chatty job costs the GUI thread
+    # the same as a quiet one
+    REFRESH_MS = 50
+
+    def __init__(self, capacity: int = CONSOLE_LINES, parent=None):
+        super().__init__(parent)
+        self.ring = LineRing(capacity)
+        self.pending = []
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(self.REFRESH_MS)
+        self.flush_timer.timeout.connect(self.flush)
+        self.viewport().setBackgroundRole(QPalette.Base)
+        self.viewport().setAutoFillBackground(True)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
+
+    def append(self, text: str, source: int = APP_SOURCE):
+        self.pending.append((source, text))
+        if not self.flush_timer.isActive():
+            self.flush_timer.start()
+
+    def flush(self):
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        bar = self.verticalScrollBar()
+        following = bar.value() >= bar.maximum()
+        dropped = 0
+        for source, text in pending:
+            dropped += self.ring.append(text.split("\n"), source)
+        self.update_scrollbar()
+        # Stay on the newest line, or on the same text when scrolled back
+        bar.setValue(bar.maximum() if following else max(0, bar.value() - dropped))
+        self.viewport().update()
+
+    def set_filter(self, source: Optional[int]):
+        self.flush()
+        self.ring.set_filter(source)
+        self.update_scrollbar()
+        self.verticalScrollBar().setValue(self.verticalScrollBar().maximum())
+        self.viewport().update()
+
+    def clear(self):
+        self.pending = []
+        self.ring.clear()
+        self.update_scrollbar()
+        self.viewport().update()
+
+    def toPlainText(self) -> str:
+        self.flush()
+        return self.ring.text()
+
+    def visible_rows(self) -> int:
+        return max(1, self.viewport().height() // self.fontMetrics().lineSpacing())
+
+    def update_scrollbar(self):
+        rows = self.visible_rows()
+        bar = self.verticalScrollBar()
+        bar.setPageStep(rows)
+        bar.setRange(0, max(0, len(self.ring) - rows))
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_scrollbar()
+
+    def scrollContentsBy(self, dx: int, dy: int):
+        self.viewport().update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.setPen(self.palette().color(QPalette.Text))
+        metrics = self.fontMetrics()
+        height = metrics.lineSpacing()
+        first = self.verticalScrollBar().value()
+        last = min(len(self.ring), first + self.visible_rows() + 1)
+        y = metrics.ascent()
+        for index in range(first, last):
+            painter.drawText(4, y, self.ring.line(index))
+            y += height
+
+    def contextMenuEvent(self, event):
+        menu = QMenu(self)
+        first = self.verticalScrollBar().value()
+        last = min(len(self.ring), first + self.visible_rows())
+        menu.addAction("Copy Visible").triggered.connect(
+            lambda: QApplication.clipboard().setText("\n".join(self.ring.line(i) for i in range(first, last))))
+        menu.addAction("Copy All").triggered.connect(lambda: QApplication.clipboard().setText(self.toPlainText()))
+        menu.addAction("Clear").triggered.connect(self.clear)
+        menu.exec_(event.globalPos())
 
 class NetworkDialog(QDialog):
     def __init__(self, parent, network_type: str = "Wi-Fi"):
@@ -233,6 +640,13 @@ class SettingsDialog(QDialog):
         self.timeout_input.setRange(1, 300)
         self.timeout_input.setValue(int(yaml_config.get("timeout", settings.value("timeout", 60))))
         app_layout.addRow("Command Timeout (seconds):", self.timeout_input)
+        self.resumable_timeout_input = QSpinBox()
+        self.resumable_timeout_input.setRange(0, 10080)
+        self.resumable_timeout_input.setSpecialValueText("No limit")
+        self.resumable_timeout_input.setSuffix(" min")
+        self.resumable_timeout_input.setValue(int(yaml_config.get("resumable_timeout_minutes",
+                                                                  settings.value("resumable_timeout_minutes", 0))))
+        app_layout.addRow("Resumable Job Timeout (nmap, john, hydra):", self.resumable_timeout_input)
         self.log_level_combo = QComboBox()
         self.log_level_combo.addItems(["INFO", "DEBUG", "WARNING", "ERROR"])
         self.log_level_combo.setCurrentText(yaml_config.get("log_level", settings.value("log_level", "INFO")))
@@ -241,11 +655,43 @@ class SettingsDialog(QDialog):
         self.max_threads_input.setRange(1, 16)
         self.max_threads_input.setValue(int(yaml_config.get("max_threads", settings.value("max_threads", 4))))
         app_layout.addRow("Max Threads:", self.max_threads_input)
+        self.network_jobs_input = QSpinBox()
+        self.network_jobs_input.setRange(1, 16)
+        self.network_jobs_input.setValue(int(yaml_config.get("network_jobs", settings.value("network_jobs", self.max_threads_input.value()))))
+        app_layout.addRow("Max Network Jobs:", self.network_jobs_input)
+        self.cpu_jobs_input = QSpinBox()
+        self.cpu_jobs_input.setRange(1, 16)
+        self.cpu_jobs_input.setValue(int(yaml_config.get("cpu_jobs", settings.value("cpu_jobs", max(1, (os.cpu_count() or 2) // 2)))))
+        app_layout.addRow("Max CPU Jobs:", self.cpu_jobs_input)
+        self.nmap_shards_input = QSpinBox()
+        self.nmap_shards_input.setRange(0, 64)
+        self.nmap_shards_input.setSpecialValueText("Auto")
+        shards = str(yaml_config.get("nmap_shards", settings.value("nmap_shards", "auto")))
+        self.nmap_shards_input.setValue(int(shards) if shards.isdigit() else 0)
+        app_layout.addRow("Nmap Shards:", self.nmap_shards_input)
+        self.scan_rate_input = QSpinBox()
+        self.scan_rate_input.setRange(0, 1000000)
+        self.scan_rate_input.setSpecialValueText("Unlimited")
+        self.scan_rate_input.setSuffix(" pps")
+        self.scan_rate_input.setValue(int(yaml_config.get("scan_max_rate", settings.value("scan_max_rate", 0))))
+        app_layout.addRow("Scan Rate Budget:", self.scan_rate_input)
+        self.monitor_interval_input = QSpinBox()
+        self.monitor_interval_input.setRange(1, 60)
+        self.monitor_interval_input.setSuffix(" s")
+        self.monitor_interval_input.setValue(int(yaml_config.get("monitor_interval", settings.value("monitor_interval", 1))))
+        app_layout.addRow("Monitor Interval:", self.monitor_interval_input)
         self.encryption_key_input = QLineEdit(yaml_config.get("encryption_key", settings.value("encryption_key", "default_password")))
         app_layout.addRow("Encryption Key:", self.encryption_key_input)
         self.auto_update_check = QCheckBox("Enable Auto Updates")
         self.auto_update_check.setChecked(yaml_config.get("auto_update", settings.value("auto_update", True, type=bool)))
         app_layout.addRow(self.auto_update_check)
+        self.result_cache_check = QCheckBox("Reuse Recent Results of Identical Scans")
+        self.result_cache_check.setChecked(yaml_config.get("result_cache", settings.value("result_cache", False, type=bool)))
+        app_layout.addRow(self.result_cache_check)
+        self.cache_size_input = QSpinBox()
+        self.cache_size_input.setRange(1, 10000)
+        self.cache_size_input.setValue(int(yaml_config.get("cache_size", settings.value("cache_size", DEFAULT_CACHE_SIZE))))
+        app_layout.addRow("Result Cache Size:", self.cache_size_input)
         app_group.setLayout(app_layout)
         layout.addWidget(app_group)
 
@@ -254,9 +700,14 @@ class SettingsDialog(QDialog):
         self.profile_name_input = QLineEdit(yaml_config.get("profile_name", settings.value("profile_name", "default_user")))
         profile_layout.addRow("Profile Name:", self.profile_name_input)
         self.history_size_input = QSpinBox()
-        self.history_size_input.setRange(10, 1000)
+        self.history_size_input.setRange(10, 1000000)
         self.history_size_input.setValue(int(yaml_config.get("history_size", settings.value("history_size", 100))))
         profile_layout.addRow("Max History Size:", self.history_size_input)
+        self.history_age_input = QSpinBox()
+        self.history_age_input.setRange(0, 3650)
+        self.history_age_input.setSpecialValueText("Forever")
+        self.history_age_input.setValue(int(yaml_config.get("history_max_age_days", settings.value("history_max_age_days", 0))))
+        profile_layout.addRow("Keep History (days):", self.history_age_input)
         profile_group.setLayout(profile_layout)
         layout.addWidget(profile_group)
 
@@ -277,20 +728,35 @@ class SettingsDialog(QDialog):
                 "proxy": self.proxy_input.text(),
                 "dns_servers": self.dns_input.text(),
                 "timeout": self.timeout_input.value(),
+                "resumable_timeout_minutes": self.resumable_timeout_input.value(),
                 "log_level": self.log_level_combo.currentText(),
                 "max_threads": self.max_threads_input.value(),
+                "network_jobs": self.network_jobs_input.value(),
+                "cpu_jobs": self.cpu_jobs_input.value(),
+                "nmap_shards": self.nmap_shards_input.value() or "auto",
+                "scan_max_rate": self.scan_rate_input.value(),
+                "monitor_interval": self.monitor_interval_input.value(),
                 "encryption_key": self.encryption_key_input.text(),
                 "auto_update": self.auto_update_check.isChecked(),
+                "result_cache": self.result_cache_check.isChecked(),
+                "cache_size": self.cache_size_input.value(),
                 "profile_name": self.profile_name_input.text(),
-                "history_size": self.history_size_input.value()
+                "history_size": self.history_size_input.value(),
+                "history_max_age_days": self.history_age_input.value()
             }
             for key, value in settings_dict.items():
                 self.parent().settings.setValue(key, value)
-            self.parent().threadpool.setMaxThreadCount(self.max_threads_input.value())
+            self.parent().scheduler.set_limits(self.max_threads_input.value(), self.parent().job_class_limits())
+            self.parent().history.set_retention(self.parent().history_retention())
+            self.parent().sampler.set_interval(self.monitor_interval_input.value())
+            self.parent().result_cache.resize(self.cache_size_input.value())
+            if not self.result_cache_check.isChecked():
+                self.parent().result_cache.invalidate()
             self.parent().update_logging_level()
             self.parent().update_encryption_key(self.encryption_key_input.text())
             if QMessageBox.question(self, "Save to YAML", "Save settings to /etc/xdg/Penetration-Mode/config.yaml?",
                                    QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
+                import yaml
                 try:
                     os.makedirs(os.path.dirname(CONFIG_PATH), exist_ok=True)
                     with open(CONFIG_PATH, "w") as f:
@@ -316,24 +782,32 @@ class PenetrationModeWindow(QMainWindow):
 
         self.settings = QSettings("HackerOS", "PenetrationMode")
         self.yaml_config = load_yaml_config()
-        self.threadpool = QThreadPool()
-        self.threadpool.setMaxThreadCount(int(self.yaml_config.get("max_threads", self.settings.value("max_threads", 4))))
+        # Created ahead of the stores below so their errors have somewhere to go;
+        # it is put into the Output dock further down
+        self.output = OutputConsole(int(self.yaml_config.get("console_lines", self.settings.value("console_lines", CONSOLE_LINES))))
+        self.scheduler = JobScheduler(int(self.yaml_config.get("max_threads", self.settings.value("max_threads", 4))),
+                                      self.job_class_limits())
+        privileged_helper.enabled = bool(self.yaml_config.get("privileged_helper", True))
+        self.scheduler.spawn_privileged = privileged_helper.spawn
+        self.job_bridge = JobBridge()
+        self.job_bridge.state_signal.connect(self.handle_job_state)
+        self.job_bridge.output_signal.connect(self.handle_output)
+        self.job_bridge.progress_signal.connect(self.update_progress)
+        self.scheduler.add_listener(self.job_bridge.dispatch)
+        self.pipelines = set()
+        self.pipeline_signal = BackgroundSignal()
+        self.pipeline_signal.fired.connect(self.dispatch_pipeline_batch)
         self.encryption_key = self.yaml_config.get("encryption_key", self.settings.value("encryption_key", "default_password"))
-        self.cipher_suite = Fernet(generate_key(self.encryption_key))
+        # PBKDF2 runs in the background; the log sink queues until the key arrives
+        self.key_deriver = KeyDeriver(generate_key)
+        self.key_signal = BackgroundSignal()
+        self.key_signal.fired.connect(self.apply_master_key)
+        self.log_signal = BackgroundSignal()
+        self.log_sink = LogSink(str(Path.home() / f".hackeros_logs_{self.profile_name()}.enc"),
+                                on_segment=self.log_signal.fired.emit)
+        self.request_master_key(self.encryption_key)
         self.user_profile = self.load_user_profile()
 
-        self.cursor_pixmap = QPixmap(32, 32)
-        self.cursor_pixmap.fill(Qt.transparent)
-        painter = QPainter(self.cursor_pixmap)
-        gradient = QLinearGradient(0, 0, 32, 32)
-        gradient.setColorAt(0, QColor("#00FFFF"))
-        gradient.setColorAt(1, QColor("#FF00FF"))
-        painter.setBrush(QBrush(gradient))
-        painter.setPen(QPen(QColor("#FFFFFF"), 2))
-        painter.drawEllipse(2, 2, 28, 28)
-        painter.end()
-        self.setCursor(QCursor(self.cursor_pixmap))
-
         self.theme = self.yaml_config.get("theme", self.settings.value("theme", "Dark"))
         self.apply_theme()
 
@@ -356,7 +830,7 @@ class PenetrationModeWindow(QMainWindow):
         self.add_toolbar_button("system-help", self.show_help, "Help")
         self.add_toolbar_button("view-refresh", self.check_anonymity, "Test Anonymity")
         self.add_toolbar_button("security-high", self.run_security_scan, "Security Scan")
-        self.add_toolbar_button("system-software-update", self.check_updates, "Check Updates")
+        self.add_toolbar_button("system-software-update", lambda: self.check_updates(force=True), "Check Updates")
         self.add_toolbar_button("application-exit", self.close_app, "Close")
 
         self.header_layout = QHBoxLayout()
@@ -377,37 +851,17 @@ class PenetrationModeWindow(QMainWindow):
         self.tabs = QTabWidget()
         self.tabs.setTabPosition(QTabWidget.West)
         self.main_layout.addWidget(self.tabs, stretch=4)
+        # Learning, Results, Anonymity and Monitoring are filled in on first use
+        self.lazy_tabs = {}
+        self.tabs.currentChanged.connect(self.build_lazy_tab)
 
         self.tool_categories = {
-            "Scanning": [
-                ("Nmap", "Network scanning", self.run_nmap, "nmap -sP 192.168.1.0/24", "nmap"),
-                ("Masscan", "Fast port scanning", self.run_masscan, "masscan -p80 192.168.1.0/24", "masscan"),
-                ("OpenVAS", "Vulnerability scanning", self.run_openvas, "openvas-start", "openvas"),
-            ],
-            "Exploits": [
-                ("Metasploit", "Exploit testing", self.run_metasploit, "msfconsole", "metasploit-framework"),
-                ("Sqlmap", "SQL Injection", self.run_sqlmap, "sqlmap -u http://example.com", "sqlmap"),
-            ],
-            "Wireless": [
-                ("Aircrack-ng", "Wi-Fi attacks", self.run_aircrack, "aircrack-ng -b <BSSID>", "aircrack-ng"),
-                ("Wifite", "Wi-Fi automation", self.run_wifite, "wifite", "wifite"),
-            ],
-            "Password Cracking": [
-                ("John", "Password cracking", self.run_john, "john hash.txt", "john"),
-                ("Hydra", "Brute force attacks", self.run_hydra, "hydra -l user -P passlist.txt ssh://192.168.1.1", "hydra"),
-            ],
-            "Anonymity": [
-                ("Proxychains", "Proxy usage", self.run_proxychains, "proxychains nmap 192.168.1.1", "proxychains"),
-                ("TorGhost", "Tor routing", self.run_torghost, "torghost --start", "torghost"),
-            ],
-            "Monitoring": [
-                ("Wireshark", "Packet sniffing", self.run_wireshark, "wireshark", "wireshark"),
-                ("Htop", "System monitoring", self.run_htop, "htop", "htop"),
-            ]
+            category: [(spec.name, spec.description, getattr(self, spec.handler), spec.default_params, spec.package)
+                       for spec in specs]
+            for category, specs in tool_categories().items()
         }
 
         self.tool_inputs = {}
-        self.workers = []
         for category, tools in self.tool_categories.items():
             tab = QWidget()
             scroll = QScrollArea()
@@ -433,6 +887,15 @@ class PenetrationModeWindow(QMainWindow):
                 layout.addWidget(auto_button, i, 2)
             self.tabs.addTab(scroll, category)
 
+        self.tool_binaries = {name: default_param.split()[0]
+                              for tools in self.tool_categories.values()
+                              for name, _, _, default_param, _ in tools}
+        self.inventory_signal = BackgroundSignal()
+        self.inventory_signal.fired.connect(lambda names: self.refresh_tools_table())
+        self.tool_inventory = ToolInventory(list(self.tool_binaries.values()) + INVENTORY_EXTRA_TOOLS,
+                                            on_change=self.inventory_signal.fired.emit)
+        self.tool_inventory.start()
+
         hacker_menu_button = QPushButton("Hacker Menu")
         hacker_menu_button.setFont(QFont("Ubuntu Mono", 14))
         hacker_menu_button.setObjectName("hackerMenuButton")
@@ -443,6 +906,7 @@ class PenetrationModeWindow(QMainWindow):
         self.hacker_menu.addAction("Update System", self.update_system)
         self.hacker_menu.addAction("Check Connection", self.check_network)
         self.hacker_menu.addAction("Clear Logs", self.clear_logs)
+        self.hacker_menu.addAction("Clear Result Cache", self.clear_result_cache)
         self.hacker_menu.addAction("Randomize MAC", self.randomize_mac)
         self.hacker_menu.addAction("Change Hostname", self.change_hostname)
         self.hacker_menu.addAction("Scan Network", self.scan_network)
@@ -451,41 +915,254 @@ class PenetrationModeWindow(QMainWindow):
         self.hacker_menu.addAction("Create Backup", self.create_encrypted_backup)
         self.hacker_menu.addAction("Test DNS Leak", self.test_dns_leak)
         self.hacker_menu.addAction("Schedule Task", self.schedule_task)
+        self.hacker_menu.addAction("Remove Scheduled Task", self.remove_scheduled_task)
         self.hacker_menu.addAction("Auto-Detect Interfaces", self.auto_detect_interfaces)
         self.hacker_menu.addAction("Generate Report", self.generate_report)
+        self.hacker_menu.addAction("Resume Interrupted Jobs", self.offer_resume)
         hacker_menu_button.setMenu(self.hacker_menu)
         self.main_layout.addWidget(hacker_menu_button, alignment=Qt.AlignBottom | Qt.AlignRight)
 
         self.learning_tab = QWidget()
         self.learning_layout = QVBoxLayout(self.learning_tab)
-        self.learning_combo = QComboBox()
-        self.learning_combo.addItems(["Basics", "Scanning", "Exploits", "Wireless", "Password Cracking", "Anonymity", "Monitoring"])
-        self.learning_combo.currentTextChanged.connect(self.update_learning_text)
-        self.learning_layout.addWidget(self.learning_combo)
-        self.learning_text = QTextEdit()
-        self.learning_text.setReadOnly(True)
-        self.learning_text.setFont(QFont("Ubuntu Mono", 14))
-        self.update_learning_text("Basics")
-        self.learning_layout.addWidget(self.learning_text)
-        self.tabs.addTab(self.learning_tab, "Learning")
+        self.add_lazy_tab(self.learning_tab, "Learning", self.build_learning_tab)
 
         self.logs_tab = QWidget()
         self.logs_layout = QVBoxLayout(self.logs_tab)
-        self.logs_text = QTextEdit()
+        # One decrypted segment at a time; "Follow" keeps the newest one on screen
+        self.logs_nav_layout = QHBoxLayout()
+        self.logs_prev_button = QPushButton("Previous")
+        self.logs_prev_button.clicked.connect(lambda: self.step_log_page(-1))
+        self.logs_nav_layout.addWidget(self.logs_prev_button)
+        self.logs_page_label = QLabel()
+        self.logs_page_label.setAlignment(Qt.AlignCenter)
+        self.logs_nav_layout.addWidget(self.logs_page_label, stretch=1)
+        self.logs_next_button = QPushButton("Next")
+        self.logs_next_button.clicked.connect(lambda: self.step_log_page(1))
+        self.logs_nav_layout.addWidget(self.logs_next_button)
+        self.logs_follow_check = QCheckBox("Follow")
+        self.logs_follow_check.setChecked(True)
+        self.logs_follow_check.toggled.connect(lambda checked: checked and self.show_log_page(-1))
+        self.logs_nav_layout.addWidget(self.logs_follow_check)
+        self.logs_layout.addLayout(self.logs_nav_layout)
+        self.logs_text = QPlainTextEdit()
         self.logs_text.setReadOnly(True)
         self.logs_text.setFont(QFont("Ubuntu Mono", 14))
         self.logs_layout.addWidget(self.logs_text)
+        self.log_page = -1
+        self.log_signal.fired.connect(self.on_log_segment)
+        self.show_log_page(-1)
         self.tabs.addTab(self.logs_tab, "Logs")
 
         self.results_tab = QWidget()
         self.results_layout = QVBoxLayout(self.results_tab)
+        self.results_store = ResultsStore()
+        self.results_model = ResultsTableModel(self.results_store)
+        self.history = self.open_history()
+        self.blob_store = self.open_blob_store()
+        self.journal = self.open_journal()
+        self.tool_stats = ToolStats()
+        self.result_cache = ResultCache(int(self.yaml_config.get("cache_size", self.settings.value("cache_size", DEFAULT_CACHE_SIZE))),
+                                        self.cache_ttls())
+        self.results_chart = None
+        self.add_lazy_tab(self.results_tab, "Results", self.build_results_tab)
+
+        self.findings_tab = QWidget()
+        self.findings_layout = QVBoxLayout(self.findings_tab)
+        findings_filter_layout = QHBoxLayout()
+        self.findings_scan_combo = QComboBox()
+        self.findings_scan_combo.currentIndexChanged.connect(lambda index: self.show_findings())
+        findings_filter_layout.addWidget(QLabel("Scan:"))
+        findings_filter_layout.addWidget(self.findings_scan_combo, 1)
+        self.findings_host_input = QLineEdit()
+        self.findings_host_input.setPlaceholderText("Host prefix, * as wildcard")
+        self.findings_host_input.returnPressed.connect(self.show_findings)
+        findings_filter_layout.addWidget(QLabel("Host:"))
+        findings_filter_layout.addWidget(self.findings_host_input)
+        findings_filter_button = QPushButton("Filter")
+        findings_filter_button.clicked.connect(self.show_findings)
+        findings_filter_layout.addWidget(findings_filter_button)
+        self.findings_layout.addLayout(findings_filter_layout)
+        self.findings_model = FindingsTableModel(self.history)
+        self.findings_view = QTableView()
+        self.findings_view.setModel(self.findings_model)
+        self.findings_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.findings_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.findings_view.verticalHeader().setDefaultSectionSize(24)
+        self.findings_view.setWordWrap(False)
+        self.findings_view.setEditTriggers(QTableView.NoEditTriggers)
+        self.findings_view.setSelectionBehavior(QTableView.SelectRows)
+        self.findings_layout.addWidget(self.findings_view)
+        self.tabs.addTab(self.findings_tab, "Findings")
+        self.refresh_findings_scans()
+
+        self.anonymity_tab = QWidget()
+        self.anonymity_layout = QVBoxLayout(self.anonymity_tab)
+        self.anonymity_prober = None
+        self.anonymity_ip_signal = BackgroundSignal()
+        self.anonymity_ip_signal.fired.connect(lambda ip: self.ip_label.setText(f"IP: {ip}"))
+        self.anonymity_report_signal = BackgroundSignal()
+        self.anonymity_report_signal.fired.connect(self.show_anonymity_report)
+        self.anonymity_step_signal = BackgroundSignal()
+        self.anonymity_step_signal.fired.connect(self.apply_anonymity_step)
+        self.anonymity_done_signal = BackgroundSignal()
+        self.anonymity_done_signal.fired.connect(self.finish_full_anonymity)
+        self.add_lazy_tab(self.anonymity_tab, "Anonymity", self.build_anonymity_tab)
+
+        self.monitoring_tab = QWidget()
+        self.monitoring_layout = QVBoxLayout(self.monitoring_tab)
+        self.resource_label = None
+        self.add_lazy_tab(self.monitoring_tab, "Monitoring", self.build_monitoring_tab)
+        self.tabs.currentChanged.connect(lambda index: self.tabs.widget(index) is self.monitoring_tab and self.refresh_sparklines())
+        self.sampler_signal = BackgroundSignal()
+        self.sampler_signal.fired.connect(self.update_system_resources)
+        self.sampler = ResourceSampler(float(self.yaml_config.get("monitor_interval", self.settings.value("monitor_interval", 1))),
+                                       on_sample=self.sampler_signal.fired.emit)
+        self.sampler.start()
+
+        self.jobs_tab = QWidget()
+        self.jobs_layout = QVBoxLayout(self.jobs_tab)
+        self.jobs_table = QTableWidget()
+        self.jobs_table.setColumnCount(8)
+        self.jobs_table.setHorizontalHeaderLabels(["ID", "Job", "Class", "Priority", "State", "Queue Wait", "Run Time", "Progress"])
+        self.jobs_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.jobs_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.jobs_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.jobs_layout.addWidget(self.jobs_table)
+        jobs_button_layout = QHBoxLayout()
+        for label, callback in (("Cancel Selected", self.cancel_selected_jobs), ("Cancel Queued", self.cancel_queued_jobs),
+                                ("Raise Priority", lambda: self.shift_job_priority(PRIORITY_HIGH)),
+                                ("Lower Priority", lambda: self.shift_job_priority(PRIORITY_LOW))):
+            button = QPushButton(label)
+            button.clicked.connect(callback)
+            jobs_button_layout.addWidget(button)
+        self.jobs_layout.addLayout(jobs_button_layout)
+        self.tabs.addTab(self.jobs_tab, "Jobs")
+
+        self.tools_tab = QWidget()
+        self.tools_layout = QVBoxLayout(self.tools_tab)
+        self.tools_table = QTableWidget()
+        self.tools_table.setColumnCount(4)
+        self.tools_table.setHorizontalHeaderLabels(["Tool", "Status", "Path", "Version"])
+        self.tools_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.tools_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.tools_layout.addWidget(self.tools_table)
+        rescan_tools_button = QPushButton("Rescan PATH")
+        rescan_tools_button.clicked.connect(self.rescan_tools)
+        self.tools_layout.addWidget(rescan_tools_button)
+        self.tabs.addTab(self.tools_tab, "Tools")
+        self.refresh_tools_table()
+
+        self.output_dock = QDockWidget("Output", self)
+        self.output_widget = QWidget()
+        self.output_layout = QVBoxLayout(self.output_widget)
+        output_filter_layout = QHBoxLayout()
+        output_filter_layout.addWidget(QLabel("Show:"))
+        self.output_filter = QComboBox()
+        self.output_filter.addItem("All output", None)
+        self.output_filter.addItem("Application", APP_SOURCE)
+        self.output_filter.currentIndexChanged.connect(
+            lambda: self.output.set_filter(self.output_filter.currentData()))
+        output_filter_layout.addWidget(self.output_filter, 1)
+        self.output_layout.addLayout(output_filter_layout)
+        self.output.setFont(QFont("Ubuntu Mono", 14))
+        self.output_layout.addWidget(self.output)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        self.output_layout.addWidget(self.progress_bar)
+        self.output_dock.setWidget(self.output_widget)
+        self.addDockWidget(Qt.BottomDockWidgetArea, self.output_dock)
+
+        self.status_bar = QStatusBar()
+        self.setStatusBar(self.status_bar)
+        self.status_bar.showMessage("Penetration Mode Active | Anonymity: Off", 5000)
+
+        self.interface_signal = BackgroundSignal()
+        self.interface_signal.fired.connect(self.on_interface_change)
+        self.interface_watcher = NetlinkWatcher(on_change=lambda event, interface: self.interface_signal.fired.emit((event, interface)))
+        try:
+            self.interface_watcher.start()
+        except OSError as e:
+            self.log_error(f"Interface watcher unavailable: {str(e)}")
+        self.interfaces = self.interface_watcher.table
+
+        self.vpn_active = False
+        self.tor_active = False
+        self.proxy_active = False
+        self.dns_secure = False
+        self.update_status_timer = QTimer()
+        self.update_status_timer.timeout.connect(self.update_status)
+
+        self.task_signal = BackgroundSignal()
+        self.task_signal.fired.connect(self.run_scheduled_task)
+        self.task_skip_signal = BackgroundSignal()
+        self.task_skip_signal.fired.connect(lambda payload: self.output.append(f"Scheduled task '{payload[0].name}' skipped: {payload[1]}"))
+        tasks_path = str(Path.home() / f".hackeros_tasks_{self.profile_name()}.json")
+        on_skip = lambda task, reason: self.task_skip_signal.fired.emit((task, reason))
+        try:
+            self.task_scheduler = TaskScheduler(tasks_path, fire=self.task_signal.fired.emit, on_skip=on_skip)
+        except (OSError, ValueError, KeyError) as e:
+            self.log_error(f"Failed to load scheduled tasks: {str(e)}")
+            self.task_scheduler = TaskScheduler(None, fire=self.task_signal.fired.emit, on_skip=on_skip)
+        self.task_scheduler.start()
+
+        release_info = self.yaml_config.get("release_info_path")
+        self.update_checker = UpdateChecker(self.yaml_config.get("update_url", DEFAULT_UPDATE_URL),
+                                            release_info_paths=[release_info] if release_info else RELEASE_INFO_PATHS,
+                                            min_interval=3600 * float(self.yaml_config.get("update_check_hours",
+                                                                                           MIN_CHECK_INTERVAL / 3600)))
+        self.update_signal = BackgroundSignal()
+        self.update_signal.fired.connect(self.show_update_status)
+        self.update_check_pending = False
+        self.update_prompted = set()
+        self.auto_update_timer = QTimer()
+        if self.yaml_config.get("auto_update", self.settings.value("auto_update", True, type=bool)):
+            self.auto_update_timer.timeout.connect(self.check_updates)
+            self.auto_update_timer.start(3600000)
+            # Answered from the on-disk cache unless it has gone stale
+            QTimer.singleShot(0, self.check_updates)
+
+        self.update_logging_level()
+        QTimer.singleShot(0, self.finish_startup)
+
+    def add_lazy_tab(self, tab: QWidget, title: str, build):
+        self.lazy_tabs[tab] = build
+        self.tabs.addTab(tab, title)
+
+    def build_lazy_tab(self, index: int):
+        build = self.lazy_tabs.pop(self.tabs.widget(index), None)
+        if build is not None:
+            build()
+
+    def build_learning_tab(self):
+        self.learning_combo = QComboBox()
+        self.learning_combo.addItems(["Basics", "Scanning", "Exploits", "Wireless", "Password Cracking", "Anonymity", "Monitoring"])
+        self.learning_combo.currentTextChanged.connect(self.update_learning_text)
+        self.learning_layout.addWidget(self.learning_combo)
+        self.learning_text = QTextEdit()
+        self.learning_text.setReadOnly(True)
+        self.learning_text.setFont(QFont("Ubuntu Mono", 14))
+        self.update_learning_text("Basics")
+        self.learning_layout.addWidget(self.learning_text)
+
+    def build_results_tab(self):
         self.results_splitter = QSplitter(Qt.Horizontal)
-        self.results_table = QTableWidget()
-        self.results_table.setColumnCount(6)
-        self.results_table.setHorizontalHeaderLabels(["Date", "Tool", "Params", "Result", "Status", "Duration"])
-        self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.results_table.setEditTriggers(QTableWidget.NoEditTriggers)
-        self.results_splitter.addWidget(self.results_table)
+        self.results_proxy = ResultsProxyModel(self.results_model)
+        self.results_view = QTableView()
+        self.results_view.setModel(self.results_proxy)
+        # Only the result preview takes up spare width; the figures keep a fixed column each
+        self.results_view.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
+        self.results_view.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        # Fixed row heights keep the view from measuring every row
+        self.results_view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.results_view.verticalHeader().setDefaultSectionSize(24)
+        self.results_view.setWordWrap(False)
+        self.results_view.setEditTriggers(QTableView.NoEditTriggers)
+        self.results_view.setSelectionBehavior(QTableView.SelectRows)
+        self.results_view.setSortingEnabled(True)
+        self.results_view.sortByColumn(0, Qt.AscendingOrder)
+        self.results_view.doubleClicked.connect(self.show_result_output)
+        self.results_view.setToolTip("Double-click a result to open its full output")
+        self.results_splitter.addWidget(self.results_view)
 
         self.results_graph_widget = QWidget()
         self.results_graph_layout = QVBoxLayout(self.results_graph_widget)
@@ -493,6 +1170,13 @@ class PenetrationModeWindow(QMainWindow):
         self.results_graph = QGraphicsView(self.results_graph_scene)
         self.results_graph.setFixedSize(500, 300)
         self.results_graph_layout.addWidget(self.results_graph)
+        self.results_graph.mousePressEvent = self.on_graph_click
+        self.results_chart = ResultsChart(self.results_graph_scene)
+        # Redraws are coalesced to at most one per frame budget
+        self.graph_timer = QTimer()
+        self.graph_timer.setSingleShot(True)
+        self.graph_timer.setInterval(33)
+        self.graph_timer.timeout.connect(lambda: self.results_chart.update(self.tool_stats))
         self.graph_info_label = QLabel("Click a bar for details")
         self.graph_info_label.setAlignment(Qt.AlignCenter)
         self.results_graph_layout.addWidget(self.graph_info_label)
@@ -514,10 +1198,11 @@ class PenetrationModeWindow(QMainWindow):
         self.date_filter_layout.addWidget(self.filter_button)
         self.results_layout.addLayout(self.date_filter_layout)
         self.results_layout.addWidget(self.results_splitter)
-        self.tabs.addTab(self.results_tab, "Results")
+        self.update_graph()
 
-        self.anonymity_tab = QWidget()
-        self.anonymity_layout = QVBoxLayout(self.anonymity_tab)
+    def build_anonymity_tab(self):
+        # asyncio and ssl come with the prober; neither is needed before this tab opens
+        from penmode.anonymity import AnonymityProber
         self.ip_label = QLabel("IP: Unknown")
         self.anonymity_layout.addWidget(self.ip_label)
         self.anonymity_report = QTextEdit()
@@ -528,55 +1213,44 @@ class PenetrationModeWindow(QMainWindow):
         check_anonymity_button = QPushButton("Check Anonymity")
         check_anonymity_button.clicked.connect(self.check_anonymity)
         self.anonymity_layout.addWidget(check_anonymity_button)
-        self.tabs.addTab(self.anonymity_tab, "Anonymity")
+        self.anonymity_prober = AnonymityProber()
 
-        self.monitoring_tab = QWidget()
-        self.monitoring_layout = QVBoxLayout(self.monitoring_tab)
+    def build_monitoring_tab(self):
         self.resource_label = QLabel("CPU: N/A | RAM: N/A | Disk: N/A")
         self.monitoring_layout.addWidget(self.resource_label)
+        self.sparklines = {
+            "cpu": Sparkline("CPU", "%", 100),
+            "memory": Sparkline("Memory", "%", 100),
+            "load": Sparkline("Load", ""),
+            "disk": Sparkline("Disk used", "%", 100),
+        }
+        for sparkline in self.sparklines.values():
+            self.monitoring_layout.addWidget(sparkline)
         self.refresh_monitor_button = QPushButton("Refresh")
-        self.refresh_monitor_button.clicked.connect(self.update_system_resources)
+        self.refresh_monitor_button.clicked.connect(lambda: self.sampler.sample_now())
         self.monitoring_layout.addWidget(self.refresh_monitor_button)
-        self.tabs.addTab(self.monitoring_tab, "Monitoring")
-
-        self.output_dock = QDockWidget("Output", self)
-        self.output_widget = QWidget()
-        self.output_layout = QVBoxLayout(self.output_widget)
-        self.output = QTextEdit()
-        self.output.setReadOnly(True)
-        self.output.setFont(QFont("Ubuntu Mono", 14))
-        self.output_layout.addWidget(self.output)
-        self.progress_bar = QProgressBar()
-        self.progress_bar.setVisible(False)
-        self.output_layout.addWidget(self.progress_bar)
-        self.output_dock.setWidget(self.output_widget)
-        self.addDockWidget(Qt.BottomDockWidgetArea, self.output_dock)
-
-        self.status_bar = QStatusBar()
-        self.setStatusBar(self.status_bar)
-        self.status_bar.showMessage("Penetration Mode Active | Anonymity: Off", 5000)
+        self.update_system_resources()
 
-        self.vpn_active = False
-        self.tor_active = False
-        self.proxy_active = False
-        self.dns_secure = False
-        self.update_status_timer = QTimer()
-        self.update_status_timer.timeout.connect(self.update_status)
+    def finish_startup(self):
+        # Runs once the event loop is up, after the window's first paint;
+        # nothing here is needed to show it
+        self.cursor_pixmap = QPixmap(32, 32)
+        self.cursor_pixmap.fill(Qt.transparent)
+        painter = QPainter(self.cursor_pixmap)
+        gradient = QLinearGradient(0, 0, 32, 32)
+        gradient.setColorAt(0, QColor("#00FFFF"))
+        gradient.setColorAt(1, QColor("#FF00FF"))
+        painter.setBrush(QBrush(gradient))
+        painter.setPen(QPen(QColor("#FFFFFF"), 2))
+        painter.drawEllipse(2, 2, 28, 28)
+        painter.end()
+        self.setCursor(QCursor(self.cursor_pixmap))
+        self.results_model.reset_rows(self.history.rows())
+        self.update_graph()
         self.update_status_timer.start(1000)
-
-        self.scheduled_tasks = {}
-        self.task_timer = QTimer()
-        self.task_timer.timeout.connect(self.check_scheduled_tasks)
-        self.task_timer.start(60000)
-
-        self.auto_update_timer = QTimer()
-        if self.yaml_config.get("auto_update", self.settings.value("auto_update", True, type=bool)):
-            self.auto_update_timer.timeout.connect(self.check_updates)
-            self.auto_update_timer.start(3600000)
-
-        self.update_logging_level()
         self.auto_detect_interfaces()
-        self.update_graph()
+        if self.journal is not None and self.journal.interrupted:
+            self.offer_resume()
 
     def add_toolbar_button(self, icon_name: str, callback, tooltip: str):
         button = QToolButton()
@@ -591,13 +1265,13 @@ class PenetrationModeWindow(QMainWindow):
                 QWidget { background-color: #1C2526; color: #FFFFFF; font-family: 'Ubuntu Mono'; }
                 QPushButton, QToolButton { background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #2A3439, stop:1 #4A5A66); border: 2px solid #FFFFFF; padding: 10px; font-size: 16px; color: #FFFFFF; border-radius: 8px; }
                 QPushButton:hover, QToolButton:hover { background: #4A5A66; }
-                QTextEdit, QLineEdit { background-color: #2E2E2E; border: 1px solid #FFFFFF; color: #FFFFFF; font-size: 14px; border-radius: 5px; padding: 5px; }
+                QTextEdit, QPlainTextEdit, OutputConsole, QLineEdit { background-color: #2E2E2E; border: 1px solid #FFFFFF; color: #FFFFFF; font-size: 14px; border-radius: 5px; padding: 5px; }
                 QLabel { font-size: 36px; font-weight: bold; color: #FFFFFF; }
                 QComboBox { background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #2A3439, stop:1 #4A5A66); color: #FFFFFF; padding: 5px; border: 1px solid #FFFFFF; border-radius: 5px; }
                 QProgressBar { background-color: #2E2E2E; border: 1px solid #FFFFFF; border-radius: 5px; color: #FFFFFF; }
                 QProgressBar::chunk { background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #4A5A66, stop:1 #6A8299); }
                 QStatusBar { background: #1C2526; color: #FFFFFF; font-size: 14px; }
-                QTableWidget { background-color: #2E2E2E; color: #FFFFFF; border: 1px solid #FFFFFF; }
+                QTableView { background-color: #2E2E2E; color: #FFFFFF; border: 1px solid #FFFFFF; }
                 QDockWidget { background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #1C2526, stop:1 #4A5A66); color: #FFFFFF; }
                 QPushButton#hackerMenuButton {
                     background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #2A3439, stop:1 #4A5A66);
@@ -618,13 +1292,13 @@ class PenetrationModeWindow(QMainWindow):
                 QWidget { background-color: #F0F0F0; color: #000000; font-family: 'Ubuntu Mono'; }
                 QPushButton, QToolButton { background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #D0D0D0, stop:1 #B0B0B0); border: 2px solid #000000; padding: 10px; font-size: 16px; color: #000000; border-radius: 8px; }
                 QPushButton:hover, QToolButton:hover { background: #B0B0B0; }
-                QTextEdit, QLineEdit { background-color: #FFFFFF; border: 1px solid #000000; color: #000000; font-size: 14px; border-radius: 5px; padding: 5px; }
+                QTextEdit, QPlainTextEdit, OutputConsole, QLineEdit { background-color: #FFFFFF; border: 1px solid #000000; color: #000000; font-size: 14px; border-radius: 5px; padding: 5px; }
                 QLabel { font-size: 36px; font-weight: bold; color: #000000; }
                 QComboBox { background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #D0D0D0, stop:1 #B0B0B0); color: #000000; padding: 5px; border: 1px solid #000000; border-radius: 5px; }
                 QProgressBar { background-color: #FFFFFF; border: 1px solid #000000; border-radius: 5px; color: #000000; }
                 QProgressBar::chunk { background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #B0B0B0, stop:1 #909090); }
                 QStatusBar { background: #F0F0F0; color: #000000; font-size: 14px; }
-                QTableWidget { background-color: #FFFFFF; color: #000000; border: 1px solid #000000; }
+                QTableView { background-color: #FFFFFF; color: #000000; border: 1px solid #000000; }
                 QDockWidget { background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #F0F0F0, stop:1 #D0D0D0); color: #000000; }
                 QPushButton#hackerMenuButton {
                     background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #D0D0D0, stop:1 #B0B0B0);
@@ -645,13 +1319,13 @@ class PenetrationModeWindow(QMainWindow):
                 QWidget { background-color: #0A1F0A; color: #00FF00; font-family: 'Ubuntu Mono'; }
                 QPushButton, QToolButton { background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #1A3C1A, stop:1 #2A5A2A); border: 2px solid #00FF00; padding: 10px; font-size: 16px; color: #00FF00; border-radius: 8px; }
                 QPushButton:hover, QToolButton:hover { background: #2A5A2A; }
-                QTextEdit, QLineEdit { background-color: #1A2E1A; border: 1px solid #00FF00; color: #00FF00; font-size: 14px; border-radius: 5px; padding: 5px; }
+                QTextEdit, QPlainTextEdit, OutputConsole, QLineEdit { background-color: #1A2E1A; border: 1px solid #00FF00; color: #00FF00; font-size: 14px; border-radius: 5px; padding: 5px; }
                 QLabel { font-size: 36px; font-weight: bold; color: #00FF00; }
                 QComboBox { background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #1A3C1A, stop:1 #2A5A2A); color: #00FF00; padding: 5px; border: 1px solid #00FF00; border-radius: 5px; }
                 QProgressBar { background-color: #1A2E1A; border: 1px solid #00FF00; border-radius: 5px; color: #00FF00; }
                 QProgressBar::chunk { background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #2A5A2A, stop:1 #4A7A4A); }
                 QStatusBar { background: #0A1F0A; color: #00FF00; font-size: 14px; }
-                QTableWidget { background-color: #1A2E1A; color: #00FF00; border: 1px solid #00FF00; }
+                QTableView { background-color: #1A2E1A; color: #00FF00; border: 1px solid #00FF00; }
                 QDockWidget { background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #0A1F0A, stop:1 #2A5A2A); color: #00FF00; }
                 QPushButton#hackerMenuButton {
                     background: qlineargradient(x1:0, y1:0, x2:1, y2:1, stop:0 #1A3C1A, stop:1 #2A5A2A);
@@ -675,7 +1349,8 @@ class PenetrationModeWindow(QMainWindow):
         self.theme = theme
         self.settings.setValue("theme", theme)
         self.apply_theme()
-        self.update_graph()
+        if self.results_chart is not None:
+            self.results_chart.rebuild(self.tool_stats)
 
     def manage_bluetooth(self):
         dialog = NetworkDialog(self, "Bluetooth")
@@ -693,10 +1368,14 @@ class PenetrationModeWindow(QMainWindow):
         if not os.path.exists(vpn_path):
             self.log_error(f"VPN file {vpn_path} does not exist. Check settings.")
             return
+        privileged_helper.set_vpn_config(vpn_path)
         if not self.vpn_active:
-            subprocess.Popen(["pkexec", "openvpn", "--config", vpn_path, "--daemon"])
-            self.output.append("VPN activated.")
-            self.vpn_active = True
+            try:
+                run_with_privileges(["openvpn", "--config", vpn_path, "--daemon"], timeout=30)
+                self.output.append("VPN activated.")
+                self.vpn_active = True
+            except subprocess.CalledProcessError as e:
+                self.log_error(f"Failed to activate VPN: {str(e)}")
         else:
             try:
                 run_with_privileges(["pkill", "openvpn"], timeout=30)
@@ -744,19 +1423,13 @@ class PenetrationModeWindow(QMainWindow):
         self.update_status()
 
     def toggle_dns(self):
-        dns_servers = self.yaml_config.get("dns_servers", self.settings.value("dns_servers", "8.8.8.8,8.8.4.4")).split(",")
         try:
             if not self.dns_secure:
-                dns_content = "\n".join(f"nameserver {server.strip()}" for server in dns_servers)
-                with open("/tmp/resolv.conf", "w") as f:
-                    f.write(dns_content)
-                run_with_privileges(["mv", "/tmp/resolv.conf", "/etc/resolv.conf"])
-                self.output.append(f"DNS secured: {', '.join(dns_servers)}")
+                run_with_privileges(["mv", self.stage_resolv_conf(True), "/etc/resolv.conf"])
+                self.output.append(f"DNS secured: {', '.join(self.dns_servers())}")
                 self.dns_secure = True
             else:
-                with open("/tmp/resolv.conf", "w") as f:
-                    f.write("nameserver 127.0.0.1\n")
-                run_with_privileges(["mv", "/tmp/resolv.conf", "/etc/resolv.conf"])
+                run_with_privileges(["mv", self.stage_resolv_conf(False), "/etc/resolv.conf"])
                 self.output.append("DNS reset to default.")
                 self.dns_secure = False
         except subprocess.CalledProcessError as e:
@@ -765,55 +1438,150 @@ class PenetrationModeWindow(QMainWindow):
             self.log_error("Permission denied: Cannot modify /etc/resolv.conf")
         self.update_status()
 
+    def dns_servers(self) -> List[str]:
+        servers = self.yaml_config.get("dns_servers", self.settings.value("dns_servers", "8.8.8.8,8.8.4.4")).split(",")
+        return [server.strip() for server in servers]
+
+    def stage_resolv_conf(self, secure: bool) -> str:
+        # Written unprivileged, then moved into place by a privileged mv
+        with open(STAGED_RESOLV_CONF, "w") as f:
+            if secure:
+                f.write("\n".join(f"nameserver {server}" for server in self.dns_servers()))
+            else:
+                f.write("nameserver 127.0.0.1\n")
+        return STAGED_RESOLV_CONF
+
+    def configured_interface(self) -> str:
+        return self.yaml_config.get("interface", self.settings.value("interface", "wlan0"))
+
+    def mac_interface(self) -> str:
+        # The configured interface while it exists, otherwise whatever is live now
+        configured = self.configured_interface()
+        if not len(self.interfaces) or self.interfaces.get(configured):
+            return configured
+        interface = self.interfaces.preferred(wireless=True) or self.interfaces.preferred()
+        return interface.name if interface else configured
+
+    def wireless_interface(self) -> Optional[Interface]:
+        # Monitor-mode interfaces first; that is what the aircrack-ng suite captures on
+        return self.interfaces.preferred(monitor=True) or self.interfaces.preferred(wireless=True)
+
+    def mac_commands(self, interface: str) -> List[List[str]]:
+        return [["ip", "link", "set", interface, "down"],
+                ["macchanger", "-r", interface],
+                ["ip", "link", "set", interface, "up"]]
+
+    def anonymity_chains(self, enable: bool) -> Dict[str, List[List[str]]]:
+        # One chain per component; the helper runs the chains side by side
+        chains = {}
+        if self.vpn_active != enable:
+            vpn_path = self.yaml_config.get("vpn_path", self.settings.value("vpn_path", "/etc/openvpn/client.conf"))
+            if not self.check_tool("openvpn"):
+                self.install_tool("openvpn")
+            elif enable and not os.path.exists(vpn_path):
+                self.log_error(f"VPN file {vpn_path} does not exist. Check settings.")
+            else:
+                privileged_helper.set_vpn_config(vpn_path)
+                chains["VPN"] = [["openvpn", "--config", vpn_path, "--daemon"] if enable else ["pkill", "openvpn"]]
+        if self.tor_active != enable:
+            if not self.check_tool("tor"):
+                self.install_tool("tor")
+            else:
+                chains["Tor"] = [["systemctl", "start" if enable else "stop", "tor"]]
+        if self.dns_secure != enable:
+            try:
+                chains["DNS"] = [["mv", self.stage_resolv_conf(enable), "/etc/resolv.conf"]]
+            except OSError as e:
+                self.log_error(f"Failed to modify DNS: {str(e)}")
+        if enable:
+            if not self.check_tool("macchanger"):
+                self.install_tool("macchanger")
+            else:
+                chains["MAC"] = self.mac_commands(self.mac_interface())
+        return chains
+
     def toggle_full_anonymity(self):
-        if not all([self.vpn_active, self.tor_active, self.proxy_active, self.dns_secure]):
-            self.toggle_vpn()
-            self.toggle_tor()
-            self.toggle_proxy()
-            self.toggle_dns()
-            self.randomize_mac()
-            self.output.append("Full Anonymity mode enabled.")
-        else:
-            self.toggle_vpn()
-            self.toggle_tor()
+        enable = not all([self.vpn_active, self.tor_active, self.proxy_active, self.dns_secure])
+        if self.proxy_active != enable:
             self.toggle_proxy()
-            self.toggle_dns()
-            self.output.append("Full Anonymity mode disabled.")
+        chains = self.anonymity_chains(enable)
+        names = list(chains)
+        try:
+            future = privileged_helper.run_batch(
+                [chains[name] for name in names], timeout=30,
+                on_result=lambda chain, step, result: self.anonymity_step_signal.fired.emit(
+                    (enable, names[chain], step == len(chains[names[chain]]) - 1, result)))
+        except subprocess.CalledProcessError as e:
+            self.log_error(f"Failed to {'enable' if enable else 'disable'} Full Anonymity mode: {e.output or str(e)}")
+            return
+        future.add_done_callback(lambda f: self.anonymity_done_signal.fired.emit((enable, f)))
+
+    def apply_anonymity_step(self, payload):
+        enable, name, last, result = payload
+        if isinstance(result, subprocess.TimeoutExpired) or result.returncode != 0:
+            reason = "timed out" if isinstance(result, subprocess.TimeoutExpired) else (result.stderr.strip() or f"exit code {result.returncode}")
+            if not isinstance(result, subprocess.TimeoutExpired) and result.returncode in (126, 127):
+                reason = "Authentication canceled by user"
+            self.log_error(f"Failed to {'enable' if enable else 'disable'} {name}: {reason}")
+            return
+        if not last:
+            return
+        if name == "VPN":
+            self.vpn_active = enable
+            self.output.append("VPN activated." if enable else "VPN deactivated.")
+        elif name == "Tor":
+            self.tor_active = enable
+            self.output.append("Tor activated." if enable else "Tor deactivated.")
+        elif name == "DNS":
+            self.dns_secure = enable
+            self.output.append(f"DNS secured: {', '.join(self.dns_servers())}" if enable else "DNS reset to default.")
+        elif name == "MAC":
+            self.output.append(f"MAC address randomized for {self.mac_interface()}.")
+        self.update_status()
+
+    def finish_full_anonymity(self, payload):
+        enable, future = payload
+        try:
+            future.result()
+        except OSError as e:
+            self.log_error(f"Privileged helper error: {str(e)}")
+        self.output.append("Full Anonymity mode enabled." if enable else "Full Anonymity mode disabled.")
         self.update_status()
 
     def check_network(self):
         self.output.append("Checking connection...")
-        worker = ProcessWorker(["ping", "-c", "4", "8.8.8.8"], timeout=int(self.settings.value("timeout", 60)))
-        worker.output_signal.connect(self.handle_output)
-        worker.error_signal.connect(self.handle_error)
-        worker.finished_signal.connect(lambda: self.output.append("Check completed."))
-        self.workers.append(worker)
-        self.threadpool.start(worker)
+        self.submit_job(["ping", "-c", "4", "8.8.8.8"], name="Connection check", priority=PRIORITY_HIGH)
 
     def randomize_mac(self):
         if not self.check_tool("macchanger"):
             self.install_tool("macchanger")
             return
-        interface = self.yaml_config.get("interface", self.settings.value("interface", "wlan0"))
+        interface = self.mac_interface()
         try:
-            run_with_privileges(["ip", "link", "set", interface, "down"], timeout=30)
-            run_with_privileges(["macchanger", "-r", interface], timeout=30)
-            run_with_privileges(["ip", "link", "set", interface, "up"], timeout=30)
+            for command in self.mac_commands(interface):
+                run_with_privileges(command, timeout=30)
             self.output.append(f"MAC address randomized for {interface}.")
         except subprocess.CalledProcessError as e:
             self.log_error(f"Failed to randomize MAC: {str(e)}")
 
     def auto_detect_interfaces(self):
-        try:
-            result = subprocess.check_output(["ip", "link"], text=True)
-            interfaces = [line.split(":")[1].strip() for line in result.splitlines() if "state UP" in line]
-            if interfaces:
-                self.settings.setValue("interface", interfaces[0])
-                self.output.append(f"Auto-detected interface: {interfaces[0]}")
-            else:
-                self.output.append("No active interfaces detected.")
-        except subprocess.CalledProcessError as e:
-            self.log_error(f"Interface detection error: {str(e)}")
+        interface = self.interfaces.preferred()
+        if interface is not None and (interface.running or interface.monitor):
+            self.settings.setValue("interface", interface.name)
+            self.output.append(f"Auto-detected interface: {interface.describe()}")
+        else:
+            self.output.append("No active interfaces detected.")
+
+    def on_interface_change(self, payload):
+        event, interface = payload
+        if event == "added":
+            self.output.append(f"Interface added: {interface.describe()}")
+        elif event == "removed":
+            self.output.append(f"Interface removed: {interface.name}")
+            if interface.name == self.configured_interface():
+                fallback = self.mac_interface()
+                self.log_error(f"Configured interface {interface.name} is gone"
+                               + (f"; using {fallback} for now." if fallback != interface.name else "."))
 
     def schedule_task(self):
         task_name, ok1 = QInputDialog.getText(self, "Task Name", "Enter task name:")
@@ -822,48 +1590,85 @@ class PenetrationModeWindow(QMainWindow):
         command, ok2 = QInputDialog.getText(self, "Command", "Enter command to schedule:")
         if not ok2:
             return
-        interval, ok3 = QInputDialog.getInt(self, "Interval", "Enter interval in minutes:", 60, 1, 1440)
-        if ok3:
-            self.scheduled_tasks[task_name] = {"command": command.split(), "interval": interval * 60, "last_run": 0}
-            self.output.append(f"Task '{task_name}' scheduled every {interval} minutes.")
-
-    def check_scheduled_tasks(self):
-        current_time = datetime.now().timestamp()
-        for name, task in list(self.scheduled_tasks.items()):
-            if current_time - task["last_run"] >= task["interval"]:
-                self.execute_command(task["command"], datetime.now())
-                task["last_run"] = current_time
-                self.output.append(f"Scheduled task '{name}' executed.")
-
-    def update_system_resources(self):
+        schedule, ok3 = QInputDialog.getText(self, "Schedule", "Cron expression or @every interval (e.g. */15 * * * *, @daily, @every 90m):",
+                                             text="@every 60m")
+        if not ok3:
+            return
         try:
-            cpu = subprocess.check_output(["top", "-bn1"], text=True).splitlines()[2].split()[1]
-            ram = subprocess.check_output(["free", "-h"], text=True).splitlines()[1].split()[2]
-            disk = subprocess.check_output(["df", "-h", "/"], text=True).splitlines()[1].split()[3]
-            self.resource_label.setText(f"CPU: {cpu}% | RAM: {ram} | Disk: {disk}")
-        except subprocess.CalledProcessError as e:
-            self.log_error(f"Resource monitoring error: {str(e)}")
+            task = ScheduledTask(task_name, command.split(), schedule,
+                                 jitter=float(self.yaml_config.get("task_jitter", self.settings.value("task_jitter", 0))),
+                                 catch_up=self.yaml_config.get("task_catch_up", self.settings.value("task_catch_up", "once")),
+                                 max_overlap=int(self.yaml_config.get("task_max_overlap", self.settings.value("task_max_overlap", 1))))
+        except ValueError as e:
+            self.log_error(f"Invalid schedule: {str(e)}")
+            return
+        self.task_scheduler.add(task)
+        self.output.append(f"Task '{task_name}' scheduled ({task.schedule}), next run {datetime.fromtimestamp(task.next_run):%Y-%m-%d %H:%M}.")
+
+    def remove_scheduled_task(self):
+        names = sorted(task.name for task in self.task_scheduler.tasks())
+        if not names:
+            self.output.append("No scheduled tasks.")
+            return
+        name, ok = QInputDialog.getItem(self, "Remove Scheduled Task", "Task:", names, 0, False)
+        if ok and self.task_scheduler.remove(name):
+            self.output.append(f"Task '{name}' removed.")
+
+    def run_scheduled_task(self, task: ScheduledTask):
+        key = self.result_cache_key(task.command)
+        if key is not None and self.replay_cached_result(key, datetime.now()):
+            self.task_scheduler.finished(task.name)
+            self.output.append(f"Scheduled task '{task.name}' answered from the result cache.")
+            return
+        job = self.execute_command(task.command, datetime.now(), priority=PRIORITY_LOW)
+        job.cache_key = key
+        # Lets handle_job_state release the task's overlap slot
+        job.task_name = task.name
+        self.output.append(f"Scheduled task '{task.name}' executed.")
+
+    def update_system_resources(self, sample: Dict = None):
+        sample = sample or self.sampler.latest
+        if not sample or self.resource_label is None:
+            return
+        self.resource_label.setText(
+            f"CPU: {sample['cpu']:.1f}% | RAM: {format_bytes(sample['memory_used'])}/{format_bytes(sample['memory_total'])}"
+            f" | Disk: {format_bytes(sample['disk_free'])} free | Load: {sample['load']:.2f}")
+        if self.monitoring_tab.isVisible():
+            self.refresh_sparklines()
+
+    def refresh_sparklines(self):
+        times, series = self.sampler.snapshot()
+        if not times:
+            return
+        now = times[-1]
+        markers = [(job.started_at, job.finished_at or now, job.name) for job in self.scheduler.snapshot()
+                   if job.started_at is not None and (job.finished_at or now) >= times[0]]
+        for name, sparkline in self.sparklines.items():
+            sparkline.set_series(times, series[name], markers)
 
     def check_anonymity(self):
+        from penmode.anonymity import AnonymityConfig
+        # Showing the tab also builds it, prober included
         self.tabs.setCurrentWidget(self.anonymity_tab)
-        report = []
+        self.ip_label.setText("IP: checking...")
+        # All probes run concurrently off the GUI thread; the label updates
+        # as soon as enough of them agree, the report once all are in
+        config = AnonymityConfig.from_dict(self.yaml_config.get("anonymity", {}))
+        future = self.anonymity_prober.check(config, on_consensus=self.anonymity_ip_signal.fired.emit)
+        future.add_done_callback(self.anonymity_report_signal.fired.emit)
+
+    def show_anonymity_report(self, future):
         try:
-            response = requests.get("https://api.ipify.org?format=json", timeout=5)
-            ip_info = response.json()
-            self.ip_label.setText(f"IP: {ip_info['ip']}")
-            detailed_response = requests.get(f"http://ipinfo.io/{ip_info['ip']}/json", timeout=5)
-            details = detailed_response.json()
-            report.append(f"IP: {ip_info['ip']}")
-            report.append(f"Location: {details.get('city', 'Unknown')}, {details.get('region', 'Unknown')}, {details.get('country', 'Unknown')}")
-            report.append(f"ISP: {details.get('org', 'Unknown')}")
-            dns_result = run_with_privileges(["nslookup", "whoami.akamai.net"], timeout=10).stdout
-            report.append(f"DNS Response: {dns_result.strip()}")
-            self.anonymity_report.setText("\n".join(report))
-            self.output.append(f"Anonymity Report:\n{'-'*20}\n{'\n'.join(report)}\n{'-'*20}")
-        except requests.RequestException as e:
+            report = future.result()
+        except Exception as e:
+            self.ip_label.setText("IP: Unknown")
             self.log_error(f"IP check error: {str(e)}")
-        except subprocess.CalledProcessError as e:
-            self.log_error(f"DNS check error: {str(e)}")
+            return
+        lines = report.lines()
+        self.ip_label.setText(f"IP: {report.ip or 'Unknown'}")
+        self.anonymity_report.setText("\n".join(lines))
+        separator = "-" * 20
+        self.output.append(f"Anonymity Report:\n{separator}\n" + "\n".join(lines) + f"\n{separator}")
 
     def run_security_scan(self):
         required_tools = ["lynis", "chkrootkit"]
@@ -875,20 +1680,33 @@ class PenetrationModeWindow(QMainWindow):
         self.execute_command(["lynis", "audit", "system"], datetime.now())
         self.execute_command(["chkrootkit"], datetime.now())
 
-    def check_updates(self):
+    def check_updates(self, force: bool = False):
+        if self.update_check_pending:
+            return
+        self.update_check_pending = True
         self.output.append("Checking for updates...")
+        self.update_checker.check_async(force).add_done_callback(self.update_signal.fired.emit)
+
+    def show_update_status(self, future):
+        self.update_check_pending = False
         try:
-            response = requests.get("https://example.com/hackeros_version.json", timeout=10)
-            latest_version = response.json().get("version", "unknown")
-            current_version = "1.0.0"
-            if latest_version != current_version:
-                self.output.append(f"Update available: {latest_version}")
-                if QMessageBox.question(self, "Update", "Update now?", QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
-                    self.update_system()
-            else:
-                self.output.append("System is up to date.")
-        except requests.RequestException as e:
+            status = future.result()
+        except Exception as e:
             self.log_error(f"Update check error: {str(e)}")
+            return
+        if status.error:
+            self.log_error(f"Update check error: {status.error}")
+        if status.available:
+            latest = release_label(status.latest)
+            self.output.append(f"Update available: {latest}")
+            # Ask once per release; the hourly tick should not keep popping the dialog
+            if latest not in self.update_prompted:
+                self.update_prompted.add(latest)
+                if QMessageBox.question(self, "Update", f"{latest} is available. Update now?", QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
+                    self.update_system()
+        elif status.latest:
+            installed = release_label(status.installed) if status.installed else "unknown"
+            self.output.append(f"System is up to date ({installed}).")
 
     def open_settings(self):
         dialog = SettingsDialog(self)
@@ -906,113 +1724,342 @@ class PenetrationModeWindow(QMainWindow):
 
     def close_app(self):
         self.save_user_profile()
-        for worker in self.workers[:]:
-            if worker.isRunning():
-                worker.terminate()
+        # Jobs stopped from here on stay in the journal and are offered for resume next time
+        if self.journal is not None:
+            self.journal.suspend()
+        self.scheduler.shutdown()
+        self.tool_inventory.stop()
+        self.history.close()
+        self.log_sink.close()
+        self.key_deriver.shutdown()
+        self.sampler.stop()
+        if self.anonymity_prober is not None:
+            self.anonymity_prober.close()
+        self.update_checker.shutdown()
+        self.task_scheduler.stop()
+        self.interface_watcher.stop()
+        for pipeline in list(self.pipelines):
+            pipeline.stop()
+        privileged_helper.stop()
+        if self.journal is not None:
+            self.journal.close()
         QApplication.quit()
 
     def check_tool(self, tool: str) -> bool:
-        try:
-            subprocess.run([tool, "--version"], stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=5)
-            return True
-        except (subprocess.CalledProcessError, FileNotFoundError):
-            return False
+        return self.tool_inventory.check_tool(tool)
+
+    def rescan_tools(self):
+        self.output.append("Rescanning PATH for tools...")
+        self.tool_inventory.rescan()
+
+    def refresh_tools_table(self):
+        binaries = list(dict.fromkeys(list(self.tool_binaries.values()) + INVENTORY_EXTRA_TOOLS))
+        self.tools_table.setRowCount(len(binaries))
+        for row, entry in enumerate(self.tool_inventory.entries(binaries)):
+            values = [entry.name, "Installed" if entry.installed else "Missing", entry.path or "", entry.version or ""]
+            for column, value in enumerate(values):
+                self.tools_table.setItem(row, column, QTableWidgetItem(value))
 
     def install_tool(self, tool: str):
         self.output.append(f"Installing {tool}...")
-        worker = ProcessWorker(["apt-get", "install", "-y", tool], timeout=300)
-        worker.output_signal.connect(self.handle_output)
-        worker.error_signal.connect(self.handle_error)
-        worker.finished_signal.connect(self.process_finished)
-        self.workers.append(worker)
-        self.threadpool.start(worker)
-
-    def execute_command(self, command: List[str], start_time: datetime):
-        worker = ProcessWorker(command, timeout=int(self.settings.value("timeout", 60)))
-        worker.output_signal.connect(lambda data: self.handle_output(data, start_time))
-        worker.error_signal.connect(lambda data: self.handle_error(data, start_time))
-        worker.finished_signal.connect(self.process_finished)
-        worker.progress_signal.connect(self.update_progress)
-        self.workers.append(worker)
-        self.threadpool.start(worker)
+        self.submit_job(["apt-get", "install", "-y", tool], name=f"Install {tool}", priority=PRIORITY_HIGH, timeout=300)
+
+    def execute_command(self, command: List[str], start_time: datetime, priority: int = PRIORITY_NORMAL) -> Job:
+        entry = self.journal_entry(command)
+        return self.submit_job(entry.command if entry else command, start_time=start_time, priority=priority,
+                               journal_entry=entry)
+
+    def journal_entry(self, command: List[str], name: str = None, scan_id: int = None,
+                      shard: List[int] = None) -> Optional[JournalEntry]:
+        # Interactive tools are not worth bringing back after a restart
+        if self.journal is None or RESOURCE_CLASSES.get(os.path.basename(command[0])) == "interactive":
+            return None
+        try:
+            return self.journal.new_entry(command, name, scan_id, shard)
+        except OSError as e:
+            self.log_error(f"Job journal error: {str(e)}")
+            return None
+
+    def nmap_shard_count(self, nmap: NmapCommand) -> int:
+        shards = self.yaml_config.get("nmap_shards", self.settings.value("nmap_shards", "auto"))
+        if str(shards) != "auto":
+            try:
+                return max(1, int(shards))
+            except ValueError:
+                self.log_error(f"Invalid nmap_shards value: {shards}")
+                return 1
+        budget = nmap.max_rate or int(self.yaml_config.get("scan_max_rate", self.settings.value("scan_max_rate", 0)))
+        return shard_count(os.cpu_count() or 1, budget, self.scheduler.class_limits.get("network"))
+
+    def execute_nmap(self, command: List[str], start_time: datetime) -> Job:
+        # Large target ranges run as parallel nmap processes over balanced shards;
+        # their findings are deduplicated into one scan
+        nmap = NmapCommand(command[1:])
+        split_ports = bool(self.yaml_config.get("shard_ports", self.settings.value("shard_ports", True, type=bool)))
+        shards = plan_shards(nmap, self.nmap_shard_count(nmap), split_ports)
+        if len(shards) == 1:
+            return self.execute_scan(command, start_time)
+        try:
+            scan = self.history.start_scan(date_key(start_time), command[0], " ".join(command[1:]))
+        except sqlite3.Error as e:
+            self.log_error(f"History write error: {str(e)}")
+            return self.execute_scan(command, start_time)
+        budget = nmap.max_rate or int(self.yaml_config.get("scan_max_rate", self.settings.value("scan_max_rate", 0)))
+        rate = max(1, budget // len(shards)) if budget else None
+        group = ShardGroup(command, shards)
+        group.start_time = start_time
+        group.scan_id = scan
+        for shard in shards:
+            shard_command, parser = structured_output(nmap.build(shard, rate))
+            ingest = OutputIngest(parser, lambda findings: self.history.add_findings(scan, group.merger.add(findings)))
+            name = f"nmap [{shard.index + 1}/{len(shards)}] {shard.describe()}"
+            entry = self.journal_entry(shard_command, name, scan, [shard.index, len(shards)])
+            job = self.submit_job(entry.command if entry else shard_command, name=name, start_time=start_time,
+                                  output_hook=ingest, journal_entry=entry)
+            job.scan_id = scan
+            job.shard_group = group
+            group.add_job(job)
+        self.output.append(f"nmap split into {len(shards)} shards" + (f" at {rate} pps each." if rate else "."))
+        return group.jobs[0]
+
+    def execute_scan(self, command: List[str], start_time: datetime) -> Job:
+        # nmap/masscan output is parsed while it streams and stored as findings
+        parsed_command, parser = structured_output(command)
+        if parser is None:
+            return self.execute_command(command, start_time)
+        try:
+            scan = self.history.start_scan(date_key(start_time), command[0], " ".join(command[1:]))
+        except sqlite3.Error as e:
+            self.log_error(f"History write error: {str(e)}")
+            return self.execute_command(command, start_time)
+        ingest = OutputIngest(parser, lambda findings: self.history.add_findings(scan, findings))
+        entry = self.journal_entry(parsed_command, scan_id=scan)
+        job = self.submit_job(entry.command if entry else parsed_command, start_time=start_time, output_hook=ingest,
+                              journal_entry=entry)
+        job.scan_id = scan
+        return job
+
+    def submit_job(self, command: List[str], name: str = None, priority: int = PRIORITY_NORMAL,
+                   timeout: int = None, start_time: datetime = None, output_hook=None,
+                   journal_entry: JournalEntry = None) -> Job:
+        if timeout is None:
+            # Tools that can resume run as long as they need to; a cut-off run is offered for resume
+            if journal_entry is not None and journal_entry.workdir:
+                timeout = 60 * int(self.yaml_config.get("resumable_timeout_minutes",
+                                                        self.settings.value("resumable_timeout_minutes", 0)))
+            else:
+                timeout = int(self.settings.value("timeout", 60))
+        job = Job(command, name=name, priority=priority, timeout=timeout or None, output_hook=output_hook)
+        job.start_time = start_time or datetime.now()
+        job.batch_window = BatchWindow()
+        if self.blob_store is not None:
+            job.capture = self.blob_store.writer()
+        if journal_entry is not None:
+            job.cwd = journal_entry.cwd
+            if journal_entry.workdir:
+                # What Ctrl-C does: nmap, john and hydra save their resume state on SIGINT
+                job.stop_signal = signal.SIGINT
+            try:
+                # Written ahead: the entry is on disk before the job can start
+                self.journal.start(journal_entry)
+                job.journal_entry = journal_entry
+            except OSError as e:
+                self.log_error(f"Job journal error: {str(e)}")
+        self.progress_bar.setVisible(True)
+        return self.scheduler.submit(job)
+
+    def job_class_limits(self) -> Dict[str, int]:
+        return {
+            "network": int(self.yaml_config.get("network_jobs", self.settings.value("network_jobs", 4))),
+            "cpu": int(self.yaml_config.get("cpu_jobs", self.settings.value("cpu_jobs", max(1, (os.cpu_count() or 2) // 2)))),
+        }
+
+    def selected_job_ids(self) -> List[int]:
+        rows = {index.row() for index in self.jobs_table.selectedIndexes()}
+        return [int(self.jobs_table.item(row, 0).text()) for row in rows if self.jobs_table.item(row, 0)]
+
+    def cancel_selected_jobs(self):
+        for job_id in self.selected_job_ids():
+            if self.scheduler.cancel(job_id):
+                self.output.append(f"Cancelling job #{job_id}...")
+        self.refresh_jobs_table()
+
+    def cancel_queued_jobs(self):
+        self.scheduler.cancel_all(queued_only=True)
+        self.refresh_jobs_table()
+
+    def shift_job_priority(self, priority: int):
+        for job_id in self.selected_job_ids():
+            self.scheduler.set_priority(job_id, priority)
+        self.refresh_jobs_table()
+
+    def refresh_jobs_table(self):
+        jobs = self.scheduler.snapshot()
+        self.jobs_table.setRowCount(len(jobs))
+        for row, job in enumerate(jobs):
+            values = [str(job.id), job.name, job.resource_class, str(job.priority), job.state,
+                      f"{job.queue_wait:.1f}s", f"{job.run_time:.1f}s", f"{job.progress}%"]
+            for column, value in enumerate(values):
+                item = self.jobs_table.item(row, column)
+                if item is None:
+                    self.jobs_table.setItem(row, column, QTableWidgetItem(value))
+                elif item.text() != value:
+                    item.setText(value)
 
     def run_nmap(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("nmap"):
             self.install_tool("nmap")
             return
-        self.execute_command(["nmap"] + params.split(), start_time)
+        return self.execute_nmap(["nmap"] + params.split(), start_time)
 
     def run_masscan(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("masscan"):
             self.install_tool("masscan")
             return
-        self.execute_command(["masscan"] + params.split(), start_time)
+        return self.execute_scan(["masscan"] + params.split(), start_time)
+
+    def run_discovery_pipeline(self, params: str, tool_name: str, start_time: datetime):
+        for tool in ("masscan", "nmap"):
+            if not self.check_tool(tool):
+                self.install_tool(tool)
+                return
+        masscan_args, nmap_args = split_pipeline_params(params)
+        command, parser = structured_output(["masscan"] + masscan_args)
+        if parser is None:
+            self.output.append("Error: the pipeline reads masscan results from stdout; remove its output options.")
+            return
+        try:
+            discovery_scan = self.history.start_scan(date_key(start_time), "masscan", " ".join(masscan_args))
+            service_scan = self.history.start_scan(date_key(start_time), "nmap", " ".join(nmap_args) + " (pipeline)")
+        except sqlite3.Error as e:
+            self.log_error(f"History write error: {str(e)}")
+            return
+        # Batches come from the pipeline's thread; jobs are submitted on the GUI thread
+        pipeline = DiscoveryPipeline(lambda hosts, ports: self.pipeline_signal.fired.emit((pipeline, hosts, ports)))
+        pipeline.command = ["masscan"] + masscan_args + ["|", "nmap"] + nmap_args
+        pipeline.nmap_args = nmap_args
+        pipeline.start_time = start_time
+        pipeline.scan_id = service_scan
+        pipeline.jobs = []
+
+        def discovered(findings):
+            pipeline.feed(findings)
+            self.history.add_findings(discovery_scan, findings)
+
+        job = self.submit_job(command, name="pipeline masscan", start_time=start_time,
+                              output_hook=OutputIngest(parser, discovered))
+        job.scan_id = discovery_scan
+        job.pipeline = pipeline
+        pipeline.discovery_job = job
+        self.pipelines.add(pipeline)
+        pipeline.start()
+        return pipeline
+
+    def dispatch_pipeline_batch(self, payload):
+        pipeline, hosts, ports = payload
+        if pipeline.stopped:
+            if pipeline.batch_finished():
+                self.finish_pipeline(pipeline)
+            return
+        command, parser = structured_output(nmap_command(pipeline.nmap_args, hosts, ports))
+        ingest = OutputIngest(parser, lambda findings: self.history.add_findings(pipeline.scan_id, findings)) if parser else None
+        name = f"pipeline nmap {hosts[0]}" + (f" +{len(hosts) - 1}" if len(hosts) > 1 else "")
+        job = self.submit_job(command, name=name, start_time=pipeline.start_time, output_hook=ingest)
+        job.pipeline = pipeline
+        pipeline.jobs.append(job)
+
+    def finish_pipeline(self, pipeline: DiscoveryPipeline):
+        self.pipelines.discard(pipeline)
+        jobs = [pipeline.discovery_job] + pipeline.jobs
+        if pipeline.discovery_job.state == CANCELLED:
+            status = "Cancelled"
+        elif any(job.error or job.returncode != 0 for job in jobs):
+            status = "Error"
+        else:
+            status = "Success"
+        services = sum(job.output_hook.records for job in pipeline.jobs if job.output_hook is not None)
+        data = (f"{len(pipeline.hosts)} hosts, {pipeline.open_ports} open ports discovered; "
+                f"{len(pipeline.jobs)} nmap runs, {services} service findings")
+        self.add_result_row(pipeline.command, data, status, pipeline.start_time, self.job_blobs(jobs),
+                            Usage.total(job.usage for job in jobs), getattr(pipeline, "cache_key", None))
+        self.refresh_findings_scans()
 
     def run_openvas(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("openvas-start"):
             self.install_tool("openvas")
             return
-        self.execute_command(["openvas-start"], start_time)
+        return self.execute_command(["openvas-start"], start_time)
 
     def run_metasploit(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("msfconsole"):
             self.install_tool("metasploit-framework")
             return
-        self.execute_command(["msfconsole"] + params.split(), start_time)
+        return self.execute_command(["msfconsole"] + params.split(), start_time)
 
     def run_sqlmap(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("sqlmap"):
             self.install_tool("sqlmap")
             return
-        self.execute_command(["sqlmap"] + params.split(), start_time)
+        return self.execute_command(["sqlmap"] + params.split(), start_time)
 
     def run_aircrack(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("aircrack-ng"):
             self.install_tool("aircrack-ng")
             return
-        self.execute_command(["aircrack-ng"] + params.split(), start_time)
+        monitor = self.interfaces.preferred(monitor=True)
+        if monitor is None and len(self.interfaces):
+            self.output.append("No monitor-mode interface; captures need one (airmon-ng start <interface>).")
+        elif monitor is not None:
+            self.output.append(f"Monitor interface: {monitor.describe()}")
+        return self.execute_command(["aircrack-ng"] + params.split(), start_time)
 
     def run_wifite(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("wifite"):
             self.install_tool("wifite")
             return
-        self.execute_command(["wifite"] + params.split(), start_time)
+        args = params.split()
+        interface = self.wireless_interface()
+        if "-i" not in args and interface is not None:
+            args = ["-i", interface.name] + args
+        elif interface is None and len(self.interfaces):
+            self.log_error("No wireless interface detected.")
+        return self.execute_command(["wifite"] + args, start_time)
 
     def run_john(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("john"):
             self.install_tool("john")
             return
-        self.execute_command(["john"] + params.split(), start_time)
+        return self.execute_command(["john"] + params.split(), start_time)
 
     def run_hydra(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("hydra"):
             self.install_tool("hydra")
             return
-        self.execute_command(["hydra"] + params.split(), start_time)
+        return self.execute_command(["hydra"] + params.split(), start_time)
 
     def run_proxychains(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("proxychains"):
             self.install_tool("proxychains")
             return
-        self.execute_command(["proxychains"] + params.split(), start_time)
+        return self.execute_command(["proxychains"] + params.split(), start_time)
 
     def run_torghost(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("torghost"):
             self.install_tool("torghost")
             return
-        self.execute_command(["torghost"] + params.split(), start_time)
+        return self.execute_command(["torghost"] + params.split(), start_time)
 
     def run_wireshark(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("wireshark"):
             self.install_tool("wireshark")
             return
-        self.execute_command(["wireshark"] + params.split(), start_time)
+        return self.execute_command(["wireshark"] + params.split(), start_time)
 
     def run_htop(self, params: str, tool_name: str, start_time: datetime):
         if not self.check_tool("htop"):
             self.install_tool("htop")
             return
-        self.execute_command(["htop"] + params.split(), start_time)
+        return self.execute_command(["htop"] + params.split(), start_time)
 
     def restart_system(self):
         if QMessageBox.question(self, "Restart", "Restart system now?", QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
@@ -1030,17 +2077,21 @@ class PenetrationModeWindow(QMainWindow):
 
     def restart_app(self):
         self.save_user_profile()
+        # exec would leave the jobs running unsupervised; stop them so the new
+        # process can offer to resume them instead
+        if self.journal is not None:
+            self.journal.suspend()
+        self.scheduler.shutdown()
+        for pipeline in list(self.pipelines):
+            pipeline.stop()
+        privileged_helper.stop()
         python = sys.executable
         os.execl(python, python, *sys.argv)
 
     def update_system(self):
         self.output.append("Updating system...")
-        worker = ProcessWorker(["apt-get", "update", "&&", "apt-get", "upgrade", "-y"], timeout=600)
-        worker.output_signal.connect(self.handle_output)
-        worker.error_signal.connect(self.handle_error)
-        worker.finished_signal.connect(self.process_finished)
-        self.workers.append(worker)
-        self.threadpool.start(worker)
+        self.submit_job(["sh", "-c", "apt-get update && apt-get upgrade -y"], name="System update",
+                        priority=PRIORITY_HIGH, timeout=600)
 
     def change_hostname(self):
         new_hostname, ok = QInputDialog.getText(self, "Change Hostname", "Enter new hostname:")
@@ -1056,14 +2107,13 @@ class PenetrationModeWindow(QMainWindow):
             self.install_tool("nmap")
             return
         self.output.append("Scanning network...")
-        self.execute_command(["nmap", "-sn", "192.168.1.0/24"], datetime.now())
+        self.execute_nmap(["nmap", "-sn", "192.168.1.0/24"], datetime.now())
 
     def export_logs(self):
         export_path, _ = QFileDialog.getSaveFileName(self, "Export Logs", "", "Text Files (*.txt)")
         if export_path:
             try:
-                with open(export_path, "w") as f:
-                    f.write(self.logs_text.toPlainText())
+                self.log_sink.export(export_path)
                 self.output.append(f"Logs exported to {export_path}")
             except IOError as e:
                 self.log_error(f"Failed to export logs: {str(e)}")
@@ -1071,6 +2121,7 @@ class PenetrationModeWindow(QMainWindow):
     def import_config(self):
         import_path, _ = QFileDialog.getOpenFileName(self, "Import Config", "", "YAML Files (*.yaml)")
         if import_path:
+            import yaml
             try:
                 with open(import_path, "r") as f:
                     config = yaml.safe_load(f)
@@ -1085,8 +2136,8 @@ class PenetrationModeWindow(QMainWindow):
         backup_path, _ = QFileDialog.getSaveFileName(self, "Save Backup", "", "Encrypted Files (*.enc)")
         if backup_path:
             try:
-                profile_data = json.dumps(self.user_profile).encode()
-                encrypted_data = self.cipher_suite.encrypt(profile_data)
+                profile_data = json.dumps(dict(self.user_profile, history=self.history.entries())).encode()
+                encrypted_data = self.encryption_cipher().encrypt(profile_data)
                 with open(backup_path, "wb") as f:
                     f.write(encrypted_data)
                 self.output.append(f"Encrypted backup created at {backup_path}")
@@ -1095,12 +2146,7 @@ class PenetrationModeWindow(QMainWindow):
 
     def test_dns_leak(self):
         self.output.append("Testing DNS leak...")
-        worker = ProcessWorker(["nslookup", "whoami.akamai.net"], timeout=10)
-        worker.output_signal.connect(self.handle_output)
-        worker.error_signal.connect(self.handle_error)
-        worker.finished_signal.connect(self.process_finished)
-        self.workers.append(worker)
-        self.threadpool.start(worker)
+        self.submit_job(["nslookup", "whoami.akamai.net"], name="DNS leak test", priority=PRIORITY_HIGH, timeout=10)
 
     def run_tool(self, func, tool_name: str):
         params = self.tool_inputs[tool_name].text().strip()
@@ -1108,14 +2154,20 @@ class PenetrationModeWindow(QMainWindow):
             self.output.append(f"Error: Invalid parameters for {tool_name}.")
             return
         self.settings.setValue(f"tool_params/{tool_name}", params)
+        start_time = datetime.now()
+        spec = find_tool(tool_name)
+        key = self.result_cache_key(spec.command(params)) if spec is not None else None
+        if key is not None and self.replay_cached_result(key, start_time):
+            return
         self.progress_bar.setVisible(True)
         self.progress_bar.setValue(0)
-        start_time = datetime.now()
-        func(params, tool_name, start_time)
+        started = func(params, tool_name, start_time)
+        if key is not None and started is not None:
+            # Split nmap runs get their result row (and cache entry) from the shard group
+            (getattr(started, "shard_group", None) or started).cache_key = key
 
     def validate_input(self, params: str) -> bool:
-        dangerous = ["rm -rf", "dd", "mkfs", ":(){ :|:& };:", "chmod -R", "chown -R", "kill -9", "reboot", "shutdown"]
-        return not any(d in params.lower() for d in dangerous)
+        return validate_input(params)
 
     def validate_url(self, url: str) -> bool:
         try:
@@ -1130,56 +2182,255 @@ class PenetrationModeWindow(QMainWindow):
 
     def update_encryption_key(self, new_key: str):
         self.encryption_key = new_key
-        self.cipher_suite = Fernet(generate_key(self.encryption_key))
+        self.request_master_key(new_key)
         self.output.append("Encryption key updated.")
 
+    def request_master_key(self, password: str):
+        # Cached per session, so re-saving the same key resolves immediately
+        self.master_key = self.key_deriver.derive(password)
+        self.master_key.add_done_callback(self.key_signal.fired.emit)
+
+    def apply_master_key(self, future):
+        if future is not self.master_key:
+            return
+        try:
+            master_key = future.result()
+        except Exception as e:
+            self.log_error(f"Key derivation failed: {str(e)}")
+            return
+        self.log_sink.set_key(derive_log_key(base64.urlsafe_b64decode(master_key)))
+        self.show_log_page(-1 if self.logs_follow_check.isChecked() else self.log_page)
+
+    def encryption_cipher(self):
+        # A Fernet; only waits if used before the background derivation has finished
+        from cryptography.fernet import Fernet
+        return Fernet(self.master_key.result())
+
     def log_info(self, message: str):
-        encrypted_message = self.cipher_suite.encrypt(message.encode()).decode()
-        self.logs_text.append(encrypted_message)
+        self.log_sink.write("INFO", message)
         logging.info(message)
 
     def log_error(self, message: str):
-        encrypted_message = self.cipher_suite.encrypt(message.encode()).decode()
-        self.logs_text.append(encrypted_message)
+        self.log_sink.write("ERROR", message)
         self.output.append(f"Error: {message}")
         logging.error(message)
 
-    def handle_output(self, data: str, start_time: datetime = None):
-        self.output.append(data)
-        self.log_info(data)
-        row = self.results_table.rowCount()
-        self.results_table.insertRow(row)
-        cmd = self.sender().command if self.sender() else []
-        duration = (datetime.now() - start_time).total_seconds() if start_time else 0
-        self.results_table.setItem(row, 0, QTableWidgetItem(datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-        self.results_table.setItem(row, 1, QTableWidgetItem(cmd[0] if cmd else "Unknown"))
-        self.results_table.setItem(row, 2, QTableWidgetItem(" ".join(cmd[1:]) if len(cmd) > 1 else ""))
-        self.results_table.setItem(row, 3, QTableWidgetItem(data[:100] + "..." if len(data) > 100 else data))
-        self.results_table.setItem(row, 4, QTableWidgetItem("Success"))
-        self.results_table.setItem(row, 5, QTableWidgetItem(f"{duration:.2f}s"))
-        self.update_graph()
+    def show_log_page(self, page: int):
+        count = self.log_sink.segment_count()
+        if page < 0 or page >= count:
+            page = count - 1
+        self.log_page = page
+        if page >= 0:
+            self.logs_text.setPlainText(self.log_sink.read_segment(page))
+            self.logs_text.moveCursor(self.logs_text.textCursor().End)
+        else:
+            self.logs_text.clear()
+        self.logs_page_label.setText(f"Segment {page + 1} of {count}")
+        self.logs_prev_button.setEnabled(page > 0)
+        self.logs_next_button.setEnabled(page < count - 1)
+
+    def step_log_page(self, delta: int):
+        # Paging by hand stops following the newest segment
+        self.logs_follow_check.setChecked(False)
+        self.show_log_page(max(0, self.log_page + delta))
+
+    def on_log_segment(self, count: int):
+        if self.logs_follow_check.isChecked() or count == 0:
+            self.show_log_page(-1)
+        else:
+            self.logs_page_label.setText(f"Segment {self.log_page + 1} of {count}")
+            self.logs_next_button.setEnabled(self.log_page < count - 1)
 
-    def handle_error(self, data: str, start_time: datetime = None):
+    def handle_output(self, job: Job, stream: str, data: str):
+        if self.output_filter.findData(job.id) < 0:
+            self.add_output_source(job)
+        self.output.append(data, job.id)
+        self.log_info(data)
+        job.batch_window.release()
+
+    def add_output_source(self, job: Job):
+        # Jobs whose lines have all been pushed out of the console leave the filter list
+        live = self.output.ring.sources()
+        for index in range(self.output_filter.count() - 1, 1, -1):
+            source = self.output_filter.itemData(index)
+            if source not in live and index != self.output_filter.currentIndex():
+                self.output_filter.removeItem(index)
+        self.output_filter.addItem(f"#{job.id} {job.name}", job.id)
+
+    def handle_error(self, data: str, start_time: datetime = None, cmd: List[str] = None, usage: Usage = None):
         self.log_error(f"Error: {data}")
-        row = self.results_table.rowCount()
-        self.results_table.insertRow(row)
-        cmd = self.sender().command if self.sender() else []
-        duration = (datetime.now() - start_time).total_seconds() if start_time else 0
-        self.results_table.setItem(row, 0, QTableWidgetItem(datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
-        self.results_table.setItem(row, 1, QTableWidgetItem(cmd[0] if cmd else "Unknown"))
-        self.results_table.setItem(row, 2, QTableWidgetItem(" ".join(cmd[1:]) if len(cmd) > 1 else ""))
-        self.results_table.setItem(row, 3, QTableWidgetItem(data[:100] + "..." if len(data) > 100 else data))
-        self.results_table.setItem(row, 4, QTableWidgetItem("Error"))
-        self.results_table.setItem(row, 5, QTableWidgetItem(f"{duration:.2f}s"))
-        self.update_graph()
+        self.add_result_row(cmd or [], data, "Error", start_time, usage=usage)
 
-    def process_finished(self):
-        self.output.append("Process completed.")
-        self.progress_bar.setVisible(False)
-        self.workers = [w for w in self.workers if not w.isFinished()]
+    def handle_job_state(self, job: Job):
+        if not job.finished:
+            return
+        entry = getattr(job, "journal_entry", None)
+        if entry is not None:
+            if job.timed_out:
+                # The tool saved its state on the way out; the entry and its directory stay
+                self.journal.interrupt(entry)
+                self.output.append(f"{job.name} timed out; Hacker Menu > Resume Interrupted Jobs carries on with it.")
+            else:
+                self.journal.finish(entry)
+        if getattr(job, "task_name", None):
+            self.task_scheduler.finished(job.task_name)
+        pipeline = getattr(job, "pipeline", None)
+        if pipeline is not None:
+            if job.error:
+                self.log_error(f"{job.name}: {job.error}")
+            if job is pipeline.discovery_job:
+                # Cancelled or failed discovery drops the hosts not handed to nmap yet
+                if job.state == CANCELLED or job.error:
+                    pipeline.stop()
+                else:
+                    pipeline.close()
+                done = pipeline.done
+            else:
+                done = pipeline.batch_finished()
+            if done:
+                self.finish_pipeline(pipeline)
+            self.process_finished(job)
+            return
+        group = getattr(job, "shard_group", None)
+        if group is not None:
+            if job.error:
+                self.log_error(f"{job.name}: {job.error}")
+            if group.finish(job):
+                self.finish_shard_group(group)
+            self.process_finished(job)
+            return
+        if job.error:
+            self.handle_error(job.error, job.start_time, job.command, job.usage)
+        elif job.result is not None:
+            status = "Cancelled" if job.result.cancelled else ("Success" if job.returncode == 0 else "Error")
+            data = job.result.tail_text()
+            if getattr(job, "scan_id", None) and job.output_hook.records:
+                data = self.scan_summary(job)
+            self.add_result_row(job.command, data, status, job.start_time, job.blob, job.usage,
+                                getattr(job, "cache_key", None))
+        if getattr(job, "scan_id", None):
+            self.refresh_findings_scans()
+        self.process_finished(job)
+
+    def finish_shard_group(self, group: ShardGroup):
+        jobs = group.jobs
+        if any(job.result is not None and job.result.cancelled for job in jobs):
+            status = "Cancelled"
+        elif any(job.error or job.returncode != 0 for job in jobs):
+            status = "Error"
+        else:
+            status = "Success"
+        merger = group.merger
+        try:
+            hosts = f"{self.history.scan_hosts(group.scan_id)} hosts, "
+        except sqlite3.Error:
+            hosts = ""
+        data = (f"{hosts}{merger.open_ports} open ports ({merger.findings} findings) from {len(jobs)} shards, "
+                f"{merger.duplicates} duplicates merged")
+        self.add_result_row(group.command, data, status, group.start_time, self.job_blobs(jobs),
+                            Usage.total(job.usage for job in jobs), getattr(group, "cache_key", None))
+        self.refresh_findings_scans()
+
+    def scan_summary(self, job: Job) -> str:
+        try:
+            hosts = self.history.scan_hosts(job.scan_id)
+        except sqlite3.Error:
+            return job.output_hook.summary()
+        return f"{hosts} hosts, {job.output_hook.summary()}"
 
-    def update_progress(self, value: int):
-        self.progress_bar.setValue(value)
+    def refresh_findings_scans(self):
+        current = self.findings_scan_combo.currentData()
+        try:
+            scans = self.history.scans()
+        except sqlite3.Error as e:
+            self.log_error(f"History read error: {str(e)}")
+            scans = []
+        self.findings_scan_combo.blockSignals(True)
+        self.findings_scan_combo.clear()
+        for scan_id, ts, tool, params, count in scans:
+            self.findings_scan_combo.addItem(f"{format_date_key(ts)}  {tool} {params}  ({count} findings)", scan_id)
+        index = self.findings_scan_combo.findData(current)
+        self.findings_scan_combo.setCurrentIndex(max(0, index))
+        self.findings_scan_combo.blockSignals(False)
+        self.show_findings()
+
+    def show_findings(self):
+        self.findings_model.set_query(self.findings_scan_combo.currentData(), self.findings_host_input.text().strip())
+
+    def add_result_row(self, cmd: List[str], data: str, status: str, start_time: datetime = None, blob: str = None,
+                       usage: Usage = None, cache_key: str = None):
+        duration = (datetime.now() - start_time).total_seconds() if start_time else 0
+        tool = cmd[0] if cmd else "Unknown"
+        if usage is not None and not usage.measured:
+            usage = None
+        row = (date_key(datetime.now()), tool, " ".join(cmd[1:]) if len(cmd) > 1 else "", preview(data), status, duration, blob)
+        self.results_model.append_row(*row, usage)
+        try:
+            self.history.append(*row, usage=usage)
+        except sqlite3.Error as e:
+            self.log_error(f"History write error: {str(e)}")
+        if usage is not None:
+            io = None if usage.read_bytes is None and usage.write_bytes is None else (usage.read_bytes or 0) + (usage.write_bytes or 0)
+            self.tool_stats.add(tool, status, duration, usage.cpu_time, usage.max_rss, io)
+        else:
+            self.tool_stats.add(tool, status, duration)
+        if cache_key is not None and status == "Success":
+            self.result_cache.put(cache_key, cmd, data, blob)
+        self.schedule_graph_update()
+
+    def job_blobs(self, jobs: List[Job]) -> Optional[str]:
+        # Multi-job runs (shards, pipelines) point at every job's output
+        return " ".join(dict.fromkeys(job.blob for job in jobs if job.blob)) or None
+
+    def blob_text(self, blob: str, limit: int = MAX_OUTPUT_VIEW) -> str:
+        parts = []
+        digests = blob.split()
+        for digest in digests:
+            try:
+                data, truncated = self.blob_store.read(digest, limit // len(digests))
+            except OSError as e:
+                self.log_error(f"Output blob read error: {str(e)}")
+                parts.append(f"[output {digest[:12]} unavailable]")
+                continue
+            text = data.decode(errors="replace")
+            if truncated:
+                text += f"\n[... truncated at {format_bytes(len(data))}]"
+            parts.append(text if len(digests) == 1 else f"===== {digest[:12]} =====\n{text}")
+        return "\n".join(parts)
+
+    def show_result_output(self, index):
+        row = self.results_proxy.mapToSource(index).row()
+        blob = self.results_store.blob(row)
+        if not blob or self.blob_store is None:
+            QMessageBox.information(self, "Result Output", "No stored output for this result.")
+            return
+        text = self.blob_text(blob)
+        dialog = QDialog(self)
+        dialog.setWindowTitle(f"{self.results_store.tool(row)} output - {self.results_store.cell(row, 0)}")
+        dialog.resize(900, 600)
+        layout = QVBoxLayout(dialog)
+        viewer = QPlainTextEdit()
+        viewer.setReadOnly(True)
+        viewer.setFont(QFont("Ubuntu Mono", 11))
+        viewer.setPlainText(text)
+        layout.addWidget(viewer)
+        dialog.show()
+
+    def schedule_graph_update(self):
+        if self.results_chart is not None and not self.graph_timer.isActive():
+            self.graph_timer.start()
+
+    def process_finished(self, job: Job):
+        self.output.append(f"{job.name} {'cancelled' if job.state == CANCELLED else 'completed'}.")
+        if not self.scheduler.counts()["running"]:
+            self.progress_bar.setVisible(False)
+
+    def update_progress(self, job: Job, value: int):
+        entry = getattr(job, "journal_entry", None)
+        if entry is not None:
+            self.journal.progress(entry, value)
+        group = getattr(job, "shard_group", None)
+        self.progress_bar.setValue(group.set_progress(job, value) if group is not None else value)
 
     def auto_fill(self, param_input: QLineEdit, default_param: str):
         if not param_input.text():
@@ -1187,10 +2438,17 @@ class PenetrationModeWindow(QMainWindow):
         self.output.append(f"Auto parameters set: {default_param}")
 
     def clear_logs(self):
-        self.logs_text.clear()
-        self.results_table.setRowCount(0)
-        self.results_graph_scene.clear()
-        self.graph_info_label.setText("Click a bar for details")
+        self.log_sink.clear()
+        self.history.clear()
+        if self.blob_store is not None:
+            self.blob_store.collect(self.history.blob_refs(), grace=60)
+        self.results_model.reset_rows([])
+        self.refresh_findings_scans()
+        self.result_cache.invalidate()
+        self.tool_stats.clear()
+        if self.results_chart is not None:
+            self.results_chart.rebuild(self.tool_stats)
+            self.graph_info_label.setText("Click a bar for details")
         self.output.append("Logs and results cleared.")
 
     def update_status(self):
@@ -1205,8 +2463,19 @@ class PenetrationModeWindow(QMainWindow):
         if self.dns_secure:
             components.append("DNS")
         status += " + ".join(components) if components else "Off"
-        status += f" | Threads: {self.threadpool.activeThreadCount()} | Tasks: {len(self.scheduled_tasks)}"
+        interface = self.interfaces.get(self.mac_interface())
+        if interface is not None:
+            status += f" | Iface: {interface.describe()}"
+        monitors = [interface.name for interface in self.interfaces.interfaces() if interface.monitor]
+        if monitors:
+            status += f" | Monitor: {', '.join(monitors)}"
+        jobs = self.scheduler.counts()
+        status += f" | Jobs: {jobs['running']} running, {jobs['queued']} queued | Tasks: {len(self.task_scheduler)}"
+        upcoming = self.task_scheduler.upcoming(3)
+        if upcoming:
+            status += " (next: " + ", ".join(f"{name} {datetime.fromtimestamp(when):%H:%M}" for when, name in upcoming) + ")"
         self.status_bar.showMessage(status)
+        self.refresh_jobs_table()
 
     def update_learning_text(self, topic: str):
         learning_content = {
@@ -1221,82 +2490,62 @@ class PenetrationModeWindow(QMainWindow):
         self.learning_text.setText(learning_content.get(topic, "Select a topic to learn more."))
 
     def update_graph(self):
-        self.results_graph_scene.clear()
-        tools = [self.results_table.item(i, 1).text() for i in range(self.results_table.rowCount()) if self.results_table.item(i, 1)]
-        counts = {tool: tools.count(tool) for tool in set(tools)}
-        if not counts:
-            self.results_graph_scene.addText("No data available", QFont("Ubuntu Mono", 14)).setPos(200, 140)
+        # Full rebuild, only needed when the store was replaced wholesale;
+        # until the Results tab is first opened there is no chart to draw
+        if self.results_chart is None:
             return
-
-        bar_width = 50
-        spacing = 20
-        max_height = 250
-        max_count = max(counts.values()) if counts else 1
-        x_start = 50
-        y_bottom = 280
-
-        self.results_graph_scene.addText("Tool Usage", QFont("Ubuntu Mono", 14)).setPos(200, 10)
-        self.results_graph_scene.addLine(50, y_bottom, 450, y_bottom, QPen(Qt.white))
-        self.results_graph_scene.addLine(50, 30, 50, y_bottom, QPen(Qt.white))
-
-        for i, (tool, count) in enumerate(counts.items()):
-            x = x_start + i * (bar_width + spacing)
-            height = (count / max_count) * max_height
-            bar = self.results_graph_scene.addRect(x, y_bottom - height, bar_width, height, QPen(Qt.NoPen), QBrush(QColor("#4A5A66")))
-            bar.setData(1, tool)
-            bar.setFlag(QGraphicsItem.ItemIsSelectable, True)
-            self.results_graph_scene.addText(tool, QFont("Ubuntu Mono", 10)).setPos(x + bar_width // 2 - 20, y_bottom + 5)
-            self.results_graph_scene.addText(str(count), QFont("Ubuntu Mono", 10)).setPos(x + bar_width // 2 - 10, y_bottom - height - 15)
-
-        self.results_graph.mousePressEvent = self.on_graph_click
+        self.graph_timer.stop()
+        self.tool_stats.rebuild(self.results_store.stat_rows())
+        self.results_chart.rebuild(self.tool_stats)
 
     def on_graph_click(self, event):
-        pos = event.scenePos()
+        pos = self.results_graph.mapToScene(event.pos())
         item = self.results_graph_scene.itemAt(pos, self.results_graph.transform())
         if item and isinstance(item, QGraphicsRectItem):
             tool_name = item.data(1)
-            results = [f"{self.results_table.item(i, 0).text()} - {self.results_table.item(i, 3).text()} ({self.results_table.item(i, 5).text()})"
-                       for i in range(self.results_table.rowCount())
-                       if self.results_table.item(i, 1).text() == tool_name]
-            self.graph_info_label.setText(f"{tool_name}: {len(results)} runs\n" + "\n".join(results[:3]))
+            stats = self.tool_stats.tools.get(tool_name)
+            # A bar left from before the stats were cleared or rebuilt
+            if stats is None:
+                return
+            store = self.results_store
+            results = [f"{store.cell(i, 0)} - {store.cell(i, 3)} ({store.cell(i, 5)})"
+                       for i in store.rows_for_tool(tool_name)]
+            summary = f"{tool_name}: {stats.count} runs, {stats.success} ok, {stats.error} failed, avg {stats.average_duration:.2f}s"
+            if stats.measured:
+                summary += (f"\nCPU avg {stats.average_cpu:.2f}s ({stats.cores:.2f} cores while running), "
+                            f"peak RSS {format_bytes(stats.peak_rss)}, I/O {format_bytes(stats.total_io)}")
+            self.graph_info_label.setText(summary + "\n" + "\n".join(results[:3]))
             QMessageBox.information(self, f"{tool_name} Details", "\n".join(results))
 
     def filter_results_by_date(self):
         start = self.start_date.date().toPyDate()
         end = self.end_date.date().toPyDate()
-        self.results_table.setRowCount(0)
-        for entry in self.user_profile["history"]:
-            date = datetime.strptime(entry["date"], "%Y-%m-%d %H:%M:%S").date()
-            if start <= date <= end:
-                row = self.results_table.rowCount()
-                self.results_table.insertRow(row)
-                self.results_table.setItem(row, 0, QTableWidgetItem(entry["date"]))
-                self.results_table.setItem(row, 1, QTableWidgetItem(entry["tool"]))
-                self.results_table.setItem(row, 2, QTableWidgetItem(entry["params"]))
-                self.results_table.setItem(row, 3, QTableWidgetItem(entry.get("result", "N/A")))
-                self.results_table.setItem(row, 4, QTableWidgetItem(entry.get("status", "Unknown")))
-                self.results_table.setItem(row, 5, QTableWidgetItem(entry.get("duration", "0.00s")))
+        date_range = (date_key(datetime.combine(start, datetime.min.time())),
+                      date_key(datetime.combine(end, datetime.max.time())))
+        # Only the range is read back; the proxy keeps later results outside it hidden
+        self.results_model.reset_rows(self.history.rows(date_range))
+        self.results_proxy.set_date_range(date_range)
         self.update_graph()
+        # The store now holds only the range; the total comes from the database
+        self.output.append(f"Showing {self.results_proxy.rowCount()} of {self.history.count()} results.")
+
+    def profile_name(self) -> str:
+        return self.yaml_config.get('profile_name', self.settings.value('profile_name', 'default_user'))
 
     def load_user_profile(self) -> Dict:
-        profile_path = Path.home() / f".hackeros_profile_{self.yaml_config.get('profile_name', self.settings.value('profile_name', 'default_user'))}.json"
+        profile_path = Path.home() / f".hackeros_profile_{self.profile_name()}.json"
         if profile_path.exists():
             try:
                 with open(profile_path, "r") as f:
                     return json.load(f)
             except (json.JSONDecodeError, IOError) as e:
                 self.log_error(f"Profile load error: {str(e)}")
-        return {"history": [], "preferences": {}}
+        return {"preferences": {}}
 
     def save_user_profile(self):
-        profile_path = Path.home() / f".hackeros_profile_{self.yaml_config.get('profile_name', self.settings.value('profile_name', 'default_user'))}.json"
-        max_history = int(self.yaml_config.get("history_size", self.settings.value("history_size", 100)))
-        self.user_profile["history"] = [
-            {"tool": self.results_table.item(i, 1).text(), "params": self.results_table.item(i, 2).text(),
-             "date": self.results_table.item(i, 0).text(), "result": self.results_table.item(i, 3).text(),
-             "status": self.results_table.item(i, 4).text(), "duration": self.results_table.item(i, 5).text()}
-            for i in range(self.results_table.rowCount())
-        ][-max_history:]
+        profile_path = Path.home() / f".hackeros_profile_{self.profile_name()}.json"
+        # Run history lives in the history database; the profile only keeps preferences
+        self.user_profile.pop("history", None)
         self.user_profile["preferences"] = {"theme": self.theme}
         try:
             with open(profile_path, "w") as f:
@@ -1304,6 +2553,122 @@ class PenetrationModeWindow(QMainWindow):
         except IOError as e:
             self.log_error(f"Profile save error: {str(e)}")
 
+    def history_retention(self) -> RetentionPolicy:
+        return RetentionPolicy(
+            int(self.yaml_config.get("history_size", self.settings.value("history_size", 100))),
+            int(self.yaml_config.get("history_max_age_days", self.settings.value("history_max_age_days", 0))))
+
+    def open_blob_store(self) -> Optional[BlobStore]:
+        try:
+            blob_store = BlobStore(str(outputs_path(self.profile_name())))
+            # Outputs whose result rows were dropped by retention go on startup
+            # (not when history fell back to memory and knows no references)
+            if self.history.path != ":memory:":
+                blob_store.collect(self.history.blob_refs())
+        except (OSError, sqlite3.Error) as e:
+            self.log_error(f"Output store error: {str(e)}")
+            return None
+        return blob_store
+
+    def open_journal(self) -> Optional[JobJournal]:
+        try:
+            return JobJournal(str(journal_path(self.profile_name())))
+        except OSError as e:
+            self.log_error(f"Job journal error: {str(e)}")
+            return None
+
+    def offer_resume(self):
+        if self.journal is None or not self.journal.interrupted:
+            self.output.append("No interrupted jobs to resume.")
+            return
+        entries = sorted(self.journal.interrupted.values(), key=lambda entry: entry.submitted)
+        lines = [f"{entry.describe()} - {'resumes' if entry.resume_command() else 'starts over'}" for entry in entries]
+        answer = QMessageBox.question(
+            self, "Interrupted Jobs",
+            f"{len(entries)} job(s) did not finish last time:\n\n" + "\n".join(lines)
+            + "\n\nResume them now? No discards them; Cancel asks again next time.",
+            QMessageBox.Yes | QMessageBox.No | QMessageBox.Cancel)
+        if answer == QMessageBox.Yes:
+            for entry in entries:
+                self.resume_job(entry)
+        elif answer == QMessageBox.No:
+            for entry in entries:
+                self.journal.discard(entry)
+            self.output.append(f"Discarded {len(entries)} interrupted job(s).")
+
+    def resume_job(self, entry: JournalEntry) -> Job:
+        self.journal.take(entry)
+        command = entry.resume_command()
+        if command is None:
+            command = entry.command
+            self.output.append(f"{entry.name}: nothing saved to resume from, starting over.")
+        # Findings keep going to the scan the job was started for
+        parser = stdout_parser(entry.command) if entry.scan_id is not None else None
+        ingest = None
+        if parser is not None:
+            scan = entry.scan_id
+            ingest = OutputIngest(parser, lambda findings: self.history.add_findings(scan, findings))
+        job = self.submit_job(command, name=f"{entry.name} (resumed)", output_hook=ingest, journal_entry=entry)
+        if ingest is not None:
+            job.scan_id = entry.scan_id
+        self.output.append(f"Resuming {entry.name}: {' '.join(command)}")
+        return job
+
+    def cache_ttls(self) -> Dict[str, int]:
+        # Per-tool seconds from cache_ttl/<tool> settings, overridden by the YAML `cache_ttls` mapping
+        ttls = dict(DEFAULT_TTLS)
+        for key in self.settings.allKeys():
+            if key.startswith("cache_ttl/"):
+                ttls[key.split("/", 1)[1]] = self.settings.value(key)
+        ttls.update(self.yaml_config.get("cache_ttls") or {})
+        try:
+            return {tool: int(ttl) for tool, ttl in ttls.items()}
+        except (TypeError, ValueError):
+            self.log_error(f"Invalid cache TTLs: {ttls}")
+            return dict(DEFAULT_TTLS)
+
+    def cache_environment(self) -> Dict:
+        # What a target sees of us; results taken through Tor or a proxy are kept apart
+        proxy = self.yaml_config.get("proxy", self.settings.value("proxy", "http://localhost:8080"))
+        return {"tor": self.tor_active, "vpn": self.vpn_active, "proxy": proxy if self.proxy_active else None}
+
+    def result_cache_key(self, command: List[str]) -> Optional[str]:
+        # None when caching is off or the tool has no TTL: the command always runs
+        enabled = self.yaml_config.get("result_cache", self.settings.value("result_cache", False, type=bool))
+        if not enabled or not self.result_cache.cacheable(command):
+            return None
+        return cache_key(command, self.cache_environment())
+
+    def replay_cached_result(self, key: str, start_time: datetime) -> bool:
+        entry = self.result_cache.get(key)
+        if entry is None:
+            return False
+        age, remaining = int(entry.age()), int(entry.remaining())
+        header = (f"[cached] {' '.join(entry.command)}: result from {age // 60}m{age % 60:02d}s ago, "
+                  f"runs again in {remaining // 60}m{remaining % 60:02d}s or after Hacker Menu > Clear Result Cache")
+        self.output.append(header)
+        self.log_info(header)
+        if entry.blob and self.blob_store is not None:
+            self.output.append(self.blob_text(entry.blob, MAX_CACHED_REPLAY))
+        else:
+            self.output.append(entry.data)
+        self.add_result_row(entry.command, entry.data, CACHED, start_time, entry.blob)
+        return True
+
+    def clear_result_cache(self):
+        count = self.result_cache.invalidate()
+        self.output.append(f"Result cache cleared ({count} result(s)).")
+
+    def open_history(self) -> HistoryStore:
+        try:
+            history = HistoryStore(str(history_path(self.profile_name())), self.history_retention())
+        except sqlite3.Error as e:
+            self.log_error(f"History database error: {str(e)}")
+            history = HistoryStore(":memory:", self.history_retention())
+        if history.migrate_profile(self.user_profile):
+            self.save_user_profile()
+        return history
+
     def generate_report(self):
         report_path, _ = QFileDialog.getSaveFileName(self, "Save Report", "", "Text Files (*.txt)")
         if report_path:
@@ -1319,9 +2684,9 @@ class PenetrationModeWindow(QMainWindow):
                     f.write(f"DNS: {'Secure' if self.dns_secure else 'Default'}\n")
                     f.write("-" * 50 + "\n")
                     f.write("Recent Activity:\n")
-                    for i in range(min(5, self.results_table.rowCount())):
-                        f.write(f"{self.results_table.item(i, 0).text()} | {self.results_table.item(i, 1).text()} | "
-                                f"{self.results_table.item(i, 3).text()} | {self.results_table.item(i, 4).text()}\n")
+                    store = self.results_store
+                    for i in range(max(0, len(store) - 5), len(store)):
+                        f.write(f"{store.cell(i, 0)} | {store.cell(i, 1)} | {store.cell(i, 3)} | {store.cell(i, 4)}\n")
                 self.output.append(f"Report saved to {report_path}")
             except IOError as e:
                 self.log_error(f"Failed to save report: {str(e)}")
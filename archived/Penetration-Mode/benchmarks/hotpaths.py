@@ -0,0 +1,347 @@
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Microbenchmarks for Penetration-Mode's hot paths, run against a real window
+# on the offscreen Qt platform in a throwaway HOME, fed by the synthetic data
+# generators below. Every case is timed `--repeat` times after one warm-up
+# call; the median is what gets compared.
+#
+#   python3 benchmarks/hotpaths.py [--repeat 5] [--quick] [--only update_graph ...]
+#                                  [--json results.json] [--compare baseline.json] [--threshold 1.25]
+#
+# --json writes the results with the commit they were measured at; --compare
+# reads such a file from an earlier run and exits 1 when a case got slower by
+# more than --threshold times.
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCHEMA_VERSION = 1
+TOOLS = ["nmap", "masscan", "sqlmap", "hydra", "john", "aircrack-ng", "nslookup", "wifite"]
+STATUSES = ["Success"] * 8 + ["Error", "Cancelled"]
+
+
+def synthetic_rows(count: int, days: int = 60, seed: int = 1) -> List[Tuple]:
+    # Result rows as HistoryStore.rows() returns them, oldest first, over the last `days` days
+    from penmode.results import date_key
+    rng = random.Random(seed)
+    now = datetime.now()
+    rows = []
+    for index in range(count):
+        when = now - timedelta(seconds=(count - index) * days * 86400 // max(1, count))
+        tool = rng.choice(TOOLS)
+        measured = rng.random() < 0.7
+        rows.append((date_key(when), tool, f"-sV 10.{index % 256}.{index // 256 % 256}.0/24",
+                     f"{rng.randint(0, 256)} hosts up", rng.choice(STATUSES), round(rng.uniform(0.1, 600), 2),
+                     f"{rng.getrandbits(256):064x}" if rng.random() < 0.5 else None,
+                     rng.uniform(0, 60) if measured else None, rng.uniform(0, 5) if measured else None,
+                     rng.randint(1 << 20, 1 << 30) if measured else None,
+                     rng.randint(0, 1 << 24) if measured else None, rng.randint(0, 1 << 24) if measured else None))
+    return rows
+
+
+def legacy_history(count: int, seed: int = 1) -> List[Dict]:
+    # History entries as old profile JSON files kept them
+    from penmode.results import format_date_key
+    return [{"date": format_date_key(row[0]), "tool": row[1], "params": row[2], "result": row[3],
+             "status": row[4], "duration": f"{row[5]:.2f}s"} for row in synthetic_rows(count, seed=seed)]
+
+
+def nmap_output(size: int, seed: int = 1) -> str:
+    # Normal-format nmap output of roughly `size` characters
+    rng = random.Random(seed)
+    lines, length = [], 0
+    while length < size:
+        host = f"10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(1, 254)}"
+        block = [f"Nmap scan report for {host}", "Host is up (0.0012s latency).", "PORT     STATE SERVICE VERSION"]
+        for port in sorted(rng.sample(range(1, 10000), rng.randint(1, 6))):
+            block.append(f"{port}/tcp".ljust(9) + "open  " + rng.choice(["ssh", "http", "https", "smb"]).ljust(8)
+                         + rng.choice(["OpenSSH 8.9p1", "nginx 1.24.0", "Apache httpd 2.4.58", "Samba smbd 4"]))
+        lines += block + [""]
+        length += sum(len(line) + 1 for line in block) + 1
+    return "\n".join(lines)[:size]
+
+
+class Bench:
+    """One case: `setup()` returns the callable to time. `items` and `unit`
+    give a throughput (items per second) next to the time per call."""
+
+    def __init__(self, name: str, setup: Callable[[], Callable[[], None]], items: int = None, unit: str = None,
+                 params: Dict = None):
+        self.name = name
+        self.setup = setup
+        self.items = items
+        self.unit = unit
+        self.params = params or {}
+
+
+class Harness:
+    # Owns the QApplication and a PenetrationModeWindow living in a temporary HOME
+
+    def __init__(self, home: str, history_rows: int):
+        self.home = home
+        os.environ.update(HOME=home, XDG_CONFIG_HOME=os.path.join(home, ".config"),
+                          XDG_RUNTIME_DIR=os.path.join(home, "run"), QT_QPA_PLATFORM="offscreen")
+        # The window refuses to start without a display, which offscreen Qt never opens
+        if not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"):
+            os.environ["DISPLAY"] = ":0"
+        os.makedirs(os.path.join(home, "run"), mode=0o700, exist_ok=True)
+        # The module logs to ./hackeros.log; keep that out of the tree
+        os.chdir(home)
+        sys.path.insert(0, APP_DIR)
+        from PyQt5.QtCore import QSettings
+        from PyQt5.QtWidgets import QApplication
+        self.app = QApplication.instance() or QApplication([sys.argv[0]])
+        settings = QSettings("HackerOS", "PenetrationMode")
+        # No update checks from a benchmark, and room for the synthetic history
+        settings.setValue("auto_update", False)
+        settings.setValue("history_size", max(100, history_rows))
+        settings.sync()
+        spec = importlib.util.spec_from_file_location("penetration_mode", os.path.join(APP_DIR, "Penetration-Mode.py"))
+        self.module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(self.module)
+        # The app also logs every line to stderr; keep what that costs, not the noise
+        self.devnull = open(os.devnull, "w")
+        for handler in logging.getLogger().handlers:
+            if type(handler) is logging.StreamHandler:
+                handler.setStream(self.devnull)
+        self.window = self.module.PenetrationModeWindow()
+        self.window.show()
+        self.spin(0.3)
+
+    def spin(self, seconds: float):
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            self.app.processEvents()
+            time.sleep(0.01)
+
+    def close(self):
+        self.window.close_app()
+        self.app.processEvents()
+        self.devnull.close()
+
+
+def build_cases(harness: Harness, sizes: Dict[str, int]) -> List[Bench]:
+    W = harness.window
+    module = harness.module
+    cases = []
+
+    def handle_output(chunk_bytes: int):
+        def setup():
+            from penmode.jobs import Job
+            from penmode.streaming import BatchWindow
+            job = Job(["nmap", "-sV", "10.0.0.0/24"], name="bench nmap")
+            job.batch_window = BatchWindow()
+            chunk = nmap_output(chunk_bytes)
+
+            def run():
+                # What one streamed batch costs the GUI thread, console repaint included
+                W.handle_output(job, "stdout", chunk)
+                W.output.flush()
+            return run
+        return Bench(f"handle_output[{chunk_bytes // 1024}KiB]", setup, chunk_bytes, "B", {"chunk_bytes": chunk_bytes})
+
+    cases += [handle_output(4 * 1024), handle_output(sizes["chunk"])]
+
+    def update_graph(rows: int):
+        def setup():
+            W.tabs.setCurrentWidget(W.results_tab)
+            W.results_model.reset_rows(synthetic_rows(rows))
+            return W.update_graph
+        return Bench(f"update_graph[{rows}]", setup, rows, "rows", {"rows": rows})
+
+    cases += [update_graph(1000), update_graph(sizes["rows"])]
+
+    def filter_results_by_date():
+        rows = sizes["history"]
+
+        def setup():
+            from PyQt5.QtCore import QDate
+            W.tabs.setCurrentWidget(W.results_tab)
+            W.history.clear()
+            W.history.import_entries(legacy_history(rows))
+            # The last 30 of the 60 synthetic days: about half the rows
+            W.start_date.setDate(QDate.currentDate().addDays(-30))
+            W.end_date.setDate(QDate.currentDate())
+            return W.filter_results_by_date
+        return Bench(f"filter_results_by_date[{rows}]", setup, rows, "rows", {"rows": rows})
+
+    cases.append(filter_results_by_date())
+
+    def profile(kind: str):
+        entries = sizes["profile"]
+        path = os.path.join(harness.home, f".hackeros_profile_{W.profile_name()}.json")
+
+        def write_legacy():
+            with open(path, "w") as f:
+                json.dump({"preferences": {"theme": "dark"}, "history": legacy_history(entries)}, f, indent=2)
+
+        def setup():
+            write_legacy()
+            if kind == "load":
+                return W.load_user_profile
+            if kind == "save":
+                loaded = W.load_user_profile()
+
+                def run():
+                    # The history comes along as loaded and is dropped on save
+                    W.user_profile = dict(loaded)
+                    W.save_user_profile()
+                return run
+            from penmode.history import HistoryStore
+            profile_data = W.load_user_profile()
+
+            def run():
+                # First start after an upgrade: the profile's history moves into the database
+                store = HistoryStore(":memory:", W.history_retention())
+                store.migrate_profile(profile_data)
+                store.close()
+            return run
+        # Saving no longer writes the history, so only load and migrate scale with it
+        items = None if kind == "save" else entries
+        return Bench(f"profile_{kind}[{entries}]", setup, items, "entries", {"entries": entries})
+
+    cases += [profile("load"), profile("save"), profile("migrate")]
+
+    def log_info():
+        messages = sizes["log"]
+
+        def setup():
+            from penmode.logsink import derive_log_key
+            W.log_sink.set_key(derive_log_key(os.urandom(32)))
+            lines = nmap_output(messages * 80).splitlines()[:messages]
+
+            def run():
+                # Queueing on the GUI thread plus sealing on the writer thread, up to disk
+                for line in lines:
+                    W.log_info(line)
+                W.log_sink.flush(timeout=60)
+            run.bytes = sum(len(line) + 1 for line in lines)
+            return run
+        return Bench(f"log_info[{messages}]", setup, messages, "messages", {"messages": messages})
+
+    cases.append(log_info())
+    cases.append(Bench("generate_key", lambda: lambda: module.generate_key("benchmark password"), 1, "keys",
+                       {"iterations": 100000}))
+    return cases
+
+
+def time_case(bench: Bench, repeat: int) -> Dict:
+    run = bench.setup()
+    run()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    result = {"params": bench.params, "repeat": repeat, "times": times, "min": min(times), "median": median,
+              "mean": statistics.mean(times), "max": max(times)}
+    if bench.items:
+        result["throughput"] = bench.items / median if median > 0 else None
+        result["unit"] = f"{bench.unit}/s"
+    if getattr(run, "bytes", None):
+        result["bytes_per_second"] = run.bytes / median if median > 0 else None
+    return result
+
+
+def git_commit() -> Tuple[Optional[str], Optional[bool]]:
+    # HEAD and whether the app's tree had uncommitted changes
+    try:
+        head = subprocess.run(["git", "rev-parse", "HEAD"], cwd=APP_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=APP_DIR, capture_output=True,
+                                text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return head, bool(status.strip())
+
+
+def format_seconds(value: float) -> str:
+    if value < 1e-3:
+        return f"{value * 1e6:8.1f} us"
+    if value < 1:
+        return f"{value * 1e3:8.2f} ms"
+    return f"{value:8.3f} s "
+
+
+def compare(results: Dict, baseline_path: str, threshold: float) -> bool:
+    # True when any case shared with the baseline is slower by more than `threshold` times
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\ncompared with {baseline.get('commit') or baseline_path}:")
+    regressed = False
+    for name, result in results.items():
+        old = baseline.get("results", {}).get(name)
+        if old is None or not old.get("median"):
+            print(f"  {name:32} new")
+            continue
+        ratio = result["median"] / old["median"]
+        slower = ratio > threshold
+        regressed = regressed or slower
+        print(f"  {name:32} {format_seconds(old['median'])} -> {format_seconds(result['median'])}  "
+              f"x{ratio:.2f}{'  SLOWER' if slower else ''}")
+    return regressed
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Time Penetration-Mode's hot paths on an offscreen window.")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case; the median is compared")
+    parser.add_argument("--quick", action="store_true", help="smaller synthetic data, for a quick check")
+    parser.add_argument("--only", nargs="*", default=[], help="run cases whose name starts with one of these")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", help="results file of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="slowdown factor that counts as a regression")
+    args = parser.parse_args(argv)
+    # The harness changes into its temporary HOME
+    json_path = os.path.abspath(args.json) if args.json else None
+    baseline_path = os.path.abspath(args.compare) if args.compare else None
+    if args.quick:
+        sizes = {"chunk": 64 * 1024, "rows": 10000, "history": 10000, "profile": 5000, "log": 5000}
+    else:
+        sizes = {"chunk": 1024 * 1024, "rows": 100000, "history": 100000, "profile": 50000, "log": 50000}
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="pm-bench-") as home:
+        cwd = os.getcwd()
+        harness = Harness(home, sizes["history"])
+        try:
+            for bench in build_cases(harness, sizes):
+                if args.only and not any(bench.name.startswith(prefix) for prefix in args.only):
+                    continue
+                result = results[bench.name] = time_case(bench, max(1, args.repeat))
+                rate = f"  {result['throughput']:12,.0f} {result['unit']}" if result.get("throughput") else ""
+                print(f"{bench.name:32} median {format_seconds(result['median'])}  "
+                      f"min {format_seconds(result['min'])}{rate}", flush=True)
+                # Let queued signals and timers settle between cases
+                harness.spin(0.1)
+        finally:
+            harness.close()
+            os.chdir(cwd)
+
+    if json_path:
+        from PyQt5.QtCore import QT_VERSION_STR
+        commit, dirty = git_commit()
+        report = {"version": SCHEMA_VERSION, "commit": commit, "dirty": dirty, "timestamp": time.time(),
+                  "python": platform.python_version(), "qt": QT_VERSION_STR, "platform": platform.platform(),
+                  "cpus": os.cpu_count(), "quick": args.quick, "repeat": args.repeat, "results": results}
+        with open(json_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {json_path}")
+    if baseline_path and compare(results, baseline_path, args.threshold):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
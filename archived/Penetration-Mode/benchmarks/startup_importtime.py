@@ -0,0 +1,104 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+
+# Startup import budget for Penetration-Mode. Each entry point is imported in a
+# fresh interpreter under `python -X importtime`; the run fails when a module
+# that is meant to load on first use shows up, or when the median import time
+# goes over budget. Run from anywhere:
+#
+#   python3 benchmarks/startup_importtime.py [--repeat 5] [--gui-budget 220] [--headless-budget 90]
+#
+# Times are milliseconds on top of a bare interpreter (whatever site imports is
+# subtracted), so they compare across machines better than wall-clock startup.
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use only: config import/save, key derivation, the Anonymity tab,
+# update checks. `requests` is not used at all any more.
+LAZY_MODULES = ["yaml", "cryptography", "asyncio", "ssl", "urllib.request", "http.client", "requests"]
+
+ENTRY_POINTS = {
+    # Module level of the GUI: everything up to, not including, the window
+    "gui": ("import importlib.util\n"
+            f"spec = importlib.util.spec_from_file_location('penetration_mode', {os.path.join(APP_DIR, 'Penetration-Mode.py')!r})\n"
+            "spec.loader.exec_module(importlib.util.module_from_spec(spec))\n",
+            LAZY_MODULES),
+    "headless": ("import penmode.headless\n", LAZY_MODULES + ["PyQt5"]),
+}
+# Headless startup is meant to stay well under 100 ms
+DEFAULT_BUDGETS = {"gui": 220.0, "headless": 90.0}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    # (module, nesting depth, cumulative us) for every "import time:" line
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        stripped = name.lstrip()
+        entries.append((stripped.strip(), (len(name) - len(stripped) - 1) // 2, int(fields[1])))
+    return entries
+
+
+def run_importtime(code: str, cwd: str) -> List[Tuple[str, int, int]]:
+    env = dict(os.environ, PYTHONPATH=APP_DIR)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=cwd, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f"exit {result.returncode}")
+    return parse_importtime(result.stderr)
+
+
+def measure(code: str, baseline: set, cwd: str) -> Tuple[float, Dict[str, int], set]:
+    entries = run_importtime(code, cwd)
+    top = {name: cumulative for name, depth, cumulative in entries if depth == 0 and name not in baseline}
+    return sum(top.values()) / 1000.0, top, {name for name, _, _ in entries}
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check Penetration-Mode's startup imports against a budget.")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per entry point; the median is compared")
+    parser.add_argument("--gui-budget", type=float, default=DEFAULT_BUDGETS["gui"], help="ms for the GUI module")
+    parser.add_argument("--headless-budget", type=float, default=DEFAULT_BUDGETS["headless"],
+                        help="ms for the batch runner")
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    args = parser.parse_args(argv)
+    budgets = {"gui": args.gui_budget, "headless": args.headless_budget}
+
+    failed = False
+    # The GUI module logs to ./hackeros.log on import; keep that out of the tree
+    with tempfile.TemporaryDirectory(prefix="pm-importtime-") as cwd:
+        baseline = {name for name, depth, _ in run_importtime("pass", cwd) if depth == 0}
+        for entry, (code, lazy) in ENTRY_POINTS.items():
+            totals, slowest, loaded = [], {}, set()
+            for _ in range(max(1, args.repeat)):
+                total, top, names = measure(code, baseline, cwd)
+                totals.append(total)
+                loaded |= names
+                for name, cumulative in top.items():
+                    slowest[name] = min(cumulative, slowest.get(name, cumulative))
+            median = statistics.median(totals)
+            eager = sorted(module for module in lazy
+                           if any(name == module or name.startswith(module + ".") for name in loaded))
+            over = median > budgets[entry]
+            print(f"{entry}: median {median:.1f} ms (min {min(totals):.1f}, max {max(totals):.1f}, "
+                  f"budget {budgets[entry]:.0f}){' OVER BUDGET' if over else ''}")
+            for name, cumulative in sorted(slowest.items(), key=lambda item: -item[1])[:args.top]:
+                print(f"  {cumulative / 1000.0:8.1f} ms  {name}")
+            if eager:
+                print(f"  imported at startup but meant to be lazy: {', '.join(eager)}")
+            failed = failed or over or bool(eager)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,3 @@
+# Qt-free building blocks shared by Penetration-Mode.py and its helpers.
+# Modules are imported directly (e.g. `from penmode.streaming import ...`)
+# so that nothing heavy is loaded until it is actually needed.
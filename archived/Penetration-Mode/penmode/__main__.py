@@ -0,0 +1,11 @@
+import os
+import sys
+
+if not __package__:
+    # Started as `python3 path/to/penmode`: import the package from its parent
+    # directory rather than its modules as top-level ones
+    sys.path[0] = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from penmode.headless import main
+
+sys.exit(main())
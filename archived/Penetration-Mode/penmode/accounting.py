@@ -0,0 +1,182 @@
+import os
+import subprocess
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+# The job's process tree is walked this often while it runs
+SAMPLE_INTERVAL = 1.0
+FIELDS = ("cpu_user", "cpu_system", "max_rss", "read_bytes", "write_bytes")
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+class Usage:
+    """CPU seconds, peak resident memory and storage I/O of one job's process
+    tree. A field stays None when nothing could measure it (a job that never
+    started, or rows from before accounting)."""
+
+    def __init__(self, cpu_user: float = None, cpu_system: float = None, max_rss: int = None,
+                 read_bytes: int = None, write_bytes: int = None):
+        self.cpu_user = cpu_user
+        self.cpu_system = cpu_system
+        self.max_rss = max_rss
+        self.read_bytes = read_bytes
+        self.write_bytes = write_bytes
+
+    @classmethod
+    def from_rusage(cls, rusage) -> "Usage":
+        # Linux reports ru_maxrss in KiB and block counts in 512-byte units
+        return cls(rusage.ru_utime, rusage.ru_stime, rusage.ru_maxrss * 1024,
+                   rusage.ru_inblock * 512, rusage.ru_oublock * 512)
+
+    @classmethod
+    def from_dict(cls, values: Optional[Dict]) -> Optional["Usage"]:
+        if not values:
+            return None
+        return cls(*(values.get(field) for field in FIELDS))
+
+    @classmethod
+    def total(cls, usages: Iterable["Usage"]) -> "Usage":
+        # Runs made of several jobs: CPU and I/O add up, memory is the largest
+        result = cls()
+        for usage in usages:
+            if usage is None:
+                continue
+            for field in FIELDS:
+                value = getattr(usage, field)
+                if value is None:
+                    continue
+                current = getattr(result, field)
+                if current is None:
+                    setattr(result, field, value)
+                else:
+                    setattr(result, field, max(current, value) if field == "max_rss" else current + value)
+        return result
+
+    def merge(self, other: Optional["Usage"]):
+        # Two measurements of the same tree (rusage, /proc samples): each one
+        # can only miss things, so the larger value wins
+        if other is None:
+            return
+        for field in FIELDS:
+            value = getattr(other, field)
+            if value is not None:
+                current = getattr(self, field)
+                setattr(self, field, value if current is None else max(current, value))
+
+    @property
+    def cpu_time(self) -> Optional[float]:
+        if self.cpu_user is None and self.cpu_system is None:
+            return None
+        return (self.cpu_user or 0.0) + (self.cpu_system or 0.0)
+
+    @property
+    def measured(self) -> bool:
+        return any(getattr(self, field) is not None for field in FIELDS)
+
+    def values(self) -> Tuple:
+        return tuple(getattr(self, field) for field in FIELDS)
+
+    def as_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in FIELDS}
+
+
+def _exit_code(status: int) -> int:
+    # Same convention as Popen.returncode
+    return -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+
+
+def wait_process(proc, timeout: float = None) -> Tuple[int, Optional[Usage]]:
+    """proc.wait() that also returns the rusage of the process and of every
+    descendant it reaped. Uses wait4() for our own children; processes run
+    by the privileged helper carry the rusage the helper sent along. The
+    usage is None when someone else already reaped the process."""
+    if not isinstance(proc, subprocess.Popen):
+        returncode = proc.wait(timeout)
+        return returncode, Usage.from_dict(getattr(proc, "rusage", None))
+    if proc.returncode is not None:
+        return proc.returncode, None
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    delay = 0.001
+    while True:
+        try:
+            pid, status, rusage = os.wait4(proc.pid, 0 if deadline is None else os.WNOHANG)
+        except ChildProcessError:
+            return proc.wait(), None
+        if pid:
+            proc.returncode = _exit_code(status)
+            return proc.returncode, Usage.from_rusage(rusage)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(proc.args, timeout)
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.05)
+
+
+def _read_stat(pid: str) -> Optional[Tuple[int, int, float, float, int]]:
+    # (session, start time, user s, system s, rss bytes) from /proc/<pid>/stat;
+    # the command name may contain spaces and parentheses, so split after the last ")"
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as f:
+            fields = f.read().rsplit(b")", 1)[1].split()
+    except (OSError, IndexError):
+        return None
+    return (int(fields[3]), int(fields[19]), int(fields[11]) / _CLOCK_TICKS, int(fields[12]) / _CLOCK_TICKS,
+            int(fields[21]) * _PAGE_SIZE)
+
+
+def _read_io(pid: str) -> Optional[Tuple[int, int]]:
+    # Not readable for processes of other users (root tools started through pkexec)
+    try:
+        with open(f"/proc/{pid}/io", "rb") as f:
+            values = dict(line.split(b":", 1) for line in f.read().splitlines() if b":" in line)
+        return int(values[b"read_bytes"]), int(values[b"write_bytes"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class TreeSampler:
+    """Samples every process in one session from /proc. Jobs run in a
+    session of their own, so this also sees children that were reparented
+    away from the tool, which wait4() never reports. Each process keeps the
+    last values seen for it, so ones that exit between samples still count."""
+
+    def __init__(self, session: int, interval: float = SAMPLE_INTERVAL):
+        self.session = session
+        self.interval = interval
+        self.last_sample = 0.0
+        # (pid, start time) -> (user s, system s, read bytes, write bytes)
+        self.processes: Dict[Tuple[int, int], Tuple[float, float, Optional[int], Optional[int]]] = {}
+        self.peak_rss = 0
+
+    def maybe_sample(self):
+        now = time.monotonic()
+        if now - self.last_sample >= self.interval:
+            self.last_sample = now
+            self.sample()
+
+    def sample(self):
+        try:
+            pids = [name for name in os.listdir("/proc") if name.isdigit()]
+        except OSError:
+            return
+        rss = 0
+        for pid in pids:
+            stat = _read_stat(pid)
+            if stat is None or stat[0] != self.session:
+                continue
+            _, started, user, system, resident = stat
+            io = _read_io(pid)
+            self.processes[(int(pid), started)] = (user, system) + (io if io is not None else (None, None))
+            rss += resident
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def usage(self) -> Optional[Usage]:
+        if not self.processes:
+            return None
+        values = list(self.processes.values())
+        reads = [value[2] for value in values if value[2] is not None]
+        writes = [value[3] for value in values if value[3] is not None]
+        return Usage(sum(value[0] for value in values), sum(value[1] for value in values), self.peak_rss or None,
+                     sum(reads) if reads else None, sum(writes) if writes else None)
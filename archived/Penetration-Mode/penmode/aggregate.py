@@ -0,0 +1,83 @@
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+
+class ToolAggregate:
+    __slots__ = ("tool", "count", "success", "error", "total_duration",
+                 "measured", "measured_duration", "total_cpu", "peak_rss", "total_io")
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.count = 0
+        self.success = 0
+        self.error = 0
+        self.total_duration = 0.0
+        # Runs with resource accounting; older history rows have none
+        self.measured = 0
+        self.measured_duration = 0.0
+        self.total_cpu = 0.0
+        self.peak_rss = 0
+        self.total_io = 0
+
+    @property
+    def average_duration(self) -> float:
+        return self.total_duration / self.count if self.count else 0.0
+
+    @property
+    def average_cpu(self) -> float:
+        return self.total_cpu / self.measured if self.measured else 0.0
+
+    @property
+    def cores(self) -> float:
+        # CPU seconds per wall-clock second: how many cores a run of this tool keeps busy
+        return self.total_cpu / self.measured_duration if self.measured_duration > 0 else 0.0
+
+
+class ToolStats:
+    """Per-tool counters for the Results chart, updated in O(1) per result.
+    `dirty` collects the tools touched since the chart last redrew."""
+
+    def __init__(self):
+        self.tools: Dict[str, ToolAggregate] = {}
+        self.max_count = 0
+        self.dirty: Set[str] = set()
+
+    def add(self, tool: str, status: str, duration: float, cpu: Optional[float] = None,
+            max_rss: Optional[int] = None, io: Optional[int] = None):
+        if status == "Cached":
+            # Replayed results ran nothing; counting them would skew runs and durations
+            return
+        aggregate = self.tools.get(tool)
+        if aggregate is None:
+            aggregate = self.tools[tool] = ToolAggregate(tool)
+        aggregate.count += 1
+        if status == "Success":
+            aggregate.success += 1
+        elif status == "Error":
+            aggregate.error += 1
+        aggregate.total_duration += duration
+        if cpu is not None:
+            aggregate.measured += 1
+            aggregate.measured_duration += duration
+            aggregate.total_cpu += cpu
+        if max_rss is not None and max_rss > aggregate.peak_rss:
+            aggregate.peak_rss = max_rss
+        if io is not None:
+            aggregate.total_io += io
+        if aggregate.count > self.max_count:
+            self.max_count = aggregate.count
+        self.dirty.add(tool)
+
+    def rebuild(self, rows: Iterable[Tuple]):
+        # Rows as from ResultsStore.stat_rows()
+        self.clear()
+        for row in rows:
+            self.add(*row)
+
+    def clear(self):
+        self.tools = {}
+        self.max_count = 0
+        self.dirty = set()
+
+    def take_dirty(self) -> Set[str]:
+        dirty, self.dirty = self.dirty, set()
+        return dirty
@@ -0,0 +1,531 @@
+import asyncio
+import base64
+import ipaddress
+import json
+import os
+import socket
+import ssl
+import struct
+import threading
+import time
+import urllib.request
+from collections import Counter
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+# Endpoints that echo the caller's public address. Everything here can be
+# overridden from the "anonymity" section of config.yaml, e.g. to point the
+# probes at a local stand-in server.
+DEFAULT_IP_URLS = [
+    "https://api.ipify.org?format=json",
+    "https://ipinfo.io/json",
+    "https://ifconfig.me/ip",
+    "https://icanhazip.com/",
+]
+# "name/TYPE@server[:port]"; these resolvers answer with the address the query came from
+DEFAULT_DNS_IP_PROBES = [
+    "myip.opendns.com/A@208.67.222.222",
+    "o-o.myaddr.l.google.com/TXT@216.239.32.10",
+]
+# Answered with the address of whichever resolver forwarded the query;
+# "system" means the first nameserver in /etc/resolv.conf
+DEFAULT_RESOLVER_PROBES = ["whoami.akamai.net/A@system"]
+# The address a WebRTC peer would learn, which bypasses HTTP proxies
+DEFAULT_STUN_SERVERS = ["stun.l.google.com:19302", "stun.cloudflare.com:3478"]
+DEFAULT_DETAILS_URL = "https://ipinfo.io/{ip}/json"
+DEFAULT_TIMEOUT = 4.0
+DEFAULT_QUORUM = 2
+
+HTTP_IDLE_TIMEOUT = 30.0
+DNS_TYPES = {"A": 1, "AAAA": 28, "TXT": 16}
+STUN_MAGIC_COOKIE = 0x2112A442
+
+
+class AnonymityConfig:
+    def __init__(self, ip_urls: List[str] = None, dns_ip_probes: List[str] = None,
+                 resolver_probes: List[str] = None, stun_servers: List[str] = None,
+                 details_url: Optional[str] = DEFAULT_DETAILS_URL, timeout: float = DEFAULT_TIMEOUT,
+                 quorum: int = DEFAULT_QUORUM):
+        self.ip_urls = DEFAULT_IP_URLS if ip_urls is None else ip_urls
+        self.dns_ip_probes = DEFAULT_DNS_IP_PROBES if dns_ip_probes is None else dns_ip_probes
+        self.resolver_probes = DEFAULT_RESOLVER_PROBES if resolver_probes is None else resolver_probes
+        self.stun_servers = DEFAULT_STUN_SERVERS if stun_servers is None else stun_servers
+        self.details_url = details_url
+        self.timeout = timeout
+        self.quorum = quorum
+
+    @classmethod
+    def from_dict(cls, config: Dict) -> "AnonymityConfig":
+        config = config or {}
+        return cls(config.get("ip_urls"), config.get("dns_ip_probes"), config.get("resolver_probes"),
+                   config.get("stun_servers"), config.get("details_url", DEFAULT_DETAILS_URL),
+                   float(config.get("timeout", DEFAULT_TIMEOUT)), int(config.get("quorum", DEFAULT_QUORUM)))
+
+
+class ProbeResult:
+    def __init__(self, kind: str, source: str, value: Optional[str] = None, error: str = None, elapsed: float = 0.0):
+        self.kind = kind
+        self.source = source
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+
+
+class AnonymityReport:
+    # "http" and "dns" probes vote on the public address; "stun" and
+    # "resolver" answers are reported next to it
+    VOTING_KINDS = ("http", "dns")
+
+    def __init__(self):
+        self.ip: Optional[str] = None
+        self.results: List[ProbeResult] = []
+        self.details: Dict = {}
+        self.started = time.monotonic()
+        self.consensus_after: Optional[float] = None
+        # Proxy URL -> whether the HTTP probes were tunnelled through it
+        self.proxies: Dict[str, bool] = {}
+
+    def add(self, result: ProbeResult):
+        self.results.append(result)
+
+    def votes(self) -> Counter:
+        return Counter(r.value for r in self.results if r.kind in self.VOTING_KINDS and r.value)
+
+    def consensus(self, quorum: int) -> Optional[str]:
+        votes = self.votes().most_common(1)
+        return votes[0][0] if votes and votes[0][1] >= quorum else None
+
+    def values(self, kind: str) -> List[str]:
+        return sorted({r.value for r in self.results if r.kind == kind and r.value})
+
+    def lines(self) -> List[str]:
+        votes = self.votes()
+        voters = sum(1 for r in self.results if r.kind in self.VOTING_KINDS)
+        lines = [f"IP: {self.ip or 'Unknown'} ({votes.get(self.ip, 0)}/{voters} probes agree)"]
+        if self.details:
+            lines.append(f"Location: {self.details.get('city', 'Unknown')}, {self.details.get('region', 'Unknown')}, "
+                         f"{self.details.get('country', 'Unknown')}")
+            lines.append(f"ISP: {self.details.get('org', 'Unknown')}")
+        for proxy, tunnelled in sorted(self.proxies.items()):
+            if tunnelled:
+                lines.append(f"HTTP probes via proxy {proxy}")
+            else:
+                lines.append(f"Proxy bypassed: {proxy} is not an HTTP proxy, HTTP probes connected directly")
+        for resolver in self.values("resolver"):
+            lines.append(f"DNS resolver egress: {resolver}")
+        stun = self.values("stun")
+        if stun:
+            leak = self.ip is not None and any(address != self.ip for address in stun)
+            lines.append(f"WebRTC/STUN: {', '.join(stun)}" + (" (differs from HTTP IP, possible leak)" if leak else ""))
+        for result in self.results:
+            if result.kind in self.VOTING_KINDS and result.value and result.value != self.ip:
+                lines.append(f"Disagrees: {result.source} -> {result.value}")
+        for result in self.results:
+            if result.error:
+                lines.append(f"Failed: {result.source} ({result.error})")
+        return lines
+
+
+def parse_ip(text: str) -> Optional[str]:
+    try:
+        return str(ipaddress.ip_address(text.strip().strip('"')))
+    except ValueError:
+        return None
+
+
+class HTTPPool:
+    """Tiny HTTP/1.1 client with keep-alive connections per (scheme, host,
+    port); enough for small JSON/text echo endpoints and nothing more.
+    Honours http_proxy/https_proxy/no_proxy like urllib, tunnelling through
+    HTTP proxies with CONNECT. Unless `proxies` is given they are read again
+    on every refresh_proxies(), since the window toggles them at run time."""
+
+    def __init__(self, idle_timeout: float = HTTP_IDLE_TIMEOUT, proxies: Dict[str, str] = None):
+        self.idle_timeout = idle_timeout
+        self._fixed_proxies = proxies
+        self.proxies = urllib.request.getproxies() if proxies is None else proxies
+        # (scheme, host, port, proxy): a connection made through one proxy is never reused without it
+        self._idle: Dict[Tuple[str, str, int, Optional[str]], List[tuple]] = {}
+        self._ssl = None
+
+    def refresh_proxies(self):
+        if self._fixed_proxies is None:
+            self.proxies = urllib.request.getproxies()
+
+    def proxy_for(self, url: str) -> Optional[str]:
+        parts = urlsplit(url)
+        proxy = self.proxies.get(parts.scheme)
+        if not proxy or urllib.request.proxy_bypass_environment(parts.hostname or "", self.proxies):
+            return None
+        return proxy if "://" in proxy else f"http://{proxy}"
+
+    @staticmethod
+    def can_tunnel(proxy: str) -> bool:
+        # SOCKS and the like are left to proxychains/torsocks
+        return urlsplit(proxy).scheme == "http"
+
+    def _take(self, key):
+        connections = self._idle.get(key, [])
+        while connections:
+            reader, writer, last_used = connections.pop()
+            if time.monotonic() - last_used < self.idle_timeout and not reader.at_eof():
+                return reader, writer
+            writer.close()
+        return None
+
+    async def get(self, url: str) -> Tuple[int, bytes]:
+        parts = urlsplit(url)
+        https = parts.scheme == "https"
+        proxy = self.proxy_for(url)
+        if proxy is not None and not self.can_tunnel(proxy):
+            proxy = None
+        key = (parts.scheme, parts.hostname, parts.port or (443 if https else 80), proxy)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        connection = self._take(key)
+        if connection is not None:
+            try:
+                return await self._request(key, connection, parts.netloc, path)
+            except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+                pass  # Server dropped the idle connection; retry on a fresh one
+        if https and self._ssl is None:
+            self._ssl = ssl.create_default_context()
+        if proxy is not None:
+            sock = await self._tunnel(proxy, key[1], key[2])
+            connection = await asyncio.open_connection(sock=sock, ssl=self._ssl if https else None,
+                                                       server_hostname=key[1] if https else None)
+        else:
+            connection = await asyncio.open_connection(key[1], key[2], ssl=self._ssl if https else None)
+        return await self._request(key, connection, parts.netloc, path)
+
+    @staticmethod
+    async def _tunnel(proxy: str, host: str, port: int) -> socket.socket:
+        # CONNECT on a bare socket, so TLS can then be layered on the tunnel as on any connection
+        loop = asyncio.get_running_loop()
+        parts = urlsplit(proxy)
+        family, kind, protocol, _name, address = (await loop.getaddrinfo(parts.hostname, parts.port or 8080,
+                                                                         type=socket.SOCK_STREAM))[0]
+        sock = socket.socket(family, kind, protocol)
+        sock.setblocking(False)
+        try:
+            await loop.sock_connect(sock, address)
+            target = f"[{host}]:{port}" if ":" in host else f"{host}:{port}"
+            request = f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\n"
+            if parts.username:
+                credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+                request += f"Proxy-Authorization: Basic {base64.b64encode(credentials.encode()).decode()}\r\n"
+            await loop.sock_sendall(sock, (request + "\r\n").encode())
+            # Nothing follows the proxy's reply until we speak, so reading up to the blank line is exact
+            response = b""
+            while b"\r\n\r\n" not in response:
+                chunk = await loop.sock_recv(sock, 1024)
+                if not chunk:
+                    raise ConnectionError("proxy closed the connection")
+                response += chunk
+            status_line = response.split(b"\r\n", 1)[0].decode(errors="replace")
+            if status_line.split()[1:2] != ["200"]:
+                raise ConnectionError(f"proxy refused CONNECT: {status_line}")
+        except BaseException:
+            sock.close()
+            raise
+        return sock
+
+    async def _request(self, key, connection, host: str, path: str) -> Tuple[int, bytes]:
+        reader, writer = connection
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: HackerOS\r\n"
+                     f"Accept: application/json, text/plain\r\nConnection: keep-alive\r\n\r\n".encode())
+        try:
+            await writer.drain()
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionError("connection closed")
+            status = int(status_line.split()[1])
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            reusable = headers.get("connection", "").lower() != "close"
+            if headers.get("transfer-encoding", "").lower() == "chunked":
+                body = b""
+                while True:
+                    size = int((await reader.readline()).split(b";")[0], 16)
+                    if size == 0:
+                        await reader.readline()
+                        break
+                    body += await reader.readexactly(size)
+                    await reader.readline()
+            elif "content-length" in headers:
+                body = await reader.readexactly(int(headers["content-length"]))
+            else:
+                body = await reader.read()
+                reusable = False
+        except BaseException:
+            writer.close()
+            raise
+        if reusable:
+            self._idle.setdefault(key, []).append((reader, writer, time.monotonic()))
+        else:
+            writer.close()
+        return status, body
+
+    def close(self):
+        for connections in self._idle.values():
+            for _reader, writer, _last_used in connections:
+                writer.close()
+        self._idle = {}
+
+
+class _DatagramExchange(asyncio.DatagramProtocol):
+    def __init__(self, accept: Callable[[bytes], bool]):
+        self.accept = accept
+        self.answer = asyncio.get_running_loop().create_future()
+
+    def datagram_received(self, data, addr):
+        if not self.answer.done() and self.accept(data):
+            self.answer.set_result(data)
+
+    def error_received(self, exc):
+        if not self.answer.done():
+            self.answer.set_exception(exc)
+
+
+async def udp_exchange(host: str, port: int, payload: bytes, accept: Callable[[bytes], bool]) -> bytes:
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(lambda: _DatagramExchange(accept),
+                                                              remote_addr=(host, port))
+    try:
+        transport.sendto(payload)
+        return await protocol.answer
+    finally:
+        transport.close()
+
+
+def split_host_port(text: str, default_port: int) -> Tuple[str, int]:
+    if text.startswith("["):
+        host, _, rest = text[1:].partition("]")
+        return host, int(rest[1:]) if rest.startswith(":") else default_port
+    if text.count(":") == 1:
+        host, port = text.split(":")
+        return host, int(port)
+    return text, default_port
+
+
+def system_nameserver() -> str:
+    try:
+        with open("/etc/resolv.conf") as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == "nameserver":
+                    return fields[1]
+    except OSError:
+        pass
+    return "127.0.0.1"
+
+
+def build_dns_query(query_id: int, name: str, qtype: int) -> bytes:
+    qname = b"".join(bytes([len(label)]) + label.encode() for label in name.rstrip(".").split(".")) + b"\0"
+    return struct.pack(">HHHHHH", query_id, 0x0100, 1, 0, 0, 0) + qname + struct.pack(">HH", qtype, 1)
+
+
+def _skip_name(data: bytes, offset: int) -> int:
+    while True:
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            return offset + 2
+        if length == 0:
+            return offset + 1
+        offset += length + 1
+
+
+def parse_dns_answers(data: bytes) -> List[str]:
+    _qid, flags, qdcount, ancount, _ns, _ar = struct.unpack_from(">HHHHHH", data)
+    if flags & 0x000F:
+        raise ValueError(f"DNS error code {flags & 0x000F}")
+    offset = 12
+    for _ in range(qdcount):
+        offset = _skip_name(data, offset) + 4
+    answers = []
+    for _ in range(ancount):
+        offset = _skip_name(data, offset)
+        rtype, _rclass, _ttl, length = struct.unpack_from(">HHIH", data, offset)
+        offset += 10
+        rdata = data[offset:offset + length]
+        offset += length
+        if rtype in (1, 28):
+            answers.append(str(ipaddress.ip_address(rdata)))
+        elif rtype == 16:
+            position = 0
+            while position < len(rdata):
+                size = rdata[position]
+                answers.append(rdata[position + 1:position + 1 + size].decode(errors="replace"))
+                position += size + 1
+    return answers
+
+
+def build_stun_request(transaction: bytes) -> bytes:
+    return struct.pack(">HHI", 0x0001, 0, STUN_MAGIC_COOKIE) + transaction
+
+
+def parse_stun_address(data: bytes) -> Optional[str]:
+    _type, length, _cookie = struct.unpack_from(">HHI", data)
+    offset, end = 20, 20 + length
+    mapped = None
+    while offset + 4 <= end:
+        attribute, size = struct.unpack_from(">HH", data, offset)
+        value = data[offset + 4:offset + 4 + size]
+        offset += 4 + (size + 3) // 4 * 4
+        if attribute in (0x0020, 0x8020) and value[1] == 0x01:
+            raw = struct.unpack(">I", value[4:8])[0] ^ STUN_MAGIC_COOKIE
+            return str(ipaddress.IPv4Address(raw))
+        if attribute == 0x0020 and value[1] == 0x02:
+            key = struct.pack(">I", STUN_MAGIC_COOKIE) + data[8:20]
+            return str(ipaddress.IPv6Address(bytes(a ^ b for a, b in zip(value[4:20], key))))
+        if attribute == 0x0001 and value[1] == 0x01:
+            mapped = str(ipaddress.IPv4Address(value[4:8]))
+    return mapped
+
+
+class AnonymityProber:
+    """Runs all probes concurrently on a private event loop thread, so HTTP
+    connections stay pooled between checks. check() returns a Future with
+    the AnonymityReport; on_consensus(ip) fires as soon as `quorum` probes
+    agree, before the slower ones have finished."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.pool = HTTPPool()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="anonymity-probes", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def check(self, config: AnonymityConfig = None, on_consensus: Callable[[str], None] = None) -> Future:
+        return asyncio.run_coroutine_threadsafe(self.run(config or AnonymityConfig(), on_consensus), self._ensure_loop())
+
+    def close(self):
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(self.pool.close)
+            loop.call_soon_threadsafe(loop.stop)
+
+    async def run(self, config: AnonymityConfig, on_consensus: Callable[[str], None] = None) -> AnonymityReport:
+        loop = asyncio.get_running_loop()
+        report = AnonymityReport()
+        self.pool.refresh_proxies()
+        for url in config.ip_urls:
+            proxy = self.pool.proxy_for(url)
+            if proxy is not None:
+                report.proxies[proxy] = self.pool.can_tunnel(proxy)
+        probes = {}
+        for url in config.ip_urls:
+            probes[loop.create_task(self._timed(self.http_ip(url), config.timeout))] = ("http", url)
+        for spec in config.dns_ip_probes:
+            probes[loop.create_task(self._timed(self.dns_ip(spec), config.timeout))] = ("dns", spec)
+        for spec in config.resolver_probes:
+            probes[loop.create_task(self._timed(self.dns_ip(spec), config.timeout))] = ("resolver", spec)
+        for server in config.stun_servers:
+            probes[loop.create_task(self._timed(self.stun_ip(server), config.timeout))] = ("stun", server)
+        voters = len(config.ip_urls) + len(config.dns_ip_probes)
+        quorum = max(1, min(config.quorum, voters))
+        details = None
+        pending = set(probes)
+        deadline = loop.time() + config.timeout + 1.0
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - loop.time()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+            for task in done:
+                kind, source = probes[task]
+                value, error, elapsed = task.result()
+                report.add(ProbeResult(kind, source, value, error, elapsed))
+            if report.ip is None:
+                report.ip = report.consensus(quorum)
+                if report.ip is not None:
+                    report.consensus_after = time.monotonic() - report.started
+                    if on_consensus is not None:
+                        on_consensus(report.ip)
+                    details = self._start_details(config, report.ip)
+        for task in pending:
+            task.cancel()
+            kind, source = probes[task]
+            report.add(ProbeResult(kind, source, error="deadline"))
+        if report.ip is None:
+            # No quorum: fall back to the most common single answer
+            report.ip = report.consensus(1)
+            details = self._start_details(config, report.ip)
+        if details is not None:
+            value, _error, _elapsed = await details
+            report.details = value or {}
+        return report
+
+    def _start_details(self, config: AnonymityConfig, ip: Optional[str]):
+        if not ip or not config.details_url:
+            return None
+        return asyncio.get_running_loop().create_task(self._timed(self.details(config.details_url.format(ip=ip)), config.timeout))
+
+    @staticmethod
+    async def _timed(coro, timeout: float):
+        started = time.monotonic()
+        try:
+            value = await asyncio.wait_for(coro, timeout)
+            return value, None if value else "no address in answer", time.monotonic() - started
+        except asyncio.TimeoutError:
+            return None, "timeout", time.monotonic() - started
+        except (OSError, ValueError, IndexError, struct.error, asyncio.IncompleteReadError) as e:
+            return None, str(e) or type(e).__name__, time.monotonic() - started
+
+    async def http_ip(self, url: str) -> Optional[str]:
+        status, body = await self.pool.get(url)
+        if status != 200:
+            raise ValueError(f"HTTP {status}")
+        text = body.decode(errors="replace").strip()
+        try:
+            data = json.loads(text)
+        except ValueError:
+            return parse_ip(text)
+        if isinstance(data, dict):
+            return parse_ip(str(data.get("ip") or data.get("query") or ""))
+        return parse_ip(str(data))
+
+    async def details(self, url: str) -> Dict:
+        status, body = await self.pool.get(url)
+        if status != 200:
+            raise ValueError(f"HTTP {status}")
+        return json.loads(body)
+
+    async def dns_ip(self, spec: str) -> Optional[str]:
+        question, _, server = spec.partition("@")
+        name, _, qtype = question.partition("/")
+        if not server or server == "system":
+            server = system_nameserver()
+        host, port = split_host_port(server, 53)
+        qtype = (qtype or "A").upper()
+        if qtype not in DNS_TYPES:
+            # A typo in config.yaml fails this probe only, not the whole check
+            raise ValueError(f"unsupported DNS type {qtype}")
+        query_id = int.from_bytes(os.urandom(2), "big")
+        response = await udp_exchange(host, port, build_dns_query(query_id, name, DNS_TYPES[qtype]),
+                                      lambda data: len(data) >= 12 and int.from_bytes(data[:2], "big") == query_id)
+        for answer in parse_dns_answers(response):
+            address = parse_ip(answer)
+            if address:
+                return address
+        return None
+
+    async def stun_ip(self, server: str) -> Optional[str]:
+        host, port = split_host_port(server, 3478)
+        transaction = os.urandom(12)
+        response = await udp_exchange(host, port, build_stun_request(transaction),
+                                      lambda data: len(data) >= 20 and data[8:20] == transaction)
+        return parse_stun_address(response)
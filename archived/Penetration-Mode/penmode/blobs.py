@@ -0,0 +1,190 @@
+import hashlib
+import mmap
+import os
+import time
+import zlib
+from typing import Iterable, Optional, Set, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Compression level for zlib; output is written as it streams, so this
+# trades ratio for worker-thread CPU
+ZLIB_LEVEL = 3
+ZSTD_LEVEL = 3
+EXTENSIONS = (".zst", ".z")
+# Unreferenced blobs younger than this are kept; a job may have finished
+# writing one that its result row does not point to yet
+COLLECT_GRACE = 3600
+
+
+class BlobWriter:
+    """Compresses output as it is written and hashes the uncompressed bytes.
+    The file is created on the first write, so queued jobs hold no fd.
+    close() moves the file to its digest's place (or drops it when that blob
+    already exists) and returns the digest."""
+
+    def __init__(self, store: "BlobStore"):
+        self.store = store
+        self.size = 0
+        self._hash = hashlib.sha256()
+        if zstandard is not None:
+            self._extension = ".zst"
+            self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        else:
+            self._extension = ".z"
+            self._compressor = zlib.compressobj(ZLIB_LEVEL)
+        self._path = None
+        self._file = None
+
+    def _open(self):
+        os.makedirs(self.store.tmp_dir, mode=0o700, exist_ok=True)
+        self._path = os.path.join(self.store.tmp_dir, f"{os.getpid()}-{id(self)}-{time.monotonic_ns()}")
+        self._file = open(self._path, "wb")
+
+    def write(self, data: bytes):
+        if self._file is None:
+            self._open()
+        self.size += len(data)
+        self._hash.update(data)
+        self._file.write(self._compressor.compress(data))
+
+    def close(self) -> str:
+        if self._file is None:
+            self._open()
+        try:
+            self._file.write(self._compressor.flush())
+        finally:
+            self._file.close()
+        digest = self._hash.hexdigest()
+        existing = self.store.locate(digest)
+        if existing is not None:
+            os.unlink(self._path)
+            # Fresh mtime keeps collect() from taking it before the new reference lands
+            os.utime(existing)
+        else:
+            target = self.store.path(digest, self._extension)
+            os.makedirs(os.path.dirname(target), mode=0o700, exist_ok=True)
+            os.replace(self._path, target)
+        return digest
+
+    def abort(self):
+        if self._file is None:
+            return
+        self._file.close()
+        try:
+            os.unlink(self._path)
+        except OSError:
+            pass
+
+
+class BlobStore:
+    """Content-addressed store for raw tool output under `root`. A blob is
+    named by the sha256 of its uncompressed content, so identical outputs
+    (repeated scheduled runs) take disk space once. zstd is used when the
+    zstandard module is installed, zlib otherwise; both read back."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(root, mode=0o700, exist_ok=True)
+
+    def path(self, digest: str, extension: str) -> str:
+        return os.path.join(self.root, digest[:2], digest[2:] + extension)
+
+    def locate(self, digest: str) -> Optional[str]:
+        for extension in EXTENSIONS:
+            path = self.path(digest, extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def writer(self) -> BlobWriter:
+        return BlobWriter(self)
+
+    def put(self, data: bytes) -> str:
+        writer = self.writer()
+        try:
+            writer.write(data)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.close()
+
+    def read(self, digest: str, limit: int = None) -> Tuple[bytes, bool]:
+        """Decompresses up to `limit` bytes (all when None) straight from a
+        read-only mmap of the blob. Returns the data and whether there was
+        more. Raises FileNotFoundError for unknown digests."""
+        path = self.locate(digest)
+        if path is None:
+            raise FileNotFoundError(digest)
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if path.endswith(".zst"):
+                if zstandard is None:
+                    raise OSError("zstandard module is needed to read this blob")
+                with zstandard.ZstdDecompressor().stream_reader(mapped) as reader:
+                    data = reader.read(-1 if limit is None else limit + 1)
+            else:
+                decompressor = zlib.decompressobj()
+                data = decompressor.decompress(mapped, 0 if limit is None else limit + 1)
+        if limit is not None and len(data) > limit:
+            return data[:limit], True
+        return data, False
+
+    def usage(self) -> Tuple[int, int]:
+        count = size = 0
+        for path in self._blob_paths():
+            try:
+                size += os.path.getsize(path)
+                count += 1
+            except OSError:
+                continue
+        return count, size
+
+    def collect(self, referenced: Iterable[str], grace: float = COLLECT_GRACE) -> int:
+        # Deletes blobs no result row points to any more; returns how many
+        keep: Set[str] = set(referenced)
+        cutoff = time.time() - grace
+        removed = 0
+        for path in self._blob_paths():
+            name = os.path.basename(path)
+            digest = os.path.basename(os.path.dirname(path)) + name.split(".", 1)[0]
+            if digest in keep:
+                continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.unlink(path)
+                    removed += 1
+            except OSError:
+                continue
+        # Leftovers of writers that never closed (crash, kill)
+        try:
+            for name in os.listdir(self.tmp_dir):
+                path = os.path.join(self.tmp_dir, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.unlink(path)
+                except OSError:
+                    continue
+        except OSError:
+            pass
+        return removed
+
+    def _blob_paths(self):
+        try:
+            prefixes = os.listdir(self.root)
+        except OSError:
+            return
+        for prefix in prefixes:
+            if len(prefix) != 2:
+                continue
+            directory = os.path.join(self.root, prefix)
+            try:
+                names = os.listdir(directory)
+            except OSError:
+                continue
+            for name in names:
+                if name.endswith(EXTENSIONS):
+                    yield os.path.join(directory, name)
@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from penmode.sharding import NMAP_VALUE_OPTIONS, NmapCommand, Shard, cidr_targets, merge_ranges, target_ranges
+
+CACHED = "Cached"
+DEFAULT_CACHE_SIZE = 64
+# Seconds a successful result is replayed for; tools not listed are never cached
+DEFAULT_TTLS = {"nmap": 900, "masscan": 900, "sqlmap": 1800, "nslookup": 300}
+
+# masscan options whose value is the next argument
+_MASSCAN_VALUE_OPTIONS = {
+    "-p", "--ports", "--rate", "--max-rate", "-e", "--adapter", "--adapter-ip", "--adapter-port",
+    "--adapter-mac", "--router-mac", "--router-ip", "--source-ip", "--source-port", "--exclude",
+    "--excludefile", "-iL", "--includefile", "-c", "--conf", "--resume", "--shard", "--seed", "--ttl",
+    "--wait", "--retries", "--top-ports", "-oJ", "-oX", "-oG", "-oL", "-oB", "-oD", "-oU",
+    "--output-format", "--output-filename", "--http-user-agent", "--connection-timeout",
+}
+
+
+def _masscan_split(args: List[str]) -> Tuple[List[str], List[str]]:
+    options, targets = [], []
+    args = iter(args)
+    for arg in args:
+        if arg in _MASSCAN_VALUE_OPTIONS:
+            options += [arg, next(args, "")]
+        elif arg.startswith("-"):
+            options.append(arg)
+        else:
+            targets.append(arg)
+    return options, targets
+
+
+def _sorted_options(options: List[str], value_options) -> List[str]:
+    # Option order does not change what nmap or masscan do; each option is sorted with its value
+    groups, args = [], iter(options)
+    for arg in args:
+        groups.append([arg, next(args, "")] if arg in value_options else [arg])
+    return [arg for group in sorted(groups) for arg in group]
+
+
+def canonical_targets(targets: List[str]) -> List[str]:
+    """The target set as merged CIDR blocks plus sorted hostnames, so that
+    10.0.0.0/28, 10.0.0.0-15 and two /29s are the same set."""
+    ranges, others = [], set()
+    for target in targets:
+        for part in target.split(","):
+            if not part:
+                continue
+            covered = target_ranges(part)
+            if covered is None:
+                others.add(part.lower())
+            else:
+                ranges += covered
+    return cidr_targets(merge_ranges(ranges)) + sorted(others)
+
+
+def normalize_command(command: List[str]) -> Tuple[List[List[str]], List[str]]:
+    """Options of each stage of `command` (stages are split at "|") and the
+    target set of the whole run. nmap and masscan targets are taken out and
+    their options sorted, so neither order matters; for other tools every
+    argument stays where it is."""
+    stages, current = [], []
+    for arg in command:
+        if arg == "|":
+            stages.append(current)
+            current = []
+        else:
+            current.append(arg)
+    stages.append(current)
+    normalized, targets = [], []
+    for stage in stages:
+        if not stage:
+            continue
+        tool, args = os.path.basename(stage[0]), stage[1:]
+        if tool == "nmap":
+            nmap = NmapCommand(args)
+            # An empty shard builds the options alone, -p and --max-rate included
+            options = _sorted_options(nmap.build(Shard(0, []))[1:], NMAP_VALUE_OPTIONS)
+            targets += nmap.targets
+        elif tool == "masscan":
+            options, stage_targets = _masscan_split(args)
+            options = _sorted_options(options, _MASSCAN_VALUE_OPTIONS)
+            targets += stage_targets
+        else:
+            options = args
+        normalized.append([tool] + options)
+    return normalized, canonical_targets(targets)
+
+
+def cache_key(command: List[str], environment: Dict) -> str:
+    # `environment` is whatever changes what a target sees of us (proxy, Tor, VPN)
+    stages, targets = normalize_command(command)
+    text = json.dumps({"command": stages, "targets": targets, "environment": environment}, sort_keys=True)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class CachedResult:
+    def __init__(self, key: str, command: List[str], data: str, blob: Optional[str], stored: float, expires: float):
+        self.key = key
+        self.command = command
+        self.data = data
+        # Digests of the full output in the blob store, as on the result row
+        self.blob = blob
+        self.stored = stored
+        self.expires = expires
+
+    @property
+    def tool(self) -> str:
+        return os.path.basename(self.command[0]) if self.command else ""
+
+    def age(self, now: float = None) -> float:
+        return (now if now is not None else time.time()) - self.stored
+
+    def remaining(self, now: float = None) -> float:
+        return self.expires - (now if now is not None else time.time())
+
+
+class ResultCache:
+    """Successful results of identical invocations, replayed instead of
+    running the tool again until their tool's TTL runs out. Keys come from
+    cache_key(). At most `capacity` results are kept; the least recently
+    used goes first. Only used from the GUI thread."""
+
+    def __init__(self, capacity: int = DEFAULT_CACHE_SIZE, ttls: Dict[str, int] = None, clock=time.time):
+        self.capacity = max(1, capacity)
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedResult]" = OrderedDict()
+
+    def ttl(self, tool: str) -> int:
+        return int(self.ttls.get(os.path.basename(tool), 0))
+
+    def cacheable(self, command: List[str]) -> bool:
+        return bool(command) and self.ttl(command[0]) > 0
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires <= self.clock():
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key: str, command: List[str], data: str, blob: Optional[str] = None) -> Optional[CachedResult]:
+        ttl = self.ttl(command[0]) if command else 0
+        if ttl <= 0:
+            return None
+        now = self.clock()
+        entry = CachedResult(key, command, data, blob, now, now + ttl)
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, tool: str = None) -> int:
+        # Drops every result, or those of one tool; returns how many
+        if tool is None:
+            count = len(self._entries)
+            self._entries.clear()
+            return count
+        tool = os.path.basename(tool)
+        keys = [key for key, entry in self._entries.items() if entry.tool == tool]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def resize(self, capacity: int):
+        self.capacity = max(1, capacity)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
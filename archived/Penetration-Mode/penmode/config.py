@@ -0,0 +1,73 @@
+import configparser
+import logging
+import os
+from pathlib import Path
+from typing import Dict
+
+CONFIG_PATH = "/etc/xdg/Penetration-Mode/config.yaml"
+# Where QSettings("HackerOS", "PenetrationMode") keeps what the Settings dialog saved
+SETTINGS_PATH = os.path.join(os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config"),
+                             "HackerOS", "PenetrationMode.conf")
+
+
+def load_yaml_config(path: str = CONFIG_PATH) -> Dict:
+    if os.path.exists(path):
+        # PyYAML is only imported when there is a file to read
+        import yaml
+        try:
+            with open(path, "r") as f:
+                return yaml.safe_load(f) or {}
+        except (yaml.YAMLError, IOError) as e:
+            logging.error(f"Failed to load config from {path}: {str(e)}")
+    return {}
+
+
+class SavedSettings:
+    """Read-only view of the GUI's QSettings file for processes that do not
+    load Qt. value() follows the GUI's lookup: YAML config first, then the
+    saved setting, then the default, converted to the default's type."""
+
+    def __init__(self, yaml_config: Dict = None, path: str = SETTINGS_PATH):
+        self.yaml_config = yaml_config or {}
+        self.values: Dict[str, str] = {}
+        parser = configparser.ConfigParser(interpolation=None, strict=False)
+        parser.optionxform = str
+        try:
+            parser.read(path)
+        except configparser.Error as e:
+            logging.error(f"Failed to read settings from {path}: {str(e)}")
+        if parser.has_section("General"):
+            self.values = dict(parser["General"])
+
+    def value(self, key: str, default=None):
+        if key in self.yaml_config:
+            return self.yaml_config[key]
+        raw = self.values.get(key)
+        if raw is None:
+            return default
+        # QSettings quotes strings that contain separators
+        if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+            raw = raw[1:-1]
+        if isinstance(default, bool):
+            return raw.lower() == "true"
+        if isinstance(default, int):
+            try:
+                return int(raw)
+            except ValueError:
+                return default
+        return raw
+
+    def profile_name(self) -> str:
+        return str(self.value("profile_name", "default_user"))
+
+
+def history_path(profile: str) -> Path:
+    return Path.home() / f".hackeros_history_{profile}.db"
+
+
+def outputs_path(profile: str) -> Path:
+    return Path.home() / f".hackeros_outputs_{profile}"
+
+
+def journal_path(profile: str) -> Path:
+    return Path.home() / f".hackeros_jobs_{profile}"
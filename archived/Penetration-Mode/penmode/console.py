@@ -0,0 +1,93 @@
+from array import array
+from typing import Iterable, Optional
+
+CONSOLE_LINES = 20000
+# Longer lines are cut; one runaway line (a progress bar without newlines)
+# must not hold megabytes
+MAX_LINE = 2000
+# Source id of messages from the application itself
+APP_SOURCE = 0
+
+
+class LineRing:
+    """Bounded line buffer behind the output console. Every line gets a
+    running sequence number; the oldest are overwritten once `capacity` is
+    reached. A filter on one source keeps a list of the matching sequence
+    numbers, so the visible line count and random access stay O(1) either
+    way."""
+
+    def __init__(self, capacity: int = CONSOLE_LINES):
+        self.capacity = max(1, capacity)
+        self._lines = [""] * self.capacity
+        self._sources = array("I", bytes(4 * self.capacity))
+        self.first = 0
+        self.next = 0
+        self.filter: Optional[int] = None
+        self._view = array("q")
+        self._view_start = 0
+
+    def __len__(self) -> int:
+        if self.filter is None:
+            return self.next - self.first
+        return len(self._view) - self._view_start
+
+    def append(self, lines: Iterable[str], source: int = APP_SOURCE) -> int:
+        """Adds lines and returns how many lines dropped off the front of the
+        current view, so a scrolled-back reader can stay where they were."""
+        capacity = self.capacity
+        first_before = self.first
+        matches = self.filter is None or self.filter == source
+        for line in lines:
+            if len(line) > MAX_LINE:
+                line = line[:MAX_LINE] + " [...]"
+            seq = self.next
+            slot = seq % capacity
+            self._lines[slot] = line
+            self._sources[slot] = source
+            self.next = seq + 1
+            if matches and self.filter is not None:
+                self._view.append(seq)
+        self.first = max(self.first, self.next - capacity)
+        if self.filter is None:
+            return self.first - first_before
+        return self._trim_view()
+
+    def _trim_view(self) -> int:
+        view, start, first = self._view, self._view_start, self.first
+        dropped = 0
+        while start < len(view) and view[start] < first:
+            start += 1
+            dropped += 1
+        if start > 4096 and start * 2 > len(view):
+            del view[:start]
+            start = 0
+        self._view_start = start
+        return dropped
+
+    def line(self, index: int) -> str:
+        if self.filter is None:
+            seq = self.first + index
+        else:
+            seq = self._view[self._view_start + index]
+        return self._lines[seq % self.capacity]
+
+    def set_filter(self, source: Optional[int]):
+        self.filter = source
+        self._view = array("q")
+        self._view_start = 0
+        if source is not None:
+            capacity, sources = self.capacity, self._sources
+            self._view.extend(seq for seq in range(self.first, self.next) if sources[seq % capacity] == source)
+
+    def sources(self) -> set:
+        # Sources that still have lines in the buffer
+        capacity, sources = self.capacity, self._sources
+        return {sources[seq % capacity] for seq in range(self.first, self.next)}
+
+    def clear(self):
+        self.first = self.next
+        self._view = array("q")
+        self._view_start = 0
+
+    def text(self) -> str:
+        return "\n".join(self.line(index) for index in range(len(self)))
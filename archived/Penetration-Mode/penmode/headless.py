@@ -0,0 +1,410 @@
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from penmode.accounting import Usage
+from penmode.blobs import BlobStore
+from penmode.config import SavedSettings, history_path, load_yaml_config, outputs_path
+from penmode.history import HistoryStore, RetentionPolicy
+from penmode.jobs import CANCELLED, PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, RESOURCE_CLASSES, Job, JobScheduler
+from penmode.parsers import OutputIngest, structured_output
+from penmode.pipeline import DiscoveryPipeline, nmap_command, split_pipeline_params
+from penmode.results import date_key, preview
+from penmode.sharding import NmapCommand, ShardGroup, plan_shards, shard_count
+from penmode.tools import PIPELINE_TOOL, ToolSpec, find_tool, validate_input
+
+# Runs Penetration-Mode tool jobs from a YAML batch without Qt, e.g. from cron:
+#
+#   python3 -m penmode nightly.yaml
+#
+#   max_threads: 4            # optional, else the configured max_threads
+#   timeout: 900              # default per-job timeout in seconds
+#   jobs:
+#     - tool: Nmap            # tab name or executable
+#       params: -sV 10.0.0.0/24
+#     - command: masscan -p1-1024 10.0.0.0/16
+#       name: edge sweep
+#       priority: high        # low, normal, high
+#       privileged: true      # through pkexec
+#
+# Results, findings and outputs land in the same history and output store
+# as the GUI's, under the configured profile.
+
+PRIORITIES = {"low": PRIORITY_LOW, "normal": PRIORITY_NORMAL, "high": PRIORITY_HIGH}
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+class BatchError(Exception):
+    pass
+
+
+class BatchEntry:
+    def __init__(self, spec: ToolSpec, params: str, name: str = None, priority: int = PRIORITY_NORMAL,
+                 timeout: int = None, privileged: bool = False):
+        self.spec = spec
+        self.params = params
+        self.name = name or spec.name
+        self.priority = priority
+        self.timeout = timeout
+        self.privileged = privileged
+        self.start_time: Optional[datetime] = None
+
+    def command(self) -> List[str]:
+        return self.spec.command(self.params)
+
+
+def parse_entry(index: int, item) -> BatchEntry:
+    where = f"job {index + 1}"
+    if isinstance(item, str):
+        item = {"command": item}
+    if not isinstance(item, dict):
+        raise BatchError(f"{where}: expected a mapping")
+    if "command" in item:
+        command = str(item["command"]).strip()
+        tool, _, params = command.partition(" ")
+        spec = find_tool(tool)
+        if spec is not None and "|" in params:
+            spec = find_tool(PIPELINE_TOOL)
+            params = command
+    else:
+        spec = find_tool(str(item.get("tool", "")))
+        params = str(item.get("params") or "")
+    if spec is None:
+        raise BatchError(f"{where}: unknown tool {item.get('tool') or item.get('command')!r}")
+    if RESOURCE_CLASSES.get(spec.binary) == "interactive":
+        raise BatchError(f"{where}: {spec.name} is interactive and cannot run headless")
+    if not validate_input(params):
+        raise BatchError(f"{where}: invalid parameters for {spec.name}")
+    priority = PRIORITIES.get(str(item.get("priority", "normal")).lower())
+    if priority is None:
+        raise BatchError(f"{where}: priority must be one of {', '.join(PRIORITIES)}")
+    try:
+        timeout = int(item["timeout"]) if item.get("timeout") is not None else None
+    except (TypeError, ValueError):
+        raise BatchError(f"{where}: timeout must be a number of seconds")
+    return BatchEntry(spec, params.strip(), item.get("name"), priority, timeout, bool(item.get("privileged", False)))
+
+
+def load_batch(path: str) -> Tuple[Dict, List[BatchEntry]]:
+    import yaml
+    try:
+        if path == "-":
+            document = yaml.safe_load(sys.stdin)
+        else:
+            with open(path, "r") as f:
+                document = yaml.safe_load(f)
+    except (OSError, yaml.YAMLError) as e:
+        raise BatchError(f"cannot read {path}: {str(e)}")
+    if isinstance(document, list):
+        document = {"jobs": document}
+    if not isinstance(document, dict) or not isinstance(document.get("jobs"), list) or not document["jobs"]:
+        raise BatchError(f"{path}: expected a list of jobs")
+    entries = [parse_entry(index, item) for index, item in enumerate(document["jobs"])]
+    options = {key: value for key, value in document.items() if key != "jobs"}
+    # YAML gives "900" as readily as 900; Job and JobScheduler want numbers
+    for key in ("max_threads", "timeout"):
+        if options.get(key) is None:
+            continue
+        try:
+            options[key] = int(options[key])
+        except (TypeError, ValueError):
+            options[key] = 0
+        if options[key] < 1:
+            raise BatchError(f"{path}: {key} must be a positive whole number")
+    return options, entries
+
+
+class BatchRunner:
+    """Runs batch entries on a JobScheduler the way the window runs its tool
+    buttons: nmap/masscan output is parsed into findings, large nmap ranges
+    are sharded, pipelines feed nmap from masscan, and every run ends up as
+    one history row with its output blob and resource usage. Progress goes
+    to `out` as plain lines."""
+
+    def __init__(self, settings: SavedSettings, history: HistoryStore, blob_store: BlobStore = None,
+                 max_threads: int = None, timeout: int = None, verbose: bool = False, out=None):
+        self.settings = settings
+        self.history = history
+        self.blob_store = blob_store
+        self.timeout = timeout or int(settings.value("timeout", 60))
+        self.verbose = verbose
+        # Looked up per runner, not at import: stdout may be redirected since
+        self.out = out or sys.stdout
+        self.max_threads = max_threads or int(settings.value("max_threads", 4))
+        self.scheduler = JobScheduler(self.max_threads, {
+            "network": int(settings.value("network_jobs", self.max_threads)),
+            "cpu": int(settings.value("cpu_jobs", max(1, (os.cpu_count() or 2) // 2))),
+        })
+        self.scheduler.add_listener(self.on_event)
+        self.pipelines: List[DiscoveryPipeline] = []
+        self._lock = threading.RLock()
+        self._idle = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self.outstanding = 0
+        self.failed = 0
+
+    def write(self, text: str):
+        with self._write_lock:
+            self.out.write(text + "\n")
+            self.out.flush()
+
+    def run(self, entries: List[BatchEntry]) -> int:
+        # Privileged entries each go through pkexec; the privileged helper only
+        # serves the GUI's anonymity actions, never tool commands
+        self.write(f"{len(entries)} jobs, up to {self.max_threads} at a time")
+        try:
+            for entry in entries:
+                self.start(entry)
+            self.wait()
+        except KeyboardInterrupt:
+            self.write("Interrupted, cancelling jobs...")
+            self.cancel()
+            self.wait()
+        finally:
+            self.scheduler.shutdown()
+        return EXIT_FAILED if self.failed else EXIT_OK
+
+    def wait(self):
+        with self._idle:
+            while self.outstanding:
+                self._idle.wait(0.5)
+
+    def cancel(self):
+        with self._lock:
+            for pipeline in self.pipelines:
+                pipeline.stop()
+        self.scheduler.cancel_all()
+
+    def start(self, entry: BatchEntry):
+        entry.start_time = datetime.now()
+        with self._lock:
+            self.outstanding += 1
+        try:
+            if entry.spec.name == PIPELINE_TOOL:
+                self.start_pipeline(entry)
+            elif entry.spec.binary == "nmap":
+                self.start_nmap(entry, entry.command())
+            elif entry.spec.binary == "masscan":
+                self.start_scan(entry, entry.command())
+            else:
+                self.submit(entry, entry.command())
+        except (BatchError, sqlite3.Error, RuntimeError) as e:
+            self.record(entry, entry.command(), str(e), "Error")
+
+    def submit(self, entry: BatchEntry, command: List[str], name: str = None, output_hook=None,
+               scan_id: int = None) -> Job:
+        job = Job(command, name=name or entry.name, priority=entry.priority, timeout=entry.timeout or self.timeout,
+                  privileged=entry.privileged and os.geteuid() != 0, output_hook=output_hook)
+        # Set before submitting: a job that fails at once may finish before submit() returns
+        job.entry = entry
+        job.scan_id = scan_id
+        if self.blob_store is not None:
+            job.capture = self.blob_store.writer()
+        return self.scheduler.submit(job)
+
+    def start_scan(self, entry: BatchEntry, command: List[str]) -> Job:
+        parsed_command, parser = structured_output(command)
+        if parser is None:
+            return self.submit(entry, command)
+        scan = self.history.start_scan(date_key(entry.start_time), command[0], " ".join(command[1:]))
+        return self.submit(entry, parsed_command, output_hook=OutputIngest(parser, lambda findings: self.history.add_findings(scan, findings)),
+                           scan_id=scan)
+
+    def start_nmap(self, entry: BatchEntry, command: List[str]):
+        # Same sharding settings as the window's execute_nmap
+        nmap = NmapCommand(command[1:])
+        budget = nmap.max_rate or int(self.settings.value("scan_max_rate", 0))
+        count = str(self.settings.value("nmap_shards", "auto"))
+        if count == "auto":
+            count = shard_count(os.cpu_count() or 1, budget, self.scheduler.class_limits.get("network"))
+        else:
+            try:
+                count = max(1, int(count))
+            except ValueError:
+                raise BatchError(f"Invalid nmap_shards value: {count}")
+        shards = plan_shards(nmap, count, bool(self.settings.value("shard_ports", True)))
+        if len(shards) == 1:
+            self.start_scan(entry, command)
+            return
+        scan = self.history.start_scan(date_key(entry.start_time), command[0], " ".join(command[1:]))
+        rate = max(1, budget // len(shards)) if budget else None
+        group = ShardGroup(command, shards)
+        group.scan_id = scan
+        for shard in shards:
+            shard_command, parser = structured_output(nmap.build(shard, rate))
+            ingest = OutputIngest(parser, lambda findings: self.history.add_findings(scan, group.merger.add(findings)))
+            with self._lock:
+                job = self.submit(entry, shard_command, f"{entry.name} [{shard.index + 1}/{len(shards)}]", ingest)
+                job.shard_group = group
+                group.add_job(job)
+
+    def start_pipeline(self, entry: BatchEntry):
+        masscan_args, nmap_args = split_pipeline_params(entry.params)
+        command, parser = structured_output(["masscan"] + masscan_args)
+        if parser is None:
+            raise BatchError("the pipeline reads masscan results from stdout; remove its output options")
+        discovery_scan = self.history.start_scan(date_key(entry.start_time), "masscan", " ".join(masscan_args))
+        pipeline = DiscoveryPipeline(lambda hosts, ports: self.pipeline_batch(pipeline, hosts, ports))
+        pipeline.entry = entry
+        pipeline.command = ["masscan"] + masscan_args + ["|", "nmap"] + nmap_args
+        pipeline.nmap_args = nmap_args
+        pipeline.scan_id = self.history.start_scan(date_key(entry.start_time), "nmap", " ".join(nmap_args) + " (pipeline)")
+        pipeline.jobs = []
+
+        def discovered(findings):
+            pipeline.feed(findings)
+            self.history.add_findings(discovery_scan, findings)
+
+        with self._lock:
+            job = self.submit(entry, command, f"{entry.name} masscan", OutputIngest(parser, discovered))
+            job.pipeline = pipeline
+            pipeline.discovery_job = job
+            self.pipelines.append(pipeline)
+        pipeline.start()
+
+    def pipeline_batch(self, pipeline: DiscoveryPipeline, hosts: List[str], ports):
+        # Called on the pipeline's thread; the scheduler takes jobs from any thread
+        with self._lock:
+            if pipeline.stopped:
+                if pipeline.batch_finished():
+                    self.finish_pipeline(pipeline)
+                return
+            command, parser = structured_output(nmap_command(pipeline.nmap_args, hosts, ports))
+            ingest = OutputIngest(parser, lambda findings: self.history.add_findings(pipeline.scan_id, findings)) if parser else None
+            name = f"{pipeline.entry.name} nmap {hosts[0]}" + (f" +{len(hosts) - 1}" if len(hosts) > 1 else "")
+            job = self.submit(pipeline.entry, command, name, ingest)
+            job.pipeline = pipeline
+            pipeline.jobs.append(job)
+
+    def on_event(self, event: str, job: Job, payload=None):
+        if event == "output":
+            if self.verbose:
+                stream, lines = payload
+                self.write("\n".join(f"[{job.name}] {line}" for line in lines))
+        elif event == "state" and job.finished:
+            with self._lock:
+                self.job_finished(job)
+
+    def job_finished(self, job: Job):
+        pipeline = getattr(job, "pipeline", None)
+        group = getattr(job, "shard_group", None)
+        if job.error and (pipeline is not None or group is not None):
+            self.write(f"{job.name}: {job.error}")
+        if pipeline is not None:
+            if job is pipeline.discovery_job:
+                if job.state == CANCELLED or job.error:
+                    pipeline.stop()
+                else:
+                    pipeline.close()
+                done = pipeline.done
+            else:
+                done = pipeline.batch_finished()
+            if done:
+                self.finish_pipeline(pipeline)
+            return
+        if group is not None:
+            if group.finish(job):
+                merger = group.merger
+                data = (f"{self.scan_hosts(group.scan_id)}{merger.open_ports} open ports ({merger.findings} findings) "
+                        f"from {len(group.jobs)} shards, {merger.duplicates} duplicates merged")
+                self.record(job.entry, group.command, data, self.status(group.jobs), group.jobs)
+            return
+        if job.error:
+            data = job.error
+        elif job.scan_id and job.output_hook.records:
+            data = self.scan_hosts(job.scan_id) + job.output_hook.summary()
+        else:
+            data = job.result.tail_text() if job.result is not None else ""
+        self.record(job.entry, job.command, data, self.status([job]), [job])
+
+    def finish_pipeline(self, pipeline: DiscoveryPipeline):
+        if pipeline in self.pipelines:
+            self.pipelines.remove(pipeline)
+        jobs = [pipeline.discovery_job] + pipeline.jobs
+        services = sum(job.output_hook.records for job in pipeline.jobs if job.output_hook is not None)
+        data = (f"{len(pipeline.hosts)} hosts, {pipeline.open_ports} open ports discovered; "
+                f"{len(pipeline.jobs)} nmap runs, {services} service findings")
+        self.record(pipeline.entry, pipeline.command, data, self.status(jobs), jobs)
+
+    def scan_hosts(self, scan: int) -> str:
+        try:
+            return f"{self.history.scan_hosts(scan)} hosts, "
+        except sqlite3.Error:
+            return ""
+
+    @staticmethod
+    def status(jobs: List[Job]) -> str:
+        if any(job.state == CANCELLED for job in jobs):
+            return "Cancelled"
+        if any(job.error or job.returncode != 0 for job in jobs):
+            return "Error"
+        return "Success"
+
+    def record(self, entry: BatchEntry, command: List[str], data: str, status: str, jobs: List[Job] = ()):
+        # One history row per batch entry, like add_result_row in the window
+        duration = (datetime.now() - entry.start_time).total_seconds()
+        usage = Usage.total(job.usage for job in jobs)
+        blob = " ".join(dict.fromkeys(job.blob for job in jobs if job.blob)) or None
+        try:
+            self.history.append(date_key(datetime.now()), command[0] if command else "Unknown", " ".join(command[1:]),
+                                preview(data), status, duration, blob, usage if usage.measured else None)
+        except sqlite3.Error as e:
+            self.write(f"History write error: {str(e)}")
+        cpu = f", cpu {usage.cpu_time:.2f}s" if usage.cpu_time is not None else ""
+        self.write(f"{status}: {entry.name} ({duration:.1f}s{cpu})")
+        if status != "Success" and data:
+            self.write("  " + data.strip().replace("\n", "\n  "))
+        with self._idle:
+            if status != "Success":
+                self.failed += 1
+            self.outstanding -= 1
+            self._idle.notify_all()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog="penmode", description="Run a YAML batch of Penetration-Mode jobs without the GUI.")
+    parser.add_argument("batch", help="batch file, or - for stdin")
+    parser.add_argument("-j", "--max-threads", type=int, help="jobs running at once (default: configured max_threads)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print tool output as it arrives")
+    parser.add_argument("-n", "--dry-run", action="store_true", help="check the batch and print the commands only")
+    parser.add_argument("--profile", help="profile whose history and outputs are used")
+    parser.add_argument("--no-history", action="store_true", help="keep results in memory only")
+    args = parser.parse_args(argv)
+    started = time.monotonic()
+    try:
+        options, entries = load_batch(args.batch)
+    except BatchError as e:
+        print(f"penmode: {str(e)}", file=sys.stderr)
+        return EXIT_USAGE
+    if args.dry_run:
+        for entry in entries:
+            print(f"{entry.name}: {' '.join(entry.command()) if entry.spec.name != PIPELINE_TOOL else entry.params}")
+        return EXIT_OK
+    settings = SavedSettings(load_yaml_config())
+    profile = args.profile or settings.profile_name()
+    retention = RetentionPolicy(int(settings.value("history_size", 100)), int(settings.value("history_max_age_days", 0)))
+    blob_store = None
+    if args.no_history:
+        history = HistoryStore(":memory:", retention)
+    else:
+        try:
+            history = HistoryStore(str(history_path(profile)), retention)
+            blob_store = BlobStore(str(outputs_path(profile)))
+        except (OSError, sqlite3.Error) as e:
+            print(f"penmode: history unavailable ({str(e)}), results are not kept", file=sys.stderr)
+            history = HistoryStore(":memory:", retention)
+    runner = BatchRunner(settings, history, blob_store, args.max_threads or options.get("max_threads"),
+                         options.get("timeout"), args.verbose)
+    try:
+        status = runner.run(entries)
+    finally:
+        history.close()
+    runner.write(f"{len(entries) - runner.failed} of {len(entries)} succeeded in {time.monotonic() - started:.1f}s")
+    return status
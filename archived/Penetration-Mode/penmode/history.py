@@ -0,0 +1,235 @@
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from penmode.accounting import FIELDS as USAGE_FIELDS, Usage
+from penmode.results import date_key, format_date_key, parse_duration
+
+# Retention is enforced on open and then once every this many appends, so a
+# busy session overshoots the cap by at most this much between sweeps
+RETENTION_EVERY = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    tool TEXT NOT NULL,
+    params TEXT NOT NULL,
+    result TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration REAL NOT NULL,
+    blob TEXT,
+    cpu_user REAL,
+    cpu_system REAL,
+    max_rss INTEGER,
+    read_bytes INTEGER,
+    write_bytes INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_ts ON runs (ts);
+CREATE INDEX IF NOT EXISTS runs_tool_ts ON runs (tool, ts);
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    tool TEXT NOT NULL,
+    params TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS findings (
+    id INTEGER PRIMARY KEY,
+    scan INTEGER NOT NULL,
+    host TEXT NOT NULL,
+    port INTEGER,
+    proto TEXT,
+    state TEXT NOT NULL,
+    service TEXT NOT NULL,
+    product TEXT NOT NULL,
+    version TEXT NOT NULL,
+    extra TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS findings_scan_host ON findings (scan, host);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# ts, tool, params, result, status, duration, blob (space-separated digests or None),
+# then cpu_user, cpu_system, max_rss, read_bytes, write_bytes (None when not measured)
+Row = Tuple[int, str, str, str, str, float, Optional[str], Optional[float], Optional[float],
+            Optional[int], Optional[int], Optional[int]]
+RUN_COLUMNS = "ts, tool, params, result, status, duration, blob, " + ", ".join(USAGE_FIELDS)
+# Columns added to runs after the first release, for ALTER TABLE on older databases
+ADDED_COLUMNS = {"blob": "TEXT", "cpu_user": "REAL", "cpu_system": "REAL", "max_rss": "INTEGER",
+                 "read_bytes": "INTEGER", "write_bytes": "INTEGER"}
+FINDING_COLUMNS = ["Host", "Port", "Proto", "State", "Service", "Product", "Version", "Extra"]
+
+
+class RetentionPolicy:
+    # max_rows replaces the old history_size truncation; max_age_days = 0 keeps everything
+    def __init__(self, max_rows: int = 100, max_age_days: int = 0):
+        self.max_rows = max_rows
+        self.max_age_days = max_age_days
+
+
+class HistoryStore:
+    """Run history in SQLite (WAL). Every result is its own small committed
+    insert, so nothing is rewritten and a crash loses at most the run that
+    was being written. `ts` holds penmode.results date keys."""
+
+    def __init__(self, path: str, retention: RetentionPolicy = None):
+        self.path = path
+        self.retention = retention or RetentionPolicy()
+        self._lock = threading.Lock()
+        self._appends = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        # Databases from before output blobs and resource accounting
+        existing = {column[1] for column in self.conn.execute("PRAGMA table_info(runs)")}
+        for name, kind in ADDED_COLUMNS.items():
+            if name not in existing:
+                self.conn.execute(f"ALTER TABLE runs ADD COLUMN {name} {kind}")
+        self.apply_retention()
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def append(self, ts: int, tool: str, params: str, result: str, status: str, duration: float,
+               blob: str = None, usage: Usage = None) -> int:
+        values = usage.values() if usage is not None else (None,) * len(USAGE_FIELDS)
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                f"INSERT INTO runs ({RUN_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (ts, tool, params, result, status, duration, blob) + values)
+        self._appends += 1
+        if self._appends % RETENTION_EVERY == 0:
+            self.apply_retention()
+        return cursor.lastrowid
+
+    def rows(self, date_range: Optional[Tuple[int, int]] = None, tool: str = None) -> List[Row]:
+        query = f"SELECT {RUN_COLUMNS} FROM runs"
+        clauses, args = [], []
+        if tool is not None:
+            clauses.append("tool = ?")
+            args.append(tool)
+        if date_range is not None:
+            clauses.append("ts BETWEEN ? AND ?")
+            args.extend(date_range)
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self._lock:
+            return self.conn.execute(query + " ORDER BY ts, id", args).fetchall()
+
+    def entries(self, date_range: Optional[Tuple[int, int]] = None) -> List[Dict]:
+        entries = []
+        for ts, tool, params, result, status, duration, blob, *usage in self.rows(date_range):
+            entry = {"tool": tool, "params": params, "date": format_date_key(ts), "result": result,
+                     "status": status, "duration": f"{duration:.2f}s", "blob": blob}
+            if any(value is not None for value in usage):
+                entry["usage"] = dict(zip(USAGE_FIELDS, usage))
+            entries.append(entry)
+        return entries
+
+    def blob_refs(self) -> Set[str]:
+        with self._lock:
+            values = self.conn.execute("SELECT DISTINCT blob FROM runs WHERE blob IS NOT NULL").fetchall()
+        return {digest for (value,) in values for digest in value.split()}
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+    def clear(self):
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM runs")
+            self.conn.execute("DELETE FROM findings")
+            self.conn.execute("DELETE FROM scans")
+
+    def set_retention(self, retention: RetentionPolicy):
+        self.retention = retention
+        self.apply_retention()
+
+    def apply_retention(self):
+        with self._lock, self.conn:
+            if self.retention.max_age_days:
+                cutoff = date_key(datetime.now() - timedelta(days=self.retention.max_age_days))
+                self.conn.execute("DELETE FROM runs WHERE ts < ?", (cutoff,))
+            if self.retention.max_rows:
+                # Ids grow with insertion, so the newest max_rows ids are kept
+                self.conn.execute(
+                    "DELETE FROM runs WHERE id <= (SELECT id FROM runs ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                    (self.retention.max_rows,))
+            # Scans go with the runs they belong to; a scan still running has no run yet
+            # and is newer than every kept run, so it stays
+            stale = "SELECT id FROM scans WHERE ts < (SELECT MIN(ts) FROM runs)"
+            self.conn.execute(f"DELETE FROM findings WHERE scan IN ({stale})")
+            self.conn.execute(f"DELETE FROM scans WHERE id IN ({stale})")
+
+    def start_scan(self, ts: int, tool: str, params: str) -> int:
+        with self._lock, self.conn:
+            return self.conn.execute("INSERT INTO scans (ts, tool, params) VALUES (?, ?, ?)", (ts, tool, params)).lastrowid
+
+    def add_findings(self, scan: int, findings: List[Tuple]):
+        # One transaction per parser batch
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO findings (scan, host, port, proto, state, service, product, version, extra)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", [(scan, *finding) for finding in findings])
+
+    def scans(self) -> List[Tuple[int, int, str, str, int]]:
+        # Newest first: (id, ts, tool, params, findings)
+        with self._lock:
+            return self.conn.execute(
+                "SELECT id, ts, tool, params, (SELECT COUNT(*) FROM findings WHERE scan = scans.id)"
+                " FROM scans ORDER BY id DESC").fetchall()
+
+    def scan_hosts(self, scan: int) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(DISTINCT host) FROM findings WHERE scan = ?", (scan,)).fetchone()[0]
+
+    def findings(self, scan: int, host: str = None, limit: int = -1, after: int = 0) -> List[Tuple]:
+        # (id, host, port, ...) in insertion order; page with after=<last id seen>
+        query = "SELECT id, host, port, proto, state, service, product, version, extra FROM findings WHERE scan = ? AND id > ?"
+        args = [scan, after]
+        if host:
+            query += " AND host LIKE ?"
+            args.append(host.replace("*", "%") + "%")
+        with self._lock:
+            return self.conn.execute(query + " ORDER BY id LIMIT ?", args + [limit]).fetchall()
+
+    def meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def import_entries(self, entries: Iterable[Dict]) -> int:
+        # Old profile JSON history: {"date": "%Y-%m-%d %H:%M:%S", "duration": "1.23s", ...}
+        rows = []
+        for entry in entries:
+            try:
+                ts = int(entry["date"].replace("-", "").replace(" ", "").replace(":", ""))
+            except (KeyError, ValueError, AttributeError):
+                continue
+            usage = entry.get("usage") if isinstance(entry.get("usage"), dict) else {}
+            rows.append((ts, entry.get("tool", "Unknown"), entry.get("params", ""), entry.get("result", "N/A"),
+                         entry.get("status", "Unknown"), parse_duration(entry.get("duration", 0)), entry.get("blob"))
+                        + tuple(usage.get(field) for field in USAGE_FIELDS))
+        with self._lock, self.conn:
+            self.conn.executemany(
+                f"INSERT INTO runs ({RUN_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.apply_retention()
+        return len(rows)
+
+    def migrate_profile(self, profile: Dict) -> bool:
+        # One-time move of the history list out of the profile JSON
+        if self.meta("profile_migrated") or not profile.get("history"):
+            return False
+        self.import_entries(profile["history"])
+        self.set_meta("profile_migrated", "1")
+        return True
@@ -0,0 +1,283 @@
+import ctypes
+import ctypes.util
+import os
+import selectors
+import shutil
+import struct
+import subprocess
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+# Arguments that make a tool print its version and exit. None means the tool
+# has no cheap way to do that (msfconsole boots a whole framework first), so
+# only its path is recorded.
+VERSION_ARGS = {
+    "msfconsole": None,
+    "openvas-start": None,
+    "torghost": None,
+    "wifite": None,
+    "john": [],
+    "hydra": [],
+    "proxychains": [],
+    "aircrack-ng": ["--help"],
+    "lynis": ["show", "version"],
+    "chkrootkit": ["-V"],
+}
+DEFAULT_VERSION_ARGS = ["--version"]
+VERSION_TIMEOUT = 5
+POLL_INTERVAL = 30
+
+IN_ATTRIB = 0x00000004
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_ATTRIB | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    # Minimal ctypes binding; raises OSError where inotify is unavailable
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, str] = {}
+
+    def add_watch(self, path: str, mask: int = WATCH_MASK) -> int:
+        wd = self._add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        self.watches[wd] = path
+        return wd
+
+    def read_events(self):
+        try:
+            data = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="replace")
+            offset += length
+            yield self.watches.get(wd), mask, name
+
+    def close(self):
+        os.close(self.fd)
+
+
+class ToolEntry:
+    def __init__(self, name: str, path: Optional[str], version: Optional[str] = None):
+        self.name = name
+        self.path = path
+        self.version = version
+
+    @property
+    def installed(self) -> bool:
+        return self.path is not None
+
+
+def _is_executable(path: str) -> bool:
+    return os.path.isfile(path) and os.access(path, os.X_OK)
+
+
+class ToolInventory:
+    """In-memory index of executables on PATH, built once in the background
+    and kept current with inotify (or a slow poll where that is missing).
+    Versions are probed off-thread for the tools in `watched_tools` only."""
+
+    def __init__(self, watched_tools: Iterable[str] = (), path: str = None,
+                 on_change: Callable[[Set[str]], None] = None):
+        self.watched_tools = set(watched_tools)
+        self.dirs = self._path_dirs(path if path is not None else os.environ.get("PATH", os.defpath))
+        self.on_change = on_change
+        self.ready = threading.Event()
+        self._lock = threading.Lock()
+        self._paths: Dict[str, str] = {}
+        self._versions: Dict[str, tuple] = {}
+        self._probe_queue: List[str] = []
+        self._probe_wakeup = threading.Condition(self._lock)
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    @staticmethod
+    def _path_dirs(path: str) -> List[str]:
+        dirs = []
+        for entry in path.split(os.pathsep):
+            real = os.path.realpath(entry or ".")
+            if real not in dirs and os.path.isdir(real):
+                dirs.append(real)
+        return dirs
+
+    def start(self):
+        for target, name in ((self._scan_and_watch, "tool-inventory"), (self._probe_versions, "tool-versions")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        with self._probe_wakeup:
+            self._probe_wakeup.notify_all()
+
+    def check_tool(self, name: str) -> bool:
+        return self.resolve(name) is not None
+
+    def resolve(self, name: str) -> Optional[str]:
+        if not self.ready.is_set():
+            # Still scanning; a PATH lookup is a few stat() calls, not a probe
+            return shutil.which(name)
+        return self._paths.get(name)
+
+    def version(self, name: str) -> Optional[str]:
+        entry = self._versions.get(name)
+        return entry[1] if entry else None
+
+    def entry(self, name: str) -> ToolEntry:
+        return ToolEntry(name, self.resolve(name), self.version(name))
+
+    def entries(self, names: Iterable[str]) -> List[ToolEntry]:
+        return [self.entry(name) for name in names]
+
+    def rescan(self):
+        self._scan()
+        with self._probe_wakeup:
+            self._versions.clear()
+            self._probe_queue = [name for name in self.watched_tools if name in self._paths]
+            self._probe_wakeup.notify()
+
+    def _scan(self):
+        paths: Dict[str, str] = {}
+        # Walk PATH back to front so earlier directories win
+        for directory in reversed(self.dirs):
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_file() and os.access(entry.path, os.X_OK):
+                            paths[entry.name] = entry.path
+            except OSError:
+                continue
+        with self._lock:
+            changed = {name for name in set(paths) | set(self._paths) if paths.get(name) != self._paths.get(name)}
+            self._paths = paths
+        self.ready.set()
+        self._changed(changed)
+
+    def _refresh_name(self, name: str):
+        resolved = None
+        for directory in self.dirs:
+            candidate = os.path.join(directory, name)
+            if _is_executable(candidate):
+                resolved = candidate
+                break
+        with self._lock:
+            if self._paths.get(name) == resolved:
+                return
+            if resolved is None:
+                self._paths.pop(name, None)
+            else:
+                self._paths[name] = resolved
+        self._changed({name})
+
+    def _changed(self, names: Set[str]):
+        if not names:
+            return
+        probes = names & self.watched_tools
+        if probes:
+            with self._probe_wakeup:
+                for name in probes:
+                    self._versions.pop(name, None)
+                    if name in self._paths and name not in self._probe_queue:
+                        self._probe_queue.append(name)
+                self._probe_wakeup.notify()
+        if self.on_change is not None:
+            self.on_change(names)
+
+    def _scan_and_watch(self):
+        self._scan()
+        try:
+            inotify = Inotify()
+            for directory in self.dirs:
+                inotify.add_watch(directory)
+        except (OSError, AttributeError):
+            self._poll()
+            return
+        selector = selectors.DefaultSelector()
+        selector.register(inotify.fd, selectors.EVENT_READ)
+        try:
+            while not self._stop.is_set():
+                if not selector.select(1.0):
+                    continue
+                names = set()
+                rescan = False
+                for directory, mask, name in inotify.read_events():
+                    if mask & (IN_Q_OVERFLOW | IN_DELETE_SELF | IN_MOVE_SELF) or directory is None:
+                        rescan = True
+                    elif name:
+                        names.add(name)
+                if rescan:
+                    self._scan()
+                else:
+                    for name in names:
+                        self._refresh_name(name)
+        finally:
+            selector.close()
+            inotify.close()
+
+    def _poll(self):
+        mtimes = {}
+        while not self._stop.wait(POLL_INTERVAL):
+            current = {}
+            for directory in self.dirs:
+                try:
+                    current[directory] = os.stat(directory).st_mtime
+                except OSError:
+                    current[directory] = None
+            if mtimes and current != mtimes:
+                self._scan()
+            mtimes = current
+
+    def _probe_versions(self):
+        self.ready.wait()
+        with self._probe_wakeup:
+            self._probe_queue.extend(name for name in self.watched_tools
+                                     if name in self._paths and name not in self._probe_queue)
+        while not self._stop.is_set():
+            with self._probe_wakeup:
+                while not self._probe_queue and not self._stop.is_set():
+                    self._probe_wakeup.wait()
+                if self._stop.is_set():
+                    return
+                name = self._probe_queue.pop(0)
+                path = self._paths.get(name)
+            if path is None:
+                continue
+            version = probe_version(name, path)
+            with self._lock:
+                self._versions[name] = (path, version)
+            if self.on_change is not None:
+                self.on_change({name})
+
+
+def probe_version(name: str, path: str) -> Optional[str]:
+    args = VERSION_ARGS.get(name, DEFAULT_VERSION_ARGS)
+    if args is None:
+        return None
+    try:
+        result = subprocess.run([path] + args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.STDOUT, timeout=VERSION_TIMEOUT)
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+    for line in result.stdout.decode(errors="replace").splitlines():
+        line = line.strip()
+        if line and any(ch.isdigit() for ch in line):
+            return line[:120]
+    return None
@@ -0,0 +1,306 @@
+import heapq
+import itertools
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, Dict, List, Optional
+
+from penmode.accounting import Usage
+from penmode.streaming import BatchWindow, stream_process, tool_name, with_progress_args
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+PRIORITY_LOW = -10
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10
+
+# Which concurrency limit a tool counts against. Network-bound scanners can
+# run many at once, CPU-bound crackers should not fight over cores, and GUI
+# tools only need a slot of their own.
+RESOURCE_CLASSES = {
+    "nmap": "network",
+    "masscan": "network",
+    "hydra": "network",
+    "sqlmap": "network",
+    "openvas-start": "network",
+    "wifite": "network",
+    "proxychains": "network",
+    "torghost": "network",
+    "ping": "network",
+    "nslookup": "network",
+    "apt-get": "network",
+    "john": "cpu",
+    "aircrack-ng": "cpu",
+    "lynis": "cpu",
+    "chkrootkit": "cpu",
+    "msfconsole": "interactive",
+    "wireshark": "interactive",
+    "htop": "interactive",
+}
+DEFAULT_CLASS = "default"
+
+FINISHED_JOBS_KEPT = 200
+
+
+def default_class_limits(max_workers: int) -> Dict[str, int]:
+    return {
+        "network": max_workers,
+        "cpu": max(1, min(max_workers, (os.cpu_count() or 2) // 2)),
+    }
+
+
+class Job:
+    _ids = itertools.count(1)
+
+    def __init__(self, command: List[str], name: str = None, priority: int = PRIORITY_NORMAL,
+                 resource_class: str = None, timeout: int = 60, privileged: bool = True,
+                 output_hook: Callable[[str, List[str]], List[str]] = None, cwd: str = None,
+                 stop_signal: int = signal.SIGTERM):
+        self.id = next(Job._ids)
+        self.command = command
+        self.tool = tool_name(command)
+        self.name = name or self.tool
+        self.priority = priority
+        self.resource_class = resource_class or RESOURCE_CLASSES.get(self.tool, DEFAULT_CLASS)
+        self.timeout = timeout
+        self.privileged = privileged
+        self.cwd = cwd
+        # Sent first when the job is cancelled or times out
+        self.stop_signal = stop_signal
+        self.state = QUEUED
+        self.timed_out = False
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = 0
+        self.returncode = None
+        self.error = None
+        self.result = None
+        self.cancel_event = threading.Event()
+        # Set by consumers that want back-pressure on output batches
+        self.batch_window: Optional[BatchWindow] = None
+        # Sees every batch on the worker thread first and returns the lines
+        # still meant for listeners (parsers keep structured output to themselves)
+        self.output_hook = output_hook
+        # Raw output sink (write(bytes) / close() -> reference), e.g. a BlobWriter;
+        # close() runs when the job ends and its return value lands in `blob`
+        self.capture = None
+        self.blob: Optional[str] = None
+        # CPU, memory and I/O of the process tree, filled in as the job ends
+        self.usage = Usage()
+
+    @property
+    def queue_wait(self) -> float:
+        return (self.started_at or self.finished_at or time.time()) - self.submitted_at
+
+    @property
+    def run_time(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+
+class JobScheduler:
+    """Priority queue of Jobs with a global worker limit plus per resource
+    class limits. Listeners are called as listener(event, job, payload) from
+    worker threads; events are "state", "output" and "progress"."""
+
+    def __init__(self, max_workers: int = 4, class_limits: Dict[str, int] = None):
+        self.max_workers = max_workers
+        self.class_limits = class_limits if class_limits is not None else default_class_limits(max_workers)
+        self.listeners: List[Callable] = []
+        # Set to the privileged helper's spawn() so jobs share one authorization
+        self.spawn_privileged: Optional[Callable] = None
+        self._lock = threading.RLock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._queued: Dict[int, Job] = {}
+        self._running: Dict[int, Job] = {}
+        self._threads: Dict[int, threading.Thread] = {}
+        self._class_running = Counter()
+        self._finished = deque(maxlen=FINISHED_JOBS_KEPT)
+        self._closed = False
+
+    def add_listener(self, listener: Callable):
+        self.listeners.append(listener)
+
+    def _notify(self, event: str, job: Job, payload=None):
+        for listener in self.listeners:
+            listener(event, job, payload)
+
+    def submit(self, job: Job) -> Job:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Job scheduler is shut down")
+            self._queued[job.id] = job
+            heapq.heappush(self._heap, (-job.priority, next(self._seq), job))
+        self._notify("state", job)
+        self._dispatch()
+        return job
+
+    def set_priority(self, job_id: int, priority: int) -> bool:
+        with self._lock:
+            job = self._queued.get(job_id)
+            if job is None:
+                return False
+            # The old heap entry goes stale and is skipped when popped
+            job.priority = priority
+            heapq.heappush(self._heap, (-priority, next(self._seq), job))
+        self._notify("state", job)
+        self._dispatch()
+        return True
+
+    def set_limits(self, max_workers: int = None, class_limits: Dict[str, int] = None):
+        with self._lock:
+            if max_workers is not None:
+                self.max_workers = max_workers
+            if class_limits is not None:
+                self.class_limits = class_limits
+        self._dispatch()
+
+    def cancel(self, job_id: int) -> bool:
+        with self._lock:
+            job = self._queued.pop(job_id, None)
+            if job is not None:
+                job.state = CANCELLED
+                job.finished_at = time.time()
+                self._finished.append(job)
+            else:
+                job = self._running.get(job_id)
+                if job is None:
+                    return False
+                # The worker kills the process group and reports the state
+                job.cancel_event.set()
+                return True
+        self._notify("state", job)
+        return True
+
+    def cancel_all(self, queued_only: bool = False):
+        with self._lock:
+            ids = list(self._queued) + ([] if queued_only else list(self._running))
+        for job_id in ids:
+            self.cancel(job_id)
+
+    def shutdown(self, timeout: float = 5.0):
+        with self._lock:
+            self._closed = True
+        self.cancel_all()
+        deadline = time.monotonic() + timeout
+        for thread in list(self._threads.values()):
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {"running": len(self._running), "queued": len(self._queued)}
+
+    def snapshot(self) -> List[Job]:
+        with self._lock:
+            queued = sorted(self._queued.values(), key=lambda j: (-j.priority, j.id))
+            return list(self._running.values()) + queued + list(reversed(self._finished))
+
+    def _dispatch(self):
+        started = []
+        with self._lock:
+            if self._closed:
+                return
+            blocked = []
+            while self._heap and len(self._running) < self.max_workers:
+                entry = heapq.heappop(self._heap)
+                job = entry[2]
+                if job.state != QUEUED or entry[0] != -job.priority:
+                    continue
+                limit = self.class_limits.get(job.resource_class)
+                if limit is not None and self._class_running[job.resource_class] >= limit:
+                    blocked.append(entry)
+                    continue
+                del self._queued[job.id]
+                job.state = RUNNING
+                job.started_at = time.time()
+                self._running[job.id] = job
+                self._class_running[job.resource_class] += 1
+                thread = threading.Thread(target=self._run, args=(job,), name=f"job-{job.id}", daemon=True)
+                self._threads[job.id] = thread
+                started.append((job, thread))
+            for entry in blocked:
+                heapq.heappush(self._heap, entry)
+        for job, thread in started:
+            self._notify("state", job)
+            thread.start()
+
+    def _emit_output(self, job: Job, stream: str, lines: List[str]):
+        if job.capture is not None:
+            try:
+                job.capture.write(("\n".join(lines) + "\n").encode(errors="replace"))
+            except OSError as e:
+                job.error = job.error or f"Output capture error: {str(e)}"
+                job.capture.abort()
+                job.capture = None
+        if job.output_hook is not None:
+            lines = job.output_hook(stream, lines)
+            if not lines:
+                return
+        if job.batch_window is not None and not job.batch_window.acquire(job.cancel_event):
+            # Cancelled while the console was backed up: the batch has no slot for
+            # handle_output to release, so it stays in the capture only
+            return
+        self._notify("output", job, (stream, lines))
+
+    def _emit_progress(self, job: Job, value: int):
+        job.progress = value
+        self._notify("progress", job, value)
+
+    def _run(self, job: Job):
+        state = FAILED
+        try:
+            job.result = stream_process(with_progress_args(job.command),
+                                        lambda stream, lines: self._emit_output(job, stream, lines),
+                                        lambda value: self._emit_progress(job, value),
+                                        timeout=job.timeout, privileged=job.privileged,
+                                        cancel_event=job.cancel_event, spawn_privileged=self.spawn_privileged,
+                                        usage=job.usage, cwd=job.cwd, stop_signal=job.stop_signal)
+            job.returncode = job.result.returncode
+            if job.result.cancelled:
+                state = CANCELLED
+            elif job.returncode == 0:
+                state = DONE
+                job.progress = 100
+        except subprocess.TimeoutExpired:
+            job.timed_out = True
+            job.error = f"Timeout ({job.timeout}s) for command: {' '.join(job.command)}"
+        except subprocess.CalledProcessError as e:
+            job.error = f"Execution error: {e.stderr or e.output or str(e)}"
+        except Exception as e:
+            job.error = f"Unexpected error: {str(e)}"
+        finally:
+            close = getattr(job.output_hook, "close", None)
+            if close is not None:
+                try:
+                    close()
+                except Exception as e:
+                    job.error = job.error or f"Output hook error: {str(e)}"
+            if job.capture is not None:
+                try:
+                    job.blob = job.capture.close()
+                except OSError as e:
+                    job.error = job.error or f"Output capture error: {str(e)}"
+            with self._lock:
+                job.state = state
+                job.finished_at = time.time()
+                self._running.pop(job.id, None)
+                self._threads.pop(job.id, None)
+                self._class_running[job.resource_class] -= 1
+                self._finished.append(job)
+            self._notify("state", job)
+            self._dispatch()
@@ -0,0 +1,251 @@
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from penmode.streaming import tool_name
+
+JOURNAL_FILE = "journal.jsonl"
+# Tools with resume state of their own; anything else starts over when resumed
+RESUMABLE_TOOLS = ("nmap", "john", "hydra")
+# Progress is journaled in steps this large; it is only shown when offering a resume
+PROGRESS_STEP = 5
+# hydra options naming a file; made absolute since journaled hydra runs start
+# in a directory of their own
+HYDRA_FILE_OPTIONS = ("-L", "-P", "-C", "-M", "-o")
+
+
+def _option_value(args: List[str], option: str) -> Optional[str]:
+    # "-oG file", "--session=name" and "--session name" alike; the last one wins
+    value = None
+    for index, arg in enumerate(args):
+        if arg == option and index + 1 < len(args):
+            value = args[index + 1]
+        elif arg.startswith(option + "="):
+            value = arg[len(option) + 1:]
+    return value
+
+
+def _nmap_log(command: List[str]) -> Optional[str]:
+    # nmap --resume reads the normal or grepable log back; stdout and the
+    # console (/dev/stderr) do not count
+    for option, suffix in (("-oG", ""), ("-oN", ""), ("-oA", ".gnmap")):
+        value = _option_value(command[1:], option)
+        if value and value != "-" and not value.startswith("/dev/"):
+            return value + suffix
+    return None
+
+
+def _has_host_lines(path: str) -> bool:
+    # nmap refuses to resume from a log without a single finished host
+    try:
+        with open(path, "rb") as f:
+            return any(line.startswith((b"Host: ", b"Nmap scan report for ")) for line in f)
+    except OSError:
+        return False
+
+
+def prepare_command(command: List[str], workdir: str) -> Tuple[List[str], Optional[str]]:
+    """Makes a tool keep its resume state under `workdir`. Returns the command
+    to run and the directory it has to run in (None: wherever jobs run)."""
+    tool = tool_name(command)
+    if tool == "nmap" and _nmap_log(command) is None:
+        return command + ["-oG", os.path.join(workdir, "scan.gnmap")], None
+    if tool == "john" and _option_value(command[1:], "--session") is None:
+        return command + [f"--session={os.path.join(workdir, 'john')}"], None
+    if tool == "hydra":
+        # hydra only writes ./hydra.restore, so each run gets a directory of its own
+        args = list(command)
+        for index in range(1, len(args) - 1):
+            if args[index] in HYDRA_FILE_OPTIONS and not os.path.isabs(args[index + 1]):
+                args[index + 1] = os.path.abspath(args[index + 1])
+        return args, workdir
+    return command, None
+
+
+class JournalEntry:
+    """One journaled job: the command as first submitted, where the tool
+    keeps its resume state, and the scan and shard it belongs to."""
+
+    def __init__(self, key: str, command: List[str], name: str = None, workdir: str = None, cwd: str = None,
+                 scan_id: int = None, shard: List[int] = None, submitted: float = None, progress: int = 0,
+                 resumes: int = 0):
+        self.key = key
+        self.command = command
+        self.name = name or tool_name(command)
+        self.workdir = workdir
+        self.cwd = cwd
+        self.scan_id = scan_id
+        # [index, count] for one shard of a split nmap scan
+        self.shard = shard
+        self.submitted = submitted if submitted is not None else time.time()
+        self.progress = progress
+        self.resumes = resumes
+
+    @property
+    def tool(self) -> str:
+        return tool_name(self.command)
+
+    def to_dict(self) -> Dict:
+        return {"key": self.key, "command": self.command, "name": self.name, "workdir": self.workdir,
+                "cwd": self.cwd, "scan_id": self.scan_id, "shard": self.shard, "submitted": self.submitted,
+                "progress": self.progress, "resumes": self.resumes}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "JournalEntry":
+        return cls(data["key"], list(data["command"]), data.get("name"), data.get("workdir"), data.get("cwd"),
+                   data.get("scan_id"), data.get("shard"), data.get("submitted"), data.get("progress", 0),
+                   data.get("resumes", 0))
+
+    def resume_command(self) -> Optional[List[str]]:
+        """The command that carries on where the tool stopped, or None when it
+        left nothing to resume from and has to start over."""
+        tool = self.tool
+        if tool == "nmap":
+            log = _nmap_log(self.command)
+            # Paths the user gave relative to the job's directory cannot be checked from here
+            if log is not None and (not os.path.isabs(log) or _has_host_lines(log)):
+                return ["nmap", "--resume", log]
+        elif tool == "john":
+            session = _option_value(self.command[1:], "--session")
+            if session is not None and (not os.path.isabs(session) or os.path.exists(session + ".rec")):
+                return ["john", f"--restore={session}"]
+        elif tool == "hydra":
+            if self.cwd and os.path.exists(os.path.join(self.cwd, "hydra.restore")):
+                return ["hydra", "-R"]
+        return None
+
+    def describe(self) -> str:
+        text = self.name
+        if self.progress:
+            text += f" ({self.progress}%)"
+        return text + f", started {time.strftime('%Y-%m-%d %H:%M', time.localtime(self.submitted))}"
+
+
+class JobJournal:
+    """Write-ahead log of jobs that should outlive the app. An entry is
+    written (and fsynced) before its job is queued and closed once the job
+    ends on its own or the user cancels it. Whatever is still open when the
+    journal is opened again was cut short by a crash, a restart or closing
+    the app, and is listed in `interrupted`. After suspend() endings are no
+    longer recorded, so the jobs the app stops on its way out stay open."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self.path = os.path.join(root, JOURNAL_FILE)
+        self._lock = threading.Lock()
+        self._keys = itertools.count(1)
+        self._suspended = False
+        os.makedirs(root, mode=0o700, exist_ok=True)
+        self.interrupted: Dict[str, JournalEntry] = self._replay()
+        self._compact()
+        self._file = open(self.path, "a")
+
+    def _replay(self) -> Dict[str, JournalEntry]:
+        entries: Dict[str, JournalEntry] = {}
+        try:
+            with open(self.path) as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return entries
+        for line in lines:
+            try:
+                record = json.loads(line)
+                op = record["op"]
+                if op == "start":
+                    entry = JournalEntry.from_dict(record["entry"])
+                    entries[entry.key] = entry
+                elif op == "progress" and record["key"] in entries:
+                    entries[record["key"]].progress = record["progress"]
+                elif op == "end":
+                    entries.pop(record["key"], None)
+            except (ValueError, KeyError, TypeError):
+                # A crash can leave the last line half written
+                continue
+        return entries
+
+    def _compact(self):
+        # Only open entries are carried over, together with their directories
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            for entry in self.interrupted.values():
+                f.write(json.dumps({"op": "start", "entry": entry.to_dict()}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        keep = {os.path.basename(entry.workdir) for entry in self.interrupted.values() if entry.workdir}
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if name not in keep and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def _write(self, record: Dict, sync: bool = True):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+
+    def new_entry(self, command: List[str], name: str = None, scan_id: int = None,
+                  shard: List[int] = None) -> JournalEntry:
+        # Keys only need to be unique within this journal's directory
+        key = f"{int(time.time())}-{os.getpid()}-{next(self._keys)}"
+        workdir = None
+        cwd = None
+        if tool_name(command) in RESUMABLE_TOOLS:
+            workdir = os.path.join(self.root, key)
+            os.makedirs(workdir, mode=0o700)
+            command, cwd = prepare_command(command, workdir)
+        return JournalEntry(key, command, name, workdir, cwd, scan_id, shard)
+
+    def start(self, entry: JournalEntry):
+        self._write({"op": "start", "entry": entry.to_dict()})
+
+    def progress(self, entry: JournalEntry, value: int):
+        if value >= entry.progress + PROGRESS_STEP:
+            entry.progress = value
+            try:
+                self._write({"op": "progress", "key": entry.key, "progress": value}, sync=False)
+            except OSError:
+                pass
+
+    def finish(self, entry: JournalEntry):
+        if self._suspended:
+            return
+        self._end(entry)
+
+    def discard(self, entry: JournalEntry):
+        self.interrupted.pop(entry.key, None)
+        self._end(entry)
+
+    def interrupt(self, entry: JournalEntry):
+        # A job that stopped short (timed out) stays open and is offered like a crashed one
+        self.interrupted[entry.key] = entry
+
+    def take(self, entry: JournalEntry) -> JournalEntry:
+        # The entry is journaled again when its resumed job starts
+        self.interrupted.pop(entry.key, None)
+        entry.resumes += 1
+        return entry
+
+    def _end(self, entry: JournalEntry):
+        try:
+            self._write({"op": "end", "key": entry.key})
+        except OSError:
+            # At worst the job is offered for resume once more
+            pass
+        if entry.workdir:
+            shutil.rmtree(entry.workdir, ignore_errors=True)
+
+    def suspend(self):
+        self._suspended = True
+
+    def close(self):
+        self._suspended = True
+        with self._lock:
+            self._file.close()
@@ -0,0 +1,33 @@
+import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict
+
+
+class KeyDeriver:
+    """Runs the password KDF on a worker thread and remembers the result for
+    the rest of the session. Callers get a Future; asking again for the same
+    password (re-saving settings, switching back to a profile) returns the
+    cached one instead of paying for PBKDF2 again."""
+
+    def __init__(self, kdf: Callable[[str], bytes]):
+        self.kdf = kdf
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kdf")
+        self._lock = threading.Lock()
+        # Keyed by a digest so the cache does not hold the passwords themselves
+        self._cache: Dict[bytes, Future] = {}
+
+    def derive(self, password: str) -> Future:
+        digest = hashlib.sha256(password.encode()).digest()
+        with self._lock:
+            future = self._cache.get(digest)
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._cache[digest] = self._executor.submit(self.kdf, password)
+            return future
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,230 @@
+import hashlib
+import os
+import struct
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Iterator, List, Tuple
+
+# Messages are buffered and sealed together: one AES-GCM operation and one
+# write() per segment instead of a Fernet token per message.
+SEGMENT_BYTES = 64 * 1024
+FLUSH_INTERVAL = 1.0
+# What may wait in memory for the key (or a slow disk); beyond that the
+# oldest records are dropped and a marker says how many
+MAX_PENDING_BYTES = 16 * SEGMENT_BYTES
+
+MAGIC = b"HXL1"
+# magic, ciphertext length, sequence number, nonce, key id
+HEADER = struct.Struct(">4sIQ12s8s")
+
+
+def derive_log_key(master_key: bytes) -> bytes:
+    # Separate key for the log so it is never shared with the Fernet backups.
+    # cryptography is only imported once there is a key, not when the sink opens
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"hackeros log segments").derive(master_key)
+
+
+def key_id(key: bytes) -> bytes:
+    return hashlib.sha256(key).digest()[:8]
+
+
+class LogSink:
+    """Append-only encrypted log file. `write()` only queues the message; a
+    writer thread seals whatever is queued into one authenticated segment
+    every FLUSH_INTERVAL (or SEGMENT_BYTES). Segments are indexed by file
+    offset so a viewer can decrypt one at a time. The key may arrive later
+    through set_key(); messages stay queued until it does, up to
+    max_pending_bytes."""
+
+    def __init__(self, path: str, key: bytes = None, on_segment: Callable[[int], None] = None,
+                 segment_bytes: int = SEGMENT_BYTES, flush_interval: float = FLUSH_INTERVAL,
+                 max_pending_bytes: int = MAX_PENDING_BYTES):
+        self.path = path
+        self.on_segment = on_segment
+        self.segment_bytes = segment_bytes
+        self.flush_interval = flush_interval
+        self.max_pending_bytes = max_pending_bytes
+        # key id -> AESGCM
+        self._ciphers: Dict[bytes, object] = {}
+        self._key_id = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        if key is not None:
+            self.set_key(key)
+        self._file_lock = threading.Lock()
+        self._pending: Deque[str] = deque()
+        self._pending_bytes = 0
+        self._dropped = 0
+        self._written = 0
+        self._queued = 0
+        self._closed = False
+        self.index: List[Tuple[int, int]] = []
+        self._seq = 0
+        self._load_index()
+        self._file = open(path, "ab")
+        self._reader = open(path, "rb")
+        self._thread = threading.Thread(target=self._writer, name="log-sink", daemon=True)
+        self._thread.start()
+
+    def set_key(self, key: bytes):
+        # Older keys stay usable for reading segments written before the change
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        ident = key_id(key)
+        with self._wakeup:
+            self._ciphers[ident] = AESGCM(key)
+            self._key_id = ident
+            self._wakeup.notify_all()
+
+    def write(self, level: str, message: str):
+        record = f"{time.strftime('%Y-%m-%d %H:%M:%S')} {level} {message}"
+        with self._wakeup:
+            if self._closed:
+                return
+            self._pending.append(record)
+            self._pending_bytes += len(record) + 1
+            self._queued += 1
+            while self._pending_bytes > self.max_pending_bytes and len(self._pending) > 1:
+                self._pending_bytes -= len(self._pending.popleft()) + 1
+                self._dropped += 1
+                # Dropped records count as done, so flush() does not wait for them
+                self._written += 1
+            if self._pending_bytes >= self.segment_bytes:
+                self._wakeup.notify()
+
+    def flush(self, timeout: float = 5.0):
+        # Blocks until everything queued so far is on disk; without a key
+        # nothing can be written, so there is nothing to wait for
+        deadline = time.monotonic() + timeout
+        with self._wakeup:
+            if self._key_id is None:
+                return
+            target = self._queued
+            self._wakeup.notify_all()
+            while self._written < target and time.monotonic() < deadline:
+                self._wakeup.wait(0.05)
+
+    def close(self):
+        self.flush()
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify_all()
+        self._thread.join(2.0)
+        self._file.close()
+        self._reader.close()
+
+    def segment_count(self) -> int:
+        with self._file_lock:
+            return len(self.index)
+
+    def read_segment(self, number: int) -> str:
+        with self._file_lock:
+            offset, length = self.index[number]
+            data = os.pread(self._reader.fileno(), HEADER.size + length, offset)
+        header, ciphertext = data[:HEADER.size], data[HEADER.size:]
+        _magic, _length, _seq, nonce, ident = HEADER.unpack(header)
+        cipher = self._ciphers.get(ident)
+        if cipher is None:
+            return "[waiting for encryption key]" if self._key_id is None else "[segment encrypted with a different key]"
+        from cryptography.exceptions import InvalidTag
+        try:
+            return cipher.decrypt(nonce, ciphertext, header).decode(errors="replace")
+        except InvalidTag:
+            return "[segment failed authentication]"
+
+    def export(self, path: str):
+        self.flush()
+        with open(path, "w") as f:
+            for number in range(self.segment_count()):
+                f.write(self.read_segment(number))
+                f.write("\n")
+
+    def clear(self):
+        with self._wakeup:
+            self._pending.clear()
+            self._pending_bytes = 0
+            self._dropped = 0
+            self._written = self._queued
+        with self._file_lock:
+            self._file.truncate(0)
+            self.index = []
+        if self.on_segment is not None:
+            self.on_segment(0)
+
+    def _load_index(self):
+        if not os.path.exists(self.path):
+            return
+        good = 0
+        size = os.path.getsize(self.path)
+        with open(self.path, "rb") as f:
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                magic, length, seq, _nonce, _ident = HEADER.unpack(header)
+                if magic != MAGIC or good + HEADER.size + length > size:
+                    break
+                self.index.append((good, length))
+                self._seq = seq + 1
+                good += HEADER.size + length
+                f.seek(good)
+        if good < size:
+            # Torn write from a crash; drop the partial segment
+            os.truncate(self.path, good)
+
+    def _seal(self, records: List[str]) -> bytes:
+        nonce = os.urandom(12)
+        plaintext = "\n".join(records).encode()
+        # Header fields are authenticated as associated data; the ciphertext
+        # (with its 16 byte tag) is exactly len(plaintext) + 16
+        header = HEADER.pack(MAGIC, len(plaintext) + 16, self._seq, nonce, self._key_id)
+        self._seq += 1
+        return header + self._ciphers[self._key_id].encrypt(nonce, plaintext, header)
+
+    def _writer(self):
+        while True:
+            with self._wakeup:
+                if (self._pending_bytes < self.segment_bytes or self._key_id is None) and not self._closed:
+                    self._wakeup.wait(self.flush_interval)
+                if self._key_id is None:
+                    if self._closed:
+                        return
+                    continue
+                if self._dropped:
+                    self._pending.appendleft(f"{time.strftime('%Y-%m-%d %H:%M:%S')} WARNING {self._dropped} older "
+                                             f"log records dropped, more than {self.max_pending_bytes} bytes were queued")
+                    self._queued += 1
+                    self._dropped = 0
+                records = list(self._pending)
+                self._pending.clear()
+                self._pending_bytes = 0
+                if not records and self._closed:
+                    return
+            if not records:
+                continue
+            for chunk in self._chunks(records):
+                segment = self._seal(chunk)
+                with self._file_lock:
+                    offset = self.index[-1][0] + HEADER.size + self.index[-1][1] if self.index else 0
+                    self._file.write(segment)
+                    self._file.flush()
+                    self.index.append((offset, len(segment) - HEADER.size))
+                    count = len(self.index)
+                with self._wakeup:
+                    self._written += len(chunk)
+                    self._wakeup.notify_all()
+                if self.on_segment is not None:
+                    self.on_segment(count)
+
+    def _chunks(self, records: List[str]) -> Iterator[List[str]]:
+        # Keeps pages around segment_bytes even when a burst queued far more
+        start, size = 0, 0
+        for i, record in enumerate(records):
+            size += len(record) + 1
+            if size >= self.segment_bytes:
+                yield records[start:i + 1]
+                start, size = i + 1, 0
+        if start < len(records):
+            yield records[start:]
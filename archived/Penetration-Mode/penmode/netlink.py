@@ -0,0 +1,329 @@
+import errno
+import os
+import selectors
+import socket
+import struct
+import threading
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+NETLINK_ROUTE = 0
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV6_IFADDR = 0x100
+
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLMSG_OVERRUN = 4
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+RTM_GETLINK = 18
+RTM_NEWADDR = 20
+RTM_DELADDR = 21
+RTM_GETADDR = 22
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+
+IFLA_ADDRESS = 1
+IFLA_IFNAME = 3
+IFLA_MTU = 4
+IFLA_OPERSTATE = 16
+IFLA_LINKINFO = 18
+IFLA_INFO_KIND = 1
+IFA_ADDRESS = 1
+IFA_LOCAL = 2
+
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+IFF_LOWER_UP = 0x10000
+
+ARPHRD_ETHER = 1
+ARPHRD_LOOPBACK = 772
+# What a wireless card in monitor mode reports as its link type
+ARPHRD_IEEE80211_RADIOTAP = 803
+ARPHRD_NONE = 65534
+
+OPERSTATES = ["unknown", "notpresent", "down", "lowerlayerdown", "testing", "dormant", "up"]
+
+NLMSGHDR = struct.Struct("=IHHII")
+IFINFOMSG = struct.Struct("=BxHiII")
+IFADDRMSG = struct.Struct("=BBBBI")
+RTATTR = struct.Struct("=HH")
+RECV_SIZE = 1 << 16
+RCVBUF = 1 << 20
+SYSFS_NET = "/sys/class/net"
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def parse_attributes(data: bytes, offset: int = 0) -> Dict[int, bytes]:
+    attributes = {}
+    while offset + RTATTR.size <= len(data):
+        length, kind = RTATTR.unpack_from(data, offset)
+        if length < RTATTR.size:
+            break
+        # The top bits are the NLA_F_NESTED / NLA_F_NET_BYTEORDER flags
+        attributes[kind & 0x3fff] = data[offset + RTATTR.size:offset + length]
+        offset += _align(length)
+    return attributes
+
+
+def iter_messages(data: bytes) -> Iterator[Tuple[int, int, bytes]]:
+    # (type, sequence, payload) for each netlink message in one datagram
+    offset = 0
+    while offset + NLMSGHDR.size <= len(data):
+        length, kind, _flags, seq, _pid = NLMSGHDR.unpack_from(data, offset)
+        if length < NLMSGHDR.size:
+            break
+        yield kind, seq, data[offset + NLMSGHDR.size:offset + length]
+        offset += _align(length)
+
+
+def _cstring(value: bytes) -> str:
+    return value.split(b"\0", 1)[0].decode(errors="replace")
+
+
+class Interface:
+    def __init__(self, index: int):
+        self.index = index
+        self.name = ""
+        self.mac = ""
+        self.mtu = 0
+        self.flags = 0
+        self.operstate = "unknown"
+        self.link_type = 0
+        self.kind = ""
+        self.wireless = False
+        self.addresses: Dict[str, int] = {}
+
+    @property
+    def up(self) -> bool:
+        return bool(self.flags & IFF_UP)
+
+    @property
+    def running(self) -> bool:
+        # Tunnels report "unknown" operstate but carry traffic once up
+        return self.up and (self.operstate == "up" or (self.operstate == "unknown" and bool(self.flags & IFF_LOWER_UP)))
+
+    @property
+    def loopback(self) -> bool:
+        return bool(self.flags & IFF_LOOPBACK) or self.link_type == ARPHRD_LOOPBACK
+
+    @property
+    def monitor(self) -> bool:
+        return self.link_type == ARPHRD_IEEE80211_RADIOTAP
+
+    def describe(self) -> str:
+        state = "monitor" if self.monitor else ("up" if self.running else self.operstate)
+        ips = ", ".join(address.split("/")[0] for address in self.addresses)
+        return f"{self.name} ({state}{', ' + ips if ips else ''})"
+
+
+class InterfaceTable:
+    """Interfaces by index with a name index on the side, kept current by
+    applying RTM_NEWLINK/DELLINK/NEWADDR/DELADDR messages."""
+
+    def __init__(self, sysfs: str = SYSFS_NET):
+        self.sysfs = sysfs
+        self._lock = threading.Lock()
+        self._by_index: Dict[int, Interface] = {}
+        self._by_name: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_index)
+
+    def get(self, name: str) -> Optional[Interface]:
+        with self._lock:
+            index = self._by_name.get(name)
+            return self._by_index.get(index) if index is not None else None
+
+    def interfaces(self) -> List[Interface]:
+        with self._lock:
+            return sorted(self._by_index.values(), key=lambda interface: interface.index)
+
+    def preferred(self, wireless: bool = False, monitor: bool = False) -> Optional[Interface]:
+        # First running non-loopback interface, ones with an address first;
+        # wireless/monitor narrow the choice
+        candidates = [interface for interface in self.interfaces() if not interface.loopback]
+        if monitor:
+            candidates = [interface for interface in candidates if interface.monitor]
+        elif wireless:
+            candidates = [interface for interface in candidates if interface.wireless or interface.monitor]
+        running = [interface for interface in candidates if interface.running or interface.monitor]
+        running.sort(key=lambda interface: not interface.addresses)
+        return (running or candidates or [None])[0]
+
+    def clear(self):
+        with self._lock:
+            self._by_index.clear()
+            self._by_name.clear()
+
+    def apply(self, kind: int, payload: bytes) -> Optional[Tuple[str, Interface]]:
+        # Returns (event, interface) when something changed
+        if kind in (RTM_NEWLINK, RTM_DELLINK):
+            return self._apply_link(kind, payload)
+        if kind in (RTM_NEWADDR, RTM_DELADDR):
+            return self._apply_address(kind, payload)
+        return None
+
+    def _apply_link(self, kind: int, payload: bytes) -> Optional[Tuple[str, Interface]]:
+        _family, link_type, index, flags, _change = IFINFOMSG.unpack_from(payload)
+        attributes = parse_attributes(payload, IFINFOMSG.size)
+        with self._lock:
+            interface = self._by_index.get(index)
+            if kind == RTM_DELLINK:
+                if interface is None:
+                    return None
+                del self._by_index[index]
+                if self._by_name.get(interface.name) == index:
+                    del self._by_name[interface.name]
+                return "removed", interface
+            event = "changed" if interface is not None else "added"
+            if interface is None:
+                interface = self._by_index[index] = Interface(index)
+            name = _cstring(attributes[IFLA_IFNAME]) if IFLA_IFNAME in attributes else interface.name
+            renamed = name != interface.name
+            if renamed:
+                # Renamed (udev does this to fresh USB adapters)
+                if self._by_name.get(interface.name) == index:
+                    del self._by_name[interface.name]
+                interface.name = name
+                self._by_name[name] = index
+            interface.flags = flags
+            interface.link_type = link_type
+            if IFLA_ADDRESS in attributes:
+                interface.mac = ":".join(f"{byte:02x}" for byte in attributes[IFLA_ADDRESS])
+            if IFLA_MTU in attributes:
+                interface.mtu = struct.unpack("=I", attributes[IFLA_MTU][:4])[0]
+            if IFLA_OPERSTATE in attributes:
+                state = attributes[IFLA_OPERSTATE][0]
+                interface.operstate = OPERSTATES[state] if state < len(OPERSTATES) else "unknown"
+            if IFLA_LINKINFO in attributes:
+                info = parse_attributes(attributes[IFLA_LINKINFO])
+                if IFLA_INFO_KIND in info:
+                    interface.kind = _cstring(info[IFLA_INFO_KIND])
+        if renamed:
+            interface.wireless = self._is_wireless(interface.name)
+        return event, interface
+
+    def _apply_address(self, kind: int, payload: bytes) -> Optional[Tuple[str, Interface]]:
+        family, prefix, _flags, _scope, index = IFADDRMSG.unpack_from(payload)
+        attributes = parse_attributes(payload, IFADDRMSG.size)
+        # IFA_LOCAL is the interface's own address on point-to-point links
+        raw = attributes.get(IFA_LOCAL) or attributes.get(IFA_ADDRESS)
+        if raw is None or family not in (socket.AF_INET, socket.AF_INET6):
+            return None
+        address = f"{socket.inet_ntop(family, raw)}/{prefix}"
+        with self._lock:
+            interface = self._by_index.get(index)
+            if interface is None:
+                return None
+            if kind == RTM_NEWADDR:
+                interface.addresses[address] = family
+            else:
+                interface.addresses.pop(address, None)
+        return "address", interface
+
+    def _is_wireless(self, name: str) -> bool:
+        # No nl80211 here; cfg80211 marks wireless devices in sysfs
+        base = os.path.join(self.sysfs, name)
+        return os.path.exists(os.path.join(base, "wireless")) or os.path.exists(os.path.join(base, "phy80211"))
+
+
+class NetlinkWatcher:
+    """Subscribes to rtnetlink link and address groups on a raw AF_NETLINK
+    socket, dumps the current state once and then applies every change to
+    `table` as the kernel reports it. on_change(event, interface) is called
+    from the watcher thread."""
+
+    def __init__(self, on_change: Callable[[str, Interface], None] = None, table: InterfaceTable = None):
+        self.on_change = on_change
+        self.table = table or InterfaceTable()
+        self._sock = None
+        self._seq = 0
+        self._thread = None
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._stop = threading.Event()
+
+    def start(self):
+        # Raises OSError where rtnetlink is unavailable
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF)
+        # Subscribe before dumping so no change falls between the two
+        sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV6_IFADDR))
+        self._sock = sock
+        self._resync()
+        self._thread = threading.Thread(target=self._run, name="netlink", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        os.write(self._wakeup_w, b"\0")
+        if self._thread is not None:
+            self._thread.join(2.0)
+        if self._sock is not None:
+            self._sock.close()
+        os.close(self._wakeup_r)
+        os.close(self._wakeup_w)
+
+    def _request(self, kind: int, body: bytes):
+        self._seq += 1
+        self._sock.send(NLMSGHDR.pack(NLMSGHDR.size + len(body), kind, NLM_F_REQUEST | NLM_F_DUMP, self._seq, 0) + body)
+        return self._seq
+
+    def _dump(self, kind: int, body: bytes):
+        seq = self._request(kind, body)
+        while True:
+            data = self._sock.recv(RECV_SIZE)
+            for message_kind, message_seq, payload in iter_messages(data):
+                if message_seq == seq and message_kind == NLMSG_DONE:
+                    return
+                if message_seq == seq and message_kind == NLMSG_ERROR:
+                    error = -struct.unpack_from("=i", payload)[0]
+                    if error:
+                        raise OSError(error, os.strerror(error))
+                    return
+                # Multicast notifications arriving mid-dump are applied in order too
+                self._handle(message_kind, payload, notify=message_seq != seq)
+
+    def _resync(self):
+        # Initial load, and recovery after the receive buffer overflowed
+        self.table.clear()
+        self._dump(RTM_GETLINK, IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0))
+        self._dump(RTM_GETADDR, IFADDRMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0))
+        if self.on_change is not None:
+            self.on_change("resync", None)
+
+    def _handle(self, kind: int, payload: bytes, notify: bool = True):
+        try:
+            change = self.table.apply(kind, payload)
+        except (struct.error, KeyError, ValueError):
+            return
+        if change is not None and notify and self.on_change is not None:
+            self.on_change(*change)
+
+    def _run(self):
+        selector = selectors.DefaultSelector()
+        selector.register(self._sock, selectors.EVENT_READ)
+        selector.register(self._wakeup_r, selectors.EVENT_READ)
+        try:
+            while not self._stop.is_set():
+                for key, _ in selector.select():
+                    if key.fileobj is not self._sock:
+                        continue
+                    try:
+                        data = self._sock.recv(RECV_SIZE)
+                    except OSError as e:
+                        if e.errno != errno.ENOBUFS:
+                            return
+                        # Events were dropped; the table can no longer be trusted
+                        self._resync()
+                        continue
+                    for kind, _seq, payload in iter_messages(data):
+                        if kind == NLMSG_OVERRUN:
+                            self._resync()
+                            break
+                        self._handle(kind, payload)
+        finally:
+            selector.close()
@@ -0,0 +1,209 @@
+import json
+import time
+import xml.etree.ElementTree as ET
+from typing import Callable, List, Optional, Tuple
+
+# host, port, proto, state, service, product, version, extra
+# port/proto are None for hosts seen without port results (nmap -sn)
+Finding = Tuple[str, Optional[int], Optional[str], str, str, str, str, str]
+
+BATCH_SIZE = 2000
+# Findings never wait longer than this for a batch to fill up
+MAX_DELAY = 1.0
+
+# nmap output options that already say where the XML goes
+_NMAP_XML_OPTIONS = ("-oX", "-oA")
+_NMAP_TEXT_OPTIONS = ("-oN", "-oG", "-oS", "-oA")
+_MASSCAN_OUTPUT_OPTIONS = ("-oX", "-oJ", "-oD", "-oG", "-oL", "-oB", "-oU", "--output-format", "--output-filename")
+
+
+class NmapXMLParser:
+    """Incremental parser for `nmap -oX -`. Each finished <host> element is
+    turned into findings and then dropped from the tree, so memory stays
+    flat however many hosts the scan covers."""
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._root = None
+        self._depth = 0
+        self.error = None
+
+    def feed(self, lines: List[str]) -> List[Finding]:
+        if self.error is not None:
+            return []
+        findings = []
+        try:
+            for line in lines:
+                self._parser.feed(line + "\n")
+                for event, element in self._parser.read_events():
+                    if event == "start":
+                        if self._root is None:
+                            self._root = element
+                        self._depth += 1
+                        continue
+                    self._depth -= 1
+                    # Only direct children of <nmaprun> are finished records
+                    if self._depth != 1:
+                        continue
+                    if element.tag == "host":
+                        findings.extend(self._host(element))
+                    self._root.remove(element)
+        except ET.ParseError as e:
+            # Not XML after all (or truncated); stop parsing, keep what we have
+            self.error = str(e)
+        return findings
+
+    def close(self) -> List[Finding]:
+        return []
+
+    @staticmethod
+    def _host(host: ET.Element) -> List[Finding]:
+        address = ""
+        for element in host.iter("address"):
+            if element.get("addrtype") in ("ipv4", "ipv6"):
+                address = element.get("addr", "")
+                break
+            address = address or element.get("addr", "")
+        status = host.find("status")
+        host_state = status.get("state", "") if status is not None else ""
+        hostname = host.find("hostnames/hostname")
+        name = hostname.get("name", "") if hostname is not None else ""
+        findings = []
+        for port in host.iter("port"):
+            state = port.find("state")
+            service = port.find("service")
+            findings.append((
+                address, int(port.get("portid", 0)), port.get("protocol"),
+                state.get("state", "") if state is not None else "",
+                service.get("name", "") if service is not None else "",
+                service.get("product", "") if service is not None else "",
+                service.get("version", "") if service is not None else "",
+                name,
+            ))
+        if not findings:
+            findings.append((address, None, None, host_state, "", "", "", name))
+        return findings
+
+
+class MasscanJSONParser:
+    """Line parser for `masscan -oJ -` (one object per line inside a JSON
+    array) and `-oD` (plain ndjson)."""
+
+    def __init__(self):
+        self.error = None
+
+    def feed(self, lines: List[str]) -> List[Finding]:
+        # "[", "]" and blank lines around the records are skipped
+        objects = [line for line in (line.strip().rstrip(",") for line in lines) if line.startswith("{")]
+        if not objects:
+            return []
+        try:
+            # One decoder call per batch instead of one per line
+            records = json.loads("[" + ",".join(objects) + "]")
+        except ValueError:
+            records = []
+            for line in objects:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        findings = []
+        for record in records:
+            ip = record.get("ip", "")
+            for port in record.get("ports", ()):
+                service = port.get("service") or {}
+                findings.append((ip, port.get("port"), port.get("proto"), port.get("status", ""),
+                                 service.get("name", ""), "", "", service.get("banner", "")))
+        return findings
+
+    def close(self) -> List[Finding]:
+        return []
+
+
+def structured_output(command: List[str]) -> Tuple[List[str], Optional[object]]:
+    """Adds machine-readable output to nmap/masscan commands that do not ask
+    for a file of their own. Returns the command to run and a parser for its
+    stdout, or the command unchanged and None."""
+    if not command:
+        return command, None
+    tool = command[0].rsplit("/", 1)[-1]
+    options = [arg[:3] if arg.startswith("-o") else arg for arg in command[1:]]
+    if tool == "nmap" and not any(option in _NMAP_XML_OPTIONS for option in options):
+        extra = ["-oX", "-"]
+        # Keep the human-readable report on stderr for the console
+        if not any(option in _NMAP_TEXT_OPTIONS for option in options):
+            extra += ["-oN", "/dev/stderr"]
+        return command + extra, NmapXMLParser()
+    if tool == "masscan" and not any(option in _MASSCAN_OUTPUT_OPTIONS for option in options):
+        return command + ["-oJ", "-"], MasscanJSONParser()
+    return command, None
+
+
+def stdout_parser(command: List[str]) -> Optional[object]:
+    # Parser for a command that already sends its findings to stdout, such as
+    # one structured_output() returned earlier (a journaled scan being resumed)
+    if not command:
+        return None
+    tool = command[0].rsplit("/", 1)[-1]
+    pairs = list(zip(command[1:], command[2:]))
+    if tool == "nmap" and ("-oX", "-") in pairs:
+        return NmapXMLParser()
+    if tool == "masscan" and ("-oJ", "-") in pairs:
+        return MasscanJSONParser()
+    return None
+
+
+class OutputIngest:
+    """Job output hook. stdout goes through `parser` as it streams and the
+    findings reach `sink` in batches of `batch_size`, or sooner once the
+    oldest has waited `max_delay` seconds; stderr is passed on to the console
+    unchanged. Call close() when the job ends."""
+
+    def __init__(self, parser, sink: Callable[[List[Finding]], None], batch_size: int = BATCH_SIZE,
+                 max_delay: float = MAX_DELAY):
+        self.parser = parser
+        self.sink = sink
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.pending: List[Finding] = []
+        self.pending_since = 0.0
+        self.records = 0
+        self.open_ports = 0
+        self.error = None
+
+    def __call__(self, stream: str, lines: List[str]) -> List[str]:
+        if stream == "stdout":
+            self._add(self.parser.feed(lines))
+        # Status lines on stderr keep arriving while stdout is quiet
+        if self.pending and time.monotonic() - self.pending_since >= self.max_delay:
+            self.flush()
+        return [] if stream == "stdout" else lines
+
+    def _add(self, findings: List[Finding]):
+        if not findings:
+            return
+        self.records += len(findings)
+        self.open_ports += sum(1 for finding in findings if finding[3] == "open")
+        if not self.pending:
+            self.pending_since = time.monotonic()
+        self.pending.extend(findings)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            batch, self.pending = self.pending, []
+            try:
+                self.sink(batch)
+            except Exception as e:
+                self.error = str(e)
+
+    def close(self):
+        self._add(self.parser.close())
+        self.flush()
+
+    def summary(self) -> str:
+        # Distinct hosts are counted by the store; keeping a set here would grow with the scan
+        text = f"{self.open_ports} open ports ({self.records} findings)"
+        error = self.error or self.parser.error
+        return f"{text}; {error}" if error else text
@@ -0,0 +1,152 @@
+import threading
+import time
+from typing import Callable, Dict, List, Set, Tuple
+
+# masscan prints every port of a host as it finds it; a host is handed to
+# nmap once no new port has shown up for LINGER seconds, or MAX_HOLD after
+# its first port, whichever comes first
+LINGER = 2.0
+MAX_HOLD = 15.0
+BATCH_HOSTS = 16
+DEFAULT_NMAP_ARGS = ["-sV", "-sC"]
+
+
+def split_pipeline_params(params: str) -> Tuple[List[str], List[str]]:
+    # "masscan -p1-65535 10.0.0.0/16 | nmap -sV --script vuln"
+    masscan, _, nmap = params.partition("|")
+    masscan_args = masscan.split()
+    nmap_args = nmap.split()
+    if masscan_args[:1] == ["masscan"]:
+        masscan_args = masscan_args[1:]
+    if nmap_args[:1] == ["nmap"]:
+        nmap_args = nmap_args[1:]
+    return masscan_args, nmap_args or list(DEFAULT_NMAP_ARGS)
+
+
+def nmap_command(args: List[str], hosts: List[str], ports: Tuple[Tuple[str, int], ...]) -> List[str]:
+    # masscan already saw the hosts answer, so nmap's host discovery is skipped
+    if "-Pn" not in args:
+        args = args + ["-Pn"]
+    tcp = [str(port) for proto, port in ports if proto != "udp"]
+    udp = [str(port) for proto, port in ports if proto == "udp"]
+    if not udp:
+        return ["nmap"] + args + ["-p", ",".join(tcp)] + hosts
+    # UDP ports need -sU next to the TCP scan type
+    spec = ",".join(([f"T:{','.join(tcp)}"] if tcp else []) + [f"U:{','.join(udp)}"])
+    scan_types = ["-sU"] + (["-sS"] if tcp and not any(arg.startswith("-s") and arg[2:3] in "STAWMNFX" for arg in args) else [])
+    return ["nmap"] + args + scan_types + ["-p", spec] + hosts
+
+
+class DiscoveryPipeline:
+    """Second stage of a masscan -> nmap run. feed() takes masscan findings
+    from any thread; open ports are collected per host and passed to
+    dispatch(hosts, ports) in batches of up to `batch_hosts` hosts with the
+    same port set, while masscan is still running. close() marks the end of
+    stage one and dispatches whatever is left."""
+
+    def __init__(self, dispatch: Callable[[List[str], Tuple[Tuple[str, int], ...]], None],
+                 batch_hosts: int = BATCH_HOSTS, linger: float = LINGER, max_hold: float = MAX_HOLD,
+                 clock: Callable[[], float] = time.monotonic):
+        self.dispatch = dispatch
+        self.batch_hosts = batch_hosts
+        self.linger = linger
+        self.max_hold = max_hold
+        self.clock = clock
+        # host -> (proto, port) pairs not dispatched yet, and when the host is due
+        self._pending: Dict[str, Set[Tuple[str, int]]] = {}
+        self._first_seen: Dict[str, float] = {}
+        self._due: Dict[str, float] = {}
+        self._dispatched: Set[Tuple[str, str, int]] = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self.closed = False
+        self.stopped = False
+        self.hosts: Set[str] = set()
+        self.open_ports = 0
+        self.batches = 0
+        self.finished_batches = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="discovery-pipeline", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        # Drops anything not dispatched yet
+        with self._cond:
+            self.stopped = True
+            self.closed = True
+            self._pending.clear()
+            self._due.clear()
+            self._cond.notify()
+
+    def feed(self, findings: List[Tuple]):
+        now = self.clock()
+        with self._cond:
+            if self.closed:
+                return
+            for host, port, proto, state in (finding[:4] for finding in findings):
+                if state != "open" or port is None:
+                    continue
+                key = (host, proto or "tcp", port)
+                if key in self._dispatched:
+                    continue
+                self._dispatched.add(key)
+                self.hosts.add(host)
+                self.open_ports += 1
+                self._pending.setdefault(host, set()).add(key[1:])
+                first = self._first_seen.setdefault(host, now)
+                self._due[host] = min(now + self.linger, first + self.max_hold)
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            if self.closed:
+                return
+            self.closed = True
+            batches = self._take(list(self._pending))
+            self._cond.notify()
+        self._send(batches)
+
+    def batch_finished(self) -> bool:
+        # Called once per dispatched batch; True when the whole pipeline is done
+        with self._cond:
+            self.finished_batches += 1
+            return self.done
+
+    @property
+    def done(self) -> bool:
+        return self.closed and not self._pending and self.finished_batches >= self.batches
+
+    def _take(self, hosts: List[str]) -> List[Tuple[List[str], Tuple[Tuple[str, int], ...]]]:
+        # Hosts with identical port sets share one nmap run
+        groups: Dict[Tuple[Tuple[str, int], ...], List[str]] = {}
+        for host in hosts:
+            ports = tuple(sorted(self._pending.pop(host)))
+            self._due.pop(host, None)
+            self._first_seen.pop(host, None)
+            groups.setdefault(ports, []).append(host)
+        batches = []
+        for ports, group in groups.items():
+            for i in range(0, len(group), self.batch_hosts):
+                batches.append((group[i:i + self.batch_hosts], ports))
+        self.batches += len(batches)
+        return batches
+
+    def _send(self, batches):
+        for hosts, ports in batches:
+            self.dispatch(hosts, ports)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self.closed:
+                    now = self.clock()
+                    due = [host for host, deadline in self._due.items() if deadline <= now]
+                    if due:
+                        break
+                    wait = min(self._due.values()) - now if self._due else None
+                    self._cond.wait(wait)
+                if self.closed:
+                    return
+                batches = self._take(due)
+            self._send(batches)
@@ -0,0 +1,547 @@
+import json
+import os
+import re
+import signal
+import shutil
+import socket
+import stat
+import struct
+import subprocess
+import sys
+import threading
+from array import array
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+
+# The helper is started once per session as `pkexec python3 privhelper.py
+# [--vpn-config PATH]` and talks JSON lines over a socketpair handed to it as
+# stdin. Once authorized it asks no more questions, so it only runs the exact
+# command lines of the anonymity actions (Full Anonymity, VPN, Tor, DNS, MAC)
+# below; argv[0] is resolved against TRUSTED_PATH, never against the
+# caller's PATH. Everything else, tool tabs included, pays a pkexec of its own.
+TRUSTED_PATH = "/usr/local/sbin:/usr/local/bin:/usr/sbin:/usr/bin:/sbin:/bin"
+SYSTEMD_UNITS = {"tor", "openvpn", "NetworkManager"}
+# stage_resolv_conf writes here unprivileged; only this file is moved into place
+STAGED_RESOLV_CONF = "/tmp/resolv.conf"
+_INTERFACE = re.compile(r"[A-Za-z0-9_.:@][A-Za-z0-9_.:@-]{0,14}")
+
+
+def _invoking_uid() -> int:
+    return int(os.environ.get("PKEXEC_UID", os.getuid()))
+
+
+def _root_owned(path: str) -> bool:
+    # openvpn runs its config's up/down scripts as root, so a config the user
+    # could edit would be a root shell
+    try:
+        info = os.stat(path)
+    except OSError:
+        return False
+    return stat.S_ISREG(info.st_mode) and info.st_uid == 0 and not info.st_mode & 0o022
+
+
+def _staged_file(path: str) -> bool:
+    # A regular file of the invoking user, not a link to something else
+    try:
+        info = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISREG(info.st_mode) and info.st_uid == _invoking_uid()
+
+
+def _interface(name: str) -> bool:
+    return _INTERFACE.fullmatch(name) is not None
+
+
+# Rules get the arguments after argv[0] and the VPN config the helper was started for
+ARGUMENT_RULES: Dict[str, Callable[[List[str], Optional[str]], bool]] = {
+    "openvpn": lambda args, vpn_config: (vpn_config is not None and args == ["--config", vpn_config, "--daemon"]
+                                         and _root_owned(vpn_config)),
+    "pkill": lambda args, _vpn_config: args in (["openvpn"], ["tor"]),
+    "systemctl": lambda args, _vpn_config: (len(args) == 2 and args[0] in ("start", "stop", "restart")
+                                            and args[1] in SYSTEMD_UNITS),
+    "mv": lambda args, _vpn_config: args == [STAGED_RESOLV_CONF, "/etc/resolv.conf"] and _staged_file(args[0]),
+    "ip": lambda args, _vpn_config: (len(args) == 4 and args[:2] == ["link", "set"] and _interface(args[2])
+                                     and args[3] in ("down", "up")),
+    "macchanger": lambda args, _vpn_config: len(args) == 2 and args[0] == "-r" and _interface(args[1]),
+}
+ALLOWED_COMMANDS = set(ARGUMENT_RULES)
+
+START_TIMEOUT = 300
+RECV_SIZE = 65536
+MAX_FDS = 8
+_UCRED = struct.Struct("3i")
+
+
+def is_allowed(command: List[str], vpn_config: str = None) -> bool:
+    name = os.path.basename(command[0]) if command else ""
+    rule = ARGUMENT_RULES.get(name)
+    return rule is not None and rule(command[1:], vpn_config)
+
+
+def resolve_command(command: List[str], vpn_config: str = None) -> List[str]:
+    if not command or not isinstance(command, list) or not all(isinstance(arg, str) for arg in command):
+        raise ValueError("malformed command")
+    name = os.path.basename(command[0])
+    if name not in ALLOWED_COMMANDS:
+        raise PermissionError(f"{name} is not on the helper allow-list")
+    path = shutil.which(name, path=TRUSTED_PATH)
+    if path is None:
+        raise FileNotFoundError(f"{name}: command not found")
+    if os.path.isabs(command[0]) and os.path.realpath(command[0]) != os.path.realpath(path):
+        raise PermissionError(f"{command[0]} is not the trusted {name}")
+    if not ARGUMENT_RULES[name](command[1:], vpn_config):
+        raise PermissionError(f"arguments not allowed for {name}: {' '.join(command[1:])}")
+    return [path] + command[1:]
+
+
+# ---------------------------------------------------------------- helper side
+
+class HelperServer:
+    """Runs as root. Requests are handled on their own threads so a long
+    batch or a streaming job never holds up the next request."""
+
+    def __init__(self, sock: socket.socket, vpn_config: str = None):
+        self.sock = sock
+        self.vpn_config = vpn_config
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._processes: Dict[int, List[subprocess.Popen]] = {}
+
+    def send(self, message: Dict, fds: List[int] = ()):
+        data = (json.dumps(message) + "\n").encode()
+        with self._send_lock:
+            if fds:
+                sent = self.sock.sendmsg([data], [(socket.SOL_SOCKET, socket.SCM_RIGHTS, array("i", fds))])
+                data = data[sent:]
+            if data:
+                self.sock.sendall(data)
+
+    def serve(self):
+        self.send({"ready": True, "pid": os.getpid()})
+        reader = self.sock.makefile("rb")
+        for line in reader:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                continue
+            op = request.get("op")
+            if op == "spawn":
+                self._spawn(request)
+            elif op == "batch":
+                threading.Thread(target=self._batch, args=(request,), daemon=True).start()
+            elif op == "signal":
+                self._signal(request.get("target"), request.get("signal", signal.SIGTERM))
+            elif op == "ping":
+                self.send({"id": request.get("id"), "pong": True})
+        # The session is gone; nothing the helper started should outlive it
+        # except daemons that detached on their own (openvpn --daemon)
+        for target in list(self._processes):
+            self._signal(target, signal.SIGTERM)
+
+    def _track(self, request_id: int, proc: subprocess.Popen):
+        with self._lock:
+            self._processes.setdefault(request_id, []).append(proc)
+
+    def _untrack(self, request_id: int, proc: subprocess.Popen):
+        with self._lock:
+            procs = self._processes.get(request_id, [])
+            if proc in procs:
+                procs.remove(proc)
+            if not procs:
+                self._processes.pop(request_id, None)
+
+    def _signal(self, target: int, sig: int):
+        with self._lock:
+            procs = list(self._processes.get(target, []))
+        for proc in procs:
+            try:
+                os.killpg(proc.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def _spawn(self, request: Dict):
+        request_id = request.get("id")
+        try:
+            argv = resolve_command(request.get("argv"), self.vpn_config)
+            if request.get("cwd") is not None:
+                raise PermissionError("the helper runs nothing that needs a working directory")
+            proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, start_new_session=True, cwd="/")
+        except (OSError, ValueError) as e:
+            self.send({"id": request_id, "error": str(e)})
+            return
+        self._track(request_id, proc)
+        # The caller reads the pipes directly; only the exit status comes back as a message
+        self.send({"id": request_id, "pid": proc.pid, "fds": 2}, [proc.stdout.fileno(), proc.stderr.fileno()])
+        proc.stdout.close()
+        proc.stderr.close()
+
+        def wait():
+            # wait4 so the caller gets the tool's rusage along with its exit status
+            try:
+                _pid, status, rusage = os.wait4(proc.pid, 0)
+                proc.returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+                usage = {"cpu_user": rusage.ru_utime, "cpu_system": rusage.ru_stime, "max_rss": rusage.ru_maxrss * 1024,
+                         "read_bytes": rusage.ru_inblock * 512, "write_bytes": rusage.ru_oublock * 512}
+            except ChildProcessError:
+                proc.wait()
+                usage = None
+            self._untrack(request_id, proc)
+            self.send({"id": request_id, "exit": proc.returncode, "rusage": usage})
+        threading.Thread(target=wait, daemon=True).start()
+
+    def _batch(self, request: Dict):
+        request_id = request.get("id")
+        timeout = request.get("timeout")
+        chains = request.get("chains") or []
+        threads = [threading.Thread(target=self._chain, args=(request_id, index, chain, timeout), daemon=True)
+                   for index, chain in enumerate(chains)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.send({"id": request_id, "done": True})
+
+    def _chain(self, request_id: int, chain_index: int, chain: List[List[str]], timeout: Optional[float]):
+        # Steps of one chain depend on each other (ip link down, macchanger, ip link up)
+        for step_index, command in enumerate(chain):
+            message = {"id": request_id, "chain": chain_index, "step": step_index}
+            message.update(self._run_step(request_id, command, timeout))
+            self.send(message)
+            if message["returncode"] != 0:
+                break
+
+    def _run_step(self, request_id: int, command: List[str], timeout: Optional[float]) -> Dict:
+        try:
+            proc = subprocess.Popen(resolve_command(command, self.vpn_config), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, start_new_session=True)
+        except (OSError, ValueError) as e:
+            return {"returncode": 1, "stdout": "", "stderr": str(e)}
+        self._track(request_id, proc)
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+            timed_out = False
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            stdout, stderr = proc.communicate()
+            timed_out = True
+        finally:
+            self._untrack(request_id, proc)
+        return {"returncode": proc.returncode, "stdout": stdout.decode(errors="replace"),
+                "stderr": stderr.decode(errors="replace"), "timeout": timed_out}
+
+
+def main():
+    # The VPN config is part of the command line the user authorized
+    if sys.argv[1:2] == ["--vpn-config"] and len(sys.argv) == 3:
+        vpn_config = sys.argv[2]
+    elif len(sys.argv) == 1:
+        vpn_config = None
+    else:
+        sys.exit("usage: privhelper.py [--vpn-config PATH]")
+    sock = socket.socket(fileno=os.dup(0))
+    # Only the session that started us may talk to us: pkexec records the
+    # invoking user in PKEXEC_UID, the socket tells us who is on the other end
+    _pid, uid, _gid = _UCRED.unpack(sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, _UCRED.size))
+    if uid != _invoking_uid():
+        sys.exit("penmode helper: peer is not the invoking user")
+    # Keep the socket away from children that would otherwise inherit it as stdin/stdout
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.environ["PATH"] = TRUSTED_PATH
+    HelperServer(sock, vpn_config).serve()
+
+
+# ---------------------------------------------------------------- client side
+
+class HelperProcess:
+    # Popen look-alike for a command started by the helper. stdout/stderr are
+    # the pipe ends passed back over the socket, so callers read them as usual.
+    def __init__(self, helper: "PrivilegedHelper", request_id: int, args: List[str], pid: int, stdout, stderr):
+        self.helper = helper
+        self.request_id = request_id
+        self.args = args
+        self.pid = pid
+        self.stdout = stdout
+        self.stderr = stderr
+        self.returncode = None
+        # Filled in by the helper from wait4() when the process exits
+        self.rusage: Optional[Dict] = None
+        self._exited = threading.Event()
+
+    def _set_exit(self, returncode: int, rusage: Dict = None):
+        self.returncode = returncode
+        self.rusage = rusage
+        self._exited.set()
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: float = None) -> int:
+        if not self._exited.wait(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    def signal_group(self, sig: int):
+        self.helper.send({"op": "signal", "target": self.request_id, "signal": int(sig)})
+
+
+class _Request:
+    def __init__(self, command=None, on_result: Callable = None, chains: List[List[List[str]]] = None):
+        self.command = command
+        self.chains = chains
+        self.future = Future()
+        self.on_result = on_result
+        self.results: List[List[subprocess.CompletedProcess]] = [[] for _ in chains or []]
+        self.process: Optional[HelperProcess] = None
+
+
+class PrivilegedHelper:
+    """Client for the privileged helper. The helper is started (and the user
+    authenticates) on first use and then serves the allow-listed anonymity
+    commands of the session. Everything else, and every command when
+    enabled=False, pays its own pkexec as before."""
+
+    def __init__(self, elevate: List[str] = ("pkexec",), python: str = sys.executable,
+                 script: str = os.path.abspath(__file__), start_timeout: float = START_TIMEOUT,
+                 enabled: bool = True):
+        self.elevate = list(elevate)
+        self.python = python
+        self.script = script
+        self.start_timeout = start_timeout
+        self.enabled = enabled
+        self.vpn_config: Optional[str] = None
+        self._start_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._proc: Optional[subprocess.Popen] = None
+        self._ready = threading.Event()
+        self._requests: Dict[int, _Request] = {}
+        self._next_id = 1
+
+    @property
+    def running(self) -> bool:
+        return self._sock is not None and self._ready.is_set() and self._proc.poll() is None
+
+    def set_vpn_config(self, path: str):
+        # The helper only starts openvpn with the config it was authorized for;
+        # another one means a new helper, and a new authorization
+        if path != self.vpn_config:
+            self.vpn_config = path
+            self.stop()
+
+    def allowed(self, command: List[str]) -> bool:
+        return self.enabled and is_allowed(command, self.vpn_config)
+
+    def start(self):
+        # Raises CalledProcessError when the user dismisses the polkit dialog
+        with self._start_lock:
+            if self.running:
+                return
+            parent, child = socket.socketpair()
+            argv = self.elevate + [self.python, self.script]
+            if self.vpn_config:
+                argv += ["--vpn-config", self.vpn_config]
+            try:
+                proc = subprocess.Popen(argv, stdin=child, stdout=child, stderr=subprocess.DEVNULL)
+            finally:
+                child.close()
+            self._ready.clear()
+            self._sock, self._proc = parent, proc
+            threading.Thread(target=self._reader, args=(parent,), name="privhelper", daemon=True).start()
+            waited = 0.0
+            while not self._ready.wait(0.1):
+                waited += 0.1
+                if proc.poll() is not None or waited >= self.start_timeout:
+                    self._close_socket(parent)
+                    if proc.poll() is None:
+                        proc.kill()
+                    returncode = proc.wait()
+                    output = "Authentication canceled by user" if returncode in (126, 127) else "Privileged helper did not start"
+                    raise subprocess.CalledProcessError(returncode, argv, output=output)
+
+    def stop(self):
+        with self._start_lock:
+            if self._sock is not None:
+                self._close_socket(self._sock)
+            if self._proc is not None:
+                try:
+                    self._proc.wait(timeout=2)
+                except subprocess.TimeoutExpired:
+                    pass
+
+    def send(self, message: Dict):
+        data = (json.dumps(message) + "\n").encode()
+        with self._lock:
+            sock = self._sock
+            if sock is None:
+                raise OSError("privileged helper is not running")
+            sock.sendall(data)
+
+    def run(self, command: List[str], timeout: float = None) -> subprocess.CompletedProcess:
+        if not self.allowed(command):
+            return self._run_direct(command, timeout)
+        try:
+            result = self.run_batch([[command]], timeout).result()[0][0]
+        except OSError as e:
+            raise subprocess.CalledProcessError(1, command, output=str(e))
+        if isinstance(result, subprocess.TimeoutExpired):
+            raise subprocess.TimeoutExpired(command, timeout)
+        return result
+
+    def run_batch(self, chains: List[List[List[str]]], timeout: float = None,
+                  on_result: Callable[[int, int, object], None] = None) -> Future:
+        """Chains run in parallel, the steps of a chain one after another
+        until one fails. on_result(chain, step, result) is called as each step
+        finishes; the Future resolves to the per-chain lists of results. A
+        result is a CompletedProcess, or TimeoutExpired for a step that ran out
+        of time."""
+        if not all(self.allowed(command) for chain in chains for command in chain):
+            return self._run_batch_direct(chains, timeout, on_result)
+        self.start()
+        request = _Request(on_result=on_result, chains=chains)
+        request_id = self._register(request)
+        try:
+            self.send({"id": request_id, "op": "batch", "chains": chains, "timeout": timeout})
+        except OSError as e:
+            self._requests.pop(request_id, None)
+            request.future.set_exception(e)
+        return request.future
+
+    def spawn(self, command: List[str], cwd: str = None):
+        # Used by stream_process for privileged jobs; tool commands are never
+        # on the allow-list and each get their own pkexec
+        if cwd is not None or not self.allowed(command):
+            return subprocess.Popen(["pkexec"] + command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, start_new_session=True, cwd=cwd)
+        self.start()
+        request = _Request(command)
+        request_id = self._register(request)
+        self.send({"id": request_id, "op": "spawn", "argv": command, "cwd": cwd})
+        return request.future.result()
+
+    def _register(self, request: _Request) -> int:
+        with self._lock:
+            request_id = self._next_id
+            self._next_id += 1
+            self._requests[request_id] = request
+        return request_id
+
+    def _close_socket(self, sock: socket.socket):
+        with self._lock:
+            if self._sock is sock:
+                self._sock = None
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        sock.close()
+
+    def _reader(self, sock: socket.socket):
+        buffer = b""
+        fds = deque()
+        while True:
+            try:
+                data, ancdata, _flags, _address = sock.recvmsg(RECV_SIZE, socket.CMSG_SPACE(MAX_FDS * 4))
+            except OSError:
+                break
+            for level, kind, payload in ancdata:
+                if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+                    fds.extend(array("i", payload[:len(payload) - len(payload) % 4]))
+            if not data:
+                break
+            buffer += data
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                self._dispatch(json.loads(line), fds)
+        for fd in fds:
+            os.close(fd)
+        self._lost(sock)
+
+    def _dispatch(self, message: Dict, fds: deque):
+        if message.get("ready"):
+            self._ready.set()
+            return
+        request = self._requests.get(message.get("id"))
+        received = [fds.popleft() for _ in range(message.get("fds", 0))]
+        if request is None:
+            for fd in received:
+                os.close(fd)
+            return
+        if "error" in message:
+            self._requests.pop(message["id"], None)
+            request.future.set_exception(subprocess.CalledProcessError(1, request.command, stderr=message["error"]))
+        elif "pid" in message:
+            stdout, stderr = (open(fd, "rb", buffering=0) for fd in received)
+            request.process = HelperProcess(self, message["id"], request.command, message["pid"], stdout, stderr)
+            request.future.set_result(request.process)
+        elif "exit" in message:
+            self._requests.pop(message["id"], None)
+            request.process._set_exit(message["exit"], message.get("rusage"))
+        elif "chain" in message:
+            result = self._step_result(message, request.chains[message["chain"]][message["step"]])
+            request.results[message["chain"]].append(result)
+            if request.on_result is not None:
+                request.on_result(message["chain"], message["step"], result)
+        elif message.get("done"):
+            self._requests.pop(message["id"], None)
+            request.future.set_result(request.results)
+
+    @staticmethod
+    def _step_result(message: Dict, command: List[str]):
+        if message.get("timeout"):
+            return subprocess.TimeoutExpired(command, None, output=message["stdout"], stderr=message["stderr"])
+        return subprocess.CompletedProcess(command, message["returncode"], message["stdout"], message["stderr"])
+
+    def _lost(self, sock: socket.socket):
+        # The helper exited (or was killed); fail whatever was still waiting on it
+        self._close_socket(sock)
+        with self._lock:
+            requests, self._requests = self._requests, {}
+        for request in requests.values():
+            if request.process is not None:
+                request.process._set_exit(-signal.SIGKILL)
+            elif not request.future.done():
+                request.future.set_exception(OSError("privileged helper exited"))
+
+    def _run_direct(self, command: List[str], timeout: float = None) -> subprocess.CompletedProcess:
+        return subprocess.run(["pkexec"] + command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              text=True, timeout=timeout)
+
+    def _run_batch_direct(self, chains: List[List[List[str]]], timeout: float = None,
+                          on_result: Callable[[int, int, object], None] = None) -> Future:
+        future = Future()
+        results: List[List] = [[] for _ in chains]
+
+        def run_chain(index: int, chain: List[List[str]]):
+            for step, command in enumerate(chain):
+                try:
+                    result = self._run_direct(command, timeout)
+                except subprocess.TimeoutExpired as e:
+                    result = e
+                results[index].append(result)
+                if on_result is not None:
+                    on_result(index, step, result)
+                if not isinstance(result, subprocess.CompletedProcess) or result.returncode != 0:
+                    break
+
+        def run_all():
+            threads = [threading.Thread(target=run_chain, args=(index, chain), daemon=True)
+                       for index, chain in enumerate(chains)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            future.set_result(results)
+        threading.Thread(target=run_all, daemon=True).start()
+        return future
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from penmode.sampler import format_bytes
+
+COLUMNS = ["Date", "Tool", "Params", "Result", "Status", "Duration", "User CPU", "Sys CPU", "Peak RSS", "Read", "Written"]
+# Stand-in for resource figures that were not measured; sorts below every real value
+UNMEASURED = -1
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+RESULT_PREVIEW = 100
+
+
+def date_key(value: datetime) -> int:
+    # 2025-03-01 12:30:05 -> 20250301123005; orders like the date itself
+    return (((value.year * 100 + value.month) * 100 + value.day) * 100 + value.hour) * 10000 + value.minute * 100 + value.second
+
+
+def format_date_key(key: int) -> str:
+    digits = f"{key:014d}"
+    return f"{digits[0:4]}-{digits[4:6]}-{digits[6:8]} {digits[8:10]}:{digits[10:12]}:{digits[12:14]}"
+
+
+def preview(data: str) -> str:
+    return data[:RESULT_PREVIEW] + "..." if len(data) > RESULT_PREVIEW else data
+
+
+def parse_duration(text) -> float:
+    if isinstance(text, (int, float)):
+        return float(text)
+    try:
+        return float(str(text).rstrip("s") or 0)
+    except ValueError:
+        return 0.0
+
+
+class StringPool:
+    def __init__(self):
+        self.strings: List[str] = []
+        self.ids: Dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        index = self.ids.get(value)
+        if index is None:
+            index = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return index
+
+    def sync(self):
+        # Picks up ids assigned directly through ids.setdefault(); the dict
+        # keeps insertion order, so new strings are the tail of its keys
+        if len(self.strings) < len(self.ids):
+            self.strings.extend(list(self.ids)[len(self.strings):])
+
+    def clear(self):
+        self.strings = []
+        self.ids = {}
+
+
+class ResultsStore:
+    """Column-oriented storage for the Results grid: numbers live in typed
+    arrays, repeated strings (tool, params, status, output blob references)
+    are interned, and only the result preview is kept per row as a plain str.
+    Resource figures that were not measured are stored as UNMEASURED."""
+
+    def __init__(self):
+        self.pool = StringPool()
+        self.clear()
+
+    def clear(self):
+        self.pool.clear()
+        self.dates = array("q")
+        self.tools = array("I")
+        self.params = array("I")
+        self.statuses = array("I")
+        self.durations = array("d")
+        self.blobs = array("I")
+        self.cpu_user = array("d")
+        self.cpu_system = array("d")
+        self.max_rss = array("q")
+        self.read_bytes = array("q")
+        self.write_bytes = array("q")
+        self.results: List[str] = []
+        self.chronological = True
+
+    def _usage_arrays(self) -> Tuple[array, ...]:
+        return self.cpu_user, self.cpu_system, self.max_rss, self.read_bytes, self.write_bytes
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def append(self, date: int, tool: str, params: str, result: str, status: str, duration: float,
+               blob: str = None, usage=None) -> int:
+        intern = self.pool.intern
+        if self.dates and date < self.dates[-1]:
+            self.chronological = False
+        self.dates.append(date)
+        self.tools.append(intern(tool))
+        self.params.append(intern(params))
+        self.statuses.append(intern(status))
+        self.durations.append(duration)
+        self.blobs.append(intern(blob or ""))
+        values = usage.values() if usage is not None else (None,) * 5
+        for column, value in zip(self._usage_arrays(), values):
+            column.append(UNMEASURED if value is None else value)
+        self.results.append(result)
+        return len(self.dates) - 1
+
+    def extend_rows(self, rows: Iterable[Tuple]):
+        # Bulk path for history loads: (date key, tool, params, result, status, duration, blob,
+        # cpu_user, cpu_system, max_rss, read_bytes, write_bytes)
+        ids = self.pool.ids
+        dates, tools, params, statuses = [], [], [], []
+        durations, blobs, results = [], [], []
+        usage: List[list] = [[], [], [], [], []]
+        for date, tool, param, result, status, duration, blob, *measured in rows:
+            dates.append(date)
+            tools.append(ids.setdefault(tool, len(ids)))
+            params.append(ids.setdefault(param, len(ids)))
+            statuses.append(ids.setdefault(status, len(ids)))
+            durations.append(duration)
+            blobs.append(ids.setdefault(blob or "", len(ids)))
+            for column, value in zip(usage, measured):
+                column.append(UNMEASURED if value is None else value)
+            results.append(result)
+        self.pool.sync()
+        if not dates:
+            return
+        previous = self.dates[-1] if self.dates else dates[0]
+        if self.chronological and (dates[0] < previous or any(b < a for a, b in zip(dates, dates[1:]))):
+            self.chronological = False
+        self.dates.extend(dates)
+        self.tools.extend(tools)
+        self.params.extend(params)
+        self.statuses.extend(statuses)
+        self.durations.extend(durations)
+        self.blobs.extend(blobs)
+        for column, values in zip(self._usage_arrays(), usage):
+            column.extend(values)
+        self.results.extend(results)
+
+    def tool(self, row: int) -> str:
+        return self.pool.strings[self.tools[row]]
+
+    def status(self, row: int) -> str:
+        return self.pool.strings[self.statuses[row]]
+
+    def blob(self, row: int) -> str:
+        return self.pool.strings[self.blobs[row]]
+
+    def cpu_time(self, row: int) -> float:
+        user, system = self.cpu_user[row], self.cpu_system[row]
+        if user == UNMEASURED and system == UNMEASURED:
+            return UNMEASURED
+        return max(user, 0.0) + max(system, 0.0)
+
+    def cell(self, row: int, column: int) -> str:
+        if column == 0:
+            return format_date_key(self.dates[row])
+        if column == 1:
+            return self.pool.strings[self.tools[row]]
+        if column == 2:
+            return self.pool.strings[self.params[row]]
+        if column == 3:
+            return self.results[row]
+        if column == 4:
+            return self.pool.strings[self.statuses[row]]
+        if column == 5:
+            return f"{self.durations[row]:.2f}s"
+        value = self._usage_arrays()[column - 6][row]
+        if value == UNMEASURED:
+            return ""
+        return f"{value:.2f}s" if column < 8 else format_bytes(value)
+
+    def sort_key(self, column: int):
+        strings = self.pool.strings
+        keys = {
+            0: self.dates.__getitem__,
+            1: lambda row: strings[self.tools[row]],
+            2: lambda row: strings[self.params[row]],
+            3: self.results.__getitem__,
+            4: lambda row: strings[self.statuses[row]],
+            5: self.durations.__getitem__,
+            6: self.cpu_user.__getitem__,
+            7: self.cpu_system.__getitem__,
+            8: self.max_rss.__getitem__,
+            9: self.read_bytes.__getitem__,
+            10: self.write_bytes.__getitem__,
+        }
+        return keys[column]
+
+    def rows_for_tool(self, tool: str) -> List[int]:
+        tool_id = self.pool.ids.get(tool)
+        if tool_id is None:
+            return []
+        return [row for row, value in enumerate(self.tools) if value == tool_id]
+
+    def stat_rows(self) -> Iterable[Tuple[str, str, float, Optional[float], Optional[int], Optional[int]]]:
+        # (tool, status, duration, cpu seconds, peak rss, bytes read + written); None when not measured
+        strings = self.pool.strings
+        for row, (tool, status, duration) in enumerate(zip(self.tools, self.statuses, self.durations)):
+            cpu = self.cpu_time(row)
+            rss = self.max_rss[row]
+            reads, writes = self.read_bytes[row], self.write_bytes[row]
+            io = None if reads == UNMEASURED and writes == UNMEASURED else max(reads, 0) + max(writes, 0)
+            yield (strings[tool], strings[status], duration, None if cpu == UNMEASURED else cpu,
+                   None if rss == UNMEASURED else rss, io)
+
+    def select(self, date_range: Optional[Tuple[int, int]] = None, column: int = 0, descending: bool = False) -> array:
+        """Row numbers inside `date_range` (inclusive keys), ordered by `column`."""
+        rows = range(len(self))
+        if date_range is not None:
+            start, end = date_range
+            if self.chronological:
+                rows = range(_bisect_left(self.dates, start), _bisect_right(self.dates, end))
+            else:
+                rows = [row for row in rows if start <= self.dates[row] <= end]
+        if column == 0 and self.chronological:
+            ordered = reversed(rows) if descending else rows
+        else:
+            ordered = sorted(rows, key=self.sort_key(column), reverse=descending)
+        return array("I", ordered)
+
+
+def _bisect_left(values: array, key: int) -> int:
+    lo, hi = 0, len(values)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if values[mid] < key:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _bisect_right(values: array, key: int) -> int:
+    lo, hi = 0, len(values)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if key < values[mid]:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
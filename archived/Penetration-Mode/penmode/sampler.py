@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_CAPACITY = 300
+SERIES = ("cpu", "memory", "load", "disk")
+
+
+class RingBuffer:
+    # Fixed-size float history; appends overwrite the oldest sample
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.data = array("d", bytes(8 * capacity))
+        self.head = 0
+        self.count = 0
+
+    def append(self, value: float):
+        self.data[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+
+    def values(self) -> List[float]:
+        start = (self.head - self.count) % self.capacity
+        if start + self.count <= self.capacity:
+            return self.data[start:start + self.count].tolist()
+        return (self.data[start:] + self.data[:self.head]).tolist()
+
+    def last(self) -> Optional[float]:
+        return self.data[(self.head - 1) % self.capacity] if self.count else None
+
+    def __len__(self) -> int:
+        return self.count
+
+
+def read_cpu_times() -> Tuple[int, int]:
+    # (busy, total) jiffies from the aggregate "cpu" line; guest time is
+    # already counted in user/nice, so only the first eight fields are summed
+    with open("/proc/stat", "rb") as f:
+        fields = [int(value) for value in f.readline().split()[1:9]]
+    idle = fields[3] + fields[4]
+    total = sum(fields)
+    return total - idle, total
+
+
+def read_meminfo() -> Tuple[int, int]:
+    # (used, total) bytes; MemAvailable is what the kernel considers reclaimable
+    values = {}
+    with open("/proc/meminfo", "rb") as f:
+        for line in f:
+            key, _, rest = line.partition(b":")
+            if key in (b"MemTotal", b"MemAvailable", b"MemFree"):
+                values[key] = int(rest.split()[0]) * 1024
+    total = values.get(b"MemTotal", 0)
+    available = values.get(b"MemAvailable", values.get(b"MemFree", 0))
+    return total - available, total
+
+
+def read_loadavg() -> float:
+    with open("/proc/loadavg", "rb") as f:
+        return float(f.read().split()[0])
+
+
+def read_disk(path: str = "/") -> Tuple[int, int]:
+    # (free, total) bytes available to unprivileged users
+    stat = os.statvfs(path)
+    return stat.f_bavail * stat.f_frsize, stat.f_blocks * stat.f_frsize
+
+
+def format_bytes(value: float) -> str:
+    for unit in ("B", "K", "M", "G"):
+        if value < 1024:
+            return f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{value:.1f}T"
+
+
+class ResourceSampler:
+    """Samples CPU, memory, load and disk straight from /proc and statvfs on
+    its own thread and keeps the last `capacity` samples of each series with
+    their wall-clock times, so they line up with Job.started_at/finished_at."""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, capacity: int = DEFAULT_CAPACITY,
+                 disk_path: str = "/", on_sample: Callable[[Dict], None] = None):
+        self.interval = interval
+        self.capacity = capacity
+        self.disk_path = disk_path
+        self.on_sample = on_sample
+        self.times = RingBuffer(capacity)
+        self.series: Dict[str, RingBuffer] = {name: RingBuffer(capacity) for name in SERIES}
+        self.latest: Dict = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._previous_cpu = None
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="resource-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def set_interval(self, interval: float):
+        self.interval = max(0.1, interval)
+        self._wakeup.set()
+
+    def sample_now(self):
+        self._wakeup.set()
+
+    def snapshot(self) -> Tuple[List[float], Dict[str, List[float]]]:
+        with self._lock:
+            return self.times.values(), {name: buffer.values() for name, buffer in self.series.items()}
+
+    def sample(self) -> Dict:
+        busy, total = read_cpu_times()
+        if self._previous_cpu is None:
+            cpu = 0.0
+        else:
+            busy_delta = busy - self._previous_cpu[0]
+            total_delta = total - self._previous_cpu[1]
+            cpu = 100.0 * busy_delta / total_delta if total_delta > 0 else 0.0
+        self._previous_cpu = (busy, total)
+        mem_used, mem_total = read_meminfo()
+        disk_free, disk_total = read_disk(self.disk_path)
+        return {
+            "time": time.time(),
+            "cpu": cpu,
+            "memory": 100.0 * mem_used / mem_total if mem_total else 0.0,
+            "memory_used": mem_used,
+            "memory_total": mem_total,
+            "load": read_loadavg(),
+            "disk": 100.0 * (disk_total - disk_free) / disk_total if disk_total else 0.0,
+            "disk_free": disk_free,
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                sample = self.sample()
+            except (OSError, ValueError, IndexError):
+                sample = None
+            if sample is not None:
+                with self._lock:
+                    self.times.append(sample["time"])
+                    for name, buffer in self.series.items():
+                        buffer.append(sample[name])
+                    self.latest = sample
+                if self.on_sample is not None:
+                    self.on_sample(sample)
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
@@ -0,0 +1,292 @@
+import ipaddress
+import itertools
+import re
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Below this many packets per second a shard is not worth its own process
+MIN_SHARD_RATE = 100
+# Ranges smaller than two of these are scanned by a single process
+MIN_SHARD_HOSTS = 16
+
+# nmap options whose value is the next argument
+NMAP_VALUE_OPTIONS = {
+    "-p", "-e", "-S", "-D", "-g", "-b", "-sI", "-iL", "-iR", "-oN", "-oX", "-oS", "-oG", "-oA", "-oM",
+    "--exclude", "--excludefile", "--exclude-ports", "--max-rate", "--min-rate", "--source-port",
+    "--data", "--data-string", "--data-length", "--ttl", "--mtu", "--spoof-mac", "--proxies",
+    "--script", "--script-args", "--script-args-file", "--script-timeout", "--top-ports", "--port-ratio",
+    "--version-intensity", "--max-retries", "--host-timeout", "--scan-delay", "--max-scan-delay",
+    "--min-hostgroup", "--max-hostgroup", "--min-parallelism", "--max-parallelism",
+    "--min-rtt-timeout", "--max-rtt-timeout", "--initial-rtt-timeout", "--stats-every",
+    "--dns-servers", "--datadir", "--servicedb", "--versiondb", "--stylesheet", "--resume", "--scanflags",
+}
+# Target lists nmap reads or picks itself, and output files every shard
+# would overwrite; such runs are never split
+_UNSHARDABLE = {"-iL", "-iR", "--resume", "-oN", "-oX", "-oS", "-oG", "-oA", "-oM"}
+_OCTET_RANGE = re.compile(r"^[\d,\-*]+(\.[\d,\-*]+){3}$")
+_NUMERIC_PORTS = re.compile(r"^\d+(-\d+)?(,\d+(-\d+)?)*$")
+
+Range = Tuple[int, int]
+
+
+class Shard:
+    def __init__(self, index: int, targets: List[str], ports: Optional[str] = None):
+        self.index = index
+        self.targets = targets
+        self.ports = ports
+        self.addresses = 0
+
+    def describe(self) -> str:
+        text = " ".join(self.targets[:2]) + (" ..." if len(self.targets) > 2 else "")
+        return f"{text} -p {self.ports}" if self.ports else text
+
+
+class NmapCommand:
+    """An nmap argument list split into options, targets and the -p spec."""
+
+    def __init__(self, args: List[str]):
+        self.options: List[str] = []
+        self.targets: List[str] = []
+        self.ports: Optional[str] = None
+        self.max_rate: Optional[int] = None
+        self.shardable = True
+        args = iter(args)
+        for arg in args:
+            if arg in _UNSHARDABLE or arg.startswith("--resume="):
+                self.shardable = False
+            if arg == "-p":
+                self.ports = next(args, "")
+            elif arg.startswith("-p") and len(arg) > 2:
+                self.ports = arg[2:]
+            elif arg == "--max-rate" or arg.startswith("--max-rate="):
+                value = next(args, "") if arg == "--max-rate" else arg.split("=", 1)[1]
+                try:
+                    self.max_rate = int(float(value))
+                except ValueError:
+                    self.options += ["--max-rate", value]
+            elif arg in NMAP_VALUE_OPTIONS:
+                self.options += [arg, next(args, "")]
+            elif arg.startswith("-"):
+                self.options.append(arg)
+            else:
+                self.targets.append(arg)
+
+    def build(self, shard: Shard = None, max_rate: int = None) -> List[str]:
+        command = ["nmap"] + self.options
+        ports = shard.ports if shard is not None and shard.ports else self.ports
+        if ports:
+            command += ["-p", ports]
+        rate = max_rate or self.max_rate
+        if rate:
+            command += ["--max-rate", str(rate)]
+        return command + (shard.targets if shard is not None else self.targets)
+
+
+def _octet_values(spec: str) -> Optional[List[int]]:
+    values = []
+    for part in spec.split(","):
+        if part == "*":
+            low, high = 0, 255
+        elif "-" in part:
+            low_text, high_text = part.split("-", 1)
+            low, high = int(low_text or 0), int(high_text or 255)
+        else:
+            low = high = int(part)
+        if not 0 <= low <= high <= 255:
+            return None
+        values.extend(range(low, high + 1))
+    return sorted(set(values))
+
+
+def target_ranges(target: str) -> Optional[List[Range]]:
+    """IPv4 address ranges covered by one nmap target (CIDR, single address
+    or octet ranges like 10.0.0-3.1-254). None for hostnames and IPv6, which
+    are kept whole."""
+    try:
+        network = ipaddress.ip_network(target, strict=False)
+    except ValueError:
+        network = None
+    if network is not None:
+        if network.version != 4:
+            return None
+        return [(int(network.network_address), int(network.broadcast_address))]
+    if not _OCTET_RANGE.match(target):
+        return None
+    try:
+        octets = [_octet_values(spec) for spec in target.split(".")]
+    except ValueError:
+        return None
+    if any(values is None for values in octets):
+        return None
+    ranges: List[Range] = []
+    last = octets[3]
+    # The last octet's runs become ranges; the first three are enumerated
+    runs = []
+    for value in last:
+        if runs and runs[-1][1] == value - 1:
+            runs[-1][1] = value
+        else:
+            runs.append([value, value])
+    for a, b, c in itertools.product(*octets[:3]):
+        base = (a << 24) | (b << 16) | (c << 8)
+        for low, high in runs:
+            if ranges and ranges[-1][1] == base + low - 1:
+                ranges[-1] = (ranges[-1][0], base + high)
+            else:
+                ranges.append((base + low, base + high))
+    return ranges
+
+
+def merge_ranges(ranges: List[Range]) -> List[Range]:
+    merged: List[Range] = []
+    for low, high in sorted(ranges):
+        if merged and low <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
+
+
+def split_ranges(ranges: List[Range], pieces: int) -> List[List[Range]]:
+    # Contiguous cut into pieces of (almost) equal address counts
+    total = sum(high - low + 1 for low, high in ranges)
+    pieces = max(1, min(pieces, total))
+    result: List[List[Range]] = [[] for _ in range(pieces)]
+    index, used = 0, 0
+    quota = [total // pieces + (1 if i < total % pieces else 0) for i in range(pieces)]
+    for low, high in ranges:
+        while low <= high:
+            take = min(high - low + 1, quota[index] - used)
+            result[index].append((low, low + take - 1))
+            low += take
+            used += take
+            if used == quota[index] and index < pieces - 1:
+                index, used = index + 1, 0
+    return result
+
+
+def cidr_targets(ranges: List[Range]) -> List[str]:
+    targets = []
+    for low, high in ranges:
+        for network in ipaddress.summarize_address_range(ipaddress.IPv4Address(low), ipaddress.IPv4Address(high)):
+            targets.append(str(network.network_address) if network.prefixlen == 32 else str(network))
+    return targets
+
+
+def port_ranges(spec: str) -> Optional[List[Range]]:
+    # Only plain numeric specs are split; T:/U: prefixes and service names are kept whole
+    if spec == "-":
+        return [(1, 65535)]
+    if not spec or not _NUMERIC_PORTS.match(spec):
+        return None
+    ranges = []
+    for part in spec.split(","):
+        low, _, high = part.partition("-")
+        ranges.append((int(low), int(high or low)))
+    return merge_ranges(ranges)
+
+
+def port_spec(ranges: List[Range]) -> str:
+    return ",".join(str(low) if low == high else f"{low}-{high}" for low, high in ranges)
+
+
+def shard_count(cpus: int, budget: int = None, limit: int = None) -> int:
+    """One shard per CPU, fewer when the packet rate budget would leave a
+    shard below MIN_SHARD_RATE, and no more than `limit` (concurrent jobs)."""
+    count = max(1, cpus)
+    if budget:
+        count = min(count, max(1, budget // MIN_SHARD_RATE))
+    if limit:
+        count = min(count, limit)
+    return count
+
+
+def plan_shards(command: NmapCommand, count: int, split_ports: bool = False) -> List[Shard]:
+    """Balanced shards for `command`. Address space is cut into contiguous
+    CIDR blocks; hostnames and IPv6 targets go to the lightest shard. When
+    there are too few addresses to fill `count` shards, a numeric -p range is
+    split as well (if split_ports). A single shard means "run as is"."""
+    if not command.shardable or count <= 1:
+        return [Shard(0, list(command.targets))]
+    ranges: List[Range] = []
+    atoms: List[str] = []
+    for target in command.targets:
+        covered = target_ranges(target)
+        if covered is None:
+            atoms.append(target)
+        else:
+            ranges.extend(covered)
+    ranges = merge_ranges(ranges)
+    addresses = sum(high - low + 1 for low, high in ranges)
+    address_pieces = min(count, max(1, addresses // MIN_SHARD_HOSTS))
+    ports = port_ranges(command.ports) if split_ports and command.ports else None
+    port_pieces = 1
+    if ports is not None and address_pieces < count:
+        port_pieces = min(count // address_pieces, sum(high - low + 1 for low, high in ports))
+    if address_pieces * port_pieces <= 1 and len(atoms) <= 1:
+        return [Shard(0, list(command.targets))]
+    address_groups = split_ranges(ranges, address_pieces) if ranges else [[]]
+    port_groups = [port_spec(group) for group in split_ranges(ports, port_pieces)] if port_pieces > 1 else [None]
+    shards = []
+    for group in address_groups:
+        for ports_part in port_groups:
+            shard = Shard(len(shards), cidr_targets(group), ports_part)
+            shard.addresses = sum(high - low + 1 for low, high in group)
+            shards.append(shard)
+    for atom in atoms:
+        lightest = min(shards, key=lambda shard: shard.addresses)
+        lightest.targets.append(atom)
+        lightest.addresses += 1
+    return [shard for shard in shards if shard.targets]
+
+
+class ShardMerger:
+    """Deduplicates findings coming in from several shards of one scan.
+    add() is called from the shards' worker threads and returns only the
+    findings not seen before; the rest are dropped."""
+
+    def __init__(self):
+        self._seen = set()
+        self._lock = threading.Lock()
+        self.findings = 0
+        self.open_ports = 0
+        self.duplicates = 0
+
+    def add(self, findings: List[Tuple]) -> List[Tuple]:
+        fresh = []
+        with self._lock:
+            for finding in findings:
+                key = finding[:3]
+                if key in self._seen:
+                    self.duplicates += 1
+                    continue
+                self._seen.add(key)
+                fresh.append(finding)
+                self.findings += 1
+                self.open_ports += finding[3] == "open"
+        return fresh
+
+
+class ShardGroup:
+    """The jobs of one sharded scan: overall progress and completion."""
+
+    def __init__(self, command: List[str], shards: List[Shard]):
+        self.command = command
+        self.shards = shards
+        self.merger = ShardMerger()
+        self.jobs: List = []
+        self.progress: Dict[int, int] = {}
+        self.done: Dict[int, object] = {}
+
+    def add_job(self, job):
+        self.jobs.append(job)
+        self.progress[job.id] = 0
+
+    def set_progress(self, job, value: int) -> int:
+        self.progress[job.id] = value
+        return sum(self.progress.values()) // max(1, len(self.progress))
+
+    def finish(self, job) -> bool:
+        self.done[job.id] = job
+        self.progress[job.id] = 100
+        return len(self.done) == len(self.jobs)
@@ -0,0 +1,270 @@
+import codecs
+import os
+import re
+import selectors
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from penmode.accounting import TreeSampler, Usage, wait_process
+
+# Pipes are read in chunks of this size and split into lines; lines are
+# handed over in batches so the consumer never sees one event per line.
+CHUNK_SIZE = 65536
+BATCH_LINES = 200
+BATCH_INTERVAL = 0.25
+MAX_LINE_LENGTH = 8192
+TAIL_LINES = 50
+
+# Return codes pkexec uses when the user dismisses the auth dialog
+AUTH_CANCELED_CODES = (126, 127)
+
+NMAP_STATS_INTERVAL = "10s"
+
+_PERCENT_DONE = re.compile(r"(\d+(?:\.\d+)?)% done")
+_NMAP_PROGRESS = re.compile(r"(\d+(?:\.\d+)?)% done|<taskprogress [^>]*percent=\"(\d+(?:\.\d+)?)\"")
+_JOHN_STATUS = re.compile(r"^\d+g \d+:\d\d:\d\d:\d\d (\d+(?:\.\d+)?)%")
+_HYDRA_STATUS = re.compile(r"(\d+) tries in [\d:]+h, (\d+) to do")
+
+
+def _percent(match) -> int:
+    return min(100, int(float(match.group(1) or match.group(2))))
+
+
+def _hydra_percent(match) -> int:
+    done, todo = int(match.group(1)), int(match.group(2))
+    return int(done * 100 / (done + todo)) if done + todo else 0
+
+
+# Status lines the tools print on their own, keyed by executable name
+PROGRESS_PARSERS = {
+    "nmap": (_NMAP_PROGRESS, _percent),       # "SYN Stealth Scan Timing: About 45.20% done", or <taskprogress percent="45.20"> with -oX -
+    "masscan": (_PERCENT_DONE, _percent),     # "rate:  9.98-kpps, 12.34% done, 0:01:02 remaining"
+    "john": (_JOHN_STATUS, _percent),         # "0g 0:00:00:05 12.34% (ETA: ...)"
+    "hydra": (_HYDRA_STATUS, _hydra_percent), # "[STATUS] ... 120 tries in 00:01h, 880 to do in ..."
+}
+
+
+def tool_name(command: List[str]) -> str:
+    return os.path.basename(command[0]) if command else ""
+
+
+def parse_progress(tool: str, line: str) -> Optional[int]:
+    parser = PROGRESS_PARSERS.get(tool)
+    if not parser:
+        return None
+    pattern, convert = parser
+    match = pattern.search(line)
+    return convert(match) if match else None
+
+
+def with_progress_args(command: List[str]) -> List[str]:
+    # nmap only prints timing stats when asked to
+    if tool_name(command) == "nmap" and not any(arg.startswith("--stats-every") for arg in command):
+        return command + ["--stats-every", NMAP_STATS_INTERVAL]
+    return command
+
+
+class LineSplitter:
+    # Turns decoded chunks into lines; "\r" counts as a line end because
+    # masscan and friends redraw their status line with it.
+    def __init__(self, max_line: int = MAX_LINE_LENGTH):
+        self.max_line = max_line
+        self.decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.partial = ""
+        self.pending_cr = False
+
+    def feed(self, chunk: bytes) -> List[str]:
+        data = self.decoder.decode(chunk)
+        if not data:
+            return []
+        if self.pending_cr and data.startswith("\n"):
+            data = data[1:]
+        self.pending_cr = data.endswith("\r")
+        lines = (self.partial + data).splitlines()
+        if data and not data.endswith(("\n", "\r")):
+            self.partial = lines.pop() if lines else ""
+        else:
+            self.partial = ""
+        if len(self.partial) > self.max_line:
+            lines.append(self.partial)
+            self.partial = ""
+        return lines
+
+    def flush(self) -> List[str]:
+        rest = self.partial + self.decoder.decode(b"", final=True)
+        self.partial = ""
+        return [rest] if rest else []
+
+
+class BatchWindow:
+    # Caps how many emitted batches may wait on the consumer at once. The
+    # reader blocks when the window is full, the pipe fills up and the tool
+    # itself is slowed down instead of our memory growing.
+    def __init__(self, size: int = 8):
+        self._slots = threading.Semaphore(size)
+
+    def acquire(self, cancel_event: Optional[threading.Event] = None) -> bool:
+        # False when cancelled before a slot freed up; nothing must be released then
+        while not self._slots.acquire(timeout=0.1):
+            if cancel_event is not None and cancel_event.is_set():
+                return False
+        return True
+
+    def release(self):
+        self._slots.release()
+
+
+class StreamResult:
+    def __init__(self, command: List[str]):
+        self.command = command
+        self.returncode = None
+        self.cancelled = False
+        self.line_counts = {"stdout": 0, "stderr": 0}
+        self.byte_counts = {"stdout": 0, "stderr": 0}
+        self.tail = deque(maxlen=TAIL_LINES)
+
+    def tail_text(self) -> str:
+        return "\n".join(self.tail)
+
+
+def _signal_group(pgid: int, sig: int):
+    try:
+        os.killpg(pgid, sig)
+    except PermissionError:
+        # Tools started through pkexec run as root; signal them the same way
+        subprocess.run(["pkexec", "kill", f"-{int(sig)}", "--", f"-{pgid}"],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=30)
+
+
+def _signal_process(proc, sig: int):
+    # Processes started by the privileged helper are signalled through it
+    if hasattr(proc, "signal_group"):
+        proc.signal_group(sig)
+    else:
+        _signal_group(proc.pid, sig)
+
+
+def terminate_process_group(proc: subprocess.Popen, grace: float = 3.0, sig: int = signal.SIGTERM):
+    # Every job runs in its own session, so this also reaches whatever the
+    # tool forked (nmap NSE helpers, hydra children, ...). SIGKILL follows
+    # if `sig` has not ended it within `grace` seconds.
+    if proc.poll() is not None:
+        return
+    try:
+        _signal_process(proc, sig)
+        proc.wait(timeout=grace)
+        return
+    except ProcessLookupError:
+        return
+    except subprocess.TimeoutExpired:
+        pass
+    try:
+        _signal_process(proc, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    proc.wait()
+
+
+def stream_process(command: List[str], on_batch: Callable[[str, List[str]], None],
+                   on_progress: Callable[[int], None] = None, timeout: int = None,
+                   privileged: bool = True, cancel_event: Optional[threading.Event] = None,
+                   batch_lines: int = BATCH_LINES, batch_interval: float = BATCH_INTERVAL,
+                   spawn_privileged: Callable[[List[str]], subprocess.Popen] = None,
+                   usage: Usage = None, cwd: str = None, stop_signal: int = signal.SIGTERM) -> StreamResult:
+    """Run `command` and hand its stdout/stderr to `on_batch(stream, lines)`
+    while it runs. Only the last TAIL_LINES lines are kept in the result.
+    Privileged commands go through `spawn_privileged` when given (the
+    session's privileged helper, which hands whatever it may not run to a
+    pkexec of its own). When
+    `usage` is given it is filled in with what the process tree used, also
+    for runs that time out or are cancelled. Cancelled and timed-out runs
+    get `stop_signal` first (SIGINT lets tools save their resume state)."""
+    result = StreamResult(command)
+    tool = tool_name(command)
+    last_progress = -1
+    if privileged and spawn_privileged is not None:
+        proc = spawn_privileged(command, cwd=cwd)
+    else:
+        # pkexec itself starts in root's home whatever `cwd` is
+        argv = ["pkexec"] + command if privileged else list(command)
+        proc = subprocess.Popen(argv, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, start_new_session=True, cwd=cwd)
+    selector = selectors.DefaultSelector()
+    splitters: Dict[str, LineSplitter] = {}
+    pending: Dict[str, List[str]] = {"stdout": [], "stderr": []}
+    for name, pipe in (("stdout", proc.stdout), ("stderr", proc.stderr)):
+        os.set_blocking(pipe.fileno(), False)
+        selector.register(pipe, selectors.EVENT_READ, name)
+        splitters[name] = LineSplitter()
+    deadline = time.monotonic() + timeout if timeout else None
+    last_flush = time.monotonic()
+    sampler = TreeSampler(proc.pid) if usage is not None else None
+
+    def flush():
+        for name, lines in pending.items():
+            if lines:
+                on_batch(name, lines)
+                pending[name] = []
+
+    try:
+        while selector.get_map():
+            if cancel_event is not None and cancel_event.is_set():
+                result.cancelled = True
+                terminate_process_group(proc, sig=stop_signal)
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                terminate_process_group(proc, grace=1.0, sig=stop_signal)
+                raise subprocess.TimeoutExpired(command, timeout)
+            for key, _ in selector.select(batch_interval):
+                name = key.data
+                chunk = os.read(key.fd, CHUNK_SIZE)
+                if chunk:
+                    result.byte_counts[name] += len(chunk)
+                    lines = splitters[name].feed(chunk)
+                else:
+                    selector.unregister(key.fileobj)
+                    key.fileobj.close()
+                    lines = splitters[name].flush()
+                for line in lines:
+                    if on_progress is not None:
+                        progress = parse_progress(tool, line)
+                        if progress is not None and progress != last_progress:
+                            last_progress = progress
+                            on_progress(progress)
+                result.line_counts[name] += len(lines)
+                result.tail.extend(lines)
+                pending[name].extend(lines)
+            now = time.monotonic()
+            if len(pending["stdout"]) + len(pending["stderr"]) >= batch_lines or now - last_flush >= batch_interval:
+                flush()
+                last_flush = now
+            if sampler is not None:
+                sampler.maybe_sample()
+        flush()
+        if sampler is not None:
+            # Last look before the tree is reaped; short jobs may not have had a sample yet
+            sampler.sample()
+        remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+        try:
+            result.returncode, reaped = wait_process(proc, timeout=remaining)
+        except subprocess.TimeoutExpired:
+            terminate_process_group(proc, grace=1.0)
+            raise subprocess.TimeoutExpired(command, timeout)
+        if usage is not None:
+            usage.merge(reaped)
+    finally:
+        if sampler is not None:
+            usage.merge(sampler.usage())
+        selector.close()
+        for pipe in (proc.stdout, proc.stderr):
+            if not pipe.closed:
+                pipe.close()
+        if proc.poll() is None:
+            terminate_process_group(proc, grace=1.0)
+    if privileged and result.returncode in AUTH_CANCELED_CODES:
+        raise subprocess.CalledProcessError(result.returncode, command, output="Authentication canceled by user")
+    return result
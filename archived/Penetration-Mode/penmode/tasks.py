@@ -0,0 +1,389 @@
+import heapq
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Set, Tuple
+
+# What to do with runs that were due while the app was closed (or the
+# machine asleep): drop them, run once, or run each one (up to MAX_CATCH_UP)
+CATCH_UP_SKIP = "skip"
+CATCH_UP_ONCE = "once"
+CATCH_UP_ALL = "all"
+CATCH_UP_POLICIES = (CATCH_UP_SKIP, CATCH_UP_ONCE, CATCH_UP_ALL)
+MAX_CATCH_UP = 10
+
+# The scheduler thread sleeps until the earliest task is due; the cap only
+# makes it notice wall-clock jumps (suspend, NTP) within a reasonable time
+MAX_SLEEP = 30.0
+SAVE_DELAY = 1.0
+
+MACROS = {
+    "@yearly": "0 0 1 1 *",
+    "@annually": "0 0 1 1 *",
+    "@monthly": "0 0 1 * *",
+    "@weekly": "0 0 * * 0",
+    "@daily": "0 0 * * *",
+    "@midnight": "0 0 * * *",
+    "@hourly": "0 * * * *",
+}
+MONTH_NAMES = {name: i + 1 for i, name in enumerate("jan feb mar apr may jun jul aug sep oct nov dec".split())}
+DAY_NAMES = {name: i for i, name in enumerate("sun mon tue wed thu fri sat".split())}
+_DURATION = re.compile(r"(\d+)\s*([smhd])")
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_duration(text: str) -> int:
+    # "90s", "15m", "1h30m", "2d"
+    text = text.strip().lower()
+    parts = _DURATION.findall(text)
+    if not parts or _DURATION.sub("", text).strip():
+        raise ValueError(f"Invalid duration: {text}")
+    return sum(int(value) * _DURATION_UNITS[unit] for value, unit in parts)
+
+
+def _parse_field(text: str, low: int, high: int, names: Dict[str, int] = None) -> Set[int]:
+    values = set()
+    for part in text.lower().split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step < 1:
+                raise ValueError(f"Invalid step: {step_text}")
+        if part in ("*", ""):
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = _field_value(start_text, names), _field_value(end_text, names)
+        else:
+            start = _field_value(part, names)
+            # "5/15" means every 15 starting at 5
+            end = high if step > 1 else start
+        if start < low or end > high or start > end:
+            raise ValueError(f"Value out of range {low}-{high}: {part}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+def _field_value(text: str, names: Dict[str, int] = None) -> int:
+    if names and text in names:
+        return names[text]
+    return int(text)
+
+
+class Schedule:
+    """A five-field cron expression (minute hour day-of-month month
+    day-of-week, with names, ranges, lists and steps), one of the @daily
+    style macros, or "@every <duration>"."""
+
+    def __init__(self, text: str):
+        self.text = text.strip()
+        self.interval = None
+        if self.text.lower().startswith("@every"):
+            self.interval = parse_duration(self.text[len("@every"):])
+            if self.interval <= 0:
+                raise ValueError("Interval must be positive")
+            return
+        expression = MACROS.get(self.text.lower(), self.text)
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expected 5 cron fields, got {len(fields)}: {self.text}")
+        self.minutes = _parse_field(fields[0], 0, 59)
+        self.hours = _parse_field(fields[1], 0, 23)
+        self.days = _parse_field(fields[2], 1, 31)
+        self.months = _parse_field(fields[3], 1, 12, MONTH_NAMES)
+        # 7 is Sunday as well
+        self.weekdays = {day % 7 for day in _parse_field(fields[4], 0, 7, DAY_NAMES)}
+        # Classic cron: when both day fields are restricted either one matches
+        self.any_day = fields[2] == "*"
+        self.any_weekday = fields[4] == "*"
+        self.sorted_minutes = sorted(self.minutes)
+        self.sorted_hours = sorted(self.hours)
+
+    def __str__(self) -> str:
+        return self.text
+
+    def _day_matches(self, day: datetime) -> bool:
+        in_days = day.day in self.days
+        in_weekdays = (day.weekday() + 1) % 7 in self.weekdays
+        if self.any_day and self.any_weekday:
+            return True
+        if self.any_day:
+            return in_weekdays
+        if self.any_weekday:
+            return in_days
+        return in_days or in_weekdays
+
+    def next_after(self, timestamp: float) -> float:
+        if self.interval is not None:
+            return timestamp + self.interval
+        start = datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        # Walks whole days (and skips whole months) instead of minutes; five
+        # years is enough for any satisfiable expression, e.g. "0 0 29 2 *"
+        for _ in range(5 * 366):
+            if day.month not in self.months:
+                day = (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+                continue
+            if self._day_matches(day):
+                first_day = day.date() == start.date()
+                for hour in self.sorted_hours:
+                    if first_day and hour < start.hour:
+                        continue
+                    for minute in self.sorted_minutes:
+                        if first_day and hour == start.hour and minute < start.minute:
+                            continue
+                        return day.replace(hour=hour, minute=minute).timestamp()
+            day += timedelta(days=1)
+        raise ValueError(f"Schedule never fires: {self.text}")
+
+
+class ScheduledTask:
+    def __init__(self, name: str, command: List[str], schedule: str, jitter: float = 0,
+                 catch_up: str = CATCH_UP_ONCE, max_overlap: int = 1, enabled: bool = True,
+                 last_run: float = 0, next_due: float = None):
+        if catch_up not in CATCH_UP_POLICIES:
+            raise ValueError(f"Unknown catch-up policy: {catch_up}")
+        self.name = name
+        self.command = command
+        self.schedule = Schedule(schedule)
+        self.jitter = jitter
+        self.catch_up = catch_up
+        self.max_overlap = max_overlap
+        self.enabled = enabled
+        self.last_run = last_run
+        # next_due is the schedule's own time; next_run adds this run's jitter
+        self.next_due = next_due
+        self.next_run = None
+        self.running = 0
+        self.skipped = 0
+        # Missed runs still owed under CATCH_UP_ALL; they start as earlier runs finish
+        self.backlog = 0
+        self._generation = 0
+
+    def to_dict(self) -> Dict:
+        return {"name": self.name, "command": self.command, "schedule": str(self.schedule),
+                "jitter": self.jitter, "catch_up": self.catch_up, "max_overlap": self.max_overlap,
+                "enabled": self.enabled, "last_run": self.last_run, "next_due": self.next_due}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ScheduledTask":
+        return cls(data["name"], list(data["command"]), data["schedule"], data.get("jitter", 0),
+                   data.get("catch_up", CATCH_UP_ONCE), data.get("max_overlap", 1), data.get("enabled", True),
+                   data.get("last_run", 0), data.get("next_due"))
+
+
+class TaskScheduler:
+    """Recurring tasks kept in a min-heap of next-fire times. One thread
+    sleeps until the earliest entry is due, so firing is on time and idle
+    costs nothing. `fire(task)` is called from that thread; the caller must
+    report the end of each run with finished(name) for the overlap limit.
+    Tasks are saved to `path` as JSON and reloaded with their catch-up
+    policy applied."""
+
+    def __init__(self, path: str = None, fire: Callable[[ScheduledTask], None] = None,
+                 on_skip: Callable[[ScheduledTask, str], None] = None, clock: Callable[[], float] = time.time):
+        self.path = path
+        self.fire = fire
+        self.on_skip = on_skip
+        self.clock = clock
+        self._tasks: Dict[str, ScheduledTask] = {}
+        self._heap: List[Tuple[float, int, str, int]] = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._dirty_since = None
+        self._closed = False
+        self._thread = None
+        if path:
+            self.load()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="task-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._wakeup:
+            self._closed = True
+            self._wakeup.notify_all()
+        if self._thread is not None:
+            self._thread.join(2.0)
+        self.save()
+
+    def add(self, task: ScheduledTask):
+        with self._wakeup:
+            old = self._tasks.get(task.name)
+            if old is not None:
+                old._generation += 1
+                task.running = old.running
+            self._tasks[task.name] = task
+            if task.next_due is None:
+                task.next_due = task.schedule.next_after(self.clock())
+            self._push(task)
+            self._changed()
+
+    def remove(self, name: str) -> bool:
+        with self._wakeup:
+            task = self._tasks.pop(name, None)
+            if task is None:
+                return False
+            # Its heap entry goes stale and is dropped when it surfaces
+            task._generation += 1
+            self._changed()
+            return True
+
+    def set_enabled(self, name: str, enabled: bool):
+        with self._wakeup:
+            task = self._tasks[name]
+            task.enabled = enabled
+            task._generation += 1
+            if enabled:
+                task.next_due = task.schedule.next_after(self.clock())
+                self._push(task)
+            self._changed()
+
+    def finished(self, name: str):
+        with self._lock:
+            task = self._tasks.get(name)
+            if task is None:
+                return
+            if task.running > 0:
+                task.running -= 1
+            catch_up = task.backlog > 0
+            if catch_up:
+                task.backlog -= 1
+        if catch_up:
+            self._start(task)
+
+    def tasks(self) -> List[ScheduledTask]:
+        with self._lock:
+            return list(self._tasks.values())
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def upcoming(self, count: int = 3) -> List[Tuple[float, str]]:
+        with self._lock:
+            return heapq.nsmallest(count, ((task.next_run, task.name) for task in self._tasks.values()
+                                           if task.enabled and task.next_run is not None))
+
+    def _push(self, task: ScheduledTask, due: float = None):
+        # Called with the lock held
+        if not task.enabled:
+            task.next_run = None
+            return
+        due = task.next_due if due is None else due
+        task.next_run = due + (random.uniform(0, task.jitter) if task.jitter else 0)
+        heapq.heappush(self._heap, (task.next_run, next(self._seq), task.name, task._generation))
+        self._wakeup.notify()
+
+    def _changed(self):
+        if self._dirty_since is None:
+            self._dirty_since = time.monotonic()
+        self._wakeup.notify()
+
+    def _run(self):
+        while True:
+            due_tasks = []
+            with self._wakeup:
+                if self._closed:
+                    return
+                now = self.clock()
+                while self._heap and self._heap[0][0] <= now:
+                    _, _, name, generation = heapq.heappop(self._heap)
+                    task = self._tasks.get(name)
+                    if task is None or task._generation != generation or not task.enabled:
+                        continue
+                    due_tasks.append(task)
+                    # Step from the previous due time so intervals do not drift,
+                    # unless that is already in the past (the machine slept)
+                    next_due = task.schedule.next_after(task.next_due)
+                    task.next_due = next_due if next_due > now else task.schedule.next_after(now)
+                    self._push(task)
+                    self._changed()
+                timeout = MAX_SLEEP
+                if self._heap:
+                    timeout = min(timeout, max(0.0, self._heap[0][0] - now))
+                if self._dirty_since is not None:
+                    timeout = min(timeout, max(0.0, self._dirty_since + SAVE_DELAY - time.monotonic()))
+                save = self._dirty_since is not None and time.monotonic() - self._dirty_since >= SAVE_DELAY
+            for task in due_tasks:
+                self._start(task)
+            if save:
+                try:
+                    self.save()
+                except OSError:
+                    pass
+            if due_tasks or save:
+                continue
+            with self._wakeup:
+                if not self._closed:
+                    self._wakeup.wait(timeout)
+
+    def _start(self, task: ScheduledTask):
+        with self._lock:
+            if task.running >= task.max_overlap:
+                task.skipped += 1
+                reason = f"{task.running} run(s) still active"
+            else:
+                task.running += 1
+                task.last_run = self.clock()
+                reason = None
+        if reason is not None:
+            if self.on_skip is not None:
+                self.on_skip(task, reason)
+            return
+        if self.fire is not None:
+            self.fire(task)
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        now = self.clock()
+        missed_runs = []
+        with self._wakeup:
+            for entry in data.get("tasks", []):
+                task = ScheduledTask.from_dict(entry)
+                missed = self._missed(task, now)
+                self._tasks[task.name] = task
+                self._push(task)
+                if missed:
+                    # Start what the overlap limit allows, queue the rest
+                    now_runs = min(missed, task.max_overlap)
+                    task.backlog = missed - now_runs
+                    missed_runs.extend([task] * now_runs)
+        for task in missed_runs:
+            self._start(task)
+
+    def _missed(self, task: ScheduledTask, now: float) -> int:
+        if task.next_due is None or task.next_due > now:
+            if task.next_due is None:
+                task.next_due = task.schedule.next_after(now)
+            return 0
+        missed, due = 0, task.next_due
+        while due <= now and missed < MAX_CATCH_UP:
+            missed += 1
+            due = task.schedule.next_after(due)
+        task.next_due = task.schedule.next_after(now)
+        if not task.enabled or task.catch_up == CATCH_UP_SKIP:
+            return 0
+        return 1 if task.catch_up == CATCH_UP_ONCE else missed
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"tasks": [task.to_dict() for task in self._tasks.values()]}
+            self._dirty_since = None
+        temporary = self.path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(temporary, self.path)
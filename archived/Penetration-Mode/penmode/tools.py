@@ -0,0 +1,70 @@
+from typing import Dict, List, Optional
+
+# Parameters containing any of these are refused, in the GUI and in batches
+DANGEROUS_PATTERNS = ["rm -rf", "dd", "mkfs", ":(){ :|:& };:", "chmod -R", "chown -R", "kill -9", "reboot", "shutdown"]
+
+
+class ToolSpec:
+    # One entry of the tool tabs. `handler` names the PenetrationModeWindow
+    # method behind the button; `package` is what apt-get installs.
+    def __init__(self, name: str, category: str, description: str, handler: str, default_params: str,
+                 package: str, takes_params: bool = True):
+        self.name = name
+        self.category = category
+        self.description = description
+        self.handler = handler
+        self.default_params = default_params
+        self.package = package
+        self.binary = default_params.split()[0]
+        self.takes_params = takes_params
+
+    def command(self, params: str) -> List[str]:
+        args = params.split() if self.takes_params else []
+        # "nmap -sV host" and "-sV host" mean the same thing
+        if args[:1] == [self.binary]:
+            args = args[1:]
+        return [self.binary] + args
+
+
+TOOLS = [
+    ToolSpec("Nmap", "Scanning", "Network scanning", "run_nmap", "nmap -sP 192.168.1.0/24", "nmap"),
+    ToolSpec("Masscan", "Scanning", "Fast port scanning", "run_masscan", "masscan -p80 192.168.1.0/24", "masscan"),
+    ToolSpec("Discovery Pipeline", "Scanning", "Masscan discovery, nmap -sV/NSE on the open ports it finds",
+             "run_discovery_pipeline", "masscan -p1-65535 --rate 10000 192.168.1.0/24 | nmap -sV -sC", "masscan"),
+    ToolSpec("OpenVAS", "Scanning", "Vulnerability scanning", "run_openvas", "openvas-start", "openvas", takes_params=False),
+    ToolSpec("Metasploit", "Exploits", "Exploit testing", "run_metasploit", "msfconsole", "metasploit-framework"),
+    ToolSpec("Sqlmap", "Exploits", "SQL Injection", "run_sqlmap", "sqlmap -u http://example.com", "sqlmap"),
+    ToolSpec("Aircrack-ng", "Wireless", "Wi-Fi attacks", "run_aircrack", "aircrack-ng -b <BSSID>", "aircrack-ng"),
+    ToolSpec("Wifite", "Wireless", "Wi-Fi automation", "run_wifite", "wifite", "wifite"),
+    ToolSpec("John", "Password Cracking", "Password cracking", "run_john", "john hash.txt", "john"),
+    ToolSpec("Hydra", "Password Cracking", "Brute force attacks", "run_hydra",
+             "hydra -l user -P passlist.txt ssh://192.168.1.1", "hydra"),
+    ToolSpec("Proxychains", "Anonymity", "Proxy usage", "run_proxychains", "proxychains nmap 192.168.1.1", "proxychains"),
+    ToolSpec("TorGhost", "Anonymity", "Tor routing", "run_torghost", "torghost --start", "torghost"),
+    ToolSpec("Wireshark", "Monitoring", "Packet sniffing", "run_wireshark", "wireshark", "wireshark"),
+    ToolSpec("Htop", "Monitoring", "System monitoring", "run_htop", "htop", "htop"),
+]
+PIPELINE_TOOL = "Discovery Pipeline"
+
+
+def tool_categories() -> Dict[str, List[ToolSpec]]:
+    categories: Dict[str, List[ToolSpec]] = {}
+    for spec in TOOLS:
+        categories.setdefault(spec.category, []).append(spec)
+    return categories
+
+
+def find_tool(name: str) -> Optional[ToolSpec]:
+    # By tab name ("Nmap", case-insensitive) or by executable ("nmap")
+    name = name.strip().lower()
+    for spec in TOOLS:
+        if spec.name.lower() == name:
+            return spec
+    for spec in TOOLS:
+        if spec.binary == name and spec.name != PIPELINE_TOOL:
+            return spec
+    return None
+
+
+def validate_input(params: str) -> bool:
+    return not any(pattern in params.lower() for pattern in DANGEROUS_PATTERNS)
@@ -0,0 +1,148 @@
+import json
+import os
+import re
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_UPDATE_URL = ("https://raw.githubusercontent.com/HackerOS-Linux-System/HackerOS/main/"
+                      "update_repos/official/HackerOS/Config-Files/release-info.json")
+RELEASE_INFO = "HackerOS/Config-Files/release-info.json"
+# update_repos/unpack.sh installs no single files here: it moves the whole
+# update_repos/official/HackerOS/ tree to /usr/share, release-info.json with
+# it. Then the same file in the source tree, for runs from a checkout.
+RELEASE_INFO_PATHS = [
+    os.path.join("/usr/share", RELEASE_INFO),
+    str(Path(__file__).resolve().parents[3] / "update_repos/official" / RELEASE_INFO),
+]
+# A cached answer younger than this is used without touching the network,
+# unless the server asked for a longer max-age
+MIN_CHECK_INTERVAL = 6 * 3600
+REQUEST_TIMEOUT = 10
+
+_MAX_AGE = re.compile(r"max-age=(\d+)")
+
+
+def default_cache_path() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache")
+    return os.path.join(base, "hackeros", "penetration-mode-update.json")
+
+
+def version_key(release: Dict) -> Tuple[int, ...]:
+    # "image-tag": "2.7" is the release number; "version" reads "42 -> HackerOS 2.7"
+    text = str(release.get("image-tag") or release.get("version", "").rsplit(" ", 1)[-1])
+    return tuple(int(part) for part in re.findall(r"\d+", text))
+
+
+def release_label(release: Dict) -> str:
+    return release.get("version-pretty") or release.get("image-tag") or "unknown"
+
+
+class UpdateStatus:
+    def __init__(self, installed: Optional[Dict], latest: Optional[Dict], source: str, error: str = None):
+        self.installed = installed
+        self.latest = latest
+        # "cache" (no request), "not-modified" (304) or "network"
+        self.source = source
+        self.error = error
+
+    @property
+    def available(self) -> bool:
+        if not self.latest:
+            return False
+        if not self.installed:
+            return True
+        return version_key(self.latest) > version_key(self.installed)
+
+
+class UpdateChecker:
+    """Compares the installed release-info.json with the published one.
+    Responses are cached on disk with their validators; a fresh cache answers
+    without a request, a stale one is revalidated with If-None-Match /
+    If-Modified-Since. The cache counts as fresh for min_interval seconds
+    (MIN_CHECK_INTERVAL, six hours; "update_check_hours" in config.yaml) or
+    the server's max-age if that is longer, so the hourly auto-update timer
+    reaches the network at most every six hours; "Check Updates" forces
+    a revalidation. check_async() runs on a single worker thread."""
+
+    def __init__(self, url: str = DEFAULT_UPDATE_URL, cache_path: str = None,
+                 release_info_paths: List[str] = None, min_interval: float = MIN_CHECK_INTERVAL):
+        self.url = url
+        self.cache_path = cache_path or default_cache_path()
+        self.release_info_paths = release_info_paths or RELEASE_INFO_PATHS
+        self.min_interval = min_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="update-check")
+
+    def check_async(self, force: bool = False) -> Future:
+        return self._executor.submit(self.check, force)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+    def installed_release(self) -> Optional[Dict]:
+        for path in self.release_info_paths:
+            try:
+                with open(path) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                continue
+        return None
+
+    def check(self, force: bool = False) -> UpdateStatus:
+        installed = self.installed_release()
+        cache = self._load_cache()
+        if cache and not force and time.time() - cache["fetched_at"] < max(self.min_interval, cache.get("max_age", 0)):
+            return UpdateStatus(installed, cache["body"], "cache")
+        # http.client, ssl and email come with urllib.request; only pay for them
+        # when the network is actually asked
+        import urllib.error
+        import urllib.request
+        headers = {"User-Agent": "HackerOS-Penetration-Mode", "Accept": "application/json"}
+        if cache:
+            if cache.get("etag"):
+                headers["If-None-Match"] = cache["etag"]
+            if cache.get("last_modified"):
+                headers["If-Modified-Since"] = cache["last_modified"]
+        request = urllib.request.Request(self.url, headers=headers)
+        try:
+            with urllib.request.urlopen(request, timeout=REQUEST_TIMEOUT) as response:
+                body = json.loads(response.read().decode())
+                cache = {"url": self.url, "etag": response.headers.get("ETag"),
+                         "last_modified": response.headers.get("Last-Modified"), "body": body}
+                source = "network"
+                response_headers = response.headers
+        except urllib.error.HTTPError as e:
+            if e.code != 304 or not cache:
+                return UpdateStatus(installed, cache["body"] if cache else None, "cache", f"HTTP {e.code}")
+            source = "not-modified"
+            response_headers = e.headers
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            # Offline: keep using whatever was cached last
+            reason = getattr(e, "reason", e)
+            return UpdateStatus(installed, cache["body"] if cache else None, "cache", str(reason))
+        match = _MAX_AGE.search(response_headers.get("Cache-Control", "") or "")
+        cache["max_age"] = int(match.group(1)) if match else 0
+        cache["fetched_at"] = time.time()
+        try:
+            self._save_cache(cache)
+        except OSError:
+            pass
+        return UpdateStatus(installed, cache["body"], source)
+
+    def _load_cache(self) -> Optional[Dict]:
+        try:
+            with open(self.cache_path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cache.get("url") != self.url or "body" not in cache or "fetched_at" not in cache:
+            return None
+        return cache
+
+    def _save_cache(self, cache: Dict):
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        temporary = self.cache_path + ".tmp"
+        with open(temporary, "w") as f:
+            json.dump(cache, f)
+        os.replace(temporary, self.cache_path)
@@ -0,0 +1,58 @@
+import importlib.util
+import logging
+import os
+import sys
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+@pytest.fixture
+def home(tmp_path, monkeypatch):
+    # Everything the app keeps under ~ (history, outputs, journal, logs) goes here
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / ".config"))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def make_window(home, monkeypatch):
+    """Builds PenetrationModeWindow on the offscreen Qt platform; windows are
+    closed (threads stopped) after the test."""
+    pytest.importorskip("PyQt5")
+    monkeypatch.setenv("QT_QPA_PLATFORM", "offscreen")
+    # The window refuses to start without a display, which offscreen Qt never opens
+    if not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY"):
+        monkeypatch.setenv("DISPLAY", ":0")
+    from PyQt5.QtCore import QCoreApplication, QSettings
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication(["penetration-mode-tests"])
+    settings = QSettings("HackerOS", "PenetrationMode")
+    settings.clear()
+    settings.setValue("auto_update", False)
+    settings.sync()
+    root = logging.getLogger()
+    handlers = list(root.handlers)
+    spec = importlib.util.spec_from_file_location("penetration_mode", os.path.join(APP_DIR, "Penetration-Mode.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    windows = []
+
+    def make():
+        window = module.PenetrationModeWindow()
+        windows.append(window)
+        app.processEvents()
+        return window
+
+    yield make
+    for window in windows:
+        window.close_app()
+    # close_app() ends the app's event loop; what it left queued is never delivered
+    QCoreApplication.removePostedEvents(None)
+    # basicConfig in the module added handlers for ./hackeros.log; drop them with the tmp dir
+    for handler in root.handlers[len(handlers):]:
+        root.removeHandler(handler)
+        handler.close()
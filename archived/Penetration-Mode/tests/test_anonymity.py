@@ -0,0 +1,257 @@
+import asyncio
+import ipaddress
+import json
+import struct
+import time
+
+from penmode.anonymity import AnonymityConfig, AnonymityProber, HTTPPool
+
+PUBLIC_IP = "203.0.113.7"
+
+
+class EchoServer:
+    """Local stand-in for the IP echo endpoints; paths listed in `delays`
+    answer that many seconds late."""
+
+    def __init__(self, delays=None):
+        self.delays = delays or {}
+        self.requests = []
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b""):
+                    pass
+                path = request_line.split()[1].decode()
+                self.requests.append(path)
+                await asyncio.sleep(self.delays.get(path, 0))
+                if path.startswith("/details"):
+                    body = json.dumps({"city": "Testville", "region": "Nowhere", "country": "ZZ", "org": "Example"})
+                else:
+                    body = json.dumps({"ip": PUBLIC_IP})
+                writer.write(f"HTTP/1.1 200 OK\r\nContent-Length: {len(body)}\r\n\r\n{body}".encode())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+
+class DNSStub(asyncio.DatagramProtocol):
+    """Answers every A query with PUBLIC_IP, after `delay` seconds."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    async def start(self):
+        self.transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+            lambda: self, local_addr=("127.0.0.1", 0))
+        self.port = self.transport.get_extra_info("sockname")[1]
+        return self
+
+    def spec(self, name="myip.test"):
+        return f"{name}/A@127.0.0.1:{self.port}"
+
+    def datagram_received(self, data, addr):
+        query_id = data[:2]
+        question = data[12:]
+        answer = (query_id + struct.pack(">HHHHH", 0x8180, 1, 1, 0, 0) + question
+                  + struct.pack(">HHHIH", 0xC00C, 1, 1, 60, 4) + ipaddress.IPv4Address(PUBLIC_IP).packed)
+        asyncio.get_running_loop().call_later(self.delay, self.transport.sendto, answer, addr)
+
+
+class ConnectProxy:
+    """Minimal HTTP proxy that only speaks CONNECT."""
+
+    def __init__(self):
+        self.tunnels = []
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def handle(self, reader, writer):
+        method, target, _version = (await reader.readline()).decode().split()
+        while (await reader.readline()) not in (b"\r\n", b""):
+            pass
+        assert method == "CONNECT"
+        self.tunnels.append(target)
+        host, port = target.rsplit(":", 1)
+        upstream_reader, upstream_writer = await asyncio.open_connection(host, int(port))
+        writer.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+
+        async def pipe(source, sink):
+            try:
+                while True:
+                    data = await source.read(65536)
+                    if not data:
+                        break
+                    sink.write(data)
+                    await sink.drain()
+            except ConnectionError:
+                pass
+            finally:
+                sink.close()
+
+        await asyncio.gather(pipe(reader, upstream_writer), pipe(upstream_reader, writer))
+
+
+def probe_config(http, **kwargs):
+    kwargs.setdefault("resolver_probes", [])
+    kwargs.setdefault("stun_servers", [])
+    kwargs.setdefault("details_url", http.url("/details/{ip}"))
+    return AnonymityConfig(**kwargs)
+
+
+async def probe(config, proxies=None, on_consensus=None):
+    prober = AnonymityProber()
+    prober.pool = HTTPPool(proxies=proxies or {})
+    try:
+        return await prober.run(config, on_consensus)
+    finally:
+        prober.pool.close()
+
+
+def test_probes_agree_on_address():
+    async def scenario():
+        http = await EchoServer().start()
+        dns = await DNSStub().start()
+        config = probe_config(http, ip_urls=[http.url("/a"), http.url("/b")], dns_ip_probes=[dns.spec()])
+        report = await probe(config)
+        dns.transport.close()
+        http.server.close()
+        return report
+
+    report = asyncio.run(scenario())
+    assert report.ip == PUBLIC_IP
+    assert report.details["city"] == "Testville"
+    assert report.lines()[0] == f"IP: {PUBLIC_IP} (3/3 probes agree)"
+    assert not any(result.error for result in report.results)
+
+
+def test_slow_probes_hit_their_deadline():
+    async def scenario():
+        http = await EchoServer(delays={"/slow": 30}).start()
+        dns = await DNSStub(delay=30).start()
+        config = probe_config(http, ip_urls=[http.url("/fast"), http.url("/slow")], dns_ip_probes=[dns.spec()],
+                              timeout=0.5, quorum=1)
+        started = time.monotonic()
+        report = await probe(config)
+        elapsed = time.monotonic() - started
+        dns.transport.close()
+        http.server.close()
+        return report, elapsed, dns.port
+
+    report, elapsed, dns_port = asyncio.run(scenario())
+    # Bounded by the per-probe timeout plus the details lookup, not by the slow servers
+    assert elapsed < 3
+    assert report.ip == PUBLIC_IP
+    errors = {(result.kind, result.source.split("/")[-1]): result.error for result in report.results}
+    assert errors == {("http", "fast"): None, ("http", "slow"): "timeout", ("dns", f"A@127.0.0.1:{dns_port}"): "timeout"}
+
+
+def test_consensus_reported_before_slow_probes_finish():
+    async def scenario():
+        http = await EchoServer(delays={"/slow": 1.5}).start()
+        dns = await DNSStub().start()
+        config = probe_config(http, ip_urls=[http.url("/fast"), http.url("/slow")], dns_ip_probes=[dns.spec()],
+                              timeout=5, quorum=2, details_url=None)
+        started = time.monotonic()
+        agreed = []
+        report = await probe(config, on_consensus=lambda ip: agreed.append((ip, time.monotonic() - started)))
+        dns.transport.close()
+        http.server.close()
+        return report, agreed
+
+    report, agreed = asyncio.run(scenario())
+    assert agreed[0][0] == PUBLIC_IP
+    assert agreed[0][1] < 1.0
+    assert report.consensus_after < 1.0
+    # The slow probe still reports in and is counted
+    assert report.lines()[0] == f"IP: {PUBLIC_IP} (3/3 probes agree)"
+
+
+def test_http_probes_tunnel_through_proxy():
+    async def scenario():
+        http = await EchoServer().start()
+        proxy = await ConnectProxy().start()
+        config = probe_config(http, ip_urls=[http.url("/a")], dns_ip_probes=[], details_url=None, quorum=1)
+        report = await probe(config, proxies={"http": f"http://127.0.0.1:{proxy.port}"})
+        proxy.server.close()
+        http.server.close()
+        return report, proxy
+
+    report, proxy = asyncio.run(scenario())
+    assert report.ip == PUBLIC_IP
+    assert proxy.tunnels
+    assert any("via proxy" in line for line in report.lines())
+
+
+def test_report_says_when_proxy_is_bypassed():
+    async def scenario():
+        http = await EchoServer().start()
+        config = probe_config(http, ip_urls=[http.url("/a")], dns_ip_probes=[], details_url=None, quorum=1)
+        report = await probe(config, proxies={"http": "socks5://127.0.0.1:9050"})
+        http.server.close()
+        return report
+
+    report = asyncio.run(scenario())
+    assert report.ip == PUBLIC_IP
+    assert "Proxy bypassed: socks5://127.0.0.1:9050 is not an HTTP proxy, HTTP probes connected directly" in report.lines()
+
+
+def test_proxy_toggled_between_checks(monkeypatch):
+    for name in ("http_proxy", "HTTP_PROXY", "no_proxy", "NO_PROXY"):
+        monkeypatch.delenv(name, raising=False)
+
+    async def scenario():
+        http = await EchoServer().start()
+        proxy = await ConnectProxy().start()
+        config = probe_config(http, ip_urls=[http.url("/a")], dns_ip_probes=[], details_url=None, quorum=1)
+        # One prober for both checks, as the window keeps it
+        prober = AnonymityProber()
+        direct = await prober.run(config)
+        monkeypatch.setenv("http_proxy", f"http://127.0.0.1:{proxy.port}")
+        proxied = await prober.run(config)
+        monkeypatch.delenv("http_proxy")
+        direct_again = await prober.run(config)
+        prober.pool.close()
+        proxy.server.close()
+        http.server.close()
+        return direct, proxied, direct_again, proxy
+
+    direct, proxied, direct_again, proxy = asyncio.run(scenario())
+    assert not direct.proxies
+    # The idle direct connection from the first check is not reused for the second
+    assert len(proxy.tunnels) == 1
+    assert any("via proxy" in line for line in proxied.lines())
+    assert not direct_again.proxies
+    assert direct_again.ip == PUBLIC_IP
+
+
+def test_unknown_dns_type_fails_only_its_probe():
+    async def scenario():
+        http = await EchoServer().start()
+        dns = await DNSStub().start()
+        config = probe_config(http, ip_urls=[http.url("/a")], dns_ip_probes=[dns.spec().replace("/A@", "/MX@")],
+                              details_url=None, quorum=1)
+        report = await probe(config)
+        dns.transport.close()
+        http.server.close()
+        return report
+
+    report = asyncio.run(scenario())
+    assert report.ip == PUBLIC_IP
+    assert [result.error for result in report.results if result.kind == "dns"] == ["unsupported DNS type MX"]
@@ -0,0 +1,126 @@
+import pytest
+
+from penmode.cache import ResultCache, cache_key, canonical_targets, normalize_command
+
+# As the window builds it: nothing routed anywhere
+DIRECT = {"tor": False, "vpn": False, "proxy": None}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+@pytest.mark.parametrize("targets", [
+    ["10.0.0.0/28"],
+    ["10.0.0.0-15"],
+    ["10.0.0.0/29", "10.0.0.8/29"],
+    ["10.0.0.8/29", "10.0.0.0/29"],
+    ["10.0.0.0/29,10.0.0.8/29"],
+])
+def test_same_target_set_same_key(targets):
+    assert canonical_targets(targets) == ["10.0.0.0/28"]
+    assert cache_key(["nmap", "-sV"] + targets, DIRECT) == cache_key(["nmap", "-sV", "10.0.0.0/28"], DIRECT)
+
+
+def test_hostnames_are_sorted_and_lowercased():
+    assert canonical_targets(["Scanme.Nmap.org", "10.0.0.1", "example.org"]) == \
+        ["10.0.0.1", "example.org", "scanme.nmap.org"]
+
+
+@pytest.mark.parametrize("first, second", [
+    (["nmap", "-sV", "-p", "22,80", "-T4", "10.0.0.0/28"], ["nmap", "10.0.0.0/28", "-p", "22,80", "-sV", "-T4"]),
+    (["nmap", "--max-rate", "500", "-sS", "10.0.0.1"], ["nmap", "-sS", "10.0.0.1", "--max-rate", "500"]),
+    (["nmap", "-T4", "--script", "vuln", "-sV", "10.0.0.1"], ["nmap", "-sV", "-T4", "--script", "vuln", "10.0.0.1"]),
+    (["masscan", "-p80", "--rate", "1000", "10.0.0.0/28"], ["masscan", "10.0.0.0/29", "--rate", "1000", "-p80",
+                                                            "10.0.0.8/29"]),
+    (["/usr/bin/nmap", "-sV", "10.0.0.1"], ["nmap", "-sV", "10.0.0.1"]),
+])
+def test_option_and_target_order_do_not_matter(first, second):
+    assert cache_key(first, DIRECT) == cache_key(second, DIRECT)
+
+
+@pytest.mark.parametrize("first, second", [
+    (["nmap", "-sV", "10.0.0.0/28"], ["nmap", "-sS", "10.0.0.0/28"]),
+    (["nmap", "-sV", "10.0.0.0/28"], ["nmap", "-sV", "10.0.0.0/27"]),
+    (["nmap", "-p", "22", "10.0.0.1"], ["nmap", "-p", "80", "10.0.0.1"]),
+    # Sorting keeps each value with its own option
+    (["nmap", "--script", "vuln", "-e", "eth0", "10.0.0.1"], ["nmap", "--script", "eth0", "-e", "vuln", "10.0.0.1"]),
+    # Other tools keep their arguments in place
+    (["sqlmap", "-u", "http://a/", "--batch"], ["sqlmap", "--batch", "-u", "http://a/"]),
+])
+def test_different_invocations_different_keys(first, second):
+    assert cache_key(first, DIRECT) != cache_key(second, DIRECT)
+
+
+@pytest.mark.parametrize("environment", [
+    {"tor": True, "vpn": False, "proxy": None},
+    {"tor": False, "vpn": True, "proxy": None},
+    {"tor": False, "vpn": False, "proxy": "http://localhost:8080"},
+    {"tor": False, "vpn": False, "proxy": "socks5://127.0.0.1:9050"},
+])
+def test_environment_is_part_of_key(environment):
+    command = ["nmap", "-sV", "10.0.0.0/28"]
+    assert cache_key(command, environment) != cache_key(command, DIRECT)
+
+
+def test_pipeline_stages_are_kept_apart():
+    stages, targets = normalize_command(["nmap", "-sn", "10.0.0.0/29", "|", "nmap", "-sV", "10.0.0.8/29"])
+    assert stages == [["nmap", "-sn"], ["nmap", "-sV"]]
+    assert targets == ["10.0.0.0/28"]
+
+
+def test_ttl_expiry(clock):
+    cache = ResultCache(ttls={"nmap": 60}, clock=clock)
+    key = cache_key(["nmap", "10.0.0.1"], DIRECT)
+    entry = cache.put(key, ["nmap", "10.0.0.1"], "22/tcp open ssh")
+    clock.now += 30
+    assert cache.get(key) is entry
+    assert (entry.age(clock.now), entry.remaining(clock.now)) == (30, 30)
+    clock.now += 30
+    assert cache.get(key) is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_tools_without_ttl_are_not_cached(clock):
+    cache = ResultCache(ttls={"nmap": 60}, clock=clock)
+    assert not cache.cacheable(["hydra", "-l", "admin", "ssh://10.0.0.1"])
+    assert not cache.cacheable([])
+    assert cache.put("k", ["hydra"], "output") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_goes_first(clock):
+    cache = ResultCache(capacity=2, ttls={"nmap": 60}, clock=clock)
+    cache.put("a", ["nmap", "10.0.0.1"], "a")
+    cache.put("b", ["nmap", "10.0.0.2"], "b")
+    # Reading "a" makes "b" the oldest
+    assert cache.get("a") is not None
+    cache.put("c", ["nmap", "10.0.0.3"], "c")
+    assert cache.get("b") is None
+    assert [cache.get(key).data for key in ("a", "c")] == ["a", "c"]
+    cache.resize(1)
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+
+
+def test_invalidate_one_tool(clock):
+    cache = ResultCache(ttls={"nmap": 60, "masscan": 60, "sqlmap": 60}, clock=clock)
+    cache.put("n1", ["nmap", "10.0.0.1"], "")
+    cache.put("n2", ["/usr/bin/nmap", "10.0.0.2"], "")
+    cache.put("m", ["masscan", "-p80", "10.0.0.0/28"], "")
+    cache.put("s", ["sqlmap", "-u", "http://a/"], "")
+    assert cache.invalidate("/usr/bin/nmap") == 2
+    assert cache.get("n1") is None and cache.get("n2") is None
+    assert cache.get("m") is not None and cache.get("s") is not None
+    assert cache.invalidate() == 2
+    assert len(cache) == 0
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+import penmode.headless
+from penmode.config import SavedSettings
+from penmode.headless import EXIT_FAILED, EXIT_OK, EXIT_USAGE, BatchRunner, main, parse_entry
+from penmode.history import HistoryStore, RetentionPolicy
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+# Harmless stand-ins for the tools: sqlmap echoes, hydra fails, nmap replays a recorded scan
+FAKE_TOOLS = {
+    "sqlmap": '#!/bin/sh\necho "sqlmap stand-in: $*"\n',
+    "hydra": '#!/bin/sh\necho "hydra stand-in failing" >&2\nexit 3\n',
+    "nmap": f'#!/bin/sh\ncat "{os.path.join(DATA, "nmap_ping.xml")}"\n',
+}
+
+
+@pytest.fixture
+def tools(home, monkeypatch):
+    pytest.importorskip("yaml")
+    bin_dir = home / "bin"
+    bin_dir.mkdir()
+    for name, script in FAKE_TOOLS.items():
+        path = bin_dir / name
+        path.write_text(script)
+        path.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return home
+
+
+def run(home, capsys, batch, *args):
+    path = home / "batch.yaml"
+    path.write_text(batch)
+    status = main([str(path), "--no-history", *args])
+    out, err = capsys.readouterr()
+    return status, out, err
+
+
+def test_batch_runs_to_completion(tools, capsys):
+    status, out, _err = run(tools, capsys, """
+timeout: "30"
+max_threads: "2"
+jobs:
+  - command: sqlmap --batch -u http://127.0.0.1/
+  - tool: Nmap
+    params: -sn 192.168.56.0/29
+    name: ping sweep
+""", "-v")
+    assert status == EXIT_OK
+    assert out.startswith("2 jobs, up to 2 at a time\n")
+    assert "[Sqlmap] sqlmap stand-in: --batch -u http://127.0.0.1/" in out
+    assert "Success: Sqlmap" in out
+    assert "Success: ping sweep" in out
+    assert "2 of 2 succeeded" in out
+
+
+def test_failing_job_sets_exit_status(tools, capsys):
+    status, out, _err = run(tools, capsys, """
+jobs:
+  - command: sqlmap -u http://127.0.0.1/
+  - command: hydra -l admin -P words.txt ssh://127.0.0.1
+""")
+    assert status == EXIT_FAILED
+    assert "Error: Hydra" in out
+    assert "1 of 2 succeeded" in out
+
+
+@pytest.mark.parametrize("batch, message", [
+    ("jobs:\n  - command: frobnicate --all\n", "job 1: unknown tool 'frobnicate --all'"),
+    ("jobs:\n  - command: sqlmap -u http://127.0.0.1/\n    priority: urgent\n",
+     "job 1: priority must be one of low, normal, high"),
+    ("timeout: soon\njobs:\n  - command: sqlmap -u http://127.0.0.1/\n", "timeout must be a positive whole number"),
+    ("max_threads: 0\njobs:\n  - command: sqlmap -u http://127.0.0.1/\n", "max_threads must be a positive whole number"),
+    ("jobs: []\n", "expected a list of jobs"),
+])
+def test_bad_batches_are_usage_errors(tools, capsys, batch, message):
+    status, out, err = run(tools, capsys, batch)
+    assert status == EXIT_USAGE
+    assert message in err
+    assert out == ""
+
+
+def test_dry_run_prints_commands(tools, capsys):
+    status, out, _err = run(tools, capsys, "- sqlmap -u http://127.0.0.1/\n", "--dry-run")
+    assert status == EXIT_OK
+    assert out == "Sqlmap: sqlmap -u http://127.0.0.1/\n"
+
+
+def test_scan_id_is_set_before_submit(home, monkeypatch):
+    # A job that fails at once can finish before submit() returns
+    history = HistoryStore(":memory:", RetentionPolicy(100, 0))
+    runner = BatchRunner(SavedSettings({}), history, out=open(os.devnull, "w"))
+    seen = []
+    monkeypatch.setattr(runner.scheduler, "submit", lambda job: seen.append(job.scan_id) or job)
+    entry = parse_entry(0, {"command": "masscan -p80 10.0.0.1"})
+    entry.start_time = penmode.headless.datetime.now()
+    job = runner.start_scan(entry, entry.command())
+    assert seen == [job.scan_id]
+    assert job.scan_id is not None
+    runner.scheduler.shutdown()
+    history.close()
@@ -0,0 +1,30 @@
+import threading
+
+from penmode.jobs import Job, JobScheduler
+from penmode.streaming import BatchWindow
+
+
+def test_cancelled_acquire_takes_no_slot():
+    window = BatchWindow(size=1)
+    cancel = threading.Event()
+    assert window.acquire(cancel)
+    cancel.set()
+    assert not window.acquire(cancel)
+    window.release()
+    # Exactly the one slot is back, not two
+    assert window._slots.acquire(blocking=False)
+    assert not window._slots.acquire(blocking=False)
+
+
+def test_cancelled_output_is_not_emitted_without_slot():
+    scheduler = JobScheduler()
+    events = []
+    scheduler.add_listener(lambda event, job, payload: events.append((event, payload)))
+    job = Job(["true"])
+    job.batch_window = BatchWindow(size=1)
+    scheduler._emit_output(job, "stdout", ["first"])
+    # The consumer has not released the first batch; a cancel must not block the reader
+    # nor hand the consumer a batch it would release without a slot
+    job.cancel_event.set()
+    scheduler._emit_output(job, "stdout", ["second"])
+    assert events == [("output", ("stdout", ["first"]))]
@@ -0,0 +1,68 @@
+import os
+import time
+
+import pytest
+
+import penmode.jobs
+from penmode.journal import JobJournal
+
+# Stands in for nmap: writes a finished host to its -oG log, then waits to be stopped
+FAKE_NMAP = """#!/bin/sh
+log=""
+while [ $# -gt 0 ]; do
+    if [ "$1" = "-oG" ]; then log="$2"; fi
+    shift
+done
+echo "Host: 10.0.0.1 ()	Status: Up" > "$log"
+trap 'exit 130' INT
+sleep 30 &
+wait
+"""
+
+
+@pytest.fixture
+def fake_nmap(home, monkeypatch):
+    bin_dir = home / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "nmap"
+    script.write_text(FAKE_NMAP)
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    # No pkexec or privileged helper in tests
+    stream_process = penmode.jobs.stream_process
+    monkeypatch.setattr(penmode.jobs, "stream_process",
+                        lambda *args, **kwargs: stream_process(*args, **dict(kwargs, privileged=False)))
+
+
+def wait_for(condition, timeout=15.0):
+    from PyQt5.QtWidgets import QApplication
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting"
+        QApplication.processEvents()
+        time.sleep(0.02)
+
+
+def test_resumable_jobs_have_no_default_timeout(fake_nmap, make_window):
+    window = make_window()
+    entry = window.journal_entry(["nmap", "-sn", "10.0.0.1"])
+    assert entry.workdir is not None
+    assert window.submit_job(entry.command, journal_entry=entry).timeout is None
+    window.scheduler.cancel_all()
+    other = window.journal_entry(["sqlmap", "-u", "http://127.0.0.1/"])
+    assert window.submit_job(other.command, journal_entry=other).timeout == 60
+    window.scheduler.cancel_all()
+
+
+def test_timed_out_job_stays_resumable(fake_nmap, make_window):
+    window = make_window()
+    entry = window.journal_entry(["nmap", "-sS", "10.0.0.0/24"])
+    job = window.submit_job(entry.command, timeout=1, journal_entry=entry)
+    wait_for(lambda: job.finished and not window.scheduler.counts()["running"])
+    wait_for(lambda: entry.key in window.journal.interrupted)
+    assert job.timed_out
+    assert os.path.isdir(entry.workdir)
+    assert entry.resume_command() == ["nmap", "--resume", os.path.join(entry.workdir, "scan.gnmap")]
+    # Still open on disk, so a restart offers it as well
+    window.journal.close()
+    assert entry.key in JobJournal(window.journal.root).interrupted
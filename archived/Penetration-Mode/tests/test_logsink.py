@@ -0,0 +1,51 @@
+import os
+import time
+
+import pytest
+
+from penmode.logsink import LogSink
+
+pytest.importorskip("cryptography")
+
+KEY = bytes(range(32))
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting"
+        time.sleep(0.02)
+
+
+def test_close_without_key_returns_at_once(tmp_path):
+    sink = LogSink(str(tmp_path / "log.enc"))
+    sink.write("INFO", "never sealed")
+    started = time.monotonic()
+    sink.close()
+    assert time.monotonic() - started < 1.0
+    assert os.path.getsize(tmp_path / "log.enc") == 0
+
+
+def test_queue_without_key_keeps_newest_records(tmp_path):
+    sink = LogSink(str(tmp_path / "log.enc"), segment_bytes=1 << 20, max_pending_bytes=4096)
+    for number in range(1000):
+        sink.write("INFO", f"record {number:04d}")
+    assert sink._pending_bytes <= 4096
+    sink.set_key(KEY)
+    sink.flush()
+    wait_for(lambda: sink.segment_count() == 1)
+    lines = sink.read_segment(0).splitlines()
+    sink.close()
+    assert "older log records dropped" in lines[0]
+    dropped = int(lines[0].split()[3])
+    assert dropped + len(lines) - 1 == 1000
+    assert lines[-1].endswith("record 0999")
+    assert not any(line.endswith("record 0000") for line in lines)
+
+
+def test_records_written_with_key_are_kept(tmp_path):
+    sink = LogSink(str(tmp_path / "log.enc"), key=KEY)
+    sink.write("INFO", "hello")
+    sink.flush()
+    assert sink.read_segment(0).endswith("INFO hello")
+    sink.close()
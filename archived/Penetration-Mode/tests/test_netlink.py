@@ -0,0 +1,179 @@
+import os
+import shutil
+import socket
+import subprocess
+import sys
+
+import pytest
+
+from penmode.netlink import (ARPHRD_ETHER, ARPHRD_IEEE80211_RADIOTAP, IFA_ADDRESS, IFA_LOCAL, IFADDRMSG, IFF_LOWER_UP,
+                             IFF_UP, IFINFOMSG, IFLA_ADDRESS, IFLA_IFNAME, IFLA_INFO_KIND, IFLA_LINKINFO, IFLA_MTU,
+                             IFLA_OPERSTATE, NLMSGHDR, RTATTR, RTM_DELADDR, RTM_DELLINK, RTM_NEWADDR, RTM_NEWLINK,
+                             InterfaceTable, iter_messages)
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def attribute(kind: int, value: bytes) -> bytes:
+    data = RTATTR.pack(RTATTR.size + len(value), kind) + value
+    return data + b"\0" * (-len(data) % 4)
+
+
+def link(index, name=None, flags=IFF_UP | IFF_LOWER_UP, link_type=ARPHRD_ETHER, mac=None, mtu=None,
+         operstate=None, kind=None) -> bytes:
+    payload = IFINFOMSG.pack(socket.AF_UNSPEC, link_type, index, flags, 0xFFFFFFFF)
+    if name is not None:
+        payload += attribute(IFLA_IFNAME, name.encode() + b"\0")
+    if mac is not None:
+        payload += attribute(IFLA_ADDRESS, bytes.fromhex(mac.replace(":", "")))
+    if mtu is not None:
+        payload += attribute(IFLA_MTU, mtu.to_bytes(4, sys.byteorder))
+    if operstate is not None:
+        payload += attribute(IFLA_OPERSTATE, bytes([operstate]))
+    if kind is not None:
+        payload += attribute(IFLA_LINKINFO, attribute(IFLA_INFO_KIND, kind.encode() + b"\0"))
+    return payload
+
+
+def address(index, ip, prefix, family=socket.AF_INET, local=True) -> bytes:
+    raw = socket.inet_pton(family, ip)
+    payload = IFADDRMSG.pack(family, prefix, 0, 0, index) + attribute(IFA_ADDRESS, raw)
+    return payload + attribute(IFA_LOCAL, raw) if local else payload
+
+
+@pytest.fixture
+def table(tmp_path):
+    # Empty sysfs: nothing is wireless unless a test says so
+    return InterfaceTable(sysfs=str(tmp_path))
+
+
+def test_new_link(table):
+    event, interface = table.apply(RTM_NEWLINK, link(2, "eth0", mac="08:00:27:3a:9c:11", mtu=1500, operstate=6,
+                                                     kind="veth"))
+    assert event == "added"
+    assert (interface.name, interface.mac, interface.mtu, interface.operstate, interface.kind) == \
+        ("eth0", "08:00:27:3a:9c:11", 1500, "up", "veth")
+    assert interface.running
+    assert table.get("eth0") is interface
+    assert table.apply(RTM_NEWLINK, link(2, "eth0", flags=0, operstate=2))[0] == "changed"
+    assert not interface.up
+
+
+def test_rename_moves_name_index(table, tmp_path):
+    table.apply(RTM_NEWLINK, link(3, "wlan0"))
+    (tmp_path / "wlx00c0ca123456" / "phy80211").mkdir(parents=True)
+    event, interface = table.apply(RTM_NEWLINK, link(3, "wlx00c0ca123456"))
+    assert event == "changed"
+    assert table.get("wlan0") is None
+    assert table.get("wlx00c0ca123456") is interface
+    assert interface.wireless
+    # A later message without IFLA_IFNAME keeps the name
+    table.apply(RTM_NEWLINK, link(3, link_type=ARPHRD_IEEE80211_RADIOTAP))
+    assert interface.name == "wlx00c0ca123456"
+    assert interface.monitor
+    assert table.preferred(monitor=True) is interface
+
+
+def test_delete_link(table):
+    table.apply(RTM_NEWLINK, link(4, "tun0"))
+    event, interface = table.apply(RTM_DELLINK, link(4, "tun0"))
+    assert (event, interface.name) == ("removed", "tun0")
+    assert table.get("tun0") is None
+    assert len(table) == 0
+    # Unknown index: nothing to do
+    assert table.apply(RTM_DELLINK, link(4, "tun0")) is None
+
+
+def test_delete_after_name_reused(table):
+    # eth1 was renamed away and a new device took the name before the old one went
+    table.apply(RTM_NEWLINK, link(5, "eth1"))
+    table.apply(RTM_NEWLINK, link(5, "old1"))
+    table.apply(RTM_NEWLINK, link(6, "eth1"))
+    table.apply(RTM_DELLINK, link(5))
+    assert table.get("eth1").index == 6
+
+
+def test_address_add_and_remove(table):
+    table.apply(RTM_NEWLINK, link(2, "eth0"))
+    event, interface = table.apply(RTM_NEWADDR, address(2, "192.168.56.10", 24))
+    assert event == "address"
+    table.apply(RTM_NEWADDR, address(2, "fe80::a00:27ff:fe3a:9c11", 64, socket.AF_INET6, local=False))
+    assert interface.addresses == {"192.168.56.10/24": socket.AF_INET, "fe80::a00:27ff:fe3a:9c11/64": socket.AF_INET6}
+    assert interface.describe() == "eth0 (up, 192.168.56.10, fe80::a00:27ff:fe3a:9c11)"
+    table.apply(RTM_DELADDR, address(2, "192.168.56.10", 24))
+    assert list(interface.addresses) == ["fe80::a00:27ff:fe3a:9c11/64"]
+    # Addresses of interfaces we have not seen are ignored
+    assert table.apply(RTM_NEWADDR, address(9, "10.0.0.1", 8)) is None
+
+
+def test_preferred_interface(table):
+    table.apply(RTM_NEWLINK, link(1, "lo", flags=IFF_UP | 0x8))
+    table.apply(RTM_NEWLINK, link(2, "eth0"))
+    table.apply(RTM_NEWLINK, link(3, "eth1"))
+    table.apply(RTM_NEWADDR, address(3, "10.0.0.5", 24))
+    assert table.preferred().name == "eth1"
+
+
+def test_iter_messages_splits_datagram():
+    first, second = link(2, "eth0"), address(2, "10.0.0.1", 8)
+    data = b""
+    for kind, payload in ((RTM_NEWLINK, first), (RTM_NEWADDR, second)):
+        message = NLMSGHDR.pack(NLMSGHDR.size + len(payload), kind, 0, 0, 0) + payload
+        data += message + b"\0" * (-len(message) % 4)
+    assert list(iter_messages(data)) == [(RTM_NEWLINK, 0, first), (RTM_NEWADDR, 0, second)]
+
+
+# Runs inside `unshare -rn`: a private network namespace where we may add links
+VETH_SCRIPT = """
+import subprocess, time
+from penmode.netlink import NetlinkWatcher
+
+events = []
+watcher = NetlinkWatcher(lambda event, interface: events.append((event, interface and interface.name)))
+watcher.start()
+
+
+def ip(*args):
+    subprocess.run(["ip"] + list(args), check=True)
+
+
+def wait_for(condition, what):
+    deadline = time.monotonic() + 5
+    while not condition():
+        if time.monotonic() > deadline:
+            raise SystemExit("timed out waiting for " + what + ": " + repr(events))
+        time.sleep(0.02)
+
+
+ip("link", "add", "pmveth0", "type", "veth", "peer", "name", "pmveth1")
+wait_for(lambda: watcher.table.get("pmveth0") and watcher.table.get("pmveth1"), "veth pair")
+assert watcher.table.get("pmveth0").kind == "veth"
+ip("link", "set", "pmveth0", "name", "pmrenamed")
+wait_for(lambda: watcher.table.get("pmrenamed") and not watcher.table.get("pmveth0"), "rename")
+ip("link", "set", "pmrenamed", "up")
+ip("addr", "add", "10.99.0.1/24", "dev", "pmrenamed")
+wait_for(lambda: "10.99.0.1/24" in watcher.table.get("pmrenamed").addresses, "address")
+ip("addr", "del", "10.99.0.1/24", "dev", "pmrenamed")
+wait_for(lambda: not watcher.table.get("pmrenamed").addresses, "address removal")
+ip("link", "del", "pmrenamed")
+wait_for(lambda: not watcher.table.get("pmrenamed") and not watcher.table.get("pmveth1"), "removal")
+watcher.stop()
+print("ok", len(events))
+"""
+
+
+def can_unshare() -> bool:
+    if not sys.platform.startswith("linux") or shutil.which("unshare") is None or shutil.which("ip") is None:
+        return False
+    probe = subprocess.run(["unshare", "-rn", "ip", "link", "add", "pmprobe", "type", "veth", "peer", "name", "pmprobe1"],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return probe.returncode == 0
+
+
+@pytest.mark.skipif(not can_unshare(), reason="cannot create a network namespace with veth pairs")
+def test_watcher_follows_veth_pair():
+    env = dict(os.environ, PYTHONPATH=APP_DIR)
+    result = subprocess.run(["unshare", "-rn", sys.executable, "-c", VETH_SCRIPT], env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr + result.stdout
+    assert result.stdout.startswith("ok")
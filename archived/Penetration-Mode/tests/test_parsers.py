@@ -0,0 +1,130 @@
+import os
+
+import pytest
+
+from penmode.parsers import MasscanJSONParser, NmapXMLParser, OutputIngest, stdout_parser, structured_output
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+
+def recorded(name):
+    with open(os.path.join(DATA, name)) as f:
+        return f.read().splitlines()
+
+
+def feed_in_batches(parser, lines, size):
+    findings = []
+    for start in range(0, len(lines), size):
+        findings.extend(parser.feed(lines[start:start + size]))
+    return findings + parser.close()
+
+
+@pytest.mark.parametrize("batch", [1, 3, 1000])
+def test_nmap_xml_across_batches(batch):
+    findings = feed_in_batches(NmapXMLParser(), recorded("nmap_shard0.xml"), batch)
+    assert findings == [
+        ("192.168.56.1", 22, "tcp", "open", "ssh", "OpenSSH", "9.6p1 Ubuntu 3ubuntu13.5", "gateway.lab"),
+        ("192.168.56.1", 80, "tcp", "open", "http", "nginx", "1.24.0", "gateway.lab"),
+        ("192.168.56.1", 443, "tcp", "closed", "https", "", "", "gateway.lab"),
+        ("192.168.56.5", 22, "tcp", "open", "ssh", "OpenSSH", "8.9p1 Ubuntu 3ubuntu0.10", ""),
+        ("192.168.56.5", 80, "tcp", "filtered", "http", "", "", ""),
+        ("192.168.56.5", 443, "tcp", "filtered", "https", "", "", ""),
+    ]
+
+
+def test_nmap_host_spread_over_batches():
+    # Two lines per batch: every <host> arrives in pieces and still comes out whole
+    findings = feed_in_batches(NmapXMLParser(), recorded("nmap_shard1.xml"), 2)
+    assert [finding[:4] for finding in findings if finding[3] == "open"] == [
+        ("192.168.56.5", 22, "tcp", "open"), ("192.168.56.10", 80, "tcp", "open"), ("192.168.56.10", 443, "tcp", "open")]
+
+
+def test_nmap_host_only_scan():
+    findings = feed_in_batches(NmapXMLParser(), recorded("nmap_ping.xml"), 4)
+    # -sn: one finding per host, without port, with the host state; the MAC is not the address
+    assert findings == [
+        ("192.168.56.1", None, None, "up", "", "", "", "gateway.lab"),
+        ("192.168.56.5", None, None, "up", "", "", "", ""),
+    ]
+
+
+def test_nmap_truncated_document_keeps_finished_hosts():
+    lines = recorded("nmap_shard0.xml")
+    cut = next(i for i, line in enumerate(lines) if 'addr="192.168.56.5"' in line)
+    parser = NmapXMLParser()
+    findings = feed_in_batches(parser, lines[:cut], 5)
+    # The scan was killed: the first host is complete, the second never closed
+    assert {finding[0] for finding in findings} == {"192.168.56.1"}
+    assert parser.error is None
+    # Garbage after the cut stops the parser but does not raise
+    assert parser.feed(["</nope>"]) == []
+    assert parser.error is not None
+    assert parser.feed(lines[cut:]) == []
+
+
+def test_nmap_finished_hosts_are_dropped_from_tree():
+    parser = NmapXMLParser()
+    lines = recorded("nmap_shard0.xml")
+    end_of_first_host = next(i for i, line in enumerate(lines) if line == "</host>")
+    parser.feed(lines[:end_of_first_host + 1])
+    assert parser._root.tag == "nmaprun"
+    assert parser._root.find("host") is None
+    parser.feed(lines[end_of_first_host + 1:])
+    assert len(parser._root) == 0
+
+
+def test_not_xml_stops_parser():
+    parser = NmapXMLParser()
+    assert parser.feed(["Starting Nmap 7.94SVN ( https://nmap.org )"]) == []
+    assert parser.error is not None
+
+
+def test_masscan_json_across_batches():
+    findings = feed_in_batches(MasscanJSONParser(), recorded("masscan.json"), 2)
+    assert findings == [
+        ("192.168.56.10", 443, "tcp", "open", "", "", "", ""),
+        ("192.168.56.1", 22, "tcp", "open", "", "", "", ""),
+        ("192.168.56.10", 80, "tcp", "open", "", "", "", ""),
+        ("192.168.56.1", 80, "tcp", "", "http.server", "", "", "nginx/1.24.0 (Ubuntu)"),
+    ]
+
+
+def test_masscan_skips_broken_records():
+    parser = MasscanJSONParser()
+    lines = ['{"ip": "10.0.0.1", "ports": [{"port": 22, "proto": "tcp", "status": "open"}]},', '{"ip": "10.0.0.2", "po']
+    assert parser.feed(lines) == [("10.0.0.1", 22, "tcp", "open", "", "", "", "")]
+
+
+@pytest.mark.parametrize("command, expected, parser", [
+    (["nmap", "-sV", "10.0.0.1"], ["nmap", "-sV", "10.0.0.1", "-oX", "-", "-oN", "/dev/stderr"], NmapXMLParser),
+    # A text report of its own: only the XML is added
+    (["nmap", "-oN", "scan.txt", "10.0.0.1"], ["nmap", "-oN", "scan.txt", "10.0.0.1", "-oX", "-"], NmapXMLParser),
+    (["nmap", "-oG", "scan.gnmap", "10.0.0.1"], ["nmap", "-oG", "scan.gnmap", "10.0.0.1", "-oX", "-"], NmapXMLParser),
+    # XML already goes to a file: left alone
+    (["nmap", "-oA", "scan", "10.0.0.1"], ["nmap", "-oA", "scan", "10.0.0.1"], None),
+    (["nmap", "-oX", "scan.xml", "10.0.0.1"], ["nmap", "-oX", "scan.xml", "10.0.0.1"], None),
+    (["nmap", "-oXscan.xml", "10.0.0.1"], ["nmap", "-oXscan.xml", "10.0.0.1"], None),
+    (["/usr/bin/masscan", "-p80", "10.0.0.0/8"], ["/usr/bin/masscan", "-p80", "10.0.0.0/8", "-oJ", "-"],
+     MasscanJSONParser),
+    (["masscan", "-p80", "-oL", "out.txt", "10.0.0.0/8"], ["masscan", "-p80", "-oL", "out.txt", "10.0.0.0/8"], None),
+    (["masscan", "--output-format", "xml", "10.0.0.0/8"], ["masscan", "--output-format", "xml", "10.0.0.0/8"], None),
+    (["sqlmap", "-u", "http://127.0.0.1/"], ["sqlmap", "-u", "http://127.0.0.1/"], None),
+    ([], [], None),
+])
+def test_structured_output(command, expected, parser):
+    result, stdout = structured_output(command)
+    assert result == expected
+    assert type(stdout) is parser if parser is not None else stdout is None
+    # A resumed journal entry gets the same parser back from its command line
+    if parser is not None:
+        assert type(stdout_parser(result)) is parser
+
+
+def test_ingest_batches_findings_and_passes_stderr():
+    batches = []
+    ingest = OutputIngest(NmapXMLParser(), batches.append, batch_size=4, max_delay=60)
+    assert ingest("stdout", recorded("nmap_shard0.xml")) == []
+    assert ingest("stderr", ["Nmap scan report for 192.168.56.1"]) == ["Nmap scan report for 192.168.56.1"]
+    ingest.flush()
+    assert [len(batch) for batch in batches] == [6]
+    assert (ingest.records, ingest.open_ports) == (6, 3)
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+import penmode.privhelper
+from penmode.privhelper import ALLOWED_COMMANDS, ARGUMENT_RULES, PrivilegedHelper, is_allowed, resolve_command
+
+# Root-owned and not writable by anyone else on any Linux box
+ROOT_FILE = "/etc/passwd"
+
+
+@pytest.fixture
+def staged(tmp_path, monkeypatch):
+    path = tmp_path / "resolv.conf"
+    path.write_text("nameserver 9.9.9.9\n")
+    monkeypatch.setattr(penmode.privhelper, "STAGED_RESOLV_CONF", str(path))
+    return str(path)
+
+
+def test_every_command_has_a_rule():
+    assert ALLOWED_COMMANDS == set(ARGUMENT_RULES)
+
+
+@pytest.mark.parametrize("command", [
+    ["systemctl", "start", "tor"],
+    ["systemctl", "stop", "tor"],
+    ["pkill", "openvpn"],
+    ["ip", "link", "set", "wlan0", "down"],
+    ["ip", "link", "set", "wlan0", "up"],
+    ["macchanger", "-r", "wlan0"],
+])
+def test_anonymity_actions_are_allowed(command):
+    assert is_allowed(command)
+
+
+@pytest.mark.parametrize("command", [
+    ["nmap", "--script", "exploit", "10.0.0.1"],
+    ["proxychains", "sh", "-c", "id"],
+    ["ip", "netns", "exec", "x", "sh"],
+    ["ip", "link", "set", "-all", "down"],
+    ["apt-get", "-o", "APT::Update::Pre-Invoke::=id", "update"],
+    ["sqlmap", "-u", "http://127.0.0.1/"],
+    ["systemctl", "start", "sshd"],
+    ["pkill", "-9", "sshd"],
+    ["macchanger", "-m", "00:11:22:33:44:55", "wlan0"],
+    ["mv", "/etc/shadow", "/etc/resolv.conf"],
+    ["openvpn", "--config", ROOT_FILE, "--daemon"],
+    [],
+])
+def test_everything_else_is_refused(command):
+    assert not is_allowed(command)
+
+
+def test_openvpn_only_with_authorized_root_owned_config(tmp_path):
+    command = ["openvpn", "--config", ROOT_FILE, "--daemon"]
+    assert is_allowed(command, vpn_config=ROOT_FILE)
+    assert not is_allowed(command + ["--up", "/tmp/x"], vpn_config=ROOT_FILE)
+    assert not is_allowed(["openvpn", "--config", "/etc/other.conf", "--daemon"], vpn_config=ROOT_FILE)
+    writable = tmp_path / "client.conf"
+    writable.write_text("remote example.org\n")
+    writable.chmod(0o666)
+    assert not is_allowed(["openvpn", "--config", str(writable), "--daemon"], vpn_config=str(writable))
+
+
+def test_mv_only_from_staged_file(staged, tmp_path):
+    assert is_allowed(["mv", staged, "/etc/resolv.conf"])
+    assert not is_allowed(["mv", staged, "/etc/hosts"])
+    os.remove(staged)
+    os.symlink("/etc/shadow", staged)
+    assert not is_allowed(["mv", staged, "/etc/resolv.conf"])
+
+
+def test_resolve_command_rejects_disallowed_arguments():
+    with pytest.raises(PermissionError):
+        resolve_command(["nmap", "-sV", "10.0.0.1"])
+    with pytest.raises(PermissionError):
+        resolve_command(["ip", "netns", "exec", "x", "sh"])
+
+
+def test_client_sends_only_allowed_commands_to_helper():
+    helper = PrivilegedHelper()
+    assert helper.allowed(["systemctl", "start", "tor"])
+    assert not helper.allowed(["nmap", "-sS", "10.0.0.1"])
+    helper.set_vpn_config(ROOT_FILE)
+    assert helper.allowed(["openvpn", "--config", ROOT_FILE, "--daemon"])
+    helper.enabled = False
+    assert not helper.allowed(["systemctl", "start", "tor"])
@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+
+from penmode.results import date_key
+
+
+@pytest.fixture
+def messages(monkeypatch):
+    pytest.importorskip("PyQt5")
+    from PyQt5.QtWidgets import QMessageBox
+    shown = []
+    monkeypatch.setattr(QMessageBox, "information", lambda parent, title, text: shown.append((title, text)))
+    return shown
+
+
+def results_window(make_window):
+    window = make_window()
+    # The tab is built when first shown
+    window.tabs.setCurrentWidget(window.results_tab)
+    return window
+
+
+def click_bar(window, tool):
+    from PyQt5.QtCore import QPointF
+
+    class Click:
+        def pos(self):
+            return window.results_graph.mapFromScene(QPointF(-995, -995))
+
+    bar = window.results_graph_scene.addRect(-1000, -1000, 10, 10)
+    bar.setData(1, tool)
+    window.on_graph_click(Click())
+
+
+def test_graph_click_shows_tool_stats(make_window, messages):
+    window = results_window(make_window)
+    window.tool_stats.add("Nmap", "Success", 2.0)
+    click_bar(window, "Nmap")
+    assert window.graph_info_label.text().startswith("Nmap: 1 runs, 1 ok, 0 failed, avg 2.00s")
+    assert [title for title, _text in messages] == ["Nmap Details"]
+
+
+def test_graph_click_on_stale_bar(make_window, messages):
+    # The stats were cleared; the bar is still in the scene until the chart is rebuilt
+    window = results_window(make_window)
+    window.graph_info_label.setText("")
+    click_bar(window, "Hydra")
+    assert window.graph_info_label.text() == ""
+    assert messages == []
+
+
+def test_date_filter_reports_total(make_window):
+    window = results_window(make_window)
+    from PyQt5.QtCore import QDate
+    for day in (1, 15, 28):
+        window.history.append(date_key(datetime(2025, 2, day, 12, 0)), "Nmap", "-sn 10.0.0.0/24", "", "Success", 1.0)
+    window.start_date.setDate(QDate(2025, 2, 10))
+    window.end_date.setDate(QDate(2025, 2, 20))
+    window.filter_results_by_date()
+    assert window.output.toPlainText().splitlines()[-1] == "Showing 1 of 3 results."
+    # Narrowing again still counts against every stored result
+    window.start_date.setDate(QDate(2025, 2, 1))
+    window.end_date.setDate(QDate(2025, 2, 1))
+    window.filter_results_by_date()
+    assert window.output.toPlainText().splitlines()[-1] == "Showing 1 of 3 results."
@@ -0,0 +1,134 @@
+import ipaddress
+import os
+
+import pytest
+
+from penmode.parsers import NmapXMLParser
+from penmode.sharding import NmapCommand, ShardGroup, ShardMerger, plan_shards, shard_count, target_ranges
+
+DATA = os.path.join(os.path.dirname(__file__), "data")
+
+
+def recorded(name):
+    with open(os.path.join(DATA, name)) as f:
+        return f.read().splitlines()
+
+
+def addresses(shards):
+    covered = []
+    for shard in shards:
+        for target in shard.targets:
+            covered.extend(int(address) for address in ipaddress.ip_network(target))
+    return covered
+
+
+def test_command_split_into_options_targets_and_ports():
+    command = NmapCommand(["-sV", "-p", "22,80", "--max-rate", "500", "-T4", "10.0.0.0/24", "scanme.nmap.org"])
+    assert command.options == ["-sV", "-T4"]
+    assert command.targets == ["10.0.0.0/24", "scanme.nmap.org"]
+    assert command.ports == "22,80"
+    assert command.max_rate == 500
+    assert command.build(max_rate=250) == ["nmap", "-sV", "-T4", "-p", "22,80", "--max-rate", "250",
+                                           "10.0.0.0/24", "scanme.nmap.org"]
+
+
+def test_cidr_split_is_balanced_and_complete():
+    shards = plan_shards(NmapCommand(["-sS", "10.0.0.0/24"]), 4)
+    assert [shard.targets for shard in shards] == [["10.0.0.0/26"], ["10.0.0.64/26"], ["10.0.0.128/26"],
+                                                   ["10.0.0.192/26"]]
+    assert sorted(addresses(shards)) == [int(address) for address in ipaddress.ip_network("10.0.0.0/24")]
+
+
+def test_octet_range_split():
+    assert target_ranges("10.0.0-1.1-254") == [(0x0A000001, 0x0A0000FE), (0x0A000101, 0x0A0001FE)]
+    shards = plan_shards(NmapCommand(["-sS", "10.0.0-1.1-254"]), 2)
+    assert len(shards) == 2
+    assert [shard.addresses for shard in shards] == [254, 254]
+    covered = sorted(addresses(shards))
+    assert covered == sorted(lo + offset for lo, hi in target_ranges("10.0.0-1.1-254") for offset in range(hi - lo + 1))
+
+
+def test_hostnames_go_to_lightest_shard():
+    assert target_ranges("scanme.nmap.org") is None
+    shards = plan_shards(NmapCommand(["-sS", "10.0.0.0/27", "10.0.1.0/28", "scanme.nmap.org"]), 2)
+    # 48 addresses: 24 per shard, the hostname lands on the first one that is lightest
+    assert [shard.addresses for shard in shards] == [25, 24]
+    assert shards[0].targets[-1] == "scanme.nmap.org"
+
+
+def test_small_range_runs_as_is():
+    shards = plan_shards(NmapCommand(["-sS", "-p", "80", "10.0.0.0/29"]), 4)
+    assert len(shards) == 1
+    assert shards[0].targets == ["10.0.0.0/29"]
+
+
+def test_port_split_fallback():
+    command = NmapCommand(["-sS", "-p", "1-1000", "10.0.0.0/29"])
+    shards = plan_shards(command, 4, split_ports=True)
+    assert [shard.ports for shard in shards] == ["1-250", "251-500", "501-750", "751-1000"]
+    assert all(shard.targets == ["10.0.0.0/29"] for shard in shards)
+    assert command.build(shards[1]) == ["nmap", "-sS", "-p", "251-500", "10.0.0.0/29"]
+    # Named and protocol-prefixed port specs are kept whole
+    assert len(plan_shards(NmapCommand(["-sS", "-p", "U:53,T:80", "10.0.0.0/29"]), 4, split_ports=True)) == 1
+
+
+@pytest.mark.parametrize("args", [
+    ["-sS", "-oX", "scan.xml", "10.0.0.0/16"],
+    ["-sS", "-oA", "scan", "10.0.0.0/16"],
+    ["-sS", "-iL", "targets.txt"],
+    ["--resume", "scan.gnmap"],
+    ["--resume=scan.gnmap"],
+])
+def test_unshardable_commands(args):
+    command = NmapCommand(args)
+    assert not command.shardable
+    assert len(plan_shards(command, 8)) == 1
+
+
+def test_shard_count():
+    assert shard_count(8) == 8
+    assert shard_count(8, budget=300) == 3
+    assert shard_count(8, budget=300, limit=2) == 2
+    assert shard_count(0) == 1
+
+
+def test_merger_deduplicates_overlapping_shards():
+    # Two shards whose blocks both held 192.168.56.5 (a hostname target that
+    # resolved into the other shard's block, for one)
+    group = ShardGroup(["nmap", "-sV", "-p", "22,80,443", "192.168.56.0/28"], [])
+    merged = []
+    for name in ("nmap_shard0.xml", "nmap_shard1.xml"):
+        parser = NmapXMLParser()
+        lines = recorded(name)
+        # Fed in batches, as the job's output arrives
+        for start in range(0, len(lines), 7):
+            merged.extend(group.merger.add(parser.feed(lines[start:start + 7])))
+        assert parser.error is None
+    assert sorted({finding[0] for finding in merged}) == ["192.168.56.1", "192.168.56.10", "192.168.56.5"]
+    assert len(merged) == 9
+    assert len({finding[:3] for finding in merged}) == 9
+    assert group.merger.duplicates == 3
+    assert group.merger.open_ports == 5
+
+
+def test_merger_keeps_first_answer():
+    merger = ShardMerger()
+    first = ("10.0.0.1", 80, "tcp", "open", "http", "nginx", "1.24.0", "")
+    assert merger.add([first]) == [first]
+    assert merger.add([("10.0.0.1", 80, "tcp", "filtered", "http", "", "", "")]) == []
+    assert (merger.findings, merger.duplicates, merger.open_ports) == (1, 1, 1)
+
+
+def test_group_progress_and_completion():
+    group = ShardGroup(["nmap"], [])
+
+    class FakeJob:
+        def __init__(self, job_id):
+            self.id = job_id
+
+    jobs = [FakeJob(1), FakeJob(2)]
+    for job in jobs:
+        group.add_job(job)
+    assert group.set_progress(jobs[0], 50) == 25
+    assert not group.finish(jobs[0])
+    assert group.finish(jobs[1])
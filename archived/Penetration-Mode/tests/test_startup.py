@@ -0,0 +1,26 @@
+from penmode.config import history_path, journal_path, outputs_path
+
+
+def test_history_falls_back_to_memory(home, make_window):
+    # A database path that cannot be opened: the window still starts, on an in-memory history
+    history_path("default_user").mkdir()
+    window = make_window()
+    assert window.history.path == ":memory:"
+    assert "History database error" in window.output.toPlainText()
+
+
+def test_runs_without_blob_store(home, make_window):
+    # A file where the outputs directory should be
+    outputs_path("default_user").write_text("")
+    window = make_window()
+    assert window.blob_store is None
+    assert "Output store error" in window.output.toPlainText()
+
+
+def test_runs_without_job_journal(home, make_window):
+    journal_path("default_user").write_text("")
+    window = make_window()
+    assert window.journal is None
+    assert "Job journal error" in window.output.toPlainText()
+    # Jobs are still submitted, just not journaled
+    assert window.journal_entry(["nmap", "-sn", "10.0.0.1"]) is None
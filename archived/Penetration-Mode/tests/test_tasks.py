@@ -0,0 +1,171 @@
+import json
+import queue
+from datetime import datetime
+
+import pytest
+
+import penmode.tasks
+from penmode.tasks import (CATCH_UP_ALL, CATCH_UP_ONCE, CATCH_UP_SKIP, MAX_CATCH_UP, Schedule, ScheduledTask,
+                           TaskScheduler, parse_duration)
+
+HOUR = 3600
+# Saturday 11 January 2025, local time; no DST change for weeks either side
+NOW = datetime(2025, 1, 11, 10, 30).timestamp()
+
+
+class Clock:
+    def __init__(self, now=NOW):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def next_fire(expression, after=NOW):
+    return datetime.fromtimestamp(Schedule(expression).next_after(after))
+
+
+@pytest.mark.parametrize("expression, expected", [
+    ("@hourly", datetime(2025, 1, 11, 11, 0)),
+    ("@daily", datetime(2025, 1, 12, 0, 0)),
+    ("@midnight", datetime(2025, 1, 12, 0, 0)),
+    ("@weekly", datetime(2025, 1, 12, 0, 0)),
+    ("@monthly", datetime(2025, 2, 1, 0, 0)),
+    ("@yearly", datetime(2026, 1, 1, 0, 0)),
+    ("@ANNUALLY", datetime(2026, 1, 1, 0, 0)),
+    ("*/15 * * * *", datetime(2025, 1, 11, 10, 45)),
+    ("5/20 * * * *", datetime(2025, 1, 11, 10, 45)),
+    ("0 9-17/4 * * mon-fri", datetime(2025, 1, 13, 9, 0)),
+    ("30 10 * jan,feb sat", datetime(2025, 1, 18, 10, 30)),
+    ("0 0 * * 7", datetime(2025, 1, 12, 0, 0)),
+    ("0 0 29 2 *", datetime(2028, 2, 29, 0, 0)),
+])
+def test_next_fire_time(expression, expected):
+    assert next_fire(expression) == expected
+
+
+def test_day_of_month_or_day_of_week():
+    # 13 January 2025 is a Monday, the 17th a Friday
+    monday = datetime(2025, 1, 13, 9, 0).timestamp()
+    assert next_fire("0 9 13 * *") == datetime(2025, 1, 13, 9, 0)
+    assert next_fire("0 9 13 * *", monday) == datetime(2025, 2, 13, 9, 0)
+    assert next_fire("0 9 * * fri") == datetime(2025, 1, 17, 9, 0)
+    # Both restricted: either one matches, as in cron
+    assert next_fire("0 9 13 * fri") == datetime(2025, 1, 13, 9, 0)
+    assert next_fire("0 9 13 * fri", monday) == datetime(2025, 1, 17, 9, 0)
+
+
+def test_every_interval():
+    schedule = Schedule("@every 1h30m")
+    assert schedule.interval == 5400
+    assert schedule.next_after(NOW) == NOW + 5400
+    assert parse_duration("2d") == 172800
+    assert parse_duration(" 90s ") == 90
+
+
+@pytest.mark.parametrize("expression", [
+    "61 * * * *", "* 24 * * *", "* * 0 * *", "* * * 13 *", "* * * * 8", "*/0 * * * *", "10-5 * * * *",
+    "* * * *", "@every 0s", "@every soon", "@every 5x", "@fortnightly", "0 0 30 2 *",
+])
+def test_invalid_schedules(expression):
+    with pytest.raises(ValueError):
+        Schedule(expression).next_after(NOW)
+
+
+def test_unknown_catch_up_policy():
+    with pytest.raises(ValueError):
+        ScheduledTask("scan", ["nmap", "10.0.0.1"], "@hourly", catch_up="sometimes")
+
+
+def saved(path, **task):
+    entry = {"name": "sweep", "command": ["nmap", "-sn", "10.0.0.0/24"], "schedule": "@every 1h"}
+    entry.update(task)
+    path.write_text(json.dumps({"tasks": [entry]}))
+    return str(path)
+
+
+def load(path, clock=None):
+    fired, skipped = [], []
+    scheduler = TaskScheduler(path, fire=lambda task: fired.append(task.name),
+                              on_skip=lambda task, reason: skipped.append(reason), clock=clock or Clock())
+    return scheduler, fired, skipped
+
+
+@pytest.mark.parametrize("policy, max_overlap, now_runs, backlog", [
+    (CATCH_UP_SKIP, 1, 0, 0),
+    (CATCH_UP_ONCE, 1, 1, 0),
+    (CATCH_UP_ONCE, 3, 1, 0),
+    (CATCH_UP_ALL, 1, 1, 2),
+    (CATCH_UP_ALL, 2, 2, 1),
+    (CATCH_UP_ALL, 5, 3, 0),
+])
+def test_catch_up_policies(tmp_path, policy, max_overlap, now_runs, backlog):
+    # Due 2.5h ago on an hourly schedule: three runs were missed
+    path = saved(tmp_path / "tasks.json", catch_up=policy, max_overlap=max_overlap, next_due=NOW - 2.5 * HOUR)
+    scheduler, fired, _skipped = load(path)
+    task = scheduler.tasks()[0]
+    assert len(fired) == now_runs
+    assert task.backlog == backlog
+    # The next run is counted from now, not from the missed ones
+    assert task.next_due == NOW + HOUR
+    # Each finished run lets one queued run start
+    for _ in range(backlog):
+        scheduler.finished("sweep")
+    assert len(fired) == (3 if policy == CATCH_UP_ALL else now_runs)
+    assert task.backlog == 0
+
+
+def test_catch_up_is_capped(tmp_path):
+    path = saved(tmp_path / "tasks.json", catch_up=CATCH_UP_ALL, max_overlap=100, next_due=NOW - 50 * HOUR)
+    _scheduler, fired, _skipped = load(path)
+    assert len(fired) == MAX_CATCH_UP
+
+
+def test_disabled_task_does_not_catch_up(tmp_path):
+    path = saved(tmp_path / "tasks.json", catch_up=CATCH_UP_ALL, enabled=False, next_due=NOW - 2.5 * HOUR)
+    scheduler, fired, _skipped = load(path)
+    assert fired == []
+    assert scheduler.upcoming() == []
+
+
+def test_persistence_round_trip(tmp_path):
+    path = str(tmp_path / "tasks.json")
+    clock = Clock()
+    scheduler = TaskScheduler(path, clock=clock)
+    scheduler.add(ScheduledTask("nightly", ["nmap", "-sV", "10.0.0.0/24"], "0 2 * * *", jitter=300,
+                                catch_up=CATCH_UP_ALL, max_overlap=2))
+    scheduler.add(ScheduledTask("dns", ["nslookup", "example.org"], "@every 15m", catch_up=CATCH_UP_SKIP))
+    scheduler.add(ScheduledTask("gone", ["sqlmap", "-u", "http://a/"], "@daily"))
+    scheduler.remove("gone")
+    scheduler.set_enabled("dns", False)
+    scheduler.save()
+    reloaded = TaskScheduler(path, clock=clock)
+    assert [task.to_dict() for task in reloaded.tasks()] == [task.to_dict() for task in scheduler.tasks()]
+    nightly = {task.name: task for task in reloaded.tasks()}["nightly"]
+    assert nightly.next_due == datetime(2025, 1, 12, 2, 0).timestamp()
+    assert nightly.next_due <= nightly.next_run <= nightly.next_due + 300
+    assert [name for _, name in reloaded.upcoming()] == ["nightly"]
+
+
+def test_due_tasks_fire_and_respect_max_overlap(monkeypatch):
+    # Polls the fake clock instead of sleeping until the next due time
+    monkeypatch.setattr(penmode.tasks, "MAX_SLEEP", 0.01)
+    clock = Clock()
+    events = queue.Queue()
+    scheduler = TaskScheduler(fire=lambda task: events.put(("fire", task.running)),
+                              on_skip=lambda task, reason: events.put(("skip", reason)), clock=clock)
+    scheduler.add(ScheduledTask("sweep", ["nmap", "-sn", "10.0.0.0/24"], "@every 1m", max_overlap=1))
+    scheduler.start()
+    try:
+        assert events.empty()
+        clock.now += 60
+        assert events.get(timeout=5) == ("fire", 1)
+        # Still running when the next one is due
+        clock.now += 60
+        assert events.get(timeout=5) == ("skip", "1 run(s) still active")
+        scheduler.finished("sweep")
+        clock.now += 60
+        assert events.get(timeout=5) == ("fire", 1)
+        assert scheduler.tasks()[0].skipped == 1
+    finally:
+        scheduler.stop()
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from penmode.updates import RELEASE_INFO, RELEASE_INFO_PATHS, UpdateChecker, version_key
+
+
+class ReleaseServer(ThreadingHTTPServer):
+    """Publishes one release-info.json and answers conditional requests
+    for it with 304."""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ReleaseHandler)
+        self.requests = []
+        self.publish({"image-tag": "2.7", "version-pretty": "HackerOS 2.7"}, '"v1"', "Mon, 05 Oct 2026 10:00:00 GMT")
+
+    def publish(self, release, etag, last_modified):
+        self.release, self.etag, self.last_modified = release, etag, last_modified
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/release-info.json"
+
+
+class ReleaseHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if (self.headers.get("If-None-Match") == server.etag
+                or self.headers.get("If-Modified-Since") == server.last_modified):
+            self.send_response(304)
+            self.send_header("ETag", server.etag)
+            self.end_headers()
+            return
+        body = json.dumps(server.release).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", server.etag)
+        self.send_header("Last-Modified", server.last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    # urllib would send even 127.0.0.1 to a configured proxy
+    for name in ("http_proxy", "HTTP_PROXY", "no_proxy", "NO_PROXY"):
+        monkeypatch.delenv(name, raising=False)
+    server = ReleaseServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def installed(tmp_path):
+    path = tmp_path / "release-info.json"
+    path.write_text(json.dumps({"image-tag": "2.6"}))
+    return str(path)
+
+
+def read_cache(checker):
+    with open(checker.cache_path) as f:
+        return json.load(f)
+
+
+def test_fresh_cache_answers_without_request(server, installed, tmp_path):
+    checker = UpdateChecker(server.url, cache_path=str(tmp_path / "cache.json"), release_info_paths=[installed])
+    assert checker.check().source == "network"
+    status = checker.check()
+    assert status.source == "cache"
+    assert status.available
+    assert len(server.requests) == 1
+
+
+def test_not_modified_keeps_cache(server, installed, tmp_path):
+    # min_interval=0: every check revalidates
+    checker = UpdateChecker(server.url, cache_path=str(tmp_path / "cache.json"), release_info_paths=[installed],
+                            min_interval=0)
+    assert checker.check().source == "network"
+    cached = read_cache(checker)
+    assert cached["etag"] == '"v1"'
+    status = checker.check()
+    assert status.source == "not-modified"
+    assert status.latest == server.release
+    assert server.requests[-1]["If-None-Match"] == '"v1"'
+    assert server.requests[-1]["If-Modified-Since"] == "Mon, 05 Oct 2026 10:00:00 GMT"
+    revalidated = read_cache(checker)
+    assert (revalidated["body"], revalidated["etag"], revalidated["last_modified"]) == \
+        (cached["body"], cached["etag"], cached["last_modified"])
+    assert revalidated["fetched_at"] >= cached["fetched_at"]
+
+
+def test_new_release_replaces_cache(server, installed, tmp_path):
+    checker = UpdateChecker(server.url, cache_path=str(tmp_path / "cache.json"), release_info_paths=[installed],
+                            min_interval=0)
+    checker.check()
+    server.publish({"image-tag": "2.8", "version-pretty": "HackerOS 2.8"}, '"v2"', "Fri, 16 Oct 2026 10:00:00 GMT")
+    status = checker.check()
+    assert status.source == "network"
+    assert status.latest["image-tag"] == "2.8"
+    assert server.requests[-1]["If-None-Match"] == '"v1"'
+    cached = read_cache(checker)
+    assert cached["etag"] == '"v2"'
+    assert cached["last_modified"] == "Fri, 16 Oct 2026 10:00:00 GMT"
+    assert cached["body"]["image-tag"] == "2.8"
+
+
+def test_installed_path_mirrors_source_tree():
+    installed, source = RELEASE_INFO_PATHS
+    assert installed == "/usr/share/" + RELEASE_INFO
+    with open(source) as f:
+        assert version_key(json.load(f))
+    # The installer moves the tree that holds the source copy to /usr/share
+    update_repos = source[:source.index("/official/")]
+    with open(os.path.join(update_repos, "unpack.sh")) as f:
+        assert "official/HackerOS/ /usr/share\n" in f.read()